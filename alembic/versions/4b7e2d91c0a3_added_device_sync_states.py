@@ -0,0 +1,37 @@
+"""added device sync states
+
+Revision ID: 4b7e2d91c0a3
+Revises: c13650c31090
+Create Date: 2025-08-04 10:12:37.204118
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4b7e2d91c0a3"
+down_revision: Union[str, None] = "c13650c31090"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "device_sync_states",
+        sa.Column("user_device_id", sa.UUID(), nullable=False),
+        sa.Column("last_seq", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_device_id"], ["user_devices.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("user_device_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("device_sync_states")
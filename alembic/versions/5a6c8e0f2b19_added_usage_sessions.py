@@ -0,0 +1,58 @@
+"""added usage sessions
+
+Revision ID: 5a6c8e0f2b19
+Revises: cfe09004f740
+Create Date: 2025-08-13 10:41:08.204117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5a6c8e0f2b19"
+down_revision: Union[str, None] = "cfe09004f740"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "usage_sessions",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_device_id", sa.UUID(), nullable=False),
+        sa.Column("user_app_id", sa.UUID(), nullable=False),
+        sa.Column("started_at", sa.TIMESTAMP(), nullable=False),
+        sa.Column("ended_at", sa.TIMESTAMP(), nullable=False),
+        sa.Column("is_closed", sa.Boolean(), server_default="false", nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_device_id"], ["user_devices.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["user_app_id"], ["user_apps.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_usage_sessions_user_device_id_started_at",
+        "usage_sessions",
+        ["user_device_id", "started_at"],
+    )
+    op.create_index(
+        "ix_usage_sessions_user_app_id_started_at",
+        "usage_sessions",
+        ["user_app_id", "started_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_usage_sessions_user_app_id_started_at", table_name="usage_sessions"
+    )
+    op.drop_index(
+        "ix_usage_sessions_user_device_id_started_at", table_name="usage_sessions"
+    )
+    op.drop_table("usage_sessions")
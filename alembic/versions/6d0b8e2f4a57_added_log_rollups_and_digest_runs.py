@@ -0,0 +1,72 @@
+"""added log rollups and digest runs
+
+Revision ID: 6d0b8e2f4a57
+Revises: 2f9a4c6e8b13
+Create Date: 2025-08-22 10:08:31.774920
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6d0b8e2f4a57"
+down_revision: Union[str, None] = "2f9a4c6e8b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "log_rollups",
+        sa.Column("user_device_id", sa.UUID(), nullable=False),
+        sa.Column("hour", sa.TIMESTAMP(), nullable=False),
+        sa.Column("action_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "degree",
+            postgresql.ENUM(
+                "NEUTRAL",
+                "SUSPICIOUS",
+                "TERRIBLE",
+                name="action_degrees",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("events", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["action_id"], ["actions.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["user_device_id"], ["user_devices.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("user_device_id", "hour", "action_id", "degree"),
+    )
+    op.create_index("ix_log_rollups_hour", "log_rollups", ["hour"], unique=False)
+    op.create_index("ix_logs_modified_at", "logs", ["modified_at"], unique=False)
+    op.create_table(
+        "digest_runs",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("period", sa.String(), nullable=False),
+        sa.Column("period_start", sa.DateTime(), nullable=False),
+        sa.Column("period_end", sa.DateTime(), nullable=False),
+        sa.Column("cursor", sa.UUID(), nullable=True),
+        sa.Column("sent", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("period", "period_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("digest_runs")
+    op.drop_index("ix_logs_modified_at", table_name="logs")
+    op.drop_index("ix_log_rollups_hour", table_name="log_rollups")
+    op.drop_table("log_rollups")
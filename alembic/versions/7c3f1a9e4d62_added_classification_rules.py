@@ -0,0 +1,49 @@
+"""added classification rules
+
+Revision ID: 7c3f1a9e4d62
+Revises: e71b4d2a9c05
+Create Date: 2025-08-18 11:05:29.640183
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3f1a9e4d62"
+down_revision: Union[str, None] = "e71b4d2a9c05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+action_degrees = postgresql.ENUM(
+    "NEUTRAL", "SUSPICIOUS", "TERRIBLE", name="action_degrees", create_type=False
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "classification_rules",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column(
+            "kind",
+            postgresql.ENUM("KEYWORD", "DOMAIN", "PACKAGE", "REGEX", name="rule_kinds"),
+            nullable=False,
+        ),
+        sa.Column("pattern", sa.String(), nullable=False),
+        sa.Column("degree", action_degrees, nullable=False),
+        sa.Column("is_active", sa.Boolean(), server_default="true", nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.add_column("logs", sa.Column("degree", action_degrees, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("logs", "degree")
+    op.drop_table("classification_rules")
+    op.execute("DROP TYPE rule_kinds")
@@ -0,0 +1,49 @@
+"""added run length columns to logs
+
+Revision ID: 9e1f6a3b5d27
+Revises: 4b7e2d91c0a3
+Create Date: 2025-08-05 14:41:09.551872
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e1f6a3b5d27"
+down_revision: Union[str, None] = "4b7e2d91c0a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "logs",
+        sa.Column(
+            "first_at", sa.TIMESTAMP(), server_default=sa.text("now()"), nullable=False
+        ),
+    )
+    op.add_column(
+        "logs",
+        sa.Column(
+            "last_at", sa.TIMESTAMP(), server_default=sa.text("now()"), nullable=False
+        ),
+    )
+    op.add_column(
+        "logs",
+        sa.Column("count", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.execute("UPDATE logs SET first_at = done_at, last_at = done_at")
+    op.create_index(
+        "ix_logs_user_device_id_done_at", "logs", ["user_device_id", "done_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_logs_user_device_id_done_at", table_name="logs")
+    op.drop_column("logs", "count")
+    op.drop_column("logs", "last_at")
+    op.drop_column("logs", "first_at")
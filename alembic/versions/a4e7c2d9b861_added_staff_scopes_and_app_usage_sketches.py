@@ -0,0 +1,51 @@
+"""added staff scopes and app usage sketches
+
+Revision ID: a4e7c2d9b861
+Revises: 6d0b8e2f4a57
+Create Date: 2025-08-26 14:37:12.408315
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4e7c2d9b861"
+down_revision: Union[str, None] = "6d0b8e2f4a57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "staff_scopes",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("school_id", sa.UUID(), nullable=True),
+        sa.Column("district_id", sa.UUID(), nullable=True),
+        sa.Column("region_id", sa.UUID(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["district_id"], ["districts.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["region_id"], ["regions.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["school_id"], ["schools.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_table(
+        "app_usage_sketches",
+        sa.Column("scope", sa.String(), nullable=False),
+        sa.Column("scope_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("scope", "scope_id", "day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("app_usage_sketches")
+    op.drop_table("staff_scopes")
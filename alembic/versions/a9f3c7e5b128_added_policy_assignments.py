@@ -0,0 +1,58 @@
+"""added policy assignments
+
+Revision ID: a9f3c7e5b128
+Revises: d2a8f6c4e913
+Create Date: 2025-09-05 14:12:36.840521
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a9f3c7e5b128"
+down_revision: Union[str, None] = "d2a8f6c4e913"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "policy_assignments",
+        sa.Column("scope", sa.String(), nullable=False),
+        sa.Column("scope_id", sa.UUID(), nullable=False),
+        sa.Column("policy_id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["policy_id"], ["policies.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("scope", "scope_id"),
+    )
+    op.create_index(
+        "ix_policy_assignments_policy_id",
+        "policy_assignments",
+        ["policy_id"],
+        unique=False,
+    )
+    op.add_column("schools", sa.Column("effective_policy_id", sa.UUID(), nullable=True))
+    op.create_foreign_key(
+        "schools_effective_policy_id_fkey",
+        "schools",
+        "policies",
+        ["effective_policy_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    # nothing is inherited yet, so every school keeps its own policy
+    op.execute("UPDATE schools SET effective_policy_id = policy_id")
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "schools_effective_policy_id_fkey", "schools", type_="foreignkey"
+    )
+    op.drop_column("schools", "effective_policy_id")
+    op.drop_index("ix_policy_assignments_policy_id", table_name="policy_assignments")
+    op.drop_table("policy_assignments")
@@ -0,0 +1,61 @@
+"""added alerts
+
+Revision ID: b18e5d7c3a90
+Revises: 7c3f1a9e4d62
+Create Date: 2025-08-20 09:41:12.508316
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b18e5d7c3a90"
+down_revision: Union[str, None] = "7c3f1a9e4d62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "alerts",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_device_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "degree",
+            postgresql.ENUM(
+                "NEUTRAL",
+                "SUSPICIOUS",
+                "TERRIBLE",
+                name="action_degrees",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("window_start", sa.DateTime(), nullable=False),
+        sa.Column("window_end", sa.DateTime(), nullable=False),
+        sa.Column("observed", sa.Integer(), nullable=False),
+        sa.Column("expected", sa.Float(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_device_id"], ["user_devices.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_alerts_user_device_id_window_start",
+        "alerts",
+        ["user_device_id", "window_start"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_alerts_user_device_id_window_start", table_name="alerts")
+    op.drop_table("alerts")
@@ -0,0 +1,44 @@
+"""added location pings
+
+Revision ID: b5d9e3a7c184
+Revises: e4b7c2f9a361
+Create Date: 2025-09-09 15:12:08.339274
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5d9e3a7c184"
+down_revision: Union[str, None] = "e4b7c2f9a361"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # daily partitions are added by the application's partitioner worker
+    op.create_table(
+        "location_pings",
+        sa.Column("user_device_id", sa.UUID(), nullable=False),
+        sa.Column("recorded_at", postgresql.TIMESTAMP(), nullable=False),
+        sa.Column("latitude", postgresql.REAL(), nullable=False),
+        sa.Column("longitude", postgresql.REAL(), nullable=False),
+        sa.Column("accuracy", sa.SmallInteger(), nullable=True),
+        sa.Column("school_id", sa.UUID(), nullable=True),
+        sa.Column("district_id", sa.UUID(), nullable=True),
+        sa.Column("region_id", sa.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_device_id"], ["user_devices.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("user_device_id", "recorded_at"),
+        postgresql_partition_by="RANGE (recorded_at)",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("location_pings")
@@ -0,0 +1,30 @@
+"""added policy versions
+
+Revision ID: b7d4e1a9c062
+Revises: f3c9d4b7a215
+Create Date: 2025-09-03 11:27:14.560318
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d4e1a9c062"
+down_revision: Union[str, None] = "f3c9d4b7a215"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "policies",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("policies", "version")
@@ -0,0 +1,94 @@
+"""added school compliance view
+
+Revision ID: c5d1f8a3e294
+Revises: a4e7c2d9b861
+Create Date: 2025-08-28 09:52:40.116274
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d1f8a3e294"
+down_revision: Union[str, None] = "a4e7c2d9b861"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # one row per school; active devices and event counts cover the 7 days
+    # before the last refresh, setup is judged by each device's latest setup
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW school_compliance AS
+        WITH students AS (
+            SELECT school_id, count(*) AS students
+            FROM student_infos
+            GROUP BY school_id
+        ),
+        devices AS (
+            SELECT si.school_id, ud.id AS user_device_id
+            FROM student_infos si
+            JOIN user_devices ud ON ud.user_id = si.user_id
+            WHERE ud.is_active
+        ),
+        latest_setups AS (
+            SELECT DISTINCT ON (user_device_id)
+                user_device_id,
+                coalesce(
+                    camera AND location AND usage_access AND admin_app
+                    AND accessibility_features AND pop_up
+                    AND notification_service AND battery_optimization AND gps,
+                    false
+                ) AS complete
+            FROM setups
+            ORDER BY user_device_id, created_at DESC
+        ),
+        events AS (
+            SELECT
+                user_device_id,
+                sum(events) FILTER (WHERE degree = 'SUSPICIOUS') AS suspicious,
+                sum(events) FILTER (WHERE degree = 'TERRIBLE') AS terrible
+            FROM log_rollups
+            WHERE hour >= localtimestamp - interval '7 days'
+            GROUP BY user_device_id
+        )
+        SELECT
+            sc.id AS school_id,
+            sc.district_id,
+            sc.region_id,
+            coalesce(max(st.students), 0) AS students,
+            count(d.user_device_id) AS devices,
+            count(e.user_device_id) AS active_devices,
+            count(*) FILTER (WHERE s.complete) AS setup_complete,
+            count(d.user_device_id) FILTER (WHERE s.user_device_id IS NULL)
+                AS setup_missing,
+            coalesce(sum(e.suspicious), 0)::bigint AS suspicious_events,
+            coalesce(sum(e.terrible), 0)::bigint AS terrible_events,
+            localtimestamp AS refreshed_at
+        FROM schools sc
+        LEFT JOIN students st ON st.school_id = sc.id
+        LEFT JOIN devices d ON d.school_id = sc.id
+        LEFT JOIN latest_setups s ON s.user_device_id = d.user_device_id
+        LEFT JOIN events e ON e.user_device_id = d.user_device_id
+        GROUP BY sc.id, sc.district_id, sc.region_id
+        """
+    )
+    # REFRESH ... CONCURRENTLY needs a unique index
+    op.execute(
+        "CREATE UNIQUE INDEX ux_school_compliance_school_id "
+        "ON school_compliance (school_id)"
+    )
+    op.execute(
+        "CREATE INDEX ix_school_compliance_district_id "
+        "ON school_compliance (district_id)"
+    )
+    op.execute(
+        "CREATE INDEX ix_school_compliance_region_id ON school_compliance (region_id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW school_compliance")
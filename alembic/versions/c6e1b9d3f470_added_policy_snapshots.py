@@ -0,0 +1,34 @@
+"""added policy snapshots
+
+Revision ID: c6e1b9d3f470
+Revises: a9f3c7e5b128
+Create Date: 2025-09-08 10:03:27.118462
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c6e1b9d3f470"
+down_revision: Union[str, None] = "a9f3c7e5b128"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "policy_snapshots",
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("content", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("hash"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("policy_snapshots")
@@ -0,0 +1,78 @@
+"""added log payloads
+
+Revision ID: cfe09004f740
+Revises: d3a85c1e7f40
+Create Date: 2025-08-11 14:02:37.518264
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "cfe09004f740"
+down_revision: Union[str, None] = "d3a85c1e7f40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "log_payloads",
+        sa.Column("hash", sa.LargeBinary(), nullable=False),
+        sa.Column("details", postgresql.JSONB(), nullable=False),
+        sa.Column(
+            "details_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "jsonb_to_tsvector('simple', details, "
+                '\'["string", "numeric"]\')',
+                persisted=True,
+            ),
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("hash"),
+    )
+    op.create_index(
+        "ix_log_payloads_details",
+        "log_payloads",
+        ["details"],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_log_payloads_details_tsv",
+        "log_payloads",
+        ["details_tsv"],
+        postgresql_using="gin",
+    )
+    op.add_column("logs", sa.Column("payload_hash", sa.LargeBinary(), nullable=True))
+    op.create_foreign_key(
+        "logs_payload_hash_fkey",
+        "logs",
+        "log_payloads",
+        ["payload_hash"],
+        ["hash"],
+    )
+    op.create_index("ix_logs_payload_hash", "logs", ["payload_hash"])
+
+
+def downgrade() -> None:
+    # inline the payloads again before dropping them
+    op.execute(
+        """
+        UPDATE logs SET details = log_payloads.details, payload_hash = NULL
+        FROM log_payloads
+        WHERE log_payloads.hash = logs.payload_hash
+        """
+    )
+    op.drop_index("ix_logs_payload_hash", table_name="logs")
+    op.drop_constraint("logs_payload_hash_fkey", "logs", type_="foreignkey")
+    op.drop_column("logs", "payload_hash")
+    op.drop_index("ix_log_payloads_details_tsv", table_name="log_payloads")
+    op.drop_index("ix_log_payloads_details", table_name="log_payloads")
+    op.drop_table("log_payloads")
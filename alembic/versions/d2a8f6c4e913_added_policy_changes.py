@@ -0,0 +1,46 @@
+"""added policy changes
+
+Revision ID: d2a8f6c4e913
+Revises: b7d4e1a9c062
+Create Date: 2025-09-04 09:41:52.207715
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d2a8f6c4e913"
+down_revision: Union[str, None] = "b7d4e1a9c062"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "policy_changes",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("policy_id", sa.UUID(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("value", sa.String(), nullable=True),
+        sa.Column("added", sa.Boolean(), server_default="true", nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["policy_id"], ["policies.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_policy_changes_policy_id_version",
+        "policy_changes",
+        ["policy_id", "version"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_policy_changes_policy_id_version", table_name="policy_changes")
+    op.drop_table("policy_changes")
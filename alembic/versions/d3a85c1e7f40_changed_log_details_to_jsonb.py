@@ -0,0 +1,83 @@
+"""changed log details to jsonb
+
+Revision ID: d3a85c1e7f40
+Revises: 9e1f6a3b5d27
+Create Date: 2025-08-07 09:26:51.330214
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d3a85c1e7f40"
+down_revision: Union[str, None] = "9e1f6a3b5d27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # free-form details that are not a JSON object are kept under "message"
+    op.execute(
+        """
+        CREATE FUNCTION pg_temp.details_to_jsonb(value text) RETURNS jsonb AS $$
+        DECLARE
+            parsed jsonb;
+        BEGIN
+            IF value IS NULL THEN
+                RETURN NULL;
+            END IF;
+            BEGIN
+                parsed := value::jsonb;
+            EXCEPTION WHEN others THEN
+                RETURN jsonb_build_object('message', value);
+            END;
+            IF jsonb_typeof(parsed) = 'object' THEN
+                RETURN parsed;
+            END IF;
+            RETURN jsonb_build_object('message', parsed);
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.alter_column(
+        "logs",
+        "details",
+        type_=postgresql.JSONB(),
+        postgresql_using="pg_temp.details_to_jsonb(details)",
+    )
+    op.add_column(
+        "logs",
+        sa.Column(
+            "details_tsv",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "jsonb_to_tsvector('simple', coalesce(details, '{}'::jsonb), "
+                '\'["string", "numeric"]\') '
+                "|| to_tsvector('simple', coalesce(location, ''))",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index("ix_logs_done_at", "logs", ["done_at"])
+    op.create_index("ix_logs_details", "logs", ["details"], postgresql_using="gin")
+    op.create_index(
+        "ix_logs_details_tsv", "logs", ["details_tsv"], postgresql_using="gin"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_logs_details_tsv", table_name="logs")
+    op.drop_index("ix_logs_details", table_name="logs")
+    op.drop_index("ix_logs_done_at", table_name="logs")
+    op.drop_column("logs", "details_tsv")
+    op.alter_column(
+        "logs",
+        "details",
+        type_=sa.String(),
+        postgresql_using="details::text",
+    )
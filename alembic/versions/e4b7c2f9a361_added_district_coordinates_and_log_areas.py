@@ -0,0 +1,52 @@
+"""added district coordinates and log areas
+
+Revision ID: e4b7c2f9a361
+Revises: c6e1b9d3f470
+Create Date: 2025-09-09 09:41:52.604117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b7c2f9a361"
+down_revision: Union[str, None] = "c6e1b9d3f470"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# "lat, lon" and "lat lon"; other spellings are parsed when next saved
+_BACKFILL = r"""
+    UPDATE {table} SET latitude = m[1]::numeric, longitude = m[2]::numeric
+    FROM (
+        SELECT id, regexp_match(
+            coordinate,
+            '^\s*([-+]?\d+(?:\.\d+)?)\s*[,; ]\s*([-+]?\d+(?:\.\d+)?)\s*$'
+        ) AS m
+        FROM {table}
+    ) parsed
+    WHERE {table}.id = parsed.id
+        AND m IS NOT NULL
+        AND abs(m[1]::numeric) <= 90
+        AND abs(m[2]::numeric) <= 180
+"""
+
+
+def upgrade() -> None:
+    for table in ("regions", "districts"):
+        op.add_column(table, sa.Column("latitude", sa.Numeric(10, 8), nullable=True))
+        op.add_column(table, sa.Column("longitude", sa.Numeric(11, 8), nullable=True))
+        op.execute(_BACKFILL.format(table=table))
+    op.add_column("logs", sa.Column("district_id", sa.UUID(), nullable=True))
+    op.add_column("logs", sa.Column("region_id", sa.UUID(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("logs", "region_id")
+    op.drop_column("logs", "district_id")
+    for table in ("districts", "regions"):
+        op.drop_column(table, "longitude")
+        op.drop_column(table, "latitude")
@@ -0,0 +1,40 @@
+"""added quota usages
+
+Revision ID: e71b4d2a9c05
+Revises: 5a6c8e0f2b19
+Create Date: 2025-08-15 16:20:44.913502
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e71b4d2a9c05"
+down_revision: Union[str, None] = "5a6c8e0f2b19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "quota_usages",
+        sa.Column("user_device_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("target", sa.String(), nullable=False),
+        sa.Column("used_seconds", sa.Float(), server_default="0", nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_device_id"], ["user_devices.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("user_device_id", "day", "kind", "target"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("quota_usages")
@@ -0,0 +1,65 @@
+"""added school schedules and holidays
+
+Revision ID: f3c9d4b7a215
+Revises: e8b2a6f0c317
+Create Date: 2025-09-01 16:05:48.903127
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c9d4b7a215"
+down_revision: Union[str, None] = "e8b2a6f0c317"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "school_schedules",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("school_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "shift",
+            postgresql.ENUM("MORNING", "EVENING", name="shifts", create_type=False),
+            nullable=True,
+        ),
+        sa.Column("weekdays", sa.Integer(), nullable=False),
+        sa.Column("starts_at", sa.Time(), nullable=False),
+        sa.Column("ends_at", sa.Time(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["school_id"], ["schools.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_school_schedules_school_id",
+        "school_schedules",
+        ["school_id"],
+        unique=False,
+    )
+    op.create_table(
+        "holidays",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("school_id", sa.UUID(), nullable=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("modified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["school_id"], ["schools.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_holidays_day", "holidays", ["day"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_holidays_day", table_name="holidays")
+    op.drop_table("holidays")
+    op.drop_index("ix_school_schedules_school_id", table_name="school_schedules")
+    op.drop_table("school_schedules")
@@ -0,0 +1,62 @@
+from collections import deque
+from typing import Dict, Generic, Iterable, List, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Automaton(Generic[T]):
+    """Aho-Corasick automaton: finds every pattern occurring in a text in one pass.
+
+    Built once from (pattern, value) pairs and then only read, so one
+    instance can be shared by concurrent requests. Output lists are merged
+    along failure links at build time, so a search never follows them to
+    collect matches.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[T, ...]] = [()]
+        outputs: List[List[T]] = [[]]
+
+        for pattern, value in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                state = nxt
+            outputs[state].append(value)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                outputs[nxt].extend(outputs[self._fail[nxt]])
+
+        self._out = [tuple(values) for values in outputs]
+        self.size = len(self._goto)
+
+    def search(self, text: str) -> Set[T]:
+        """Values of all patterns that occur in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[T] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
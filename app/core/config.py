@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Literal
 
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -24,6 +24,95 @@ class Config(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     SECRET_KEY: str = os.environ.get("JWT_SECRET_KEY")
     ALGORITHM: str = "HS256"
+    LOG_SPOOL_DIR: str = "var/spool/logs"
+    # spooled records the database rejected on replay
+    LOG_SPOOL_QUARANTINE_DIR: str = "var/spool/logs-quarantine"
+    LOG_SPOOL_SEGMENT_BYTES: int = 64 * 1024 * 1024
+    LOG_SPOOL_FSYNC: bool = False
+    LOG_SPOOL_REPLAY_INTERVAL: float = 2.0
+    LOG_SPOOL_REPLAY_BATCH: int = 1000
+    LOG_SPOOL_DEGRADED_SECONDS: float = 10.0
+    LOG_INGEST_DB_TIMEOUT: float = 0.5
+    LOG_COALESCE_WINDOW_SECONDS: float = 60.0
+    LOG_ARCHIVE_DIR: str = "var/archive/logs"
+    LOG_ARCHIVE_AFTER_MONTHS: int = 6
+    LOG_ARCHIVE_BATCH: int = 10000
+    LOG_ARCHIVE_INTERVAL: float = 6 * 60 * 60
+    LOG_DETAILS_STORAGE: Literal["inline", "interned"] = "inline"
+    LOG_PAYLOAD_CACHE_SIZE: int = 100_000
+    DEVICE_SYNC_CACHE_SIZE: int = 200_000
+    USAGE_SESSION_IDLE_SECONDS: float = 5 * 60
+    USAGE_CLOSE_ACTIONS: List[str] = ["app_close", "app_background", "screen_off"]
+    USAGE_CLOSE_ACTIONS_REFRESH_SECONDS: float = 5 * 60
+    USAGE_BACKFILL_DEVICE_BATCH: int = 500
+    QUOTA_FLUSH_INTERVAL: float = 5.0
+    QUOTA_REFRESH_SECONDS: float = 60.0
+    QUOTA_EVICT_SECONDS: float = 60 * 60
+    QUOTA_TIMEZONE: str = "Asia/Tashkent"
+    CLASSIFIER_RELOAD_INTERVAL: float = 5.0
+    ANOMALY_BUCKET_SECONDS: int = 60
+    ANOMALY_HALF_LIFE_BUCKETS: float = 60.0
+    ANOMALY_THRESHOLD: float = 4.0
+    ANOMALY_MIN_EVENTS: int = 10
+    ANOMALY_WARMUP_BUCKETS: int = 30
+    ANOMALY_EVICT_BUCKETS: int = 24 * 60
+    NOTIFY_CHANNELS: List[str] = ["feed", "sms"]
+    NOTIFY_WEBHOOK_URL: str = ""
+    NOTIFY_COALESCE_SECONDS: float = 5 * 60
+    NOTIFY_QUEUE_SIZE: int = 10_000
+    NOTIFY_BATCH_SIZE: int = 500
+    SMS_OUTBOX_INTERVAL: float = 2.0
+    SMS_OUTBOX_BATCH: int = 200
+    SMS_SEND_CONCURRENCY: int = 20
+    SMS_MAX_ATTEMPTS: int = 5
+    ROLLUP_INTERVAL: float = 5 * 60
+    ROLLUP_LOOKBACK_HOURS: int = 48
+    ROLLUP_OVERLAP_SECONDS: float = 2 * 60
+    DIGEST_PERIOD: Literal["hour", "day"] = "day"
+    DIGEST_TIMEZONE: str = "Asia/Tashkent"
+    DIGEST_DELAY_SECONDS: float = 15 * 60
+    DIGEST_INTERVAL: float = 60.0
+    DIGEST_BATCH: int = 2000
+    DIGEST_LEASE_SECONDS: float = 5 * 60
+    SKETCH_CMS_WIDTH: int = 2048
+    SKETCH_CMS_DEPTH: int = 4
+    SKETCH_HLL_PRECISION: int = 10
+    SKETCH_TOP_CAPACITY: int = 100
+    SKETCH_FLUSH_INTERVAL: float = 60.0
+    SKETCH_DEVICE_CACHE_SIZE: int = 200_000
+    SKETCH_MAX_QUERY_DAYS: int = 92
+    COMPLIANCE_REFRESH_INTERVAL: float = 15 * 60
+    REPORT_DIR: str = "var/reports"
+    REPORT_PROCESSES: int = 2
+    REPORT_INTERVAL: float = 5.0
+    REPORT_MAX_ATTEMPTS: int = 3
+    REPORT_LEASE_SECONDS: float = 10 * 60
+    REPORT_TIMEZONE: str = "Asia/Tashkent"
+    BLOCKING_TIMEZONE: str = "Asia/Tashkent"
+    # used for schools without a schedule of their own, Monday to Saturday
+    BLOCKING_MORNING_HOURS: str = "08:00-14:00"
+    BLOCKING_EVENING_HOURS: str = "14:00-19:00"
+    BLOCKING_EXCEPTION_MINUTES: int = 60
+    BLOCKING_POLL_INTERVAL: float = 30.0
+    # distinct policy snapshots kept in memory per process
+    POLICY_SNAPSHOT_CACHE_SIZE: int = 1024
+    POLICY_SNAPSHOT_MAX_AGE: int = 365 * 24 * 3600
+    # lines parsed per COPY and merge transaction of a bulk import
+    IMPORT_BATCH_SIZE: int = 50_000
+    # how stale the school geofence index may get from other processes' edits
+    GEOFENCE_CHECK_INTERVAL: float = 60.0
+    # same for the district centroids locations are resolved against
+    DISTRICT_INDEX_CHECK_INTERVAL: float = 300.0
+    # farther than this from every district centroid resolves to nothing
+    DISTRICT_MAX_DISTANCE_M: float = 150_000.0
+    # location pings live in daily partitions, dropped after this many days
+    LOCATION_PING_RETENTION_DAYS: int = 30
+    LOCATION_PING_DAYS_AHEAD: int = 2
+    LOCATION_PING_PARTITION_INTERVAL: float = 60 * 60
+    # latest ping per device kept in memory; entries read back from the
+    # database are trusted this long, as other processes ingest too
+    LAST_LOCATION_CACHE_SIZE: int = 200_000
+    LAST_LOCATION_TTL: float = 60.0
     model_config = SettingsConfigDict(
         extra="ignore",
         env_file=".env",
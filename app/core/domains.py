@@ -0,0 +1,48 @@
+from typing import Dict, FrozenSet, Iterable
+
+
+def normalize_domain(domain: str) -> str:
+    return domain.strip().lower().rstrip(".")
+
+
+class SuffixMatcher:
+    """Answers whether a host or any parent domain of it is in a set.
+
+    Candidate suffixes are probed from the shortest up, and only at the
+    label counts some listed domain has, so a lookup costs at most one set
+    probe per label. Answers for recent hosts are memoized, since device
+    traffic keeps returning to a small number of hosts; the memo is simply
+    dropped when full.
+    """
+
+    def __init__(self, domains: Iterable[str], memo_size: int = 1 << 16):
+        self.domains: FrozenSet[str] = frozenset(domains)
+        dots = {domain.count(".") for domain in self.domains}
+        self._min_dots = min(dots, default=0)
+        self._max_dots = max(dots, default=-1)
+        self._memo: Dict[str, bool] = {}
+        self._memo_size = memo_size
+
+    def __len__(self) -> int:
+        return len(self.domains)
+
+    def _match(self, host: str) -> bool:
+        domains = self.domains
+        pos = len(host)
+        # the candidate is the last ``dots + 1`` labels of the host
+        for dots in range(self._max_dots + 1):
+            pos = host.rfind(".", 0, pos)
+            if pos < 0:
+                return dots >= self._min_dots and host in domains
+            if dots >= self._min_dots and host[pos + 1 :] in domains:
+                return True
+        return False
+
+    def __contains__(self, host: str) -> bool:
+        found = self._memo.get(host)
+        if found is None:
+            found = self._match(normalize_domain(host))
+            if len(self._memo) >= self._memo_size:
+                self._memo.clear()
+            self._memo[host] = found
+        return found
@@ -0,0 +1,230 @@
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE = EARTH_RADIUS_M * math.pi / 180
+
+K = TypeVar("K")
+
+_NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def parse_coordinate(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) of a free-text coordinate, or ``None``.
+
+    Takes two numbers, latitude first, with any separator (``"41.31, 69.28"``,
+    ``"41.31 69.28"``, ``"geo:41.31,69.28"``), or a WKT ``POINT(lon lat)``.
+    """
+    if not text:
+        return None
+    text = text.strip().lower()
+    if text.startswith("geo:"):
+        text = text[4:].split(";", 1)[0]
+    numbers = _NUMBER.findall(text)
+    if len(numbers) != 2:
+        return None
+    lat, lon = float(numbers[0]), float(numbers[1])
+    if text.startswith("point"):
+        lat, lon = lon, lat
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def haversine_m_np(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """``haversine_m`` over arrays of coordinates, broadcast together."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeofenceIndex(Generic[K]):
+    """Circular geofences bucketed into a grid for point lookups.
+
+    Cells are at least as tall and as wide as the largest circle at the most
+    poleward fence, so a point can only be inside fences listed in its own
+    cell or the eight around it. Each cell's neighbourhood is gathered once
+    and then reused. Where fences overlap the nearest center wins.
+    """
+
+    def __init__(self, fences: Iterable[Tuple[K, float, float, float]]):
+        fences = [f for f in fences if f[3] > 0]
+        self.keys: List[K] = [f[0] for f in fences]
+        self.lat = np.array([f[1] for f in fences], dtype=np.float64)
+        self.lon = np.array([f[2] for f in fences], dtype=np.float64)
+        self.radius = np.array([f[3] for f in fences], dtype=np.float64)
+        self._plain = [(f[1], f[2], f[3]) for f in fences]
+
+        widest = float(self.radius.max()) if fences else 1000.0
+        poleward = min(float(np.abs(self.lat).max()) if fences else 0.0, 89.0)
+        self._cell_lat = widest / METERS_PER_DEGREE
+        self._cell_lon = self._cell_lat / math.cos(math.radians(poleward))
+
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i in range(len(fences)):
+            self._cells[self._cell(self.lat[i], self.lon[i])].append(i)
+        self._around: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self._cell_lat), math.floor(lon / self._cell_lon)
+
+    def _candidates(self, cell: Tuple[int, int]) -> np.ndarray:
+        around = self._around.get(cell)
+        if around is None:
+            i, j = cell
+            around = np.array(
+                [
+                    fence
+                    for di in (-1, 0, 1)
+                    for dj in (-1, 0, 1)
+                    for fence in self._cells.get((i + di, j + dj), ())
+                ],
+                dtype=np.int64,
+            )
+            self._around[cell] = around
+        return around
+
+    def locate(self, lat: float, lon: float) -> Optional[K]:
+        """The fence containing the point, or ``None``."""
+        best, best_distance = None, math.inf
+        # a handful of candidates is quicker in plain floats than in numpy
+        for i in self._candidates(self._cell(lat, lon)).tolist():
+            flat, flon, radius = self._plain[i]
+            distance = haversine_m(lat, lon, flat, flon)
+            if distance <= radius and distance < best_distance:
+                best, best_distance = i, distance
+        return None if best is None else self.keys[best]
+
+    def locate_many(
+        self, lat: Sequence[float], lon: Sequence[float]
+    ) -> List[Optional[K]]:
+        """``locate`` for many points, with one distance computation for all."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        found = np.full(len(lat), -1, dtype=np.int64)
+        if not len(lat) or not self.keys:
+            return [None] * len(lat)
+
+        ci = np.floor(lat / self._cell_lat).astype(np.int64)
+        cj = np.floor(lon / self._cell_lon).astype(np.int64)
+        # both cell numbers fit 32 bits anywhere on Earth for fences over 5 m
+        packed = (ci << 32) | (cj & 0xFFFFFFFF)
+        cells, inverse = np.unique(packed, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(cells) + 1))
+
+        points, fences = [], []
+        for n, cell in enumerate(cells.tolist()):
+            j = cell & 0xFFFFFFFF
+            candidates = self._candidates(
+                (cell >> 32, j - (1 << 32) if j >= 1 << 31 else j)
+            )
+            if candidates.size:
+                members = order[bounds[n] : bounds[n + 1]]
+                points.append(np.repeat(members, candidates.size))
+                fences.append(np.tile(candidates, members.size))
+        if points:
+            point = np.concatenate(points)
+            fence = np.concatenate(fences)
+            distance = haversine_m_np(
+                lat[point], lon[point], self.lat[fence], self.lon[fence]
+            )
+            inside = distance <= self.radius[fence]
+            point, fence, distance = point[inside], fence[inside], distance[inside]
+            # nearest fence first within each point, then the first per point
+            ranked = np.lexsort((distance, point))
+            point, fence = point[ranked], fence[ranked]
+            first = np.unique(point, return_index=True)[1]
+            found[point[first]] = fence[first]
+        return [None if i < 0 else self.keys[i] for i in found.tolist()]
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    phi, lam = np.radians(lat), np.radians(lon)
+    return np.stack(
+        [np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1
+    )
+
+
+class NearestIndex(Generic[K]):
+    """The nearest of a set of points, such as district centroids.
+
+    Points are kept as unit vectors, so the nearest one is the largest dot
+    product: one small matrix product per lookup instead of a haversine per
+    centroid. Lookups farther than ``max_distance_m`` from every point find
+    nothing.
+    """
+
+    # rows per matrix product in nearest_many, to bound memory
+    CHUNK = 4096
+
+    def __init__(
+        self,
+        points: Iterable[Tuple[K, float, float]],
+        max_distance_m: float = math.inf,
+    ):
+        points = list(points)
+        self.keys: List[K] = [p[0] for p in points]
+        self._xyz = _unit_vectors(
+            np.array([p[1] for p in points], dtype=np.float64),
+            np.array([p[2] for p in points], dtype=np.float64),
+        ).reshape(-1, 3)
+        angle = min(max_distance_m / EARTH_RADIUS_M, math.pi)
+        self._min_dot = math.cos(angle)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def nearest(self, lat: float, lon: float) -> Optional[K]:
+        if not self.keys:
+            return None
+        phi, lam = math.radians(lat), math.radians(lon)
+        dots = self._xyz @ np.array(
+            [
+                math.cos(phi) * math.cos(lam),
+                math.cos(phi) * math.sin(lam),
+                math.sin(phi),
+            ]
+        )
+        best = int(dots.argmax())
+        return self.keys[best] if dots[best] >= self._min_dot else None
+
+    def nearest_many(
+        self, lat: Sequence[float], lon: Sequence[float]
+    ) -> List[Optional[K]]:
+        xyz = _unit_vectors(
+            np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        ).reshape(-1, 3)
+        if not self.keys:
+            return [None] * len(xyz)
+        out: List[Optional[K]] = []
+        for start in range(0, len(xyz), self.CHUNK):
+            dots = xyz[start : start + self.CHUNK] @ self._xyz.T
+            best = dots.argmax(axis=1)
+            close = dots[np.arange(len(best)), best] >= self._min_dot
+            out.extend(
+                self.keys[i] if ok else None
+                for i, ok in zip(best.tolist(), close.tolist())
+            )
+        return out
@@ -28,6 +28,15 @@ def generate_transmit_access_token(username: str, secret_key: str, utime: int) -
 
 
 async def send_otp(phone_number: str, otp_code: str) -> tuple[bool, dict]:
+    return await send_sms(
+        phone_number,
+        f"Tikoncha mobil ilovasida ro'yxatdan o'tish uchun tasdiqlash kodi - {otp_code}",
+    )
+
+
+async def send_sms(
+    phone_number: str, text: str, sms_id: str | None = None
+) -> tuple[bool, dict]:
 
     utime = int(time.time())
     access_token = generate_transmit_access_token(USERNAME, SECRET_KEY, utime)
@@ -39,9 +48,9 @@ async def send_otp(phone_number: str, otp_code: str) -> tuple[bool, dict]:
         "username": USERNAME,
         "service": {"service": SERVICE_ID},
         "message": {
-            "smsid": str(int(time.time())),
+            "smsid": sms_id or str(int(time.time())),
             "phone": phone_number,
-            "text": f"Tikoncha mobil ilovasida ro'yxatdan o'tish uchun tasdiqlash kodi - {otp_code}",
+            "text": text,
         },
     }
 
@@ -0,0 +1,107 @@
+from typing import List, Sequence
+
+# landscape A4 in points
+PAGE_WIDTH = 842
+PAGE_HEIGHT = 595
+MARGIN = 36
+FONT_SIZE = 9
+TITLE_SIZE = 13
+LINE_HEIGHT = 13
+# Helvetica averages about half an em per character
+CHAR_WIDTH = 0.5 * FONT_SIZE
+
+# the standard fonts only cover Latin-1, so Cyrillic is transliterated
+_CYRILLIC = dict(
+    zip(
+        "абвгдеёжзийклмнопрстуфхцчшщъыьэюяўқғҳ",
+        ["a", "b", "v", "g", "d", "e", "yo", "j", "z", "i", "y", "k", "l", "m"]
+        + ["n", "o", "p", "r", "s", "t", "u", "f", "x", "ts", "ch", "sh", "sh"]
+        + ["'", "i", "", "e", "yu", "ya", "o'", "q", "g'", "h"],
+    )
+)
+
+
+def latin(text: str) -> str:
+    out = []
+    for ch in text:
+        lower = ch.lower()
+        if lower in _CYRILLIC:
+            sub = _CYRILLIC[lower]
+            out.append(sub.capitalize() if ch != lower else sub)
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _escape(text: str) -> bytes:
+    raw = latin(text).encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _columns(header: Sequence[str], rows: Sequence[Sequence[str]]) -> List[float]:
+    widths = [len(h) for h in header]
+    for row in rows:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(cell))
+    scale = min(
+        1.0, (PAGE_WIDTH - 2 * MARGIN) / (CHAR_WIDTH * (sum(widths) + 2 * len(widths)))
+    )
+    xs, x = [], float(MARGIN)
+    for width in widths:
+        xs.append(x)
+        x += (width + 2) * CHAR_WIDTH * scale
+    return xs
+
+
+def _text(x: float, y: float, size: int, text: str) -> bytes:
+    return b"BT /F1 %d Tf %.1f %.1f Td (%s) Tj ET\n" % (size, x, y, _escape(text))
+
+
+def render_table(
+    title: str, header: Sequence[str], rows: Sequence[Sequence[str]]
+) -> bytes:
+    """A plain single-font PDF of ``rows`` under ``header``, paginated."""
+    xs = _columns(header, rows)
+    per_page = int((PAGE_HEIGHT - 2 * MARGIN - 2 * LINE_HEIGHT) // LINE_HEIGHT) - 1
+    pages = [rows[i : i + per_page] for i in range(0, len(rows), per_page)] or [[]]
+
+    streams = []
+    for number, page in enumerate(pages, 1):
+        y = PAGE_HEIGHT - MARGIN - TITLE_SIZE
+        parts = [_text(MARGIN, y, TITLE_SIZE, f"{title} ({number}/{len(pages)})")]
+        y -= 2 * LINE_HEIGHT
+        for line in [header, *page]:
+            parts.extend(_text(x, y, FONT_SIZE, cell) for x, cell in zip(xs, line))
+            y -= LINE_HEIGHT
+        streams.append(b"".join(parts))
+
+    # 1 catalog, 2 page tree, 3 font, then a page and its content per page
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    for i, stream in enumerate(streams):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
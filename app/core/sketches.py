@@ -0,0 +1,89 @@
+import math
+from hashlib import blake2b
+from typing import Optional
+
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+
+def hash64(value: bytes) -> int:
+    return int.from_bytes(blake2b(value, digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """Approximate counts that never undercount; merged by adding tables.
+
+    With ``width`` w and ``depth`` d an estimate exceeds the true count by
+    more than ``2 / w`` of the total with probability at most ``2 ** -d``.
+    """
+
+    def __init__(self, width: int, depth: int, table: Optional[np.ndarray] = None):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), np.int64) if table is None else table
+        self._rows = np.arange(depth)
+
+    def _columns(self, h: int) -> np.ndarray:
+        # double hashing: d columns from the two halves of one 64-bit hash
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def add(self, h: int, count: int = 1) -> None:
+        self.table[self._rows, self._columns(h)] += count
+
+    def estimate(self, h: int) -> int:
+        return int(self.table[self._rows, self._columns(h)].min())
+
+    def estimate_many(self, hashes) -> np.ndarray:
+        h = np.asarray(hashes, np.uint64)
+        h1, h2 = h & 0xFFFFFFFF, (h >> np.uint64(32)) | np.uint64(1)
+        # no overflow: both halves are below 2 ** 32
+        columns = (h1 + self._rows[:, None].astype(np.uint64) * h2) % np.uint64(
+            self.width
+        )
+        return self.table[self._rows[:, None], columns.astype(np.intp)].min(axis=0)
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if self.table.shape != other.table.shape:
+            raise ValueError("Count-Min sketches of different sizes cannot be merged")
+        self.table += other.table
+
+
+class HyperLogLog:
+    """Distinct count estimate in ``2 ** precision`` one-byte registers.
+
+    The standard error is about ``1.04 / sqrt(2 ** precision)``; merging
+    takes the maximum of each register.
+    """
+
+    def __init__(self, precision: int, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = (
+            np.zeros(1 << precision, np.uint8) if registers is None else registers
+        )
+
+    def add(self, h: int) -> None:
+        p = self.precision
+        index = h >> (64 - p)
+        rest = h & (MASK64 >> p)
+        rank = (64 - p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if self.precision != other.precision:
+            raise ValueError("HyperLogLogs of different precision cannot be merged")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> float:
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = (
+            alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(int))))
+        )
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # small cardinalities: linear counting is more accurate
+        if estimate <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return estimate
@@ -0,0 +1,148 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# <payload length:u32><crc32(payload):u32><payload>
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+
+
+class Spool:
+    """Append-only, segment-based on-disk spool of JSON records.
+
+    Records are appended to the active segment; once it grows past
+    ``segment_bytes`` it is sealed and a new one is started. Sealed segments
+    are read back through ``mmap`` and every record is CRC-checked, so a torn
+    write at the tail of a segment (crash mid-append) ends the segment instead
+    of yielding garbage.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        fsync: bool = False,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._fd: int = -1
+        self._active: Path | None = None
+        self._active_size = 0
+        self._open_active()
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{seq:020d}{SEGMENT_SUFFIX}"
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def _open_active(self) -> None:
+        segments = self._segments()
+        if segments:
+            path = segments[-1]
+            valid = self._valid_length(path)
+            if valid != path.stat().st_size:
+                logger.warning("Truncating torn tail of spool segment %s", path)
+                os.truncate(path, valid)
+        else:
+            path = self._segment_path(1)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._active = path
+        self._active_size = os.fstat(self._fd).st_size
+
+    def _roll(self) -> None:
+        os.close(self._fd)
+        seq = int(self._active.stem) + 1
+        path = self._segment_path(seq)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._active = path
+        self._active_size = 0
+
+    @staticmethod
+    def encode(record: Dict[str, Any]) -> bytes:
+        payload = json.dumps(record, separators=(",", ":"), default=str).encode()
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        buf = b"".join(self.encode(r) for r in records)
+        if not buf:
+            return
+        with self._lock:
+            os.write(self._fd, buf)
+            if self.fsync:
+                os.fsync(self._fd)
+            self._active_size += len(buf)
+            if self._active_size >= self.segment_bytes:
+                self._roll()
+
+    def seal(self) -> None:
+        """Seal the active segment (if it holds anything) so it can be drained."""
+        with self._lock:
+            if self._active_size:
+                self._roll()
+
+    def sealed_segments(self) -> List[Path]:
+        with self._lock:
+            active = self._active
+        return [p for p in self._segments() if p != active]
+
+    def pending_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self._segments())
+
+    def is_empty(self) -> bool:
+        return self.pending_bytes() == 0
+
+    def remove(self, path: Path) -> None:
+        path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    @staticmethod
+    def _scan(buf) -> Iterator[tuple[int, bytes]]:
+        offset, size = 0, len(buf)
+        while offset + RECORD_HEADER.size <= size:
+            length, crc = RECORD_HEADER.unpack_from(buf, offset)
+            start = offset + RECORD_HEADER.size
+            end = start + length
+            if end > size:
+                return
+            payload = bytes(buf[start:end])
+            if zlib.crc32(payload) != crc:
+                return
+            offset = end
+            yield offset, payload
+
+    def _valid_length(self, path: Path) -> int:
+        valid = 0
+        for valid, _ in self.iter_raw(path):
+            pass
+        return valid
+
+    def iter_raw(self, path: Path) -> Iterator[tuple[int, bytes]]:
+        with open(path, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                yield from self._scan(buf)
+
+    def read_segment(self, path: Path) -> Iterator[Dict[str, Any]]:
+        for _, payload in self.iter_raw(path):
+            yield json.loads(payload)
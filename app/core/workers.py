@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """Periodic in-process job started and stopped with the application."""
+
+    name: str = "worker"
+    interval: float = 60.0
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    async def run_once(self) -> None:
+        raise NotImplementedError
+
+    async def on_stop(self) -> None:
+        pass
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error("Background worker %s failed", self.name, exc_info=True)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=self.interval + 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._task.cancel()
+            self._task = None
+        try:
+            await self.on_stop()
+        except Exception:
+            logger.error(
+                "Background worker %s failed to stop", self.name, exc_info=True
+            )
+
+
+workers: List[BackgroundWorker] = []
+
+
+def register_worker(worker: BackgroundWorker) -> BackgroundWorker:
+    workers.append(worker)
+    return worker
+
+
+def start_workers() -> None:
+    for worker in workers:
+        worker.start()
+
+
+async def stop_workers() -> None:
+    for worker in reversed(workers):
+        await worker.stop()
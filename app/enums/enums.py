@@ -96,6 +96,13 @@ class ActionDegrees(str, Enum):
     TERRIBLE = "terrible"
 
 
+class RuleKinds(str, Enum):
+    KEYWORD = "keyword"
+    DOMAIN = "domain"
+    PACKAGE = "package"
+    REGEX = "regex"
+
+
 class Languages(str, Enum):
     UZB_LAT = "uzb_lat"
     UZB_CYR = "uzb_cyr"
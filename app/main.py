@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import APIRouter, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,15 +8,42 @@ from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
 from app.core.config import config
+from app.core.workers import register_worker, start_workers, stop_workers
 from app.routers import (
+    _alerts,
+    _analytics,
+    _blocking,
+    _imports,
+    _location_pings,
+    _logs,
+    _notifications,
+    _policy_assignments,
+    _policy_snapshots,
+    _preferences,
+    _quotas,
+    _reports,
+    _rules,
+    _staff,
     auth,
     devices,
     locations,
     operating_systems,
-    _preferences,
     schools,
     users,
 )
+from app.services.anomalies import AnomalyScanner
+from app.services.app_sketches import AppSketchFlusher
+from app.services.blocking_engine import BlockingInputsWatcher
+from app.services.classifier import RuleReloader
+from app.services.compliance import ComplianceRefresher
+from app.services.digests import DigestScheduler
+from app.services.location_pings import LocationPingPartitioner
+from app.services.log_archive import LogArchiver
+from app.services.log_spool import LogSpoolReplayer
+from app.services.notifications import NotificationDispatcher, SmsOutboxSender
+from app.services.quotas import QuotaFlusher
+from app.services.reports import ReportWorker
+from app.services.rollups import LogRollupBuilder
 from app.version import __version__
 
 api_router = APIRouter()
@@ -25,12 +54,45 @@ api_router.include_router(schools.router)
 api_router.include_router(locations.router)
 api_router.include_router(operating_systems.router)
 api_router.include_router(devices.router)
-# api_router.include_router(logs.router)
+api_router.include_router(_logs.router)
 api_router.include_router(_preferences.router)
+api_router.include_router(_quotas.router)
+api_router.include_router(_rules.router)
+api_router.include_router(_alerts.router)
+api_router.include_router(_notifications.router)
+api_router.include_router(_staff.router)
+api_router.include_router(_analytics.router)
+api_router.include_router(_reports.router)
 # api_router.include_router(websites.router)
-# api_router.include_router(blocking.router)
+api_router.include_router(_blocking.router)
+api_router.include_router(_policy_assignments.router)
+api_router.include_router(_policy_snapshots.router)
+api_router.include_router(_imports.router)
+api_router.include_router(_location_pings.router)
 # api_router.include_router(policies.router)
 
+register_worker(RuleReloader())
+register_worker(LogSpoolReplayer())
+register_worker(LogArchiver())
+register_worker(QuotaFlusher())
+register_worker(AnomalyScanner())
+register_worker(NotificationDispatcher())
+register_worker(SmsOutboxSender())
+register_worker(LogRollupBuilder())
+register_worker(DigestScheduler())
+register_worker(AppSketchFlusher())
+register_worker(ComplianceRefresher())
+register_worker(ReportWorker())
+register_worker(BlockingInputsWatcher())
+register_worker(LocationPingPartitioner())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_workers()
+    yield
+    await stop_workers()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -39,6 +101,7 @@ def create_app() -> FastAPI:
         openapi_url="/openapi.json",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
 
     if config.ENVIRONMENT == "production":
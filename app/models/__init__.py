@@ -1,11 +1,39 @@
+from .alerts import Alert
+from .analytics import AppUsageSketch, SchoolCompliance
 from .app_request import App, AppRequest, AppRequestLog
 from .base import SQLModel
-from .devices import OS, Action, Device, Log, Setup, UserApp, UserDevice
+from .blocking import Holiday, SchoolSchedule
+from .classification import ClassificationRule
+from .devices import (
+    OS,
+    Action,
+    Device,
+    DeviceSyncState,
+    LocationPing,
+    Log,
+    LogPayload,
+    LogRollup,
+    Setup,
+    UsageSession,
+    UserApp,
+    UserDevice,
+)
 from .locations import District, Region
+from .notifications import DigestRun, Notification, SmsOutbox
 from .parent_profile import ParentInfo
-from .policies import Policy, PolicyApp, PolicyWeb
+from .policies import (
+    Policy,
+    PolicyApp,
+    PolicyAssignment,
+    PolicyChange,
+    PolicySnapshot,
+    PolicyWeb,
+    QuotaUsage,
+)
 from .preferences import UserPreference
+from .reports import ReportJob
 from .schools import School
+from .staff import StaffScope
 from .students import StudentInfo
 from .users import OTPEntry, PendingUser, User, UserRole, UserTask
 from .websites import Website
@@ -0,0 +1,39 @@
+import uuid
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import ENUM, UUID
+
+from app.enums.enums import ActionDegrees
+from app.models.base import SQLModel
+
+
+# an event rate well above a device's own baseline
+class Alert(SQLModel):
+    __tablename__ = "alerts"
+    __table_args__ = (
+        Index(
+            "ix_alerts_user_device_id_window_start", "user_device_id", "window_start"
+        ),
+    )
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    user_device_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("user_devices.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    degree = Column(
+        ENUM(ActionDegrees, name="action_degrees", create_type=False),
+        nullable=False,
+    )
+    window_start = Column(DateTime, nullable=False)
+    window_end = Column(DateTime, nullable=False)
+    observed = Column(Integer, nullable=False)
+    expected = Column(Float, nullable=False)
+    # standard deviations above the baseline
+    score = Column(Float, nullable=False)
@@ -0,0 +1,34 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, LargeBinary, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import column, table
+
+from app.models.base import SQLModel
+
+
+# mergeable app usage sketch of one school, district, region or the country per day
+class AppUsageSketch(SQLModel):
+    __tablename__ = "app_usage_sketches"
+
+    scope = Column(String, primary_key=True, nullable=False)
+    # no foreign key: a school, district or region id depending on scope
+    scope_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    day = Column(Date, primary_key=True, nullable=False)
+    payload = Column(LargeBinary)
+
+
+# materialized view created by migration c5d1f8a3e294; kept out of the
+# metadata so autogenerate does not try to create it as a table
+SchoolCompliance = table(
+    "school_compliance",
+    column("school_id", UUID(as_uuid=True)),
+    column("district_id", UUID(as_uuid=True)),
+    column("region_id", UUID(as_uuid=True)),
+    column("students", BigInteger),
+    column("devices", BigInteger),
+    column("active_devices", BigInteger),
+    column("setup_complete", BigInteger),
+    column("setup_missing", BigInteger),
+    column("suspicious_events", BigInteger),
+    column("terrible_events", BigInteger),
+    column("refreshed_at", DateTime),
+)
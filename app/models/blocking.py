@@ -0,0 +1,50 @@
+import uuid
+
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer, String, Time
+from sqlalchemy.dialects.postgresql import ENUM, UUID
+
+from app.enums.enums import Shifts
+from app.models.base import SQLModel
+
+
+# blocking hours of a school, for one shift or (shift null) for all of them
+class SchoolSchedule(SQLModel):
+    __tablename__ = "school_schedules"
+    __table_args__ = (Index("ix_school_schedules_school_id", "school_id"),)
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    school_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("schools.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    shift = Column(ENUM(Shifts, name="shifts", create_type=False))
+    # bit 0 is Monday
+    weekdays = Column(Integer, nullable=False, default=0b0111111)
+    starts_at = Column(Time, nullable=False)
+    ends_at = Column(Time, nullable=False)
+
+
+# a day without blocking, for one school or (school null) for the whole country
+class Holiday(SQLModel):
+    __tablename__ = "holidays"
+    __table_args__ = (Index("ix_holidays_day", "day"),)
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    school_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("schools.id", ondelete="CASCADE"),
+        nullable=True,
+    )
+    day = Column(Date, nullable=False)
+    name = Column(String, nullable=False)
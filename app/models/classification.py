@@ -0,0 +1,28 @@
+import uuid
+
+from sqlalchemy import Boolean, Column, String
+from sqlalchemy.dialects.postgresql import ENUM, UUID
+
+from app.enums.enums import ActionDegrees, RuleKinds
+from app.models.base import SQLModel
+
+
+class ClassificationRule(SQLModel):
+    __tablename__ = "classification_rules"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    kind = Column(
+        ENUM(RuleKinds, name="rule_kinds"),
+        nullable=False,
+    )
+    pattern = Column(String, nullable=False)
+    degree = Column(
+        ENUM(ActionDegrees, name="action_degrees", create_type=False),
+        nullable=False,
+    )
+    is_active = Column(Boolean, nullable=False, default=True, server_default="true")
@@ -1,11 +1,24 @@
 import uuid
 
-from sqlalchemy import TIMESTAMP, Boolean, Column, ForeignKey, Integer, String, func
-from sqlalchemy.dialects.postgresql import ENUM, UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    TIMESTAMP,
+    BigInteger,
+    Boolean,
+    Column,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    SmallInteger,
+    String,
+    func,
+)
+from sqlalchemy.dialects.postgresql import ENUM, JSONB, REAL, TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
 from app.enums.enums import ActionDegrees, AndroidUI, OsTypes, PhoneBrands
-from app.models.base import SQLModel
+from app.models.base import DeclarativeBase, SQLModel
 
 
 class OS(SQLModel):
@@ -106,6 +119,37 @@ class UserDevice(SQLModel):
     )
     setups = relationship("Setup", back_populates="user_device")
     user_apps = relationship("UserApp", back_populates="user_device")
+    usage_sessions = relationship(
+        "UsageSession",
+        back_populates="user_device",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    sync_state = relationship(
+        "DeviceSyncState",
+        back_populates="user_device",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class DeviceSyncState(SQLModel):
+    __tablename__ = "device_sync_states"
+
+    user_device_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("user_devices.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    last_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    user_device = relationship(
+        "UserDevice",
+        back_populates="sync_state",
+        passive_deletes=True,
+    )
 
 
 class Action(SQLModel):
@@ -129,6 +173,29 @@ class Action(SQLModel):
     )
 
 
+# content-addressed details shared by every log that repeats them
+class LogPayload(SQLModel):
+    __tablename__ = "log_payloads"
+
+    # sha256 of the canonical JSON encoding
+    hash = Column(LargeBinary, primary_key=True, nullable=False)
+    details = Column(JSONB, nullable=False)
+    details_tsv = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "jsonb_to_tsvector('simple', details, " '\'["string", "numeric"]\')',
+                persisted=True,
+            ),
+        )
+    )
+
+    __table_args__ = (
+        Index("ix_log_payloads_details", "details", postgresql_using="gin"),
+        Index("ix_log_payloads_details_tsv", "details_tsv", postgresql_using="gin"),
+    )
+
+
 class Log(SQLModel):
     __tablename__ = "logs"
 
@@ -155,7 +222,47 @@ class Log(SQLModel):
     )
     done_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
     location = Column(String)
-    details = Column(String)
+    # resolved from ``location`` at ingest; not kept in step with later
+    # boundary edits, hence no foreign keys
+    district_id = Column(UUID(as_uuid=True), nullable=True)
+    region_id = Column(UUID(as_uuid=True), nullable=True)
+    details = Column(JSONB)
+    details_tsv = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "jsonb_to_tsvector('simple', coalesce(details, '{}'::jsonb), "
+                '\'["string", "numeric"]\') '
+                "|| to_tsvector('simple', coalesce(location, ''))",
+                persisted=True,
+            ),
+        )
+    )
+    # run-length coalescing of identical consecutive events
+    first_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    last_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    count = Column(Integer, nullable=False, default=1, server_default="1")
+    # raised by classification rules matching the details, if any
+    degree = Column(
+        ENUM(ActionDegrees, name="action_degrees", create_type=False),
+        nullable=True,
+    )
+    # set instead of ``details`` when payloads are interned
+    payload_hash = Column(
+        LargeBinary,
+        ForeignKey("log_payloads.hash"),
+        nullable=True,
+    )
+
+    __table_args__ = (
+        Index("ix_logs_user_device_id_done_at", "user_device_id", "done_at"),
+        Index("ix_logs_done_at", "done_at"),
+        Index("ix_logs_details", "details", postgresql_using="gin"),
+        Index("ix_logs_details_tsv", "details_tsv", postgresql_using="gin"),
+        Index("ix_logs_payload_hash", "payload_hash"),
+        # rollups are refreshed from logs inserted or extended since the last run
+        Index("ix_logs_modified_at", "modified_at"),
+    )
 
     user_device = relationship(
         "UserDevice",
@@ -254,3 +361,110 @@ class UserApp(SQLModel):
         cascade="all, delete-orphan",
         passive_deletes=True,
     )
+    usage_sessions = relationship(
+        "UsageSession",
+        back_populates="user_app",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class UsageSession(SQLModel):
+    __tablename__ = "usage_sessions"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    user_device_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("user_devices.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    user_app_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("user_apps.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    started_at = Column(TIMESTAMP, nullable=False)
+    # last activity while the session is still open
+    ended_at = Column(TIMESTAMP, nullable=False)
+    is_closed = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    __table_args__ = (
+        Index(
+            "ix_usage_sessions_user_device_id_started_at",
+            "user_device_id",
+            "started_at",
+        ),
+        Index("ix_usage_sessions_user_app_id_started_at", "user_app_id", "started_at"),
+    )
+
+    user_device = relationship(
+        "UserDevice",
+        back_populates="usage_sessions",
+        passive_deletes=True,
+    )
+    user_app = relationship(
+        "UserApp",
+        back_populates="usage_sessions",
+        passive_deletes=True,
+    )
+
+
+# hourly event counts per device, action and effective degree
+class LogRollup(SQLModel):
+    __tablename__ = "log_rollups"
+
+    user_device_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("user_devices.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    hour = Column(TIMESTAMP, primary_key=True, nullable=False)
+    action_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("actions.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    degree = Column(
+        ENUM(ActionDegrees, name="action_degrees", create_type=False),
+        primary_key=True,
+        nullable=False,
+    )
+    events = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_log_rollups_hour", "hour"),)
+
+
+class LocationPing(DeclarativeBase):
+    """Device positions, one row per fix, in daily partitions.
+
+    Kept narrow on purpose: no created/modified stamps, single-precision
+    coordinates (about a meter) and the areas resolved at ingest.
+    """
+
+    __tablename__ = "location_pings"
+
+    user_device_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("user_devices.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    recorded_at = Column(TIMESTAMP, primary_key=True, nullable=False)
+    latitude = Column(REAL, nullable=False)
+    longitude = Column(REAL, nullable=False)
+    # reported accuracy in meters
+    accuracy = Column(SmallInteger, nullable=True)
+    # resolved at ingest like the log tags, hence no foreign keys
+    school_id = Column(UUID(as_uuid=True), nullable=True)
+    district_id = Column(UUID(as_uuid=True), nullable=True)
+    region_id = Column(UUID(as_uuid=True), nullable=True)
+
+    # partitions are created and dropped by the LocationPingPartitioner
+    __table_args__ = {"postgresql_partition_by": "RANGE (recorded_at)"}
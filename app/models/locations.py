@@ -1,13 +1,27 @@
 import uuid
 
-from sqlalchemy import Column, ForeignKey, String
+from sqlalchemy import Column, ForeignKey, Numeric, String
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
+from app.core.geo import parse_coordinate
 from app.models.base import SQLModel
 
 
-class Region(SQLModel):
+class _Located:
+    """``coordinate`` is free text; ``latitude``/``longitude`` are parsed
+    from it whenever it is set, and are None when it cannot be read."""
+
+    latitude = Column(Numeric(10, 8), nullable=True)
+    longitude = Column(Numeric(11, 8), nullable=True)
+
+    @validates("coordinate")
+    def _parse_coordinate(self, key, value):
+        self.latitude, self.longitude = parse_coordinate(value) or (None, None)
+        return value
+
+
+class Region(_Located, SQLModel):
     __tablename__ = "regions"
 
     id = Column(
@@ -33,7 +47,7 @@ class Region(SQLModel):
     )
 
 
-class District(SQLModel):
+class District(_Located, SQLModel):
     __tablename__ = "districts"
 
     id = Column(
@@ -0,0 +1,86 @@
+import uuid
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from app.models.base import SQLModel
+
+
+# in-app feed entry shown to a user
+class Notification(SQLModel):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    kind = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    data = Column(JSONB)
+    read_at = Column(DateTime)
+
+
+# text messages waiting for the SMS gateway
+class SmsOutbox(SQLModel):
+    __tablename__ = "sms_outbox"
+    __table_args__ = (
+        Index(
+            "ix_sms_outbox_pending",
+            "created_at",
+            postgresql_where=text("sent_at IS NULL"),
+        ),
+    )
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    phone_number = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    sent_at = Column(DateTime)
+    last_error = Column(Text)
+
+
+# one digest send per period; batches advance the cursor as they commit
+class DigestRun(SQLModel):
+    __tablename__ = "digest_runs"
+    __table_args__ = (UniqueConstraint("period", "period_start"),)
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    # "hour" or "day"
+    period = Column(String, nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    # last parent id handled
+    cursor = Column(UUID(as_uuid=True))
+    sent = Column(Integer, nullable=False, default=0, server_default="0")
+    locked_until = Column(DateTime)
+    finished_at = Column(DateTime)
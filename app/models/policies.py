@@ -1,6 +1,16 @@
 import uuid
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -19,6 +29,8 @@ class Policy(SQLModel):
     name = Column(String, nullable=False)
     is_whitelist_app = Column(Boolean, default=True)
     is_whitelist_web = Column(Boolean, default=True)
+    # moved by every edit of the policy or its apps and websites
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     targeted_role_id = Column(
         UUID(as_uuid=True),
         ForeignKey("user_roles.id", ondelete="CASCADE"),
@@ -40,6 +52,7 @@ class Policy(SQLModel):
     schools = relationship(
         "School",
         back_populates="policy",
+        foreign_keys="School.policy_id",
         cascade="all, delete-orphan",
         passive_deletes=True,
     )
@@ -93,3 +106,69 @@ class PolicyWeb(SQLModel):
 
     policy = relationship("Policy", back_populates="policy_webs")
     website = relationship("Website", back_populates="policy_webs")
+
+
+# a policy for a whole region, district or the country, or one student;
+# a school's own policy stays in schools.policy_id
+class PolicyAssignment(SQLModel):
+    __tablename__ = "policy_assignments"
+
+    # "country", "region", "district" or "student"
+    scope = Column(String, primary_key=True, nullable=False)
+    # the region, district or student user id; zero for the country
+    scope_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    policy_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("policies.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    __table_args__ = (Index("ix_policy_assignments_policy_id", "policy_id"),)
+
+
+# append-only; devices sync the entries past the version they last saw
+class PolicyChange(SQLModel):
+    __tablename__ = "policy_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    policy_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("policies.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    version = Column(Integer, nullable=False)
+    # "app" with a package, "web" with a domain, "schedule" with a school id,
+    # or "reset" when the change cannot be expressed as a delta
+    kind = Column(String, nullable=False)
+    value = Column(String, nullable=True)
+    # False when the package or domain was taken out of the policy
+    added = Column(Boolean, nullable=False, default=True, server_default="true")
+
+    __table_args__ = (
+        Index("ix_policy_changes_policy_id_version", "policy_id", "version"),
+    )
+
+
+# immutable rule sets by content hash, shared by every policy that has them
+class PolicySnapshot(SQLModel):
+    __tablename__ = "policy_snapshots"
+
+    # sha256 hex of ``content``
+    hash = Column(String(64), primary_key=True, nullable=False)
+    content = Column(LargeBinary, nullable=False)
+
+
+class QuotaUsage(SQLModel):
+    __tablename__ = "quota_usages"
+
+    user_device_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("user_devices.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    day = Column(Date, primary_key=True, nullable=False)
+    # "app" with a user_app id, or "web" with a domain
+    kind = Column(String, primary_key=True, nullable=False)
+    target = Column(String, primary_key=True, nullable=False)
+    used_seconds = Column(Float, nullable=False, default=0, server_default="0")
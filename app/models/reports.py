@@ -0,0 +1,37 @@
+import uuid
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from app.models.base import SQLModel
+
+
+# a requested report; identical requests share one job through params_hash
+class ReportJob(SQLModel):
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        Index("ix_report_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    params_hash = Column(String, nullable=False, unique=True)
+    params = Column(JSONB, nullable=False)
+    requested_by = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    # queued, running, done or failed
+    status = Column(String, nullable=False, default="queued", server_default="queued")
+    progress = Column(Float, nullable=False, default=0.0, server_default="0")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # sha256 of the rendered file, which is stored under that name
+    file_hash = Column(String)
+    error = Column(Text)
+    locked_until = Column(DateTime)
+    finished_at = Column(DateTime)
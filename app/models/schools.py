@@ -39,6 +39,13 @@ class School(SQLModel):
         ForeignKey("policies.id", ondelete="CASCADE"),
         nullable=True,
     )
+    # policy_id, else the nearest district, region or country assignment;
+    # maintained by app.services.policy_inheritance
+    effective_policy_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("policies.id", ondelete="SET NULL"),
+        nullable=True,
+    )
     region_rel = relationship("Region", back_populates="schools")
 
     district_rel = relationship(
@@ -49,6 +56,7 @@ class School(SQLModel):
     policy = relationship(
         "Policy",
         back_populates="schools",
+        foreign_keys=[policy_id],
         passive_deletes=True,
     )
     student_infos = relationship(
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.base import SQLModel
+
+
+# the school, district or region a staff member answers for, by their role
+class StaffScope(SQLModel):
+    __tablename__ = "staff_scopes"
+
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+    )
+    school_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("schools.id", ondelete="CASCADE"),
+        nullable=True,
+    )
+    district_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("districts.id", ondelete="CASCADE"),
+        nullable=True,
+    )
+    region_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("regions.id", ondelete="CASCADE"),
+        nullable=True,
+    )
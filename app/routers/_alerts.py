@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._alerts import AlertResponse
+from app.services.anomalies import get_alerts
+
+router = APIRouter(prefix="/alerts", tags=["Alerts"])
+
+
+@router.get("/", response_model=List[AlertResponse])
+async def read_alerts(
+    user_device_id: Optional[UUID] = Query(None),
+    since: Optional[datetime] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_alerts(db, current_user, user_device_id, since, limit)
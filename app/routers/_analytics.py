@@ -0,0 +1,43 @@
+from datetime import date
+from typing import Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._analytics import CompliancePage, TopAppsResponse
+from app.services.app_sketches import get_top_apps
+from app.services.compliance import get_compliance
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/top-apps", response_model=TopAppsResponse)
+async def read_top_apps(
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    scope: Optional[Literal["school", "district", "region", "country"]] = Query(
+        None, description="Defaults to the caller's own school, district or region"
+    ),
+    scope_id: Optional[UUID] = Query(None),
+    k: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_top_apps(
+        db, current_user, scope, scope_id, start_date, end_date, k
+    )
+
+
+@router.get("/compliance", response_model=CompliancePage)
+async def read_compliance(
+    level: Literal["school", "district", "region"] = Query("school"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_compliance(db, current_user, level, limit, offset)
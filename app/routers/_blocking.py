@@ -1,20 +1,20 @@
 import traceback
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.users import User
-from app.schemas.blocking import (
+from app.schemas._blocking import (
     BlockedAppListItem,
     BlockingStatusResponse,
     EmergencyExceptionRequest,
     EmergencyExceptionResponse,
     SchoolScheduleResponse,
 )
-from app.services.blocking import BlockingServiceAsync
+from app.services._blocking import BlockingServiceAsync
 
 router = APIRouter(prefix="/blocking", tags=["Blocking"])
 
@@ -25,11 +25,16 @@ router = APIRouter(prefix="/blocking", tags=["Blocking"])
     status_code=status.HTTP_200_OK,
 )
 async def get_status(
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    location = None
+    if latitude is not None and longitude is not None:
+        location = (latitude, longitude)
     try:
-        return await BlockingServiceAsync(db).get_status(current_user)
+        return await BlockingServiceAsync(db).get_status(current_user, location)
     except PermissionError as e:
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail=str(e))
     except LookupError as e:
@@ -97,8 +102,8 @@ async def emergency_exception(
     status_code=status.HTTP_200_OK,
 )
 async def school_schedule(
-    month: Optional[int] = None,
-    year: Optional[int] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1, le=9999),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -0,0 +1,28 @@
+import json
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.core.security import get_current_user
+from app.models.users import User
+from app.services.catalog_import import check_import_access, iter_lines, run_import
+
+router = APIRouter(prefix="/admin/imports", tags=["Admin"])
+
+
+@router.post("/{kind}")
+async def import_catalog(
+    kind: Literal["websites", "apps"],
+    file: UploadFile = File(...),
+    type: Optional[str] = Form(None, description="Category for every website"),
+    current_user: User = Depends(get_current_user),
+):
+    """Streams one JSON line of running totals per imported batch."""
+    check_import_access(current_user)
+
+    async def progress():
+        async for stats in run_import(kind, iter_lines(file.read), type):
+            yield json.dumps(stats.to_dict()) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
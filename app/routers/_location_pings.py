@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._location_pings import (
+    LocationPingAccepted,
+    LocationPingBatch,
+    LocationPingResponse,
+)
+from app.services.location_pings import (
+    get_last_locations,
+    get_ping_history,
+    ingest_pings,
+)
+
+router = APIRouter(prefix="/location-pings", tags=["Locations"])
+
+
+@router.post("/", response_model=LocationPingAccepted)
+async def upload_pings(
+    data: LocationPingBatch,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await ingest_pings(db, current_user, data)
+
+
+@router.get("/students/{student_id}/last", response_model=List[LocationPingResponse])
+async def read_last_locations(
+    student_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Where the student's devices were last seen, most recent first."""
+    return await get_last_locations(db, current_user, student_id)
+
+
+@router.get("/{user_device_id}", response_model=List[LocationPingResponse])
+async def read_ping_history(
+    user_device_id: UUID,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Defaults to the last day."""
+    return await get_ping_history(db, current_user, user_device_id, since, until, limit)
@@ -1,32 +1,61 @@
-from typing import List, Optional
+from datetime import date
+from typing import List, Optional, Union
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_async_session
 from app.core.security import get_current_user
 from app.models.users import User
-from app.schemas.logs import ActionResponse, LogCreate, LogDetail, LogSummaryResponse
-from app.services.logs import create_log, get_actions, get_log_summary, get_logs
+from app.schemas._logs import (
+    ActionResponse,
+    AppUsage,
+    DeviceSyncStatus,
+    LogAccepted,
+    LogCreate,
+    LogDetail,
+    LogSummaryResponse,
+    UsageRebuildResult,
+)
+from app.services._logs import (
+    create_log,
+    get_actions,
+    get_log_summary,
+    get_logs,
+    get_sync_status,
+    search_logs,
+)
+from app.services.usage_sessions import get_app_usage, rebuild_usage
 
 router = APIRouter(prefix="/logs", tags=["Logs"])
 
 
-@router.post("/", response_model=LogDetail, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=Union[LogDetail, LogAccepted],
+    status_code=status.HTTP_201_CREATED,
+)
 async def post_log(
     log_data: LogCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
-    return await create_log(db, current_user, log_data)
+    result = await create_log(db, current_user, log_data)
+    if isinstance(result, LogAccepted):
+        response.status_code = (
+            status.HTTP_200_OK if result.duplicate else status.HTTP_202_ACCEPTED
+        )
+    return result
 
 
 @router.get("/", response_model=List[LogDetail])
 async def read_logs(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    device_id: Optional[int] = None,
-    app_id: Optional[int] = None,
+    device_id: Optional[UUID] = None,
+    app_id: Optional[UUID] = None,
     action_degree: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
@@ -36,6 +65,22 @@ async def read_logs(
     )
 
 
+@router.get("/search", response_model=List[LogDetail])
+async def search(
+    key: Optional[str] = None,
+    value: Optional[str] = None,
+    q: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await search_logs(
+        db, current_user, key, value, q, start_date, end_date, limit
+    )
+
+
 @router.get("/actions", response_model=List[ActionResponse])
 async def read_actions(
     current_user: User = Depends(get_current_user),
@@ -51,3 +96,33 @@ async def read_summary(
     db: AsyncSession = Depends(get_async_session),
 ):
     return await get_log_summary(db, current_user, days)
+
+
+@router.get("/sync-status/{user_device_id}", response_model=DeviceSyncStatus)
+async def read_sync_status(
+    user_device_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_sync_status(db, current_user, user_device_id)
+
+
+@router.get("/usage", response_model=List[AppUsage])
+async def read_app_usage(
+    day: Optional[date] = None,
+    device_id: Optional[UUID] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_app_usage(db, current_user, day, device_id)
+
+
+@router.post("/usage/rebuild", response_model=UsageRebuildResult)
+async def post_usage_rebuild(
+    start_date: date,
+    end_date: date,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    sessions = await rebuild_usage(db, current_user, start_date, end_date)
+    return UsageRebuildResult(sessions=sessions)
@@ -0,0 +1,41 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._notifications import (
+    NotificationLatency,
+    NotificationResponse,
+    NotificationsRead,
+    NotificationsReadResult,
+)
+from app.services.notifications import get_latency, get_notifications, mark_read
+
+router = APIRouter(prefix="/notifications", tags=["Notifications"])
+
+
+@router.get("/", response_model=List[NotificationResponse])
+async def read_notifications(
+    unread_only: bool = Query(False),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_notifications(db, current_user, unread_only, limit)
+
+
+@router.post("/read", response_model=NotificationsReadResult)
+async def post_read(
+    data: NotificationsRead,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return NotificationsReadResult(updated=await mark_read(db, current_user, data.ids))
+
+
+@router.get("/latency", response_model=NotificationLatency)
+async def read_latency(current_user: User = Depends(get_current_user)):
+    return await get_latency(current_user)
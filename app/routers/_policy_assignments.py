@@ -0,0 +1,38 @@
+from typing import Literal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._policy_assignments import (
+    EffectivePolicyResponse,
+    PolicyAssignmentResponse,
+    PolicyAssignmentUpdate,
+)
+from app.services.policy_inheritance import get_effective_policy, set_policy_assignment
+
+router = APIRouter(prefix="/policy-assignments", tags=["Policies"])
+
+
+@router.get("/schools/{school_id}", response_model=EffectivePolicyResponse)
+async def read_effective_policy(
+    school_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_effective_policy(db, current_user, school_id)
+
+
+@router.put("/{scope}/{scope_id}", response_model=PolicyAssignmentResponse)
+async def update_policy_assignment(
+    scope: Literal["country", "region", "district", "school", "student"],
+    scope_id: UUID,
+    data: PolicyAssignmentUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Any UUID stands for the country; a student is given by user id."""
+    return await set_policy_assignment(db, current_user, scope, scope_id, data)
@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Path, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.services.policy_snapshots import get_policy_snapshot
+
+router = APIRouter(prefix="/policy-snapshots", tags=["Policies"])
+
+
+@router.get(
+    "/{digest}",
+    response_class=Response,
+    responses={200: {"content": {"application/json": {}}}},
+)
+async def read_policy_snapshot(
+    digest: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    # a hash names one content forever, so caches may keep it as long as they like
+    headers = {
+        "Cache-Control": f"public, max-age={config.POLICY_SNAPSHOT_MAX_AGE}, immutable",
+        "ETag": f'"{digest}"',
+    }
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    content = await get_policy_snapshot(db, digest)
+    return Response(content, media_type="application/json", headers=headers)
@@ -0,0 +1,33 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_token_subject
+from app.schemas._policies import QuotaStatus, WebUsageReport
+from app.services.quotas import get_quota, report_web_usage
+
+router = APIRouter(prefix="/quota", tags=["Quota"])
+
+
+# polled by devices: served from memory, the session is only used on a cold start
+@router.get("/{user_device_id}", response_model=QuotaStatus)
+async def read_quota(
+    user_device_id: UUID,
+    user_id: UUID = Depends(get_token_subject),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_quota(db, user_id, user_device_id)
+
+
+@router.post("/{user_device_id}/web-usage", response_model=QuotaStatus)
+async def post_web_usage(
+    user_device_id: UUID,
+    report: WebUsageReport,
+    user_id: UUID = Depends(get_token_subject),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await report_web_usage(
+        db, user_id, user_device_id, report.domain, report.seconds
+    )
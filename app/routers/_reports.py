@@ -0,0 +1,44 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._reports import ReportCreate, ReportJobResponse
+from app.services.reports import get_report_file, get_report_job, request_report
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+
+@router.post(
+    "/", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def create_report(
+    data: ReportCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await request_report(db, current_user, data)
+
+
+@router.get("/{job_id}", response_model=ReportJobResponse)
+async def read_report(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_report_job(db, current_user, job_id)
+
+
+@router.get("/{job_id}/download", response_class=FileResponse)
+async def download_report(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    path, media_type, filename = await get_report_file(db, current_user, job_id)
+    # served straight from disk, with sendfile where the server supports it
+    return FileResponse(path, media_type=media_type, filename=filename)
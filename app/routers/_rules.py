@@ -0,0 +1,70 @@
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._rules import (
+    ClassifyRequest,
+    ClassifyResponse,
+    RuleCreate,
+    RuleResponse,
+    RuleUpdate,
+)
+from app.services._rules import (
+    classify_sample,
+    create_rule,
+    delete_rule,
+    list_rules,
+    update_rule,
+)
+
+router = APIRouter(prefix="/rules", tags=["Classification rules"])
+
+
+@router.get("/", response_model=List[RuleResponse])
+async def read_rules(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await list_rules(db, current_user)
+
+
+@router.post("/", response_model=RuleResponse, status_code=status.HTTP_201_CREATED)
+async def post_rule(
+    data: RuleCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await create_rule(db, current_user, data)
+
+
+@router.patch("/{rule_id}", response_model=RuleResponse)
+async def patch_rule(
+    rule_id: UUID,
+    data: RuleUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await update_rule(db, current_user, rule_id, data)
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_rule(
+    rule_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    await delete_rule(db, current_user, rule_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/classify", response_model=ClassifyResponse)
+async def post_classify(
+    data: ClassifyRequest,
+    current_user: User = Depends(get_current_user),
+):
+    return await classify_sample(current_user, data)
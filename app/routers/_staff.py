@@ -0,0 +1,31 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_session
+from app.core.security import get_current_user
+from app.models.users import User
+from app.schemas._staff import StaffScopeResponse, StaffScopeUpdate
+from app.services.scopes import get_staff_scope, set_staff_scope
+
+router = APIRouter(prefix="/staff", tags=["Staff"])
+
+
+@router.get("/{user_id}/scope", response_model=StaffScopeResponse)
+async def read_staff_scope(
+    user_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await get_staff_scope(db, current_user, user_id)
+
+
+@router.put("/{user_id}/scope", response_model=StaffScopeResponse)
+async def update_staff_scope(
+    user_id: UUID,
+    data: StaffScopeUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await set_staff_scope(db, current_user, user_id, data)
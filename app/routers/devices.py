@@ -1,7 +1,7 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_async_db
@@ -9,7 +9,10 @@ from app.core.security import get_current_user
 from app.models.users import User
 from app.schemas.devices import (
     DeviceCreateRequest,
+    DevicePolicyResponse,
     DeviceUpdateRequest,
+    DomainCheckRequest,
+    DomainCheckResponse,
     RegisterDeviceResponse,
 )
 from app.services.devices import (
@@ -21,6 +24,7 @@ from app.services.devices import (
     retrieve_device,
     update_device,
 )
+from app.services.policy_sync import check_device_domains, sync_device_policy
 
 router = APIRouter(prefix="/devices", tags=["Devices"])
 
@@ -51,6 +55,34 @@ async def read_device(
     return await retrieve_device(db, current_user, device_id)
 
 
+@router.get(
+    "/{device_id}/policy",
+    response_model=DevicePolicyResponse,
+    responses={304: {"description": "Policy unchanged since the given version"}},
+)
+async def read_device_policy(
+    device_id: UUID,
+    since: Optional[int] = Query(None, ge=0),
+    policy_id: Optional[UUID] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    policy = await sync_device_policy(db, current_user, device_id, since, policy_id)
+    if policy is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    return policy
+
+
+@router.post("/{device_id}/domains/check", response_model=DomainCheckResponse)
+async def check_domains(
+    device_id: UUID,
+    data: DomainCheckRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await check_device_domains(db, current_user, device_id, data)
+
+
 @router.put("/{device_id}/deactivate", response_model=dict)
 async def disable_device(
     device_id: int,
@@ -9,7 +9,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_async_db
 from app.core.security import get_current_user
 from app.exc import LoggedHTTPException, raise_with_log
-from app.schemas.schools import SchoolCreate, SchoolListResponse, SchoolResponse
+from app.schemas.schools import (
+    SchoolCreate,
+    SchoolListResponse,
+    SchoolLocateRequest,
+    SchoolLocateResponse,
+    SchoolResponse,
+)
+from app.services.geofences import locate_schools
 from app.services.schools import SchoolService
 
 logging.basicConfig(level=logging.INFO)
@@ -73,6 +80,24 @@ async def create_school(
         )
 
 
+@router.post("/locate", response_model=SchoolLocateResponse)
+async def locate(
+    data: SchoolLocateRequest,
+    current_user: Any = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        return await locate_schools(db, data)
+    except LoggedHTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to locate schools: %s", e, exc_info=True)
+        raise_with_log(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            f"Could not locate schools: {e}. {traceback.format_exc()}",
+        )
+
+
 @router.put(
     "/{school_id}",
     response_model=SchoolResponse,
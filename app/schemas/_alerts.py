@@ -0,0 +1,16 @@
+from datetime import datetime
+from uuid import UUID
+
+from app.enums.enums import ActionDegrees
+from app.schemas.base import BaseSchema
+
+
+class AlertResponse(BaseSchema):
+    id: UUID
+    user_device_id: UUID
+    degree: ActionDegrees
+    window_start: datetime
+    window_end: datetime
+    observed: int
+    expected: float
+    score: float
@@ -0,0 +1,41 @@
+from datetime import date, datetime
+from typing import List, Optional
+from uuid import UUID
+
+from app.schemas._logs import AppInfo
+from app.schemas.base import BaseSchema
+
+
+class TopAppEstimate(BaseSchema):
+    app: AppInfo
+    # approximate: events may be overcounted, devices are within a few percent
+    events: int
+    devices: int
+
+
+class TopAppsResponse(BaseSchema):
+    scope: str
+    scope_id: UUID
+    start_date: date
+    end_date: date
+    apps: List[TopAppEstimate]
+
+
+class ComplianceEntry(BaseSchema):
+    id: UUID
+    name: str
+    students: int
+    devices: int
+    # devices with any event in the last 7 days
+    active_devices: int
+    setup_complete: int
+    setup_missing: int
+    suspicious_events: int
+    terrible_events: int
+
+
+class CompliancePage(BaseSchema):
+    level: str
+    total: int
+    refreshed_at: Optional[datetime]
+    items: List[ComplianceEntry]
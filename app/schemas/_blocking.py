@@ -1,4 +1,5 @@
 from typing import List, Optional
+from uuid import UUID
 
 from pydantic import BaseModel
 
@@ -32,10 +33,13 @@ class BlockingStatusResponse(BaseSchema):
     current_time: str
     is_holiday: bool
     shift: Optional[str]
+    # None when the school has no geofence or no location was sent
+    in_school: Optional[bool] = None
+    until: Optional[str] = None
 
 
 class BlockedAppListItem(BaseSchema):
-    id: int
+    id: UUID
     package_name: str
     app_name: str
     is_blocked: bool
@@ -61,7 +65,7 @@ class SchoolScheduleItem(BaseModel):
 class SchoolScheduleResponse(BaseSchema):
     month: int
     year: int
-    school_id: int
+    school_id: UUID
     shift: Optional[str]
     holidays: List[SchoolScheduleItem]
     special_events: List[SchoolScheduleItem]
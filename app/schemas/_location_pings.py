@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import Field
+
+from app.schemas.base import BaseSchema
+
+
+class LocationPingIn(BaseSchema):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    accuracy: Optional[int] = Field(None, ge=0, le=32767)
+    # naive values are taken as UTC
+    recorded_at: datetime
+
+
+class LocationPingBatch(BaseSchema):
+    user_device_id: UUID
+    pings: List[LocationPingIn] = Field(..., min_length=1, max_length=1000)
+
+
+class LocationPingAccepted(BaseSchema):
+    accepted: int
+    # older than the retention window or too far in the future
+    rejected: int
+
+
+class LocationPingResponse(BaseSchema):
+    user_device_id: UUID
+    recorded_at: datetime
+    latitude: float
+    longitude: float
+    accuracy: Optional[int] = None
+    # the school whose geofence held the ping, if any
+    school_id: Optional[UUID] = None
+    district_id: Optional[UUID] = None
+    region_id: Optional[UUID] = None
@@ -1,58 +1,117 @@
-from typing import List, Optional
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+from uuid import UUID
 
+from pydantic import Field, field_validator
+
+from app.core.timestamps import naive_utc
 from app.schemas.base import BaseSchema
 
 
 class LogBase(BaseSchema):
-    device_id: int
-    app_id: Optional[int] = None
-    action_id: int
-    duration: Optional[int] = None
+    user_device_id: UUID
+    user_app_id: Optional[UUID] = None
+    action_id: UUID
+    location: Optional[str] = None
+    # older clients send free text; it is stored as the migration did
+    details: Optional[Union[Dict[str, Any], str]] = None
+
+    @field_validator("details")
+    @classmethod
+    def _details_object(
+        cls, value: Optional[Union[Dict[str, Any], str]]
+    ) -> Optional[Dict[str, Any]]:
+        if not isinstance(value, str):
+            return value
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            return {"message": value}
+        return parsed if isinstance(parsed, dict) else {"message": parsed}
+
+
+class LogCreate(LogBase):
+    event_id: Optional[UUID] = None
+    seq: Optional[int] = Field(None, ge=1)
+    done_at: Optional[datetime] = None
+
+    @field_validator("done_at")
+    @classmethod
+    def _naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return naive_utc(value) if value is not None else None
+
 
+class LogAccepted(BaseSchema):
+    event_id: UUID
+    spooled: bool
+    duplicate: bool = False
 
-class LogCreate(BaseSchema):
-    pass
+
+class DeviceSyncStatus(BaseSchema):
+    user_device_id: UUID
+    last_acked_seq: int
 
 
 class DeviceInfo(BaseSchema):
-    id: int
-    name: str
+    id: UUID
+    name: Optional[str]
 
 
 class AppInfo(BaseSchema):
-    id: int
+    id: UUID
     name: str
-    package_name: str
+    package_name: Optional[str]
 
 
 class ActionInfo(BaseSchema):
-    id: int
+    id: UUID
     name: str
     degree: Optional[str]
 
 
 class LogDetail(BaseSchema):
-    id: int
-    user_id: int
+    id: UUID
+    user_device_id: UUID
+    user_app_id: Optional[UUID]
     device: DeviceInfo
     app: Optional[AppInfo]
     action: ActionInfo
-    duration: Optional[int]
-    created_at: str
+    # the action's degree, raised by any matching classification rule
+    degree: Optional[str] = None
+    location: Optional[str]
+    # where ``location`` resolved to when the log was stored
+    district_id: Optional[UUID] = None
+    region_id: Optional[UUID] = None
+    details: Optional[Dict[str, Any]]
+    done_at: str
+    first_at: str
+    last_at: str
+    count: int
 
 
 class ActionResponse(BaseSchema):
-    id: int
+    id: UUID
     name: str
     degree: Optional[str]
 
 
 class TopApp(BaseSchema):
-    id: int
+    id: UUID
     name: str
-    package_name: str
+    package_name: Optional[str]
     usage_count: int
-    total_duration: int
+
+
+class AppUsage(BaseSchema):
+    user_app_id: UUID
+    app: AppInfo
+    seconds: float
+    sessions: int
+
+
+class UsageRebuildResult(BaseSchema):
+    sessions: int
 
 
 class LogSummaryResponse(BaseSchema):
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from app.schemas.base import BaseSchema
+
+
+class NotificationResponse(BaseSchema):
+    id: UUID
+    kind: str
+    body: str
+    data: Optional[Dict[str, Any]] = None
+    read_at: Optional[datetime] = None
+    created_at: datetime
+
+
+class NotificationsRead(BaseSchema):
+    # all unread notifications when omitted
+    ids: Optional[List[UUID]] = None
+
+
+class NotificationsReadResult(BaseSchema):
+    updated: int
+
+
+class NotificationLatency(BaseSchema):
+    count: int
+    p50: float
+    p95: float
+    p99: float
+    max: float
+    queued: int
@@ -1,8 +1,11 @@
 # app/schemas/policies.py
 
-from typing import Optional
+from datetime import date
+from typing import List, Literal, Optional
 from uuid import UUID
 
+from pydantic import Field
+
 from app.schemas.base import BaseSchema
 
 
@@ -36,3 +39,23 @@ class PolicyRead(BaseSchema):
     is_whitelist_web: bool
     targeted_user_type_id: UUID
     targeted_user_type_name: Optional[str]
+
+
+class QuotaItem(BaseSchema):
+    kind: Literal["app", "web"]
+    user_app_id: Optional[UUID] = None
+    domain: Optional[str] = None
+    limit_seconds: int
+    used_seconds: int
+    remaining_seconds: int
+
+
+class QuotaStatus(BaseSchema):
+    user_device_id: UUID
+    day: date
+    items: List[QuotaItem]
+
+
+class WebUsageReport(BaseSchema):
+    domain: str = Field(..., min_length=1, max_length=253)
+    seconds: float = Field(..., gt=0, le=24 * 60 * 60)
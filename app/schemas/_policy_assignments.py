@@ -0,0 +1,24 @@
+from typing import Dict, Optional
+from uuid import UUID
+
+from app.schemas.base import BaseSchema
+
+
+class PolicyAssignmentUpdate(BaseSchema):
+    # None takes the assignment away, so the level inherits again
+    policy_id: Optional[UUID] = None
+
+
+class PolicyAssignmentResponse(BaseSchema):
+    scope: str
+    scope_id: UUID
+    policy_id: Optional[UUID]
+
+
+class EffectivePolicyResponse(BaseSchema):
+    school_id: UUID
+    policy_id: Optional[UUID]
+    # the nearest level with a policy: school, district, region or country
+    source: Optional[str]
+    # policy per level that assigns one, nearest first
+    assigned: Dict[str, UUID]
@@ -0,0 +1,24 @@
+from datetime import date, datetime
+from typing import Any, Dict, Literal, Optional
+from uuid import UUID
+
+from app.enums.enums import Shifts
+from app.schemas.base import BaseSchema
+
+
+class ReportCreate(BaseSchema):
+    school_id: UUID
+    # Monday of a finished week
+    week_start: date
+    shift: Optional[Shifts] = None
+    format: Literal["csv", "pdf"] = "csv"
+
+
+class ReportJobResponse(BaseSchema):
+    id: UUID
+    status: str
+    progress: float
+    params: Dict[str, Any]
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
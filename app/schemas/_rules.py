@@ -0,0 +1,38 @@
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from pydantic import Field
+
+from app.enums.enums import ActionDegrees, RuleKinds
+from app.schemas.base import BaseSchema
+
+
+class RuleCreate(BaseSchema):
+    kind: RuleKinds
+    pattern: str = Field(..., min_length=1, max_length=512)
+    degree: ActionDegrees
+    is_active: bool = True
+
+
+class RuleUpdate(BaseSchema):
+    pattern: Optional[str] = Field(None, min_length=1, max_length=512)
+    degree: Optional[ActionDegrees] = None
+    is_active: Optional[bool] = None
+
+
+class RuleResponse(BaseSchema):
+    id: UUID
+    kind: RuleKinds
+    pattern: str
+    degree: ActionDegrees
+    is_active: bool
+
+
+class ClassifyRequest(BaseSchema):
+    details: Optional[Dict[str, Any]] = None
+    package: Optional[str] = None
+
+
+class ClassifyResponse(BaseSchema):
+    degree: Optional[ActionDegrees]
+    rule_ids: List[UUID]
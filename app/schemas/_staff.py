@@ -0,0 +1,17 @@
+from typing import Optional
+from uuid import UUID
+
+from app.schemas.base import BaseSchema
+
+
+class StaffScopeUpdate(BaseSchema):
+    school_id: Optional[UUID] = None
+    district_id: Optional[UUID] = None
+    region_id: Optional[UUID] = None
+
+
+class StaffScopeResponse(BaseSchema):
+    user_id: UUID
+    school_id: Optional[UUID]
+    district_id: Optional[UUID]
+    region_id: Optional[UUID]
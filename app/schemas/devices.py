@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -55,3 +55,32 @@ class DeviceUpdateRequest(BaseModel):
     ram: Optional[int] = None
     storage: Optional[int] = None
     imei: Optional[str] = Field(None)
+
+
+class DevicePolicyResponse(BaseSchema):
+    policy_id: UUID
+    version: int
+    # content hash of the whole rule set, see GET /policy-snapshots/{hash}
+    snapshot: str
+    # True when the device should replace its rules with the snapshot; the
+    # lists below are then empty, otherwise they are the delta past `since`
+    full: bool
+    is_whitelist_app: bool
+    is_whitelist_web: bool
+    packages_added: List[str] = []
+    packages_removed: List[str] = []
+    domains_added: List[str] = []
+    domains_removed: List[str] = []
+    # "HH:MM-HH:MM" windows per weekday, Monday first; None when unchanged
+    schedule: Optional[List[List[str]]] = None
+
+
+class DomainCheckRequest(BaseSchema):
+    hosts: List[str] = Field(..., max_length=1000)
+
+
+class DomainCheckResponse(BaseSchema):
+    policy_id: UUID
+    version: int
+    # one answer per requested host, in order
+    blocked: List[bool]
@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 
 from app.enums.enums import Genders, Shifts, UserRole
 from app.schemas.base import BaseSchema
@@ -97,3 +97,17 @@ class UserPreferenceCreate(BaseSchema):
 class IDResponse(BaseSchema):
     message: str
     id: UUID
+
+
+class GeoPoint(BaseSchema):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
+class SchoolLocateRequest(BaseSchema):
+    points: List[GeoPoint] = Field(..., max_length=10_000)
+
+
+class SchoolLocateResponse(BaseSchema):
+    # the school whose geofence holds each point, in order, or None
+    school_ids: List[Optional[UUID]]
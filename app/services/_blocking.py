@@ -1,11 +1,18 @@
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from calendar import monthrange
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 
-from sqlalchemy import select
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import config
 from app.enums.enums import AppRequestStatuses
-from app.models import App, School, StudentInfo, User, UserApp, UserRole
+from app.enums.enums import UserRole as UserRoles
+from app.models import App, Holiday, StudentInfo, User, UserApp, UserDevice
+from app.services.blocking_engine import blocking_engine
+from app.services.geofences import school_geofences
+from app.services.policy_sets import policy_sets
 
 
 class BlockingServiceAsync:
@@ -13,8 +20,7 @@ class BlockingServiceAsync:
         self.db = db
 
     async def _ensure_student(self, user: User) -> StudentInfo:
-        ut = await self.db.get(UserRole, user.user_role_id)
-        if not ut or ut.name != "student":
+        if user.user_role_name != UserRoles.STUDENT.value:
             raise PermissionError("Only students may access blocking data")
 
         result = await self.db.execute(select(StudentInfo).filter_by(user_id=user.id))
@@ -23,53 +29,73 @@ class BlockingServiceAsync:
             raise LookupError("Student profile not found")
         return si
 
-    async def get_status(self, user: User) -> Dict[str, Any]:
-        si = await self._ensure_student(user)
-
-        school_name = "Unknown"
-        if si.school:
-            sch = await self.db.get(School, si.school)
-            if sch:
-                school_name = sch.name
+    async def get_status(
+        self, user: User, location: Optional[Tuple[float, float]] = None
+    ) -> Dict[str, Any]:
+        if user.user_role_name != UserRoles.STUDENT.value:
+            raise PermissionError("Only students may access blocking data")
+        evaluator = await blocking_engine.evaluator(self.db, user.id)
+        if evaluator is None:
+            raise LookupError("Student profile not found")
 
-        now = datetime.now()
+        now = datetime.now(timezone.utc)
+        school_name = evaluator.school_name
+        if location is not None:
+            # the nearest school only names where the device is; being in
+            # school is checked against the student's own fence, which may
+            # overlap a neighbour's
+            index = await school_geofences.index(self.db)
+            detected = index.locate(*location)
+            if detected is not None:
+                school_name = school_geofences.name(detected) or school_name
+        decision = evaluator.decide(now, location)
         return {
-            "blocking_active": True,
-            "reason": "School hours (8:00 AM - 2:00 PM)",
-            "location_based": True,
+            "blocking_active": decision.blocking_active,
+            "reason": decision.reason,
+            "location_based": decision.in_school is not None,
             "school_detected": school_name,
-            "current_time": now.strftime("%H:%M"),
-            "is_holiday": False,
-            "shift": si.shift.value if si.shift else None,
+            "current_time": now.astimezone(evaluator.tz).strftime("%H:%M"),
+            "is_holiday": decision.is_holiday,
+            "shift": evaluator.shift.value if evaluator.shift else None,
+            "in_school": decision.in_school,
+            "until": decision.until,
         }
 
     async def list_blocked_apps(self, user: User) -> List[Dict[str, Any]]:
-        await self._ensure_student(user)
-
-        result = await self.db.execute(select(App).limit(10))
-        apps = result.scalars().all()
-
-        out: List[Dict[str, Any]] = []
-        for a in apps:
-            ua_res = await self.db.execute(
-                select(UserApp).filter_by(user_id=user.id, app_id=a.id)
-            )
-            installed = ua_res.scalars().first() is not None
-
-            is_blocked = a.general_type and a.general_type.value == "Social"
-
-            out.append(
-                {
-                    "id": a.id,
-                    "package_name": a.package_name,
-                    "app_name": a.name,
-                    "is_blocked": is_blocked,
-                    "installed": installed,
-                    "category": a.general_type.value if a.general_type else "Unknown",
-                }
-            )
+        if user.user_role_name != UserRoles.STUDENT.value:
+            raise PermissionError("Only students may access blocking data")
+        evaluator = await blocking_engine.evaluator(self.db, user.id)
+        if evaluator is None:
+            raise LookupError("Student profile not found")
 
-        return out
+        result = await self.db.execute(
+            select(App.id, App.name, App.package, App.type)
+            .join(UserApp, UserApp.app_id == App.id)
+            .join(UserDevice, UserDevice.id == UserApp.user_device_id)
+            .where(UserDevice.user_id == user.id, App.package.isnot(None))
+            .distinct()
+        )
+        installed = result.all()
+
+        blocked = set()
+        if evaluator.policy_id is not None:
+            policy = await policy_sets.get(self.db, evaluator.policy_id)
+            if policy is not None:
+                blocked = policy.blocked_packages(a.package for a in installed)
+
+        now = datetime.now(timezone.utc)
+        return [
+            {
+                "id": a.id,
+                "package_name": a.package,
+                "app_name": a.name,
+                "is_blocked": a.package in blocked
+                and not evaluator.excepted(a.id, now),
+                "installed": True,
+                "category": a.type.value if a.type else "Unknown",
+            }
+            for a in sorted(installed, key=lambda a: a.name)
+        ]
 
     async def request_exception(
         self, user: User, app_id: int, reason: str
@@ -94,27 +120,31 @@ class BlockingServiceAsync:
     ) -> Dict[str, Any]:
         si = await self._ensure_student(user)
 
-        now = datetime.now()
+        now = datetime.now(ZoneInfo(config.BLOCKING_TIMEZONE))
         m = month or now.month
         y = year or now.year
 
+        first = date(y, m, 1)
+        last = date(y, m, monthrange(y, m)[1])
+        result = await self.db.execute(
+            select(Holiday.day, Holiday.name)
+            .where(
+                or_(Holiday.school_id.is_(None), Holiday.school_id == si.school_id),
+                Holiday.day >= first,
+                Holiday.day <= last,
+            )
+            .order_by(Holiday.day)
+        )
         holidays = [
-            {"date": f"{y}-{m:02d}-21", "name": "Navruz Holiday"},
-            {"date": f"{y}-{m:02d}-30", "name": "Teacher Development Day"},
-        ]
-        specials = [
-            {
-                "date": f"{y}-{m:02d}-15",
-                "name": "Science Fair",
-                "blocking_modified": True,
-            }
+            {"date": day.isoformat(), "name": name, "blocking_modified": True}
+            for day, name in result
         ]
 
         return {
             "month": m,
             "year": y,
-            "school_id": si.school,
+            "school_id": si.school_id,
             "shift": si.shift.value if si.shift else None,
             "holidays": holidays,
-            "special_events": specials,
+            "special_events": [],
         }
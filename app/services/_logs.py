@@ -1,34 +1,118 @@
+import asyncio
+import json
+import logging
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
+from sqlalchemy import Select, func, select, union
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.enums.enums import ActionDegrees
+from app.core.config import config
+from app.enums.enums import ActionDegrees, UserRole
 from app.models import Action
 from app.models import App as AppModel
-from app.models import Device, Log, User, UserApp, UserDevice, UserRole
-from app.schemas.logs import (
+from app.models import Device, Log, LogPayload, User, UserApp, UserDevice
+from app.schemas._logs import (
     ActionInfo,
     ActionResponse,
     AppInfo,
     DeviceInfo,
+    DeviceSyncStatus,
+    LogAccepted,
     LogCreate,
     LogDetail,
     LogSummaryResponse,
     TopApp,
 )
+from app.services.anomalies import anomaly_detector
+from app.services.app_sketches import app_sketches
+from app.services.classifier import classifier, max_degree
+from app.services.device_sync import (
+    accepts,
+    advance,
+    cached_high_water,
+    event_id_for,
+    get_high_water,
+    note_spooled,
+)
+from app.services.districts import district_locator
+from app.services.log_archive import archive_cutoff, read_archived_logs
+from app.services.log_coalescer import log_coalescer
+from app.services.log_payloads import load_payloads, log_details, payload_interner
+from app.services.log_spool import is_degraded, is_outage, mark_degraded, spool_log
+from app.services.notifications import TERRIBLE_ACTION, ParentEvent, alert_fanout
+from app.services.usage_sessions import track_usage
+
+logger = logging.getLogger(__name__)
 
 
 async def create_log(
     db: AsyncSession, current_user: User, data: LogCreate
-) -> LogDetail:
+) -> Union[LogDetail, LogAccepted]:
+    if data.seq is not None:
+        event_id = event_id_for(data.user_device_id, data.seq)
+    else:
+        event_id = data.event_id or uuid4()
+    row = {
+        "id": event_id,
+        "user_device_id": data.user_device_id,
+        "user_app_id": data.user_app_id,
+        "action_id": data.action_id,
+        "done_at": data.done_at or datetime.utcnow(),
+        "location": data.location,
+        "details": data.details,
+        "degree": classifier.classify(data.details).degree,
+    }
+
+    if is_degraded():
+        return _spool(current_user, row, data.seq)
+
+    try:
+        return await asyncio.wait_for(
+            _store_log(db, current_user, row, data.seq),
+            timeout=config.LOG_INGEST_DB_TIMEOUT,
+        )
+    except (IntegrityError, DataError) as e:
+        await db.rollback()
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, f"Log rejected: {e.orig}"
+        )
+    except Exception as e:
+        if not is_outage(e):
+            raise
+        logger.warning(
+            "Database unavailable, spooling log %s", row["id"], exc_info=True
+        )
+        mark_degraded()
+        await db.invalidate()
+        return _spool(current_user, row, data.seq)
+
+
+def _spool(current_user: User, row: Dict[str, Any], seq: Optional[int]) -> LogAccepted:
+    if seq is not None:
+        # only the cached mark is available without the database and it may
+        # lag other workers, so gaps are left to replay, which advances the
+        # mark through consecutive numbers only
+        hwm = cached_high_water(row["user_device_id"])
+        if hwm is not None and seq <= hwm:
+            return LogAccepted(event_id=row["id"], spooled=False, duplicate=True)
+        note_spooled(row["user_device_id"], seq)
+    spool_log(current_user.id, row, seq)
+    return LogAccepted(event_id=row["id"], spooled=True)
+
+
+async def _store_log(
+    db: AsyncSession, current_user: User, row: Dict[str, Any], seq: Optional[int]
+) -> Union[LogDetail, LogAccepted]:
     ud = (
         (
             await db.execute(
                 select(UserDevice).where(
-                    UserDevice.id == data.user_device_id,
+                    UserDevice.id == row["user_device_id"],
                     UserDevice.user_id == current_user.id,
                 )
             )
@@ -39,8 +123,12 @@ async def create_log(
     if not ud:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Device does not belong to user")
 
+    if seq is not None and not await accepts(db, ud.id, seq):
+        return LogAccepted(event_id=row["id"], spooled=False, duplicate=True)
+    await district_locator.tag_rows(db, [row])
+
     action = (
-        (await db.execute(select(Action).where(Action.id == data.action_id)))
+        (await db.execute(select(Action).where(Action.id == row["action_id"])))
         .scalars()
         .first()
     )
@@ -48,45 +136,98 @@ async def create_log(
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Action not found")
 
     app_obj = None
-    if data.user_app_id is not None:
+    if row["user_app_id"] is not None:
         ua = (
-            (await db.execute(select(UserApp).where(UserApp.id == data.user_app_id)))
+            (await db.execute(select(UserApp).where(UserApp.id == row["user_app_id"])))
             .scalars()
             .first()
         )
         if not ua:
             raise HTTPException(status.HTTP_404_NOT_FOUND, "UserApp entry not found")
         # load the real App info
-        app_obj = (
-            (await db.execute(select(AppModel).where(AppModel.id == ua.app_id)))
-            .scalars()
-            .first()
-        )
+        app_obj = await db.get(AppModel, ua.app_id)
+        if app_obj is not None:
+            row["degree"] = max_degree(
+                row["degree"], classifier.classify(None, app_obj.package).degree
+            )
 
-    new = Log(
-        user_device_id=data.user_device_id,
-        user_app_id=data.user_app_id,
-        action_id=data.action_id,
-        location=data.location,
-        details=data.details,
-    )
-    db.add(new)
+    # a retry of an event already folded into a run changes nothing
+    log_id = log_coalescer.seen(row)
+    fresh = log_id is None
+    if fresh and log_coalescer.enabled:
+        log_id = await log_coalescer.merge(db, row)
+    if log_id is None:
+        # event ids are client-generated, so a retried upload is a no-op
+        (values,) = await payload_interner.intern(db, [row])
+        log_id = row["id"]
+        fresh = (
+            await db.scalar(
+                insert(Log)
+                .values(
+                    **values, first_at=row["done_at"], last_at=row["done_at"], count=1
+                )
+                .on_conflict_do_nothing(index_elements=[Log.id])
+                .returning(Log.id)
+            )
+            is not None
+        )
+        if fresh:
+            log_coalescer.remember(db, log_id, row)
+    if fresh:
+        await track_usage(db, [row])
+    degree = max_degree(row["degree"], action.degree)
+    if fresh:
+        anomaly_detector.observe_on_commit(db, ud.id, degree, row["done_at"])
+    if fresh and app_obj is not None:
+        await app_sketches.observe(db, [(ud.id, app_obj.id, row["done_at"], 1)])
+    if fresh and degree == ActionDegrees.TERRIBLE:
+        alert_fanout.publish_on_commit(
+            db,
+            ParentEvent(
+                TERRIBLE_ACTION,
+                current_user.id,
+                {
+                    "action": action.name,
+                    "app": app_obj.name if app_obj else None,
+                    "user_device_id": str(ud.id),
+                    "log_id": str(log_id),
+                },
+            ),
+        )
+    if seq is not None and not await advance(db, ud.id, seq):
+        # another worker stored this number first
+        await db.rollback()
+        if seq <= await get_high_water(db, ud.id, refresh=True):
+            return LogAccepted(event_id=row["id"], spooled=False, duplicate=True)
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            f"Sequence {seq} was not the next expected for this device",
+        )
     await db.flush()
-    await db.refresh(new)
+    new = await db.get(Log, log_id, populate_existing=True)
 
-    device = (
-        (await db.execute(select(Device).where(Device.id == new.user_device_id)))
-        .scalars()
-        .first()
-    )
+    device = await db.get(Device, ud.device_id)
+    payloads = await load_payloads(db, [new.payload_hash])
+    detail = _log_detail(new, device, app_obj, action, log_details(new, payloads))
+    # committed here so a slow commit falls under the ingest timeout too
+    await db.commit()
+    return detail
 
+
+def _log_detail(
+    log: Log,
+    device: Device,
+    app_obj,
+    action: Action,
+    details: Optional[Dict[str, Any]],
+) -> LogDetail:
     return LogDetail(
-        id=new.id,
-        user_device_id=new.user_device_id,
-        user_app_id=new.user_app_id,
-        device=DeviceInfo(id=device.id, name=device.device_name),
+        id=log.id,
+        user_device_id=log.user_device_id,
+        user_app_id=log.user_app_id,
+        device=DeviceInfo(id=device.id, name=device.model),
         app=(
-            AppInfo(id=app_obj.id, name=app_obj.name, package_name=app_obj.package_name)
+            AppInfo(id=app_obj.id, name=app_obj.name, package_name=app_obj.package)
             if app_obj
             else None
         ),
@@ -95,32 +236,95 @@ async def create_log(
             name=action.name,
             degree=action.degree.value if action.degree else None,
         ),
-        location=new.location,
-        details=new.details,
-        done_at=new.done_at.isoformat(),
+        degree=_value(max_degree(log.degree, action.degree)),
+        location=log.location,
+        district_id=log.district_id,
+        region_id=log.region_id,
+        details=details,
+        done_at=log.done_at.isoformat(),
+        first_at=log.first_at.isoformat(),
+        last_at=log.last_at.isoformat(),
+        count=log.count,
     )
 
 
+async def _log_details(db: AsyncSession, logs: List[Log]) -> List[LogDetail]:
+    """Build LogDetail rows with one query per related table."""
+    if not logs:
+        return []
+    devices = dict(
+        (
+            await db.execute(
+                select(UserDevice.id, Device)
+                .join(Device, Device.id == UserDevice.device_id)
+                .where(UserDevice.id.in_({log.user_device_id for log in logs}))
+            )
+        ).all()
+    )
+    user_app_ids = {log.user_app_id for log in logs if log.user_app_id}
+    apps = {}
+    if user_app_ids:
+        apps = dict(
+            (
+                await db.execute(
+                    select(UserApp.id, AppModel)
+                    .join(AppModel, AppModel.id == UserApp.app_id)
+                    .where(UserApp.id.in_(user_app_ids))
+                )
+            ).all()
+        )
+    actions = {
+        a.id: a
+        for a in (
+            await db.execute(
+                select(Action).where(Action.id.in_({log.action_id for log in logs}))
+            )
+        ).scalars()
+    }
+    payloads = await load_payloads(db, (log.payload_hash for log in logs))
+    return [
+        _log_detail(
+            log,
+            devices[log.user_device_id],
+            apps.get(log.user_app_id),
+            actions[log.action_id],
+            log_details(log, payloads),
+        )
+        for log in logs
+    ]
+
+
+def _value(degree: Optional[ActionDegrees]) -> Optional[str]:
+    return degree.value if degree else None
+
+
+# a rule match can only raise the degree of the action it was logged under
+effective_degree = func.greatest(Log.degree, Action.degree)
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Invalid {name} format")
+
+
 async def get_logs(
     db: AsyncSession,
     current_user: User,
     start_date: Optional[str],
     end_date: Optional[str],
-    user_device_id: Optional[int],
-    user_app_id: Optional[int],
+    user_device_id: Optional[UUID],
+    user_app_id: Optional[UUID],
     action_degree: Optional[str],
 ) -> List[LogDetail]:
     # permission check
-    ut = (
-        (
-            await db.execute(
-                select(UserRole).where(UserRole.id == current_user.user_type_id)
-            )
-        )
-        .scalars()
-        .first()
-    )
-    if not ut or ut.name not in ("parent", "admin"):
+    if current_user.user_role_name not in (
+        UserRole.PARENT.value,
+        UserRole.MINISTRY.value,
+    ):
         raise HTTPException(
             status.HTTP_403_FORBIDDEN, "Only parents/admins can view logs"
         )
@@ -129,87 +333,205 @@ async def get_logs(
 
     stmt = stmt.where(UserDevice.user_id == current_user.id)
 
-    if start_date:
-        try:
-            sd = datetime.fromisoformat(start_date)
-            stmt = stmt.where(Log.done_at >= sd)
-        except ValueError:
-            raise HTTPException(
-                status.HTTP_400_BAD_REQUEST, "Invalid start_date format"
-            )
-    if end_date:
-        try:
-            ed = datetime.fromisoformat(end_date)
-            stmt = stmt.where(Log.done_at <= ed)
-        except ValueError:
-            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid end_date format")
+    sd = _parse_date(start_date, "start_date")
+    if sd:
+        stmt = stmt.where(Log.done_at >= sd)
+    ed = _parse_date(end_date, "end_date")
+    if ed:
+        stmt = stmt.where(Log.done_at <= ed)
 
     if user_device_id:
         stmt = stmt.where(Log.user_device_id == user_device_id)
     if user_app_id:
         stmt = stmt.where(Log.user_app_id == user_app_id)
 
+    deg = None
     if action_degree:
         try:
             deg = ActionDegrees(action_degree)
             stmt = stmt.join(Action, Log.action_id == Action.id).where(
-                Action.degree == deg
+                effective_degree == deg
             )
         except ValueError:
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST, f"Invalid action_degree: {action_degree}"
             )
 
+    limit = 100
     rows = (
-        (await db.execute(stmt.order_by(Log.done_at.desc()).limit(100))).scalars().all()
+        (await db.execute(stmt.order_by(Log.done_at.desc()).limit(limit)))
+        .scalars()
+        .all()
     )
 
-    out: List[LogDetail] = []
-    for log in rows:
-        device = (
-            (await db.execute(select(Device).where(Device.id == log.user_device_id)))
-            .scalars()
-            .first()
+    if reads_archive(rows, sd, limit, archive_cutoff()):
+        rows = await _with_archived(
+            db, current_user, rows, sd, ed, user_device_id, user_app_id, deg, limit
         )
 
-        app_info = None
-        if log.user_app_id:
-            ua = (
-                (await db.execute(select(UserApp).where(UserApp.id == log.user_app_id)))
-                .scalars()
-                .first()
-            )
-            am = (
-                (await db.execute(select(AppModel).where(AppModel.id == ua.app_id)))
-                .scalars()
-                .first()
-            )
-            app_info = AppInfo(id=am.id, name=am.name, package_name=am.package_name)
+    return await _log_details(db, rows)
+
+
+def reads_archive(
+    rows: List[Log], start: Optional[datetime], limit: int, cutoff: datetime
+) -> bool:
+    """Whether archived rows could make it into the newest ``limit`` rows.
 
-        action = (
-            (await db.execute(select(Action).where(Action.id == log.action_id)))
+    Everything archived is older than ``cutoff``, so the archive is skipped
+    when the range starts after it or the hot rows already fill the page
+    without reaching back past it.
+    """
+    if start is not None and start >= cutoff:
+        return False
+    return len(rows) < limit or rows[-1].done_at < cutoff
+
+
+async def _with_archived(
+    db: AsyncSession,
+    current_user: User,
+    rows: List[Log],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    user_device_id: Optional[UUID],
+    user_app_id: Optional[UUID],
+    degree: Optional[ActionDegrees],
+    limit: int = 100,
+) -> List[Log]:
+    """Merge matching rows from the cold-storage archive into ``rows``."""
+    stmt = select(UserDevice.id).where(UserDevice.user_id == current_user.id)
+    if user_device_id:
+        stmt = stmt.where(UserDevice.id == user_device_id)
+    device_ids = (await db.execute(stmt)).scalars().all()
+
+    action_ids = None
+    if degree is not None:
+        action_ids = (
+            (await db.execute(select(Action.id).where(Action.degree == degree)))
             .scalars()
-            .first()
+            .all()
         )
 
-        out.append(
-            LogDetail(
-                id=log.id,
-                user_device_id=log.user_device_id,
-                user_app_id=log.user_app_id,
-                device=DeviceInfo(id=device.id, name=device.device_name),
-                app=app_info,
-                action=ActionInfo(
-                    id=action.id,
-                    name=action.name,
-                    degree=action.degree.value if action.degree else None,
-                ),
-                location=log.location,
-                details=log.details,
-                done_at=log.done_at.isoformat(),
+    archived = await asyncio.to_thread(
+        read_archived_logs,
+        device_ids,
+        start=start,
+        end=end,
+        user_app_id=user_app_id,
+        degree=degree,
+        action_ids=action_ids,
+        limit=limit,
+    )
+    if not archived:
+        return rows
+    seen = {log.id for log in rows}
+    merged = rows + [log for log in archived if log.id not in seen]
+    merged.sort(key=lambda log: log.done_at, reverse=True)
+    return merged[:limit]
+
+
+def _json_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def build_log_search(
+    key: Optional[str] = None,
+    value: Optional[str] = None,
+    text: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+) -> Select:
+    """Search statement served by the GIN indexes on details and details_tsv.
+
+    ``key`` alone matches logs whose details have that key; with ``value`` it
+    becomes a containment match (``@>``). ``value`` is parsed as JSON when it
+    can be, so ``value=3`` matches numbers and ``value="3"`` strings.
+
+    Inline and interned details are searched by separate branches, each on
+    its own table's indexes, and the union is ordered and limited once more.
+    """
+
+    def branch(stmt: Select, details, details_tsv) -> Select:
+        if key is not None:
+            if value is None:
+                stmt = stmt.where(details.has_key(key))
+            else:
+                stmt = stmt.where(details.contains({key: _json_value(value)}))
+        if text:
+            stmt = stmt.where(
+                details_tsv.op("@@")(func.plainto_tsquery("simple", text))
             )
+        if start:
+            stmt = stmt.where(Log.done_at >= start)
+        if end:
+            stmt = stmt.where(Log.done_at <= end)
+        return stmt.order_by(Log.done_at.desc()).limit(limit)
+
+    joined = select(Log.id).join(LogPayload, LogPayload.hash == Log.payload_hash)
+    branches = [
+        branch(select(Log.id), Log.details, Log.details_tsv),
+        branch(joined, LogPayload.details, LogPayload.details_tsv),
+    ]
+    if key is not None and text:
+        # an interned log's own details_tsv still holds its location text;
+        # without a key the first branch already matches it
+        branches.append(branch(joined, LogPayload.details, Log.details_tsv))
+    matches = union(*branches).subquery()
+    return (
+        select(Log)
+        .join(matches, matches.c.id == Log.id)
+        .order_by(Log.done_at.desc())
+        .limit(limit)
+    )
+
+
+async def search_logs(
+    db: AsyncSession,
+    current_user: User,
+    key: Optional[str],
+    value: Optional[str],
+    text: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    limit: int = 100,
+) -> List[LogDetail]:
+    if current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Only admins can search logs")
+    if key is None and not text:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "Provide a details key or a text query"
         )
-    return out
+
+    stmt = build_log_search(
+        key=key,
+        value=value,
+        text=text,
+        start=_parse_date(start_date, "start_date"),
+        end=_parse_date(end_date, "end_date"),
+        limit=limit,
+    )
+    rows = (await db.execute(stmt)).scalars().all()
+    return await _log_details(db, rows)
+
+
+async def get_sync_status(
+    db: AsyncSession, current_user: User, user_device_id: UUID
+) -> DeviceSyncStatus:
+    owned = await db.scalar(
+        select(UserDevice.id).where(
+            UserDevice.id == user_device_id,
+            UserDevice.user_id == current_user.id,
+        )
+    )
+    if not owned:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Device not found")
+    return DeviceSyncStatus(
+        user_device_id=user_device_id,
+        last_acked_seq=await get_high_water(db, user_device_id, refresh=True),
+    )
 
 
 async def get_actions(db: AsyncSession) -> List[ActionResponse]:
@@ -225,44 +547,39 @@ async def get_actions(db: AsyncSession) -> List[ActionResponse]:
 async def get_log_summary(
     db: AsyncSession, current_user: User, days: int = 7
 ) -> LogSummaryResponse:
-    ut = (
-        (
-            await db.execute(
-                select(UserRole).where(UserRole.id == current_user.user_type_id)
-            )
-        )
-        .scalars()
-        .first()
-    )
-    if not ut or ut.name not in ("student", "parent", "admin"):
+    if current_user.user_role_name not in (
+        UserRole.STUDENT.value,
+        UserRole.PARENT.value,
+        UserRole.MINISTRY.value,
+    ):
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Access denied")
 
     now = datetime.now()
     start = now - timedelta(days=days)
 
     total = await db.scalar(
-        select(func.count(Log.id))
+        select(func.coalesce(func.sum(Log.count), 0))
         .join(UserDevice, Log.user_device_id == UserDevice.id)
         .where(UserDevice.user_id == current_user.id, Log.done_at >= start)
     )
     suspicious = await db.scalar(
-        select(func.count(Log.id))
+        select(func.coalesce(func.sum(Log.count), 0))
         .join(UserDevice, Log.user_device_id == UserDevice.id)
         .join(Action, Log.action_id == Action.id)
         .where(
             UserDevice.user_id == current_user.id,
             Log.done_at >= start,
-            Action.degree == ActionDegrees.suspicious,
+            effective_degree == ActionDegrees.SUSPICIOUS,
         )
     )
     terrible = await db.scalar(
-        select(func.count(Log.id))
+        select(func.coalesce(func.sum(Log.count), 0))
         .join(UserDevice, Log.user_device_id == UserDevice.id)
         .join(Action, Log.action_id == Action.id)
         .where(
             UserDevice.user_id == current_user.id,
             Log.done_at >= start,
-            Action.degree == ActionDegrees.terrible,
+            effective_degree == ActionDegrees.TERRIBLE,
         )
     )
 
@@ -271,15 +588,15 @@ async def get_log_summary(
             select(
                 AppModel.id,
                 AppModel.name,
-                AppModel.package_name,
-                func.count(Log.id).label("usage_count"),
+                AppModel.package,
+                func.sum(Log.count).label("usage_count"),
             )
             .join(UserApp, UserApp.id == Log.user_app_id)
             .join(AppModel, AppModel.id == UserApp.app_id)
             .join(UserDevice, Log.user_device_id == UserDevice.id)
             .where(UserDevice.user_id == current_user.id, Log.done_at >= start)
             .group_by(AppModel.id)
-            .order_by(func.count(Log.id).desc())
+            .order_by(func.sum(Log.count).desc())
             .limit(5)
         )
     ).all()
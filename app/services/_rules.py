@@ -0,0 +1,109 @@
+import re
+from typing import List
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.enums.enums import RuleKinds, UserRole
+from app.models import ClassificationRule, User
+from app.schemas._rules import (
+    ClassifyRequest,
+    ClassifyResponse,
+    RuleCreate,
+    RuleResponse,
+    RuleUpdate,
+)
+from app.services.classifier import classifier, normalize_host, rule_regex
+
+
+def _ensure_admin(current_user: User) -> None:
+    if current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, "Only admins can manage classification rules"
+        )
+
+
+def _validate(kind: RuleKinds, pattern: str) -> None:
+    if kind == RuleKinds.REGEX:
+        try:
+            re.compile(rule_regex(pattern), re.IGNORECASE)
+        except re.error as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Invalid regex: {e}")
+        # rules are combined into one pattern with a named group per rule
+        if "(?P" in pattern or re.search(r"\\\d", pattern):
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                "Named groups and backreferences are not supported in rules",
+            )
+    elif kind == RuleKinds.DOMAIN and normalize_host(pattern) is None:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid domain")
+
+
+async def _commit_and_reload(db: AsyncSession) -> None:
+    await db.commit()
+    # this worker picks the change up now; others on their next poll
+    await classifier.reload(db, force=True)
+
+
+async def list_rules(db: AsyncSession, current_user: User) -> List[RuleResponse]:
+    _ensure_admin(current_user)
+    rules = (
+        await db.execute(
+            select(ClassificationRule).order_by(
+                ClassificationRule.kind, ClassificationRule.pattern
+            )
+        )
+    ).scalars()
+    return [RuleResponse.model_validate(rule) for rule in rules]
+
+
+async def create_rule(
+    db: AsyncSession, current_user: User, data: RuleCreate
+) -> RuleResponse:
+    _ensure_admin(current_user)
+    _validate(data.kind, data.pattern)
+    rule = ClassificationRule(**data.model_dump())
+    db.add(rule)
+    await db.flush()
+    response = RuleResponse.model_validate(rule)
+    await _commit_and_reload(db)
+    return response
+
+
+async def update_rule(
+    db: AsyncSession, current_user: User, rule_id: UUID, data: RuleUpdate
+) -> RuleResponse:
+    _ensure_admin(current_user)
+    rule = await db.get(ClassificationRule, rule_id)
+    if not rule:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Rule not found")
+    if data.pattern is not None:
+        _validate(rule.kind, data.pattern)
+        rule.pattern = data.pattern
+    if data.degree is not None:
+        rule.degree = data.degree
+    if data.is_active is not None:
+        rule.is_active = data.is_active
+    await db.flush()
+    response = RuleResponse.model_validate(rule)
+    await _commit_and_reload(db)
+    return response
+
+
+async def delete_rule(db: AsyncSession, current_user: User, rule_id: UUID) -> None:
+    _ensure_admin(current_user)
+    rule = await db.get(ClassificationRule, rule_id)
+    if not rule:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Rule not found")
+    await db.delete(rule)
+    await _commit_and_reload(db)
+
+
+async def classify_sample(
+    current_user: User, data: ClassifyRequest
+) -> ClassifyResponse:
+    _ensure_admin(current_user)
+    result = classifier.classify(data.details, data.package)
+    return ClassifyResponse(degree=result.degree, rule_ids=sorted(result.rule_ids))
@@ -0,0 +1,284 @@
+import logging
+from datetime import datetime, timedelta
+from time import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import event, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.enums.enums import ActionDegrees, UserRole
+from app.models import Alert, StudentInfo, User, UserDevice
+from app.schemas._alerts import AlertResponse
+
+logger = logging.getLogger(__name__)
+
+DEGREES = list(ActionDegrees)
+DEGREE_INDEX = {degree: i for i, degree in enumerate(DEGREES)}
+
+_PENDING = "pending_anomaly_events"
+
+
+class AnomalyDetector:
+    """Exponentially weighted event-rate baselines per device and degree.
+
+    Ingest counts events into the open time bucket. When the bucket closes
+    every device's counts are scored against its baseline mean and variance
+    and then folded into them. State is a few arrays with one row per
+    tracked device (about 50 bytes each), so closing a bucket for hundreds
+    of thousands of devices is a handful of vectorized operations.
+
+    Each process only sees the events it ingested, so baselines are per
+    process; with several processes a device's traffic is spread over them.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int,
+        half_life_buckets: float,
+        threshold: float,
+        min_events: int,
+        warmup_buckets: int,
+        evict_buckets: int,
+        capacity: int = 1024,
+        now: Optional[float] = None,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.alpha = 1 - 0.5 ** (1 / half_life_buckets)
+        self.threshold = threshold
+        self.min_events = min_events
+        self.warmup_buckets = warmup_buckets
+        self.evict_buckets = evict_buckets
+
+        self._slots: Dict[UUID, int] = {}
+        self._ids: List[Optional[UUID]] = []
+        self._free: List[int] = []
+        self.counts = np.zeros((capacity, len(DEGREES)), np.float32)
+        self.mean = np.zeros((capacity, len(DEGREES)), np.float32)
+        self.var = np.zeros((capacity, len(DEGREES)), np.float32)
+        # buckets closed since the device was first seen, and its last bucket
+        self.age = np.zeros(capacity, np.int32)
+        self.last_seen = np.zeros(capacity, np.int64)
+        self._set_bucket(int((time() if now is None else now) // bucket_seconds))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _set_bucket(self, bucket: int) -> None:
+        self.bucket = bucket
+        self.bucket_start = datetime.utcfromtimestamp(bucket * self.bucket_seconds)
+
+    def _grow(self) -> None:
+        capacity = len(self.age) * 2
+        for name in ("counts", "mean", "var", "age", "last_seen"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def _slot(self, user_device_id: UUID) -> int:
+        slot = self._slots.get(user_device_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._ids[slot] = user_device_id
+            else:
+                slot = len(self._ids)
+                if slot == len(self.age):
+                    self._grow()
+                self._ids.append(user_device_id)
+            self._slots[user_device_id] = slot
+        return slot
+
+    def observe(
+        self,
+        user_device_id: UUID,
+        degree: Optional[ActionDegrees],
+        at: Optional[datetime] = None,
+        count: int = 1,
+    ) -> bool:
+        """Count events in the open bucket; ones from before it are ignored.
+
+        ``at`` is the naive UTC time of the event, so late uploads from a
+        device that was offline do not show up as a spike.
+        """
+        if at is not None and at < self.bucket_start:
+            return False
+        slot = self._slot(user_device_id)
+        self.counts[slot, DEGREE_INDEX[degree or ActionDegrees.NEUTRAL]] += count
+        self.last_seen[slot] = self.bucket
+        return True
+
+    def observe_on_commit(
+        self,
+        db: AsyncSession,
+        user_device_id: UUID,
+        degree: Optional[ActionDegrees],
+        at: Optional[datetime] = None,
+        count: int = 1,
+    ) -> None:
+        """Like ``observe``, once the transaction commits; a rollback drops it."""
+        session = getattr(db, "sync_session", db)
+        session.info.setdefault(_PENDING, {}).setdefault(self, []).append(
+            (user_device_id, degree, at, count)
+        )
+
+    def _fold(self, n: int, counts) -> None:
+        mean, var = self.mean[:n], self.var[:n]
+        diff = counts - mean
+        step = self.alpha * diff
+        mean += step
+        var[:] = (1 - self.alpha) * (var + diff * step)
+
+    def close(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Score and fold the open bucket once it has ended; returns alert rows."""
+        current = int((time() if now is None else now) // self.bucket_seconds)
+        if current <= self.bucket:
+            return []
+        n = len(self._ids)
+        counts = self.counts[:n]
+        mean = self.mean[:n]
+        # the floor keeps a steady or empty baseline from alerting on noise
+        score = (counts - mean) / np.maximum(np.sqrt(self.var[:n]), 1.0)
+        spikes = (
+            (counts >= self.min_events)
+            & (score >= self.threshold)
+            & (self.age[:n, None] >= self.warmup_buckets)
+        )
+        window_end = self.bucket_start + timedelta(seconds=self.bucket_seconds)
+        alerts = [
+            {
+                "user_device_id": self._ids[row],
+                "degree": DEGREES[col],
+                "window_start": self.bucket_start,
+                "window_end": window_end,
+                "observed": int(counts[row, col]),
+                "expected": float(mean[row, col]),
+                "score": float(score[row, col]),
+            }
+            for row, col in zip(*np.nonzero(spikes))
+        ]
+
+        self._fold(n, counts)
+        # buckets nobody closed (the process was busy or asleep) were empty
+        missed = min(current - self.bucket - 1, self.evict_buckets)
+        for _ in range(missed):
+            self._fold(n, 0)
+        counts[:] = 0
+        self.age[:n] += 1 + missed
+        self._set_bucket(current)
+        self._evict(n)
+        return alerts
+
+    def _evict(self, n: int) -> None:
+        idle = np.flatnonzero(self.bucket - self.last_seen[:n] > self.evict_buckets)
+        for slot in idle.tolist():
+            user_device_id = self._ids[slot]
+            if user_device_id is None:
+                continue
+            del self._slots[user_device_id]
+            self._ids[slot] = None
+            self._free.append(slot)
+            self.mean[slot] = 0
+            self.var[slot] = 0
+            self.age[slot] = 0
+
+
+anomaly_detector = AnomalyDetector(
+    config.ANOMALY_BUCKET_SECONDS,
+    config.ANOMALY_HALF_LIFE_BUCKETS,
+    config.ANOMALY_THRESHOLD,
+    config.ANOMALY_MIN_EVENTS,
+    config.ANOMALY_WARMUP_BUCKETS,
+    config.ANOMALY_EVICT_BUCKETS,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _observe_committed(session: Session) -> None:
+    for detector, events in session.info.pop(_PENDING, {}).items():
+        for ev in events:
+            detector.observe(*ev)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+async def store_alerts(db: AsyncSession, alerts: List[Dict[str, Any]]) -> int:
+    # devices deleted since their events were counted would fail the batch
+    existing = set(
+        (
+            await db.execute(
+                select(UserDevice.id).where(
+                    UserDevice.id.in_({a["user_device_id"] for a in alerts})
+                )
+            )
+        ).scalars()
+    )
+    rows = [a for a in alerts if a["user_device_id"] in existing]
+    if rows:
+        await db.execute(insert(Alert).values(rows))
+    return len(rows)
+
+
+async def get_alerts(
+    db: AsyncSession,
+    current_user: User,
+    user_device_id: Optional[UUID],
+    since: Optional[datetime],
+    limit: int,
+) -> List[AlertResponse]:
+    stmt = select(Alert)
+    if current_user.user_role_name == UserRole.PARENT.value:
+        children = select(StudentInfo.user_id).where(
+            or_(
+                StudentInfo.father_id == current_user.id,
+                StudentInfo.mother_id == current_user.id,
+            )
+        )
+        stmt = stmt.join(UserDevice, UserDevice.id == Alert.user_device_id).where(
+            UserDevice.user_id.in_(children)
+        )
+    elif current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, "Only parents/admins can view alerts"
+        )
+    if user_device_id:
+        stmt = stmt.where(Alert.user_device_id == user_device_id)
+    if since:
+        stmt = stmt.where(Alert.window_start >= since)
+    rows = (
+        (await db.execute(stmt.order_by(Alert.window_start.desc()).limit(limit)))
+        .scalars()
+        .all()
+    )
+    return [AlertResponse.model_validate(r) for r in rows]
+
+
+class AnomalyScanner(BackgroundWorker):
+    """Closes detector buckets and stores the spikes they flag as alerts."""
+
+    name = "anomaly-scanner"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = max(config.ANOMALY_BUCKET_SECONDS / 4, 1.0)
+        self._unsaved: List[Dict[str, Any]] = []
+
+    async def run_once(self) -> None:
+        self._unsaved.extend(anomaly_detector.close())
+        if not self._unsaved:
+            return
+        async with AsyncSessionFactory() as db:
+            stored = await store_alerts(db, self._unsaved)
+            await db.commit()
+        self._unsaved = []
+        logger.info("Stored %d anomaly alerts", stored)
@@ -0,0 +1,406 @@
+import asyncio
+import heapq
+import io
+import logging
+from collections import OrderedDict
+from datetime import date, datetime
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import event, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.sketches import CountMinSketch, HyperLogLog, hash64
+from app.core.workers import BackgroundWorker
+from app.models import App as AppModel
+from app.models import AppUsageSketch, School, StudentInfo, User, UserDevice
+from app.schemas._analytics import TopAppEstimate, TopAppsResponse
+from app.schemas._logs import AppInfo
+from app.services.scopes import (
+    COUNTRY,
+    COUNTRY_ID,
+    DISTRICT,
+    REGION,
+    SCHOOL,
+    resolve_scope,
+)
+
+logger = logging.getLogger(__name__)
+
+SketchKey = Tuple[str, UUID, date]
+# (user_device_id, app_id, done_at, events)
+AppEvent = Tuple[UUID, UUID, datetime, int]
+
+_PENDING = "pending_app_sketches"
+
+
+class AppSketch:
+    """Top apps of one scope and day, mergeable with any other day or scope.
+
+    Events per app go into a Count-Min sketch, which may overcount but
+    never undercounts. The heavy-hitter candidates are kept with their
+    estimates, each with a HyperLogLog of the devices using it. Devices of
+    an app are only tracked while it is a candidate, so an app that climbs
+    into the top after being pruned has its device count underestimated.
+    """
+
+    def __init__(self, capacity: int, width: int, depth: int, precision: int):
+        self.capacity = capacity
+        self.precision = precision
+        self.cms = CountMinSketch(width, depth)
+        self.top: Dict[UUID, int] = {}
+        self.devices: Dict[UUID, HyperLogLog] = {}
+
+    @classmethod
+    def empty(cls) -> "AppSketch":
+        return cls(
+            config.SKETCH_TOP_CAPACITY,
+            config.SKETCH_CMS_WIDTH,
+            config.SKETCH_CMS_DEPTH,
+            config.SKETCH_HLL_PRECISION,
+        )
+
+    def add(self, app_id: UUID, events: int, device_hashes: Iterable[int]) -> None:
+        h = hash64(app_id.bytes)
+        self.cms.add(h, events)
+        self.top[app_id] = self.cms.estimate(h)
+        hll = self.devices.get(app_id)
+        if hll is None:
+            hll = self.devices[app_id] = HyperLogLog(self.precision)
+        for device in device_hashes:
+            hll.add(device)
+        # pruning lazily keeps adds cheap
+        if len(self.top) > 2 * self.capacity:
+            self.prune()
+
+    def prune(self) -> None:
+        if len(self.top) <= self.capacity:
+            return
+        self.top = dict(
+            heapq.nlargest(self.capacity, self.top.items(), key=itemgetter(1))
+        )
+        self.devices = {a: self.devices[a] for a in self.top if a in self.devices}
+
+    def merge(self, other: "AppSketch") -> "AppSketch":
+        if other.precision != self.precision:
+            raise ValueError("Sketches of different precision cannot be merged")
+        self.cms.merge(other.cms)
+        for app_id, hll in other.devices.items():
+            mine = self.devices.get(app_id)
+            if mine is None:
+                self.devices[app_id] = HyperLogLog(self.precision, hll.registers.copy())
+            else:
+                mine.merge(hll)
+        candidates = list(set(self.top) | set(other.top))
+        estimates = self.cms.estimate_many([hash64(a.bytes) for a in candidates])
+        self.top = dict(zip(candidates, estimates.tolist()))
+        self.prune()
+        return self
+
+    def top_k(self, k: int) -> List[Tuple[UUID, int, int]]:
+        """(app_id, events, devices) of the ``k`` apps with the most events."""
+        return [
+            (
+                app_id,
+                events,
+                round(self.devices[app_id].count()) if app_id in self.devices else 0,
+            )
+            for app_id, events in heapq.nlargest(k, self.top.items(), key=itemgetter(1))
+        ]
+
+    def to_bytes(self) -> bytes:
+        self.prune()
+        apps = list(self.top)
+        empty = np.zeros(1 << self.precision, np.uint8)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            meta=np.array(
+                [self.capacity, self.cms.width, self.cms.depth, self.precision],
+                np.int64,
+            ),
+            cms=self.cms.table,
+            apps=np.frombuffer(b"".join(a.bytes for a in apps), np.uint8).reshape(
+                -1, 16
+            ),
+            events=np.array([self.top[a] for a in apps], np.int64),
+            devices=np.array(
+                [
+                    self.devices[a].registers if a in self.devices else empty
+                    for a in apps
+                ],
+                np.uint8,
+            ).reshape(-1, len(empty)),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "AppSketch":
+        with np.load(io.BytesIO(payload), allow_pickle=False) as arrays:
+            capacity, width, depth, precision = arrays["meta"].tolist()
+            sketch = cls(capacity, width, depth, precision)
+            sketch.cms.table = arrays["cms"]
+            for raw, events, registers in zip(
+                arrays["apps"], arrays["events"], arrays["devices"]
+            ):
+                app_id = UUID(bytes=raw.tobytes())
+                sketch.top[app_id] = int(events)
+                sketch.devices[app_id] = HyperLogLog(precision, registers)
+        return sketch
+
+
+def _merge_payloads(payloads: List[bytes]) -> Optional[AppSketch]:
+    merged = None
+    for payload in payloads:
+        sketch = AppSketch.from_bytes(payload)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
+
+
+class AppSketchTracker:
+    """Counts students' app events per school and day and folds them into
+    the stored sketches of the school, its district, its region and the
+    country.
+
+    Between flushes the counts are exact and small: one entry per app used
+    at a school that day, with the hashes of the devices using it. Sketches
+    are mergeable, so every process flushes its own counts.
+    """
+
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        # (school_id, day) -> app_id -> [events, device hashes]
+        self._pending: Dict[Tuple[UUID, date], Dict[UUID, list]] = {}
+        # user_device_id -> school_id, None for devices of non-students
+        self._schools: "OrderedDict[UUID, Optional[UUID]]" = OrderedDict()
+
+    async def _school_ids(
+        self, db: AsyncSession, device_ids: Set[UUID]
+    ) -> Dict[UUID, Optional[UUID]]:
+        missing = [d for d in device_ids if d not in self._schools]
+        if missing:
+            found = dict(
+                (
+                    await db.execute(
+                        select(UserDevice.id, StudentInfo.school_id)
+                        .join(StudentInfo, StudentInfo.user_id == UserDevice.user_id)
+                        .where(UserDevice.id.in_(missing))
+                    )
+                ).all()
+            )
+            for device in missing:
+                self._schools[device] = found.get(device)
+        schools = {}
+        for device in device_ids:
+            self._schools.move_to_end(device)
+            schools[device] = self._schools[device]
+        while len(self._schools) > self.cache_size:
+            self._schools.popitem(last=False)
+        return schools
+
+    async def observe(self, db: AsyncSession, events: Iterable[AppEvent]) -> None:
+        """Count ``events`` once the transaction storing them commits."""
+        events = list(events)
+        if not events:
+            return
+        schools = await self._school_ids(db, {e[0] for e in events})
+        staged = db.sync_session.info.setdefault(_PENDING, {}).setdefault(self, {})
+        for user_device_id, app_id, done_at, count in events:
+            school_id = schools[user_device_id]
+            if school_id is None:
+                continue
+            apps = staged.setdefault((school_id, done_at.date()), {})
+            entry = apps.setdefault(app_id, [0, set()])
+            entry[0] += count
+            entry[1].add(hash64(user_device_id.bytes))
+
+    def _add(self, pending) -> None:
+        for key, apps in pending.items():
+            mine = self._pending.setdefault(key, {})
+            for app_id, (count, devices) in apps.items():
+                entry = mine.setdefault(app_id, [0, set()])
+                entry[0] += count
+                entry[1] |= devices
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Merge the pending counts into the stored sketches; returns rows updated."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            return await self._flush(db, pending)
+        except BaseException:
+            self._add(pending)
+            raise
+
+    async def _flush(self, db: AsyncSession, pending) -> int:
+        parents = {
+            school_id: (district_id, region_id)
+            for school_id, district_id, region_id in await db.execute(
+                select(School.id, School.district_id, School.region_id).where(
+                    School.id.in_({school_id for school_id, _ in pending})
+                )
+            )
+        }
+        deltas: Dict[SketchKey, AppSketch] = {}
+        for (school_id, day), apps in pending.items():
+            if school_id not in parents:
+                continue
+            sketch = AppSketch.empty()
+            for app_id, (count, devices) in apps.items():
+                sketch.add(app_id, count, devices)
+            district_id, region_id = parents[school_id]
+            for key in (
+                (SCHOOL, school_id, day),
+                (DISTRICT, district_id, day),
+                (REGION, region_id, day),
+                (COUNTRY, COUNTRY_ID, day),
+            ):
+                deltas.setdefault(key, AppSketch.empty()).merge(sketch)
+        if not deltas:
+            return 0
+
+        keys = sorted(deltas)
+        await db.execute(
+            insert(AppUsageSketch)
+            .values([{"scope": s, "scope_id": i, "day": d} for s, i, d in keys])
+            .on_conflict_do_nothing()
+        )
+        # locking in key order keeps concurrent flushes from deadlocking
+        rows = (
+            await db.execute(
+                select(AppUsageSketch)
+                .where(
+                    tuple_(
+                        AppUsageSketch.scope,
+                        AppUsageSketch.scope_id,
+                        AppUsageSketch.day,
+                    ).in_(keys)
+                )
+                .order_by(
+                    AppUsageSketch.scope, AppUsageSketch.scope_id, AppUsageSketch.day
+                )
+                .with_for_update()
+            )
+        ).scalars()
+        for row in rows:
+            delta = deltas[(row.scope, row.scope_id, row.day)]
+            if row.payload is not None:
+                try:
+                    delta = AppSketch.from_bytes(row.payload).merge(delta)
+                except ValueError:
+                    # sketch sizes were reconfigured; start the day over
+                    logger.warning(
+                        "Replacing %s sketch of %s on %s",
+                        row.scope,
+                        row.scope_id,
+                        row.day,
+                    )
+            row.payload = delta.to_bytes()
+        await db.commit()
+        return len(keys)
+
+
+app_sketches = AppSketchTracker(config.SKETCH_DEVICE_CACHE_SIZE)
+
+
+@event.listens_for(Session, "after_commit")
+def _count_committed(session: Session) -> None:
+    for tracker, staged in session.info.pop(_PENDING, {}).items():
+        tracker._add(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+async def get_top_apps(
+    db: AsyncSession,
+    current_user: User,
+    scope: Optional[str],
+    scope_id: Optional[UUID],
+    start_date: date,
+    end_date: date,
+    k: int,
+) -> TopAppsResponse:
+    scope, scope_id = await resolve_scope(db, current_user, scope, scope_id)
+    if end_date < start_date:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "end_date must not be before start_date"
+        )
+    if (end_date - start_date).days >= config.SKETCH_MAX_QUERY_DAYS:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"At most {config.SKETCH_MAX_QUERY_DAYS} days can be queried",
+        )
+    payloads = list(
+        (
+            await db.execute(
+                select(AppUsageSketch.payload).where(
+                    AppUsageSketch.scope == scope,
+                    AppUsageSketch.scope_id == scope_id,
+                    AppUsageSketch.day >= start_date,
+                    AppUsageSketch.day <= end_date,
+                    AppUsageSketch.payload.is_not(None),
+                )
+            )
+        ).scalars()
+    )
+    merged = await asyncio.to_thread(_merge_payloads, payloads)
+    top = merged.top_k(k) if merged is not None else []
+    apps = {}
+    if top:
+        apps = {
+            app.id: app
+            for app in (
+                await db.execute(
+                    select(AppModel).where(AppModel.id.in_([t[0] for t in top]))
+                )
+            ).scalars()
+        }
+    return TopAppsResponse(
+        scope=scope,
+        scope_id=scope_id,
+        start_date=start_date,
+        end_date=end_date,
+        apps=[
+            TopAppEstimate(
+                app=AppInfo(
+                    id=app_id,
+                    name=apps[app_id].name,
+                    package_name=apps[app_id].package,
+                ),
+                events=events,
+                devices=devices,
+            )
+            for app_id, events, devices in top
+            if app_id in apps
+        ],
+    )
+
+
+class AppSketchFlusher(BackgroundWorker):
+    """Merges this process's app counts into the stored daily sketches."""
+
+    name = "app-sketch-flusher"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.SKETCH_FLUSH_INTERVAL
+
+    async def run_once(self) -> None:
+        async with AsyncSessionFactory() as db:
+            updated = await app_sketches.flush(db)
+        if updated:
+            logger.debug("Updated %d app usage sketches", updated)
+
+    async def on_stop(self) -> None:
+        await self.run_once()
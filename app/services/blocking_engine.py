@@ -0,0 +1,425 @@
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Set, Tuple
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.geo import haversine_m
+from app.core.workers import BackgroundWorker
+from app.enums.enums import AppRequestStatuses, Shifts
+from app.models import (
+    AppRequest,
+    Holiday,
+    Policy,
+    PolicyAssignment,
+    School,
+    SchoolSchedule,
+    StudentInfo,
+)
+from app.services.scopes import STUDENT
+
+logger = logging.getLogger(__name__)
+
+SCHOOL_WEEK = 0b0111111
+# rows of transactions still open when a poll starts are seen by the next one
+POLL_OVERLAP = timedelta(minutes=2)
+# (start, end) minutes since local midnight
+Window = Tuple[int, int]
+
+
+def parse_hours(value: str) -> Window:
+    """``"08:00-14:00"`` as minutes since midnight."""
+    start, end = (time.fromisoformat(part.strip()) for part in value.split("-"))
+    return start.hour * 60 + start.minute, end.hour * 60 + end.minute
+
+
+def hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@dataclass(frozen=True)
+class Decision:
+    blocking_active: bool
+    reason: str
+    is_holiday: bool = False
+    # None when there is no geofence or no location to check
+    in_school: Optional[bool] = None
+    # local time the current blocking window ends
+    until: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class BlockingEvaluator:
+    """Everything that decides one student's blocking, compiled once.
+
+    Answering is arithmetic on the fields; nothing touches the database.
+    Exceptions carry their own expiry, so they lapse without a rebuild.
+    """
+
+    user_id: UUID
+    school_id: UUID
+    school_name: str
+    shift: Optional[Shifts]
+    policy_id: Optional[UUID]
+    tz: ZoneInfo
+    # blocking windows per weekday, Monday first, sorted
+    windows: Tuple[Tuple[Window, ...], ...]
+    holidays: Mapping[date, str]
+    # latitude, longitude, radius in meters
+    geofence: Optional[Tuple[float, float, float]]
+    # app_id -> naive UTC expiry of an approved request
+    exceptions: Mapping[UUID, datetime]
+
+    def decide(
+        self, now: datetime, location: Optional[Tuple[float, float]] = None
+    ) -> Decision:
+        """``now`` is an aware datetime; ``location`` is (latitude, longitude)."""
+        if self.policy_id is None:
+            return Decision(False, "No blocking policy for this school")
+        local = now.astimezone(self.tz)
+        holiday = self.holidays.get(local.date())
+        if holiday is not None:
+            return Decision(False, f"Holiday: {holiday}", is_holiday=True)
+        minute = local.hour * 60 + local.minute
+        window = next(
+            (w for w in self.windows[local.weekday()] if w[0] <= minute < w[1]), None
+        )
+        if window is None:
+            return Decision(False, "Outside school hours")
+        in_school = None
+        if self.geofence is not None and location is not None:
+            lat, lon, radius = self.geofence
+            in_school = haversine_m(lat, lon, *location) <= radius
+            if not in_school:
+                return Decision(False, "Away from school", in_school=False)
+        return Decision(
+            True,
+            f"School hours ({hhmm(window[0])} - {hhmm(window[1])})",
+            in_school=in_school,
+            until=hhmm(window[1]),
+        )
+
+    def excepted(self, app_id: UUID, now: datetime) -> bool:
+        expires = self.exceptions.get(app_id)
+        return expires is not None and expires > now.astimezone(timezone.utc).replace(
+            tzinfo=None
+        )
+
+
+def compile_windows(
+    schedules: Iterable[Tuple[int, Window]],
+) -> Tuple[Tuple[Window, ...], ...]:
+    days = [[] for _ in range(7)]
+    for weekdays, window in schedules:
+        for day in range(7):
+            if weekdays & (1 << day):
+                days[day].append(window)
+    return tuple(tuple(sorted(windows)) for windows in days)
+
+
+def default_windows(shift: Optional[Shifts]) -> Tuple[Tuple[Window, ...], ...]:
+    hours = {
+        Shifts.MORNING: [config.BLOCKING_MORNING_HOURS],
+        Shifts.EVENING: [config.BLOCKING_EVENING_HOURS],
+    }.get(shift, [config.BLOCKING_MORNING_HOURS, config.BLOCKING_EVENING_HOURS])
+    return compile_windows((SCHOOL_WEEK, parse_hours(h)) for h in hours)
+
+
+async def school_windows(
+    db: AsyncSession, school_id: UUID, shift: Optional[Shifts]
+) -> Tuple[Tuple[Window, ...], ...]:
+    """The school's blocking windows for ``shift``, or the configured hours."""
+    schedules = (
+        await db.execute(
+            select(
+                SchoolSchedule.weekdays,
+                SchoolSchedule.starts_at,
+                SchoolSchedule.ends_at,
+            ).where(
+                SchoolSchedule.school_id == school_id,
+                or_(SchoolSchedule.shift.is_(None), SchoolSchedule.shift == shift),
+            )
+        )
+    ).all()
+    if not schedules:
+        return default_windows(shift)
+    return compile_windows(
+        (
+            weekdays,
+            (starts.hour * 60 + starts.minute, ends.hour * 60 + ends.minute),
+        )
+        for weekdays, starts, ends in schedules
+    )
+
+
+async def build_evaluator(
+    db: AsyncSession, user_id: UUID
+) -> Optional[BlockingEvaluator]:
+    row = (
+        await db.execute(
+            select(StudentInfo.shift, School)
+            .join(School, School.id == StudentInfo.school_id)
+            .where(StudentInfo.user_id == user_id)
+        )
+    ).first()
+    if row is None:
+        return None
+    shift, school = row
+    tz = ZoneInfo(config.BLOCKING_TIMEZONE)
+
+    windows = await school_windows(db, school.id, shift)
+
+    yesterday = datetime.now(tz).date() - timedelta(days=1)
+    holidays = dict(
+        (
+            await db.execute(
+                select(Holiday.day, Holiday.name).where(
+                    or_(Holiday.school_id.is_(None), Holiday.school_id == school.id),
+                    Holiday.day >= yesterday,
+                )
+            )
+        ).all()
+    )
+
+    lifetime = timedelta(minutes=config.BLOCKING_EXCEPTION_MINUTES)
+    approved = await db.execute(
+        select(AppRequest.app_id, func.max(AppRequest.modified_at))
+        .where(
+            AppRequest.from_user_id == user_id,
+            AppRequest.status == AppRequestStatuses.APPROVED,
+            AppRequest.modified_at >= func.localtimestamp() - lifetime,
+        )
+        .group_by(AppRequest.app_id)
+    )
+    exceptions = {app_id: approved_at + lifetime for app_id, approved_at in approved}
+
+    # a student's own policy overrides the school's inherited one
+    policy_id = await db.scalar(
+        select(PolicyAssignment.policy_id).where(
+            PolicyAssignment.scope == STUDENT, PolicyAssignment.scope_id == user_id
+        )
+    )
+
+    geofence = None
+    if school.latitude is not None and school.longitude is not None and school.radius:
+        geofence = (
+            float(school.latitude),
+            float(school.longitude),
+            float(school.radius),
+        )
+
+    return BlockingEvaluator(
+        user_id=user_id,
+        school_id=school.id,
+        school_name=school.name,
+        shift=shift,
+        policy_id=policy_id or school.effective_policy_id,
+        tz=tz,
+        windows=windows,
+        holidays=MappingProxyType(holidays),
+        geofence=geofence,
+        exceptions=MappingProxyType(exceptions),
+    )
+
+
+class BlockingEngine:
+    """Caches a compiled evaluator per student until one of its inputs changes.
+
+    Changes committed through this process invalidate right away (see the
+    session listeners below); changes from other processes are picked up by
+    ``poll`` from ``modified_at``. Deletions leave no row behind, so a drop
+    in any input table's row count clears the whole cache.
+    """
+
+    def __init__(self):
+        self._evaluators: Dict[UUID, BlockingEvaluator] = {}
+        # bumped by every invalidation, so a build racing one is not cached
+        self._generation = 0
+        self._since: Optional[datetime] = None
+        self._counts: Optional[Tuple[int, ...]] = None
+
+    def __len__(self) -> int:
+        return len(self._evaluators)
+
+    async def evaluator(
+        self, db: AsyncSession, user_id: UUID
+    ) -> Optional[BlockingEvaluator]:
+        evaluator = self._evaluators.get(user_id)
+        if evaluator is None:
+            generation = self._generation
+            evaluator = await build_evaluator(db, user_id)
+            if evaluator is not None and generation == self._generation:
+                self._evaluators[user_id] = evaluator
+        return evaluator
+
+    def invalidate(
+        self,
+        user_ids: Iterable[UUID] = (),
+        school_ids: Iterable[UUID] = (),
+        everyone: bool = False,
+    ) -> None:
+        self._generation += 1
+        if everyone:
+            self._evaluators.clear()
+            return
+        for user_id in user_ids:
+            self._evaluators.pop(user_id, None)
+        schools = set(school_ids)
+        if schools:
+            for user_id in [
+                u for u, e in self._evaluators.items() if e.school_id in schools
+            ]:
+                del self._evaluators[user_id]
+
+    async def poll(self, db: AsyncSession) -> None:
+        started = await db.scalar(select(func.localtimestamp()))
+        counts = tuple(
+            (
+                await db.execute(
+                    select(
+                        *(
+                            select(func.count()).select_from(model).scalar_subquery()
+                            for model in (
+                                SchoolSchedule,
+                                Holiday,
+                                AppRequest,
+                                PolicyAssignment,
+                            )
+                        )
+                    )
+                )
+            ).one()
+        )
+        since = self._since
+        if since is None or any(n < o for n, o in zip(counts, self._counts)):
+            self.invalidate(everyone=True)
+        else:
+            users, schools, everyone = await self._changed(db, since)
+            self.invalidate(users, schools, everyone)
+        self._counts = counts
+        self._since = started - POLL_OVERLAP
+
+    async def _changed(
+        self, db: AsyncSession, since: datetime
+    ) -> Tuple[Set[UUID], Set[UUID], bool]:
+        users = set(
+            (
+                await db.execute(
+                    select(StudentInfo.user_id)
+                    .where(StudentInfo.modified_at >= since)
+                    .union(
+                        select(AppRequest.from_user_id).where(
+                            AppRequest.modified_at >= since
+                        ),
+                        select(PolicyAssignment.scope_id).where(
+                            PolicyAssignment.scope == STUDENT,
+                            PolicyAssignment.modified_at >= since,
+                        ),
+                    )
+                )
+            ).scalars()
+        )
+        changed_policies = select(Policy.id).where(Policy.modified_at >= since)
+        schools = set(
+            (
+                await db.execute(
+                    select(School.id)
+                    .where(
+                        or_(
+                            School.modified_at >= since,
+                            School.effective_policy_id.in_(changed_policies),
+                        )
+                    )
+                    .union(
+                        select(SchoolSchedule.school_id).where(
+                            SchoolSchedule.modified_at >= since
+                        ),
+                        select(Holiday.school_id).where(Holiday.modified_at >= since),
+                    )
+                )
+            ).scalars()
+        )
+        # a country-wide holiday shows up as a None school
+        everyone = None in schools
+        schools.discard(None)
+        return users, schools, everyone
+
+
+blocking_engine = BlockingEngine()
+
+# session.info key for evaluators to drop once the transaction commits
+_STALE = "blocking_stale"
+
+
+def mark_stale(
+    session: Session,
+    user_ids: Iterable[UUID] = (),
+    school_ids: Iterable[UUID] = (),
+    everyone: bool = False,
+) -> None:
+    """Drop these evaluators once ``session`` commits."""
+    users, schools, all_users = session.info.setdefault(_STALE, (set(), set(), [False]))
+    users.update(user_ids)
+    schools.update(school_ids)
+    if everyone:
+        all_users[0] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_blocking_inputs(session, flush_context):
+    users, schools, everyone = set(), set(), False
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, StudentInfo):
+            users.add(obj.user_id)
+        elif isinstance(obj, AppRequest):
+            users.add(obj.from_user_id)
+        elif isinstance(obj, School):
+            schools.add(obj.id)
+        elif isinstance(obj, SchoolSchedule):
+            schools.add(obj.school_id)
+        elif isinstance(obj, Holiday):
+            if obj.school_id is None:
+                everyone = True
+            else:
+                schools.add(obj.school_id)
+        elif isinstance(obj, PolicyAssignment) and obj.scope == STUDENT:
+            users.add(obj.scope_id)
+        elif isinstance(obj, Policy):
+            # schools of a policy are not at hand here
+            everyone = True
+    mark_stale(session, users, schools, everyone)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_evaluators(session):
+    stale = session.info.pop(_STALE, None)
+    if stale is not None:
+        users, schools, everyone = stale
+        blocking_engine.invalidate(users, schools, everyone[0])
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_evaluators(session):
+    session.info.pop(_STALE, None)
+
+
+class BlockingInputsWatcher(BackgroundWorker):
+    """Drops cached evaluators whose inputs other processes changed."""
+
+    name = "blocking-inputs-watcher"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.BLOCKING_POLL_INTERVAL
+
+    async def run_once(self) -> None:
+        async with AsyncSessionFactory() as db:
+            await blocking_engine.poll(db)
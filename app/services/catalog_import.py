@@ -0,0 +1,292 @@
+"""Bulk loading of website blocklists and app catalogs.
+
+Files are parsed line by line, normalized and deduplicated in memory, then
+loaded a batch at a time with COPY into a temporary staging table and merged
+into ``websites`` or ``apps`` with ``INSERT ... ON CONFLICT``. Each batch is
+its own transaction, so an interrupted import can simply be run again.
+
+    python -m app.services.catalog_import websites blocklist.txt --type adult
+    python -m app.services.catalog_import apps catalog.csv
+"""
+
+import argparse
+import asyncio
+import codecs
+import csv
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.domains import normalize_domain
+from app.enums.enums import AppType, UserRole
+from app.models import User
+
+WEBSITES = "websites"
+APPS = "apps"
+
+# hosts files point blocked names at one of these
+_SINK_ADDRESSES = {"0.0.0.0", "127.0.0.1", "::", "::1"}
+_DOMAIN = re.compile(
+    r"^(?=.{1,253}$)(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?\.)+"
+    r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$"
+)
+_PACKAGE = re.compile(r"^[A-Za-z][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)+$")
+_APP_TYPES = {
+    **{t.name.lower(): t.name for t in AppType},
+    **{t.value.lower(): t.name for t in AppType},
+}
+
+_STAGING = {
+    WEBSITES: (
+        "website_import",
+        "CREATE TEMP TABLE IF NOT EXISTS website_import "
+        "(domain text, type text) ON COMMIT DELETE ROWS",
+        ["domain", "type"],
+    ),
+    APPS: (
+        "app_import",
+        "CREATE TEMP TABLE IF NOT EXISTS app_import "
+        "(package text, name text, type text) ON COMMIT DELETE ROWS",
+        ["package", "name", "type"],
+    ),
+}
+# xmax is zero only for rows this statement inserted
+_MERGE = {
+    WEBSITES: """
+        WITH merged AS (
+            INSERT INTO websites (id, domain, type, visit_count, created_at, modified_at)
+            SELECT gen_random_uuid(), domain, type, 0, now(), now()
+            FROM website_import
+            ON CONFLICT (domain) DO UPDATE
+            SET type = EXCLUDED.type, modified_at = now()
+            WHERE EXCLUDED.type IS NOT NULL
+                AND websites.type IS DISTINCT FROM EXCLUDED.type
+            RETURNING xmax = 0 AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+        FROM merged
+    """,
+    APPS: """
+        WITH merged AS (
+            INSERT INTO apps (id, name, package, type, install_count,
+                              created_at, modified_at)
+            SELECT gen_random_uuid(), name, package, type::app_type, 0, now(), now()
+            FROM app_import
+            ON CONFLICT (package) DO UPDATE
+            SET name = EXCLUDED.name,
+                type = coalesce(EXCLUDED.type, apps.type),
+                modified_at = now()
+            WHERE apps.name IS DISTINCT FROM EXCLUDED.name
+                OR (EXCLUDED.type IS NOT NULL AND apps.type IS DISTINCT FROM EXCLUDED.type)
+            RETURNING xmax = 0 AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+        FROM merged
+    """,
+}
+
+
+@dataclass
+class ImportStats:
+    kind: str
+    lines: int = 0
+    rows: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    updated: int = 0
+    seconds: float = 0.0
+    done: bool = False
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "rows_per_second": round(self.rows_per_second)}
+
+
+def parse_domain(line: str) -> Optional[str]:
+    """The domain of a plain, hosts-file or adblock-style blocklist line."""
+    line = line.split("#", 1)[0].strip()
+    if not line or line[0] in "![":
+        return None
+    if line.startswith("||"):
+        line = line[2:].split("^", 1)[0]
+    else:
+        parts = line.split()
+        line = parts[1] if len(parts) > 1 and parts[0] in _SINK_ADDRESSES else parts[0]
+    if "://" in line:
+        line = urlsplit(line).hostname or ""
+    domain = normalize_domain(line)
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode()
+        except UnicodeError:
+            return None
+    return domain if _DOMAIN.match(domain) else None
+
+
+def parse_app(row: List[str]) -> Optional[Tuple[str, str, Optional[str]]]:
+    """(package, name, type name) of a ``package,name[,type]`` catalog row."""
+    if len(row) < 2:
+        return None
+    package, name = row[0].strip(), row[1].strip()
+    if not _PACKAGE.match(package) or not name:
+        return None
+    app_type = _APP_TYPES.get(row[2].strip().lower()) if len(row) > 2 else None
+    return package, name, app_type
+
+
+def normalize_rows(
+    kind: str,
+    lines: Iterable[str],
+    seen: Set[str],
+    stats: ImportStats,
+    website_type: Optional[str] = None,
+) -> List[tuple]:
+    """Staging rows for ``lines``, skipping anything already in ``seen``."""
+    rows = []
+    if kind == WEBSITES:
+        for line in lines:
+            stats.lines += 1
+            domain = parse_domain(line)
+            if domain is None:
+                # blank and comment lines are not counted as invalid
+                if line.split("#", 1)[0].strip():
+                    stats.invalid += 1
+            elif domain in seen:
+                stats.duplicates += 1
+            else:
+                seen.add(domain)
+                rows.append((domain, website_type))
+        return rows
+    for row in csv.reader(lines):
+        stats.lines += 1
+        if not row or (stats.lines == 1 and row[0].strip().lower() == "package"):
+            continue
+        app = parse_app(row)
+        if app is None:
+            stats.invalid += 1
+        elif app[0] in seen:
+            stats.duplicates += 1
+        else:
+            seen.add(app[0])
+            rows.append(app)
+    return rows
+
+
+async def iter_lines(
+    read: Callable[[int], Awaitable[bytes]], chunk_size: int = 1 << 20
+) -> AsyncIterator[str]:
+    """Decoded lines of a byte stream read a chunk at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    while True:
+        chunk = await read(chunk_size)
+        decoded = tail + decoder.decode(chunk, final=not chunk)
+        lines = decoded.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+        if not chunk:
+            break
+    if tail:
+        yield tail
+
+
+async def _load(db: AsyncSession, kind: str, rows: List[tuple]) -> Tuple[int, int]:
+    table, create, columns = _STAGING[kind]
+    connection = await db.connection()
+    await connection.execute(text(create))
+    raw = (await connection.get_raw_connection()).driver_connection
+    await raw.copy_records_to_table(table, records=rows, columns=columns)
+    inserted, updated = (await connection.execute(text(_MERGE[kind]))).one()
+    await db.commit()
+    return inserted, updated
+
+
+async def run_import(
+    kind: str, lines: AsyncIterator[str], website_type: Optional[str] = None
+) -> AsyncIterator[ImportStats]:
+    """Imports ``lines``, yielding the running totals after every batch."""
+    stats = ImportStats(kind)
+    seen: Set[str] = set()
+    started = time.perf_counter()
+    pending: List[str] = []
+
+    async def flush(db: AsyncSession) -> None:
+        rows = normalize_rows(kind, pending, seen, stats, website_type)
+        pending.clear()
+        if rows:
+            inserted, updated = await _load(db, kind, rows)
+            stats.rows += len(rows)
+            stats.inserted += inserted
+            stats.updated += updated
+        stats.seconds = time.perf_counter() - started
+
+    async with AsyncSessionFactory() as db:
+        async for line in lines:
+            pending.append(line)
+            if len(pending) >= config.IMPORT_BATCH_SIZE:
+                await flush(db)
+                yield stats
+        await flush(db)
+    stats.done = True
+    yield stats
+
+
+def check_import_access(current_user: User) -> None:
+    if current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Only admins can import")
+
+
+async def _file_lines(path: str) -> AsyncIterator[str]:
+    with open(path, "rb") as f:
+
+        async def read(size: int) -> bytes:
+            return await asyncio.to_thread(f.read, size)
+
+        async for line in iter_lines(read):
+            yield line
+
+
+async def _cli(kind: str, path: str, website_type: Optional[str]) -> None:
+    async for stats in run_import(kind, _file_lines(path), website_type):
+        print(
+            f"{stats.lines} lines, {stats.rows} rows "
+            f"({stats.inserted} new, {stats.updated} updated, "
+            f"{stats.duplicates} duplicates, {stats.invalid} invalid), "
+            f"{stats.rows_per_second:.0f} rows/s",
+            flush=True,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=[WEBSITES, APPS])
+    parser.add_argument("path")
+    parser.add_argument("--type", help="category for every imported website")
+    args = parser.parse_args()
+    asyncio.run(_cli(args.kind, args.path, args.type))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.aho_corasick import Automaton
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.enums.enums import ActionDegrees, RuleKinds
+from app.models import ClassificationRule
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+DEGREE_RANK = {
+    ActionDegrees.NEUTRAL: 0,
+    ActionDegrees.SUSPICIOUS: 1,
+    ActionDegrees.TERRIBLE: 2,
+}
+
+# details keys holding a host or URL, and an app package name
+HOST_KEYS = frozenset({"url", "domain", "host"})
+PACKAGE_KEYS = frozenset({"package", "package_name"})
+
+Match = Tuple[UUID, ActionDegrees]
+
+# shorter required literals hit too often to be worth a prefilter
+MIN_REGEX_LITERAL = 3
+
+
+def max_degree(*degrees: Optional[ActionDegrees]) -> Optional[ActionDegrees]:
+    present = [d for d in degrees if d is not None]
+    return max(present, key=DEGREE_RANK.__getitem__) if present else None
+
+
+def normalize_host(value: str) -> Optional[str]:
+    value = value.strip().lower()
+    if "//" not in value:
+        value = "//" + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    return host.rstrip(".") if host else None
+
+
+def normalize_package(value: str) -> str:
+    return value.strip().lower().removesuffix(".*")
+
+
+def rule_regex(pattern: str, name: str = "r0") -> str:
+    """A regex rule as it is embedded in the joined alternation."""
+    return f"(?P<{name}>{pattern})"
+
+
+def required_literal(pattern: str) -> str:
+    """Longest literal every match of ``pattern`` contains, lowercased.
+
+    Only runs of plain characters at the top level of the pattern count, so
+    the result is empty for anything inside groups, alternations or repeats.
+    """
+    best = run = ""
+    for op, arg in sre_parse.parse(pattern).data:
+        if op is sre_parse.LITERAL:
+            run += chr(arg)
+            if len(run) > len(best):
+                best = run
+        else:
+            run = ""
+    return best.lower()
+
+
+class _Guarded:
+    """A regex rule run only when the automaton sees its required literal."""
+
+    __slots__ = ("regex", "match")
+
+    def __init__(self, regex: "re.Pattern[str]", match: Match):
+        self.regex = regex
+        self.match = match
+
+
+class Classification:
+    __slots__ = ("degree", "rule_ids")
+
+    def __init__(self, degree: Optional[ActionDegrees], rule_ids: FrozenSet[UUID]):
+        self.degree = degree
+        self.rule_ids = rule_ids
+
+
+NO_MATCH = Classification(None, frozenset())
+
+
+class RuleSet:
+    """Classification rules compiled for matching; never modified once built.
+
+    Keywords go into one Aho-Corasick automaton, domains and packages into
+    dicts probed by host suffix and dotted package prefix. A regex with a
+    required literal is added to the automaton under that literal and only
+    run when it shows up; the rest are joined into a single alternation,
+    where overlapping matches are reported once, for the leftmost rule.
+    """
+
+    def __init__(self, rules: Iterable[Tuple[UUID, RuleKinds, str, ActionDegrees]]):
+        keywords: List[Tuple[str, Union[Match, _Guarded]]] = []
+        regexes: List[Tuple[str, Match]] = []
+        self.domains: Dict[str, List[Match]] = {}
+        self.packages: Dict[str, List[Match]] = {}
+        self.size = 0
+
+        for rule_id, kind, pattern, degree in rules:
+            match = (rule_id, degree)
+            if kind == RuleKinds.KEYWORD:
+                keywords.append((pattern.lower(), match))
+            elif kind == RuleKinds.DOMAIN:
+                host = normalize_host(pattern)
+                if host is None:
+                    continue
+                self.domains.setdefault(host, []).append(match)
+            elif kind == RuleKinds.PACKAGE:
+                self.packages.setdefault(normalize_package(pattern), []).append(match)
+            elif kind == RuleKinds.REGEX:
+                # compiled as embedded, so inline global flags are caught here
+                # rather than breaking the alternation of every rule
+                try:
+                    regex = re.compile(rule_regex(pattern), re.IGNORECASE)
+                except re.error:
+                    logger.warning("Skipping invalid classification regex %r", pattern)
+                    continue
+                literal = required_literal(pattern)
+                if len(literal) >= MIN_REGEX_LITERAL:
+                    keywords.append((literal, _Guarded(regex, match)))
+                else:
+                    regexes.append((pattern, match))
+            self.size += 1
+
+        self.keywords = Automaton(keywords)
+        self.regex = None
+        self._regex_matches: Dict[str, Match] = {}
+        if regexes:
+            self.regex = re.compile(
+                "|".join(
+                    rule_regex(pattern, f"r{i}")
+                    for i, (pattern, _) in enumerate(regexes)
+                ),
+                re.IGNORECASE,
+            )
+            self._regex_matches = {f"r{i}": m for i, (_, m) in enumerate(regexes)}
+
+    def _collect(
+        self, value: Any, key: Optional[str], texts: List[str], hosts, packages
+    ) -> None:
+        if isinstance(value, str):
+            texts.append(value)
+            if key in HOST_KEYS or "://" in value:
+                hosts.append(value)
+            if key in PACKAGE_KEYS:
+                packages.append(value)
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                self._collect(v, k, texts, hosts, packages)
+        elif isinstance(value, list):
+            for v in value:
+                self._collect(v, key, texts, hosts, packages)
+
+    def classify(
+        self, details: Optional[Dict[str, Any]], package: Optional[str] = None
+    ) -> Classification:
+        if not self.size or (not details and not package):
+            return NO_MATCH
+        texts: List[str] = []
+        hosts: List[str] = []
+        packages: List[str] = [package] if package else []
+        if details:
+            self._collect(details, None, texts, hosts, packages)
+
+        matches = set()
+        if texts:
+            text = "\n".join(texts)
+            for hit in self.keywords.search(text.lower()):
+                if type(hit) is _Guarded:
+                    if hit.regex.search(text):
+                        matches.add(hit.match)
+                else:
+                    matches.add(hit)
+            if self.regex is not None:
+                matches.update(
+                    self._regex_matches[m.lastgroup] for m in self.regex.finditer(text)
+                )
+        if self.domains:
+            for value in hosts:
+                host = normalize_host(value)
+                if host is None:
+                    continue
+                labels = host.split(".")
+                for i in range(len(labels)):
+                    matches.update(self.domains.get(".".join(labels[i:]), ()))
+        if self.packages:
+            for value in packages:
+                parts = normalize_package(value).split(".")
+                for i in range(len(parts), 0, -1):
+                    matches.update(self.packages.get(".".join(parts[:i]), ()))
+
+        if not matches:
+            return NO_MATCH
+        return Classification(
+            max_degree(*(degree for _, degree in matches)),
+            frozenset(rule_id for rule_id, _ in matches),
+        )
+
+
+class Classifier:
+    """Holds the current ``RuleSet`` and swaps it when the rules change."""
+
+    def __init__(self):
+        self.rules = RuleSet([])
+        self._fingerprint = None
+
+    def classify(
+        self, details: Optional[Dict[str, Any]], package: Optional[str] = None
+    ) -> Classification:
+        return self.rules.classify(details, package)
+
+    async def reload(self, db: AsyncSession, force: bool = False) -> bool:
+        # inserts and updates move max(modified_at), deletes the count
+        fingerprint = tuple(
+            (
+                await db.execute(
+                    select(
+                        func.count(ClassificationRule.id),
+                        func.max(ClassificationRule.modified_at),
+                    )
+                )
+            ).one()
+        )
+        if not force and fingerprint == self._fingerprint:
+            return False
+        rows = (
+            await db.execute(
+                select(
+                    ClassificationRule.id,
+                    ClassificationRule.kind,
+                    ClassificationRule.pattern,
+                    ClassificationRule.degree,
+                ).where(ClassificationRule.is_active.is_(True))
+            )
+        ).all()
+        # compiled off the event loop; readers keep the old set until the swap
+        self.rules = await asyncio.to_thread(RuleSet, rows)
+        self._fingerprint = fingerprint
+        logger.info("Loaded %d classification rules", self.rules.size)
+        return True
+
+
+classifier = Classifier()
+
+
+class RuleReloader(BackgroundWorker):
+    """Polls the rules table and recompiles the classifier when it changes."""
+
+    name = "classifier-reloader"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.CLASSIFIER_RELOAD_INTERVAL
+
+    async def run_once(self) -> None:
+        async with AsyncSessionFactory() as db:
+            await classifier.reload(db)
@@ -0,0 +1,107 @@
+import logging
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.models import District, Region, School, SchoolCompliance, User
+from app.schemas._analytics import ComplianceEntry, CompliancePage
+from app.services.scopes import COUNTRY, DISTRICT, REGION, SCHOOL, caller_scope
+
+logger = logging.getLogger(__name__)
+
+# arbitrary, shared by every process refreshing the view
+REFRESH_LOCK = 0x7C0A_11CE
+
+METRICS = (
+    "students",
+    "devices",
+    "active_devices",
+    "setup_complete",
+    "setup_missing",
+    "suspicious_events",
+    "terrible_events",
+)
+# coarser levels include the finer ones
+LEVELS = (SCHOOL, DISTRICT, REGION, COUNTRY)
+_KEYS = {
+    SCHOOL: (SchoolCompliance.c.school_id, School),
+    DISTRICT: (SchoolCompliance.c.district_id, District),
+    REGION: (SchoolCompliance.c.region_id, Region),
+}
+
+
+def compliance_query(level: str, own: str, own_id: UUID) -> Select:
+    """Totals per school, district or region within the caller's scope."""
+    if LEVELS.index(level) > LEVELS.index(own):
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, f"Totals per {level} are outside of your scope"
+        )
+    key, named = _KEYS[level]
+    stmt = (
+        select(
+            key.label("id"),
+            named.name,
+            *(func.sum(SchoolCompliance.c[m]).label(m) for m in METRICS),
+            func.max(SchoolCompliance.c.refreshed_at).label("refreshed_at"),
+        )
+        .join(named, named.id == key)
+        .group_by(key, named.name)
+    )
+    if own != COUNTRY:
+        stmt = stmt.where(_KEYS[own][0] == own_id)
+    return stmt
+
+
+async def get_compliance(
+    db: AsyncSession, current_user: User, level: str, limit: int, offset: int
+) -> CompliancePage:
+    own, own_id = await caller_scope(db, current_user)
+    stmt = compliance_query(level, own, own_id)
+    total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+    rows = (
+        await db.execute(
+            stmt.order_by(stmt.selected_columns["name"], stmt.selected_columns["id"])
+            .limit(limit)
+            .offset(offset)
+        )
+    ).all()
+    return CompliancePage(
+        level=level,
+        total=total,
+        refreshed_at=max((r.refreshed_at for r in rows), default=None),
+        items=[
+            ComplianceEntry(
+                id=r.id, name=r.name, **{m: int(getattr(r, m)) for m in METRICS}
+            )
+            for r in rows
+        ],
+    )
+
+
+async def refresh_compliance(db: AsyncSession) -> bool:
+    """Refresh the view unless another process is at it; readers are not blocked."""
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK))):
+        return False
+    await db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY school_compliance"))
+    await db.commit()
+    return True
+
+
+class ComplianceRefresher(BackgroundWorker):
+    """Recomputes the school compliance view on a schedule."""
+
+    name = "compliance-refresher"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.COMPLIANCE_REFRESH_INTERVAL
+
+    async def run_once(self) -> None:
+        async with AsyncSessionFactory() as db:
+            if await refresh_compliance(db):
+                logger.debug("Refreshed school compliance")
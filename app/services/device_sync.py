@@ -0,0 +1,207 @@
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import NAMESPACE_OID, UUID, uuid5
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.models import DeviceSyncState
+
+logger = logging.getLogger(__name__)
+
+# user_device_id -> last sequence number known to be committed, per worker
+# process. Other workers advance the marks too, so a cached value is only a
+# lower bound: a gap against it is re-checked in the database.
+_high_water: "OrderedDict[UUID, int]" = OrderedDict()
+# user_device_id -> last sequence number spooled by this process while the
+# database was unavailable. Replay may still drop those records, so this is
+# only a hint for the spool path and is forgotten once the database answers.
+_spooled: "OrderedDict[UUID, int]" = OrderedDict()
+
+_PENDING = "pending_high_water"
+
+
+def event_id_for(user_device_id: UUID, seq: int) -> UUID:
+    """Deterministic event id, so a resent (device, seq) maps to the same row."""
+    return uuid5(NAMESPACE_OID, f"{user_device_id}:{seq}")
+
+
+def _put(cache: "OrderedDict[UUID, int]", user_device_id: UUID, seq: int) -> None:
+    cache[user_device_id] = seq
+    cache.move_to_end(user_device_id)
+    while len(cache) > config.DEVICE_SYNC_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def _remember(user_device_id: UUID, seq: int) -> None:
+    _put(_high_water, user_device_id, max(seq, _high_water.get(user_device_id, 0)))
+
+
+def _remember_on_commit(db: AsyncSession, user_device_id: UUID, seq: int) -> None:
+    pending = db.sync_session.info.setdefault(_PENDING, {})
+    pending[user_device_id] = max(seq, pending.get(user_device_id, 0))
+
+
+def cached_high_water(user_device_id: UUID) -> Optional[int]:
+    """The last number this process saw committed or spooled for the device."""
+    marks = [
+        mark
+        for mark in (_high_water.get(user_device_id), _spooled.get(user_device_id))
+        if mark is not None
+    ]
+    return max(marks) if marks else None
+
+
+def check_sequence(hwm: int, seq: int) -> bool:
+    """``True`` for the next expected event, ``False`` for a duplicate.
+
+    Anything past ``hwm + 1`` is a gap and is rejected so the device resends
+    from the first unacknowledged event.
+    """
+    if seq == hwm + 1:
+        return True
+    if seq <= hwm:
+        return False
+    raise HTTPException(
+        status.HTTP_409_CONFLICT,
+        f"Sequence gap: expected {hwm + 1}, got {seq}",
+    )
+
+
+def note_spooled(user_device_id: UUID, seq: int) -> None:
+    if cached_high_water(user_device_id) == seq - 1:
+        _put(_spooled, user_device_id, seq)
+
+
+def forget_spooled(user_device_ids: Iterable[UUID]) -> None:
+    for user_device_id in user_device_ids:
+        _spooled.pop(user_device_id, None)
+
+
+async def get_high_water(
+    db: AsyncSession, user_device_id: UUID, refresh: bool = False
+) -> int:
+    hwm = None if refresh else _high_water.get(user_device_id)
+    if hwm is None:
+        hwm = (
+            await db.scalar(
+                select(DeviceSyncState.last_seq).where(
+                    DeviceSyncState.user_device_id == user_device_id
+                )
+            )
+        ) or 0
+        # the stored mark wins, also over a cached value that ran ahead of it
+        _put(_high_water, user_device_id, hwm)
+    return hwm
+
+
+async def accepts(db: AsyncSession, user_device_id: UUID, seq: int) -> bool:
+    """``check_sequence`` against the cached mark, confirming gaps in the DB."""
+    forget_spooled([user_device_id])
+    hwm = await get_high_water(db, user_device_id)
+    if seq > hwm + 1:
+        hwm = await get_high_water(db, user_device_id, refresh=True)
+    return check_sequence(hwm, seq)
+
+
+async def advance(db: AsyncSession, user_device_id: UUID, seq: int) -> bool:
+    """Move the high-water mark from ``seq - 1`` to ``seq``.
+
+    The update is conditional on the stored value, so concurrent workers
+    cannot both accept the same sequence number; on a lost race ``False`` is
+    returned. The cache follows once the transaction commits.
+    """
+    result = await db.execute(
+        update(DeviceSyncState)
+        .where(
+            DeviceSyncState.user_device_id == user_device_id,
+            DeviceSyncState.last_seq == seq - 1,
+        )
+        .values(last_seq=seq, modified_at=func.now())
+    )
+    if result.rowcount == 0 and seq == 1:
+        result = await db.execute(
+            insert(DeviceSyncState)
+            .values(user_device_id=user_device_id, last_seq=seq)
+            .on_conflict_do_nothing(index_elements=[DeviceSyncState.user_device_id])
+        )
+    if result.rowcount == 0:
+        return False
+    _remember_on_commit(db, user_device_id, seq)
+    return True
+
+
+def contiguous(hwm: int, seqs: Iterable[int]) -> int:
+    """The mark after accepting ``seqs`` in order; stops at the first gap."""
+    for seq in sorted(set(seqs)):
+        if seq > hwm + 1:
+            break
+        hwm = max(hwm, seq)
+    return hwm
+
+
+async def advance_many(db: AsyncSession, marks: Iterable[Tuple[UUID, int]]) -> None:
+    """Advance high-water marks in bulk (spool replay).
+
+    A mark only moves through consecutive sequence numbers, so an event lost
+    before it reached the spool keeps the device resending from there.
+    """
+    seqs: Dict[UUID, List[int]] = defaultdict(list)
+    for user_device_id, seq in marks:
+        seqs[user_device_id].append(seq)
+    if not seqs:
+        return
+    stored = dict(
+        (
+            await db.execute(
+                select(DeviceSyncState.user_device_id, DeviceSyncState.last_seq)
+                .where(DeviceSyncState.user_device_id.in_(list(seqs)))
+                .with_for_update()
+            )
+        ).all()
+    )
+    latest = {}
+    for user_device_id, device_seqs in seqs.items():
+        hwm = stored.get(user_device_id, 0)
+        new = contiguous(hwm, device_seqs)
+        if new < max(device_seqs):
+            logger.warning(
+                "Spooled sequence gap for device %s after %d", user_device_id, new
+            )
+        if new > hwm:
+            latest[user_device_id] = new
+    if not latest:
+        return
+    stmt = insert(DeviceSyncState).values(
+        [{"user_device_id": k, "last_seq": v} for k, v in latest.items()]
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[DeviceSyncState.user_device_id],
+            set_={
+                # a row created meanwhile was not locked above
+                "last_seq": func.greatest(
+                    DeviceSyncState.last_seq, stmt.excluded.last_seq
+                ),
+                "modified_at": func.now(),
+            },
+        )
+    )
+    for user_device_id, seq in latest.items():
+        _remember_on_commit(db, user_device_id, seq)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session: Session) -> None:
+    for user_device_id, seq in session.info.pop(_PENDING, {}).items():
+        _remember(user_device_id, seq)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,277 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, or_, select, true, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.enums.enums import ActionDegrees, Languages, UserRole
+from app.models import (
+    DigestRun,
+    LogRollup,
+    StudentInfo,
+    User,
+    UserDevice,
+    UserPreference,
+)
+from app.services.notifications import Message, Recipient, alert_fanout
+
+logger = logging.getLogger(__name__)
+
+DIGEST = "digest"
+
+DIGEST_TEMPLATES = {
+    Languages.UZB_LAT: {
+        "hour": "So'nggi soat",
+        "day": "So'nggi kun",
+        "line": "{student}: {suspicious} ta shubhali, {terrible} ta xavfli, "
+        "{neutral} ta oddiy harakat",
+    },
+    Languages.UZB_CYR: {
+        "hour": "Сўнгги соат",
+        "day": "Сўнгги кун",
+        "line": "{student}: {suspicious} та шубҳали, {terrible} та хавфли, "
+        "{neutral} та оддий ҳаракат",
+    },
+    Languages.RUSSIAN: {
+        "hour": "За последний час",
+        "day": "За последний день",
+        "line": "{student}: подозрительных {suspicious}, опасных {terrible}, "
+        "обычных {neutral}",
+    },
+    Languages.ENGLISH: {
+        "hour": "Last hour",
+        "day": "Last day",
+        "line": "{student}: {suspicious} suspicious, {terrible} dangerous, "
+        "{neutral} regular actions",
+    },
+}
+
+Counts = Dict[ActionDegrees, int]
+
+
+def digest_period(
+    now: datetime, period: str, tz: ZoneInfo
+) -> Tuple[datetime, datetime]:
+    """The last complete period before ``now``, as naive UTC bounds.
+
+    Days start at midnight in ``tz``; ``now`` is naive UTC like the logs.
+    """
+    if period == "hour":
+        end = now.replace(minute=0, second=0, microsecond=0)
+        return end - timedelta(hours=1), end
+    local = now.replace(tzinfo=timezone.utc).astimezone(tz)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def utc(value: datetime) -> datetime:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return utc(midnight - timedelta(days=1)), utc(midnight)
+
+
+def render_digest(
+    language: Optional[Languages],
+    period: str,
+    children: Sequence[Tuple[Optional[str], Counts]],
+) -> str:
+    templates = DIGEST_TEMPLATES.get(language, DIGEST_TEMPLATES[Languages.UZB_LAT])
+    lines = [
+        templates["line"].format(
+            student=name or "",
+            neutral=counts.get(ActionDegrees.NEUTRAL, 0),
+            suspicious=counts.get(ActionDegrees.SUSPICIOUS, 0),
+            terrible=counts.get(ActionDegrees.TERRIBLE, 0),
+        )
+        for name, counts in children
+    ]
+    return f"{templates[period]}. " + "; ".join(lines)
+
+
+async def _digest_batch(
+    db: AsyncSession, run: DigestRun, cursor: Optional[UUID]
+) -> Tuple[Optional[UUID], List[Message]]:
+    """Messages for the next page of parents after ``cursor``, and its last id."""
+    stmt = (
+        select(User.id, User.phone_number, UserPreference.language)
+        .outerjoin(UserPreference, UserPreference.user_id == User.id)
+        .where(
+            User.user_role_name == UserRole.PARENT.value,
+            func.coalesce(UserPreference.notifications_enabled, true()),
+        )
+        .order_by(User.id)
+        .limit(config.DIGEST_BATCH)
+    )
+    if cursor is not None:
+        stmt = stmt.where(User.id > cursor)
+    parents: Dict[UUID, Recipient] = {}
+    for user_id, phone_number, language in await db.execute(stmt):
+        parents.setdefault(user_id, Recipient(user_id, phone_number, language, None))
+    if not parents:
+        return None, []
+
+    ids = list(parents)
+    children = (
+        await db.execute(
+            select(
+                StudentInfo.user_id,
+                StudentInfo.first_name,
+                StudentInfo.father_id,
+                StudentInfo.mother_id,
+            ).where(or_(StudentInfo.father_id.in_(ids), StudentInfo.mother_id.in_(ids)))
+        )
+    ).all()
+    counts: Dict[UUID, Counts] = defaultdict(dict)
+    if children:
+        rows = await db.execute(
+            select(UserDevice.user_id, LogRollup.degree, func.sum(LogRollup.events))
+            .join(UserDevice, UserDevice.id == LogRollup.user_device_id)
+            .where(
+                UserDevice.user_id.in_({c.user_id for c in children}),
+                LogRollup.hour >= run.period_start,
+                LogRollup.hour < run.period_end,
+            )
+            .group_by(UserDevice.user_id, LogRollup.degree)
+        )
+        for student_id, degree, events in rows:
+            counts[student_id][degree] = int(events)
+
+    per_parent: Dict[UUID, List[Tuple[Optional[str], Counts]]] = defaultdict(list)
+    for child in children:
+        if child.user_id not in counts:
+            continue
+        for parent_id in {child.father_id, child.mother_id}:
+            if parent_id in parents:
+                per_parent[parent_id].append((child.first_name, counts[child.user_id]))
+
+    messages = [
+        Message(
+            parents[parent_id],
+            DIGEST,
+            render_digest(parents[parent_id].language, run.period, lines),
+            {
+                "period": run.period,
+                "period_start": run.period_start.isoformat(),
+                "period_end": run.period_end.isoformat(),
+            },
+        )
+        for parent_id, lines in per_parent.items()
+    ]
+    return ids[-1], messages
+
+
+async def claim_run(db: AsyncSession) -> Optional[DigestRun]:
+    """Take an unfinished run whose lease is free, oldest first."""
+    run = (
+        (
+            await db.execute(
+                select(DigestRun)
+                .where(
+                    DigestRun.finished_at.is_(None),
+                    or_(
+                        DigestRun.locked_until.is_(None),
+                        DigestRun.locked_until < func.localtimestamp(),
+                    ),
+                )
+                .order_by(DigestRun.period_start)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+        )
+        .scalars()
+        .first()
+    )
+    if run is not None:
+        await _extend_lease(db, run)
+        await db.commit()
+    return run
+
+
+async def _extend_lease(db: AsyncSession, run: DigestRun, **values) -> None:
+    await db.execute(
+        update(DigestRun)
+        .where(DigestRun.id == run.id)
+        .values(
+            locked_until=func.localtimestamp()
+            + timedelta(seconds=config.DIGEST_LEASE_SECONDS),
+            **values,
+        )
+    )
+
+
+async def send_digest(db: AsyncSession, run: DigestRun) -> int:
+    """Send ``run`` page by page; each page commits its messages and the cursor.
+
+    A run interrupted midway is picked up from its cursor once the lease
+    expires, so nobody gets the same digest twice.
+    """
+    cursor, sent = run.cursor, run.sent
+    channels = alert_fanout.channels
+    while True:
+        last, messages = await _digest_batch(db, run, cursor)
+        if last is None:
+            break
+        if messages:
+            for channel in channels:
+                if channel.uses_db:
+                    await channel.deliver(db, messages)
+        sent += len(messages)
+        await _extend_lease(db, run, cursor=last, sent=sent)
+        await db.commit()
+        if messages:
+            for channel in channels:
+                if not channel.uses_db:
+                    try:
+                        await channel.deliver(None, messages)
+                    except Exception:
+                        logger.error("Channel %s failed", channel.name, exc_info=True)
+        cursor = last
+    await db.execute(
+        update(DigestRun)
+        .where(DigestRun.id == run.id)
+        .values(finished_at=func.localtimestamp())
+    )
+    await db.commit()
+    logger.info(
+        "Sent %d %s digests for %s", sent, run.period, run.period_start.isoformat()
+    )
+    return sent
+
+
+class DigestScheduler(BackgroundWorker):
+    """Opens a digest run per completed period and sends unfinished runs."""
+
+    name = "digest-scheduler"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.DIGEST_INTERVAL
+        self.tz = ZoneInfo(config.DIGEST_TIMEZONE)
+
+    async def run_once(self) -> None:
+        now = datetime.utcnow()
+        start, end = digest_period(now, config.DIGEST_PERIOD, self.tz)
+        async with AsyncSessionFactory() as db:
+            # rollups for the period have to be complete first
+            if now >= end + timedelta(seconds=config.DIGEST_DELAY_SECONDS):
+                await db.execute(
+                    insert(DigestRun)
+                    .values(
+                        period=config.DIGEST_PERIOD,
+                        period_start=start,
+                        period_end=end,
+                    )
+                    .on_conflict_do_nothing(
+                        index_elements=[DigestRun.period, DigestRun.period_start]
+                    )
+                )
+                await db.commit()
+            run = await claim_run(db)
+            if run is not None:
+                await send_digest(db, run)
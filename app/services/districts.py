@@ -0,0 +1,133 @@
+import logging
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.core.geo import NearestIndex, parse_coordinate
+from app.models import District, Region
+
+logger = logging.getLogger(__name__)
+
+# (district_id, region_id); the district is None for a region's own centroid
+Area = Tuple[Optional[UUID], UUID]
+
+
+class DistrictLocator:
+    """Resolves coordinates to the district and region they fall in.
+
+    Each location goes to the nearest district centroid, which splits the
+    map into the centroids' Voronoi cells. Regions with a coordinate but no
+    located district take part with their own centroid. Everything happens
+    in memory; the database is only asked whether districts or regions
+    changed, at most every ``DISTRICT_INDEX_CHECK_INTERVAL`` seconds.
+    """
+
+    def __init__(self):
+        self._index: Optional[NearestIndex[Area]] = None
+        self._token: Optional[Tuple] = None
+        self._checked = 0.0
+        self.stale = True
+
+    async def index(self, db: AsyncSession) -> NearestIndex[Area]:
+        now = monotonic()
+        if (
+            self._index is not None
+            and not self.stale
+            and now - self._checked < config.DISTRICT_INDEX_CHECK_INTERVAL
+        ):
+            return self._index
+        self.stale = False
+        changes = union_all(
+            select(func.count().label("n"), func.max(District.modified_at).label("at")),
+            select(func.count(), func.max(Region.modified_at)),
+        ).subquery()
+        token = tuple((await db.execute(select(changes.c.n, changes.c.at))).all())
+        self._checked = now
+        if self._index is None or token != self._token:
+            self._index = await self._build(db)
+            self._token = token
+            logger.info("Indexed %d district centroids", len(self._index))
+        return self._index
+
+    async def _build(self, db: AsyncSession) -> NearestIndex[Area]:
+        districts = (
+            await db.execute(
+                select(
+                    District.id,
+                    District.parent_region,
+                    District.latitude,
+                    District.longitude,
+                ).where(District.latitude.isnot(None), District.longitude.isnot(None))
+            )
+        ).all()
+        covered = {d.parent_region for d in districts}
+        regions = (
+            await db.execute(
+                select(Region.id, Region.latitude, Region.longitude).where(
+                    Region.latitude.isnot(None), Region.longitude.isnot(None)
+                )
+            )
+        ).all()
+        points = [
+            ((d.id, d.parent_region), float(d.latitude), float(d.longitude))
+            for d in districts
+        ]
+        points.extend(
+            ((None, r.id), float(r.latitude), float(r.longitude))
+            for r in regions
+            if r.id not in covered
+        )
+        return NearestIndex(points, config.DISTRICT_MAX_DISTANCE_M)
+
+    async def locate(self, db: AsyncSession, lat: float, lon: float) -> Optional[Area]:
+        return (await self.index(db)).nearest(lat, lon)
+
+    async def tag_rows(self, db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        """Sets ``district_id`` and ``region_id`` of rows from their
+        ``location`` text, all in one lookup."""
+        located = []
+        for row in rows:
+            row["district_id"] = row["region_id"] = None
+            coordinate = parse_coordinate(row.get("location"))
+            if coordinate is not None:
+                located.append((row, coordinate))
+        if not located:
+            return
+        index = await self.index(db)
+        areas = index.nearest_many(
+            [c[0] for _, c in located], [c[1] for _, c in located]
+        )
+        for (row, _), area in zip(located, areas):
+            if area is not None:
+                row["district_id"], row["region_id"] = area
+
+
+district_locator = DistrictLocator()
+
+# session.info key set when a flush touched districts or regions
+_AREAS_CHANGED = "districts_stale"
+
+
+@event.listens_for(Session, "after_flush")
+def _note_area_changes(session, flush_context):
+    if any(
+        isinstance(obj, (District, Region))
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info[_AREAS_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_districts_stale(session):
+    if session.info.pop(_AREAS_CHANGED, False):
+        district_locator.stale = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_districts(session):
+    session.info.pop(_AREAS_CHANGED, None)
@@ -0,0 +1,108 @@
+import logging
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.core.geo import GeofenceIndex
+from app.models import School
+from app.schemas.schools import SchoolLocateRequest, SchoolLocateResponse
+
+logger = logging.getLogger(__name__)
+
+
+class SchoolGeofences:
+    """The geofence index over every school, rebuilt when schools change.
+
+    Edits committed in this process mark it stale right away; edits from
+    other processes are noticed by comparing the school count and latest
+    ``modified_at`` at most every ``GEOFENCE_CHECK_INTERVAL`` seconds.
+    """
+
+    def __init__(self):
+        self._index: Optional[GeofenceIndex[UUID]] = None
+        self._names: Dict[UUID, str] = {}
+        self._token: Optional[Tuple] = None
+        self._checked = 0.0
+        self.stale = True
+
+    async def index(self, db: AsyncSession) -> GeofenceIndex[UUID]:
+        now = monotonic()
+        if (
+            self._index is not None
+            and not self.stale
+            and now - self._checked < config.GEOFENCE_CHECK_INTERVAL
+        ):
+            return self._index
+        self.stale = False
+        token = tuple(
+            (await db.execute(select(func.count(), func.max(School.modified_at)))).one()
+        )
+        self._checked = now
+        if self._index is None or token != self._token:
+            rows = (
+                await db.execute(
+                    select(
+                        School.id,
+                        School.name,
+                        School.latitude,
+                        School.longitude,
+                        School.radius,
+                    ).where(
+                        School.latitude.isnot(None),
+                        School.longitude.isnot(None),
+                        School.radius > 0,
+                    )
+                )
+            ).all()
+            self._index = GeofenceIndex(
+                (r.id, float(r.latitude), float(r.longitude), float(r.radius))
+                for r in rows
+            )
+            self._names = {r.id: r.name for r in rows}
+            self._token = token
+            logger.info("Indexed %d school geofences", len(self._index))
+        return self._index
+
+    def name(self, school_id: UUID) -> Optional[str]:
+        return self._names.get(school_id)
+
+
+school_geofences = SchoolGeofences()
+
+# session.info key set when a flush touched schools
+_SCHOOLS_CHANGED = "geofences_stale"
+
+
+@event.listens_for(Session, "after_flush")
+def _note_school_changes(session, flush_context):
+    if any(
+        isinstance(obj, School)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info[_SCHOOLS_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_geofences_stale(session):
+    if session.info.pop(_SCHOOLS_CHANGED, False):
+        school_geofences.stale = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_geofences(session):
+    session.info.pop(_SCHOOLS_CHANGED, None)
+
+
+async def locate_schools(
+    db: AsyncSession, data: SchoolLocateRequest
+) -> SchoolLocateResponse:
+    index = await school_geofences.index(db)
+    school_ids: List[Optional[UUID]] = index.locate_many(
+        [p.latitude for p in data.points], [p.longitude for p in data.points]
+    )
+    return SchoolLocateResponse(school_ids=school_ids)
@@ -0,0 +1,316 @@
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.timestamps import naive_utc
+from app.core.workers import BackgroundWorker
+from app.enums.enums import UserRole
+from app.models import LocationPing, StudentInfo, User, UserDevice
+from app.schemas._location_pings import (
+    LocationPingAccepted,
+    LocationPingBatch,
+    LocationPingResponse,
+)
+from app.services.districts import district_locator
+from app.services.geofences import school_geofences
+from app.services.scopes import SCHOOL, resolve_scope
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "location_pings_"
+# device clocks run a little ahead; anything further is a broken clock
+MAX_CLOCK_SKEW = timedelta(hours=1)
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX) :], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def oldest_day(today: date) -> date:
+    return today - timedelta(days=config.LOCATION_PING_RETENTION_DAYS)
+
+
+def retention_start() -> datetime:
+    """Midnight UTC of the oldest day still kept."""
+    return datetime.combine(oldest_day(datetime.utcnow().date()), time.min)
+
+
+def _response(row) -> LocationPingResponse:
+    return LocationPingResponse(
+        user_device_id=row.user_device_id,
+        recorded_at=row.recorded_at,
+        latitude=row.latitude,
+        longitude=row.longitude,
+        accuracy=row.accuracy,
+        school_id=row.school_id,
+        district_id=row.district_id,
+        region_id=row.region_id,
+    )
+
+
+# (monotonic expiry, latest ping or None for a device without pings)
+_Entry = Tuple[float, Optional[LocationPingResponse]]
+
+
+class LastLocations:
+    """Latest ping per device, most recently used kept.
+
+    Devices without pings are remembered too, so asking again does not
+    scan the partitions again. Entries expire after ``ttl`` seconds because
+    other processes ingest pings as well.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[UUID, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(
+        self, user_device_id: UUID, ping: Optional[LocationPingResponse]
+    ) -> None:
+        self._entries[user_device_id] = (monotonic() + self.ttl, ping)
+        self._entries.move_to_end(user_device_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def cached(
+        self, user_device_id: UUID
+    ) -> Tuple[bool, Optional[LocationPingResponse]]:
+        """(hit, ping); a hit may still be None for a device without pings."""
+        entry = self._entries.get(user_device_id)
+        if entry is None or entry[0] < monotonic():
+            return False, None
+        self._entries.move_to_end(user_device_id)
+        return True, entry[1]
+
+    def observe(self, ping: LocationPingResponse) -> None:
+        """Takes a newly stored ping unless a later one is known."""
+        hit, known = self.cached(ping.user_device_id)
+        if not hit or known is None or known.recorded_at <= ping.recorded_at:
+            self._remember(ping.user_device_id, ping)
+
+    async def get_many(
+        self, db: AsyncSession, user_device_ids: Iterable[UUID]
+    ) -> Dict[UUID, Optional[LocationPingResponse]]:
+        out, missing = {}, []
+        for user_device_id in user_device_ids:
+            hit, ping = self.cached(user_device_id)
+            if hit:
+                out[user_device_id] = ping
+            else:
+                missing.append(user_device_id)
+        if missing:
+            rows = (
+                await db.execute(
+                    select(LocationPing)
+                    .where(
+                        LocationPing.user_device_id.in_(missing),
+                        LocationPing.recorded_at >= retention_start(),
+                    )
+                    .order_by(
+                        LocationPing.user_device_id, LocationPing.recorded_at.desc()
+                    )
+                    .distinct(LocationPing.user_device_id)
+                )
+            ).scalars()
+            found = {row.user_device_id: _response(row) for row in rows}
+            for user_device_id in missing:
+                out[user_device_id] = found.get(user_device_id)
+                self._remember(user_device_id, out[user_device_id])
+        return out
+
+
+last_locations = LastLocations(
+    config.LAST_LOCATION_CACHE_SIZE, config.LAST_LOCATION_TTL
+)
+
+
+async def ingest_pings(
+    db: AsyncSession, current_user: User, data: LocationPingBatch
+) -> LocationPingAccepted:
+    owned = await db.scalar(
+        select(UserDevice.id).where(
+            UserDevice.id == data.user_device_id,
+            UserDevice.user_id == current_user.id,
+        )
+    )
+    if owned is None:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Device does not belong to user")
+
+    # only days that have a partition are accepted
+    earliest = retention_start()
+    latest = datetime.utcnow() + MAX_CLOCK_SKEW
+    pings = [
+        (p, recorded_at)
+        for p in data.pings
+        if earliest <= (recorded_at := naive_utc(p.recorded_at)) <= latest
+    ]
+    if pings:
+        lats = [p.latitude for p, _ in pings]
+        lons = [p.longitude for p, _ in pings]
+        schools = (await school_geofences.index(db)).locate_many(lats, lons)
+        areas = (await district_locator.index(db)).nearest_many(lats, lons)
+        rows = [
+            {
+                "user_device_id": data.user_device_id,
+                "recorded_at": recorded_at,
+                "latitude": p.latitude,
+                "longitude": p.longitude,
+                "accuracy": p.accuracy,
+                "school_id": school_id,
+                "district_id": area[0] if area else None,
+                "region_id": area[1] if area else None,
+            }
+            for (p, recorded_at), school_id, area in zip(pings, schools, areas)
+        ]
+        # a retried upload repeats its timestamps and is skipped
+        await db.execute(insert(LocationPing).values(rows).on_conflict_do_nothing())
+        await db.commit()
+        latest_row = max(rows, key=lambda row: row["recorded_at"])
+        last_locations.observe(LocationPingResponse(**latest_row))
+    return LocationPingAccepted(
+        accepted=len(pings), rejected=len(data.pings) - len(pings)
+    )
+
+
+async def _check_student_access(
+    db: AsyncSession, current_user: User, student_id: UUID
+) -> None:
+    """Students see themselves, parents their children, staff their scope."""
+    if current_user.id == student_id:
+        return
+    student = (
+        await db.execute(select(StudentInfo).where(StudentInfo.user_id == student_id))
+    ).scalar_one_or_none()
+    if student is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Student not found")
+    if current_user.user_role_name == UserRole.PARENT.value:
+        if current_user.id not in (student.father_id, student.mother_id):
+            raise HTTPException(status.HTTP_403_FORBIDDEN, "Not your child")
+        return
+    await resolve_scope(db, current_user, SCHOOL, student.school_id)
+
+
+async def get_last_locations(
+    db: AsyncSession, current_user: User, student_id: UUID
+) -> List[LocationPingResponse]:
+    """The latest known position of each of the student's active devices."""
+    await _check_student_access(db, current_user, student_id)
+    device_ids = (
+        await db.scalars(
+            select(UserDevice.id).where(
+                UserDevice.user_id == student_id, UserDevice.is_active
+            )
+        )
+    ).all()
+    found = await last_locations.get_many(db, device_ids)
+    pings = [ping for ping in found.values() if ping is not None]
+    return sorted(pings, key=lambda ping: ping.recorded_at, reverse=True)
+
+
+async def get_ping_history(
+    db: AsyncSession,
+    current_user: User,
+    user_device_id: UUID,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    limit: int,
+) -> List[LocationPingResponse]:
+    owner = await db.scalar(
+        select(UserDevice.user_id).where(UserDevice.id == user_device_id)
+    )
+    if owner is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Device not found")
+    await _check_student_access(db, current_user, owner)
+
+    # bounding recorded_at lets the planner skip whole partitions
+    since = naive_utc(since) if since else datetime.utcnow() - timedelta(days=1)
+    stmt = select(LocationPing).where(
+        LocationPing.user_device_id == user_device_id,
+        LocationPing.recorded_at >= since,
+    )
+    if until:
+        stmt = stmt.where(LocationPing.recorded_at < naive_utc(until))
+    rows = (
+        await db.scalars(stmt.order_by(LocationPing.recorded_at.desc()).limit(limit))
+    ).all()
+    return [_response(row) for row in rows]
+
+
+async def ensure_partitions(db: AsyncSession, today: date) -> None:
+    """Every day from the retention cutoff to a few days ahead has a partition."""
+    day = oldest_day(today)
+    while day <= today + timedelta(days=config.LOCATION_PING_DAYS_AHEAD):
+        nxt = day + timedelta(days=1)
+        await db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(day)} "
+                f"PARTITION OF location_pings "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{nxt.isoformat()}')"
+            )
+        )
+        day = nxt
+    await db.commit()
+
+
+async def drop_expired_partitions(db: AsyncSession, today: date) -> List[str]:
+    """Dropping a day's partition is the whole cost of expiring its pings."""
+    names = (
+        await db.scalars(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'location_pings'::regclass"
+            )
+        )
+    ).all()
+    expired = [
+        name
+        for name in names
+        if (day := partition_day(name)) is not None and day < oldest_day(today)
+    ]
+    for name in expired:
+        await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    await db.commit()
+    return expired
+
+
+class LocationPingPartitioner(BackgroundWorker):
+    """Keeps the daily partitions of ``location_pings`` ahead of time and
+    drops the ones past retention."""
+
+    name = "location-ping-partitioner"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.LOCATION_PING_PARTITION_INTERVAL
+
+    async def run_once(self) -> None:
+        today = datetime.utcnow().date()
+        async with AsyncSessionFactory() as db:
+            await ensure_partitions(db, today)
+            dropped = await drop_expired_partitions(db, today)
+        if dropped:
+            logger.info("Dropped location ping partitions %s", ", ".join(dropped))
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import UUID
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.enums.enums import ActionDegrees
+from app.models import Action, Log, LogPayload, School, StudentInfo, UserDevice
+from app.services.classifier import max_degree
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_REGION = "unknown"
+
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("user_device_id", pa.string()),
+        ("user_app_id", pa.string()),
+        ("action_id", pa.string()),
+        ("done_at", pa.timestamp("us")),
+        ("first_at", pa.timestamp("us")),
+        ("last_at", pa.timestamp("us")),
+        ("count", pa.int32()),
+        ("location", pa.string()),
+        ("details", pa.string()),
+        # effective degree; missing from files written before classification
+        ("degree", pa.string()),
+        ("district_id", pa.string()),
+        ("region_id", pa.string()),
+    ]
+)
+PARTITION_SCHEMA = pa.schema([("month", pa.string()), ("region", pa.string())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+# passed explicitly so files lacking newer columns read them as nulls
+DATASET_SCHEMA = pa.unify_schemas([ARCHIVE_SCHEMA, PARTITION_SCHEMA])
+
+
+def archive_cutoff(
+    today: Optional[date] = None, months: Optional[int] = None
+) -> datetime:
+    """First day of the month ``months`` months before ``today``."""
+    today = today or date.today()
+    months = config.LOG_ARCHIVE_AFTER_MONTHS if months is None else months
+    index = today.year * 12 + today.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def month_key(value: datetime) -> str:
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    out, index = [], start.year * 12 + start.month - 1
+    last = end.year * 12 + end.month - 1
+    while index <= last:
+        out.append(f"{index // 12:04d}-{index % 12 + 1:02d}")
+        index += 1
+    return out
+
+
+def _uuid_str(value: Optional[UUID]) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def write_partition(
+    root: Path, month: str, region: str, rows: List[Dict[str, Any]]
+) -> Path:
+    """Write one zstd-compressed Parquet file for a (month, region) group.
+
+    The file name is derived from the archived ids, so re-running a batch
+    that failed before its rows were deleted overwrites instead of
+    duplicating the file.
+    """
+    digest = hashlib.sha256("".join(sorted(r["id"] for r in rows)).encode())
+    directory = root / f"month={month}" / f"region={region}"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"part-{digest.hexdigest()[:32]}.parquet"
+    table = pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA)
+    # dot-prefixed files are skipped by dataset discovery while being written
+    tmp = directory / f".{path.name}.tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    tmp.replace(path)
+    return path
+
+
+async def archive_logs(
+    db: AsyncSession,
+    cutoff: datetime,
+    batch_size: Optional[int] = None,
+    root: Optional[Path] = None,
+) -> int:
+    """Move logs older than ``cutoff`` into Parquet files, batch by batch.
+
+    Each batch is written to disk before its rows are deleted and committed,
+    so a crash can at worst leave a batch both archived and still in Postgres.
+    """
+    batch_size = batch_size or config.LOG_ARCHIVE_BATCH
+    root = root or Path(config.LOG_ARCHIVE_DIR)
+    moved = 0
+    while True:
+        result = await db.execute(
+            select(Log, School.region_id, LogPayload.details, Action.degree)
+            .join(UserDevice, UserDevice.id == Log.user_device_id)
+            .join(Action, Action.id == Log.action_id)
+            .outerjoin(LogPayload, LogPayload.hash == Log.payload_hash)
+            .outerjoin(StudentInfo, StudentInfo.user_id == UserDevice.user_id)
+            .outerjoin(School, School.id == StudentInfo.school_id)
+            .where(Log.done_at < cutoff)
+            .order_by(Log.done_at, Log.id)
+            .limit(batch_size)
+        )
+        batch = result.all()
+        if not batch:
+            return moved
+
+        groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        for log, region_id, interned, action_degree in batch:
+            degree = max_degree(log.degree, action_degree)
+            details = log.details if log.details is not None else interned
+            groups[
+                (month_key(log.done_at), _uuid_str(region_id) or UNKNOWN_REGION)
+            ].append(
+                {
+                    "id": str(log.id),
+                    "user_device_id": str(log.user_device_id),
+                    "user_app_id": _uuid_str(log.user_app_id),
+                    "action_id": str(log.action_id),
+                    "done_at": log.done_at,
+                    "first_at": log.first_at,
+                    "last_at": log.last_at,
+                    "count": log.count,
+                    "location": log.location,
+                    "details": json.dumps(details) if details is not None else None,
+                    "degree": degree.value if degree else None,
+                    "district_id": _uuid_str(log.district_id),
+                    "region_id": _uuid_str(log.region_id),
+                }
+            )
+        for (month, region), rows in groups.items():
+            await asyncio.to_thread(write_partition, root, month, region, rows)
+
+        ids = list({row[0].id for row in batch})
+        await db.execute(
+            delete(Log)
+            .where(Log.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        db.expunge_all()
+        moved += len(ids)
+        logger.info("Archived %d logs older than %s", len(ids), cutoff.date())
+
+
+def read_archived_logs(
+    user_device_ids: Iterable[UUID],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_app_id: Optional[UUID] = None,
+    degree: Optional[ActionDegrees] = None,
+    action_ids: Optional[Iterable[UUID]] = None,
+    limit: int = 100,
+    root: Optional[Path] = None,
+) -> List[Log]:
+    """Read archived logs as detached ``Log`` objects, newest first.
+
+    Month partitions outside [start, end] are pruned by directory, and the
+    device/app/degree/date filters are pushed down to Parquet row groups.
+    ``action_ids`` (the actions of ``degree``) decide for rows archived
+    without a degree.
+    """
+    root = root or Path(config.LOG_ARCHIVE_DIR)
+    device_ids = [str(d) for d in user_device_ids]
+    if not device_ids or not root.exists():
+        return []
+
+    dataset = ds.dataset(
+        root, schema=DATASET_SCHEMA, format="parquet", partitioning=PARTITIONING
+    )
+    expr = ds.field("user_device_id").isin(device_ids)
+    if start or end:
+        months = months_between(start or datetime(2000, 1, 1), end or datetime.now())
+        expr &= ds.field("month").isin(months)
+    if start:
+        expr &= ds.field("done_at") >= pa.scalar(start, type=pa.timestamp("us"))
+    if end:
+        expr &= ds.field("done_at") <= pa.scalar(end, type=pa.timestamp("us"))
+    if user_app_id:
+        expr &= ds.field("user_app_id") == str(user_app_id)
+    if degree is not None:
+        expr &= (ds.field("degree") == degree.value) | (
+            ds.field("degree").is_null()
+            & ds.field("action_id").isin([str(a) for a in action_ids or ()])
+        )
+
+    table = dataset.to_table(columns=ARCHIVE_SCHEMA.names, filter=expr)
+    if table.num_rows > limit:
+        table = table.sort_by([("done_at", "descending")]).slice(0, limit)
+
+    out = []
+    for row in table.to_pylist():
+        out.append(
+            Log(
+                id=UUID(row["id"]),
+                user_device_id=UUID(row["user_device_id"]),
+                user_app_id=UUID(row["user_app_id"]) if row["user_app_id"] else None,
+                action_id=UUID(row["action_id"]),
+                done_at=row["done_at"],
+                first_at=row["first_at"],
+                last_at=row["last_at"],
+                count=row["count"],
+                location=row["location"],
+                details=json.loads(row["details"]) if row["details"] else None,
+                degree=ActionDegrees(row["degree"]) if row["degree"] else None,
+                district_id=UUID(row["district_id"]) if row["district_id"] else None,
+                region_id=UUID(row["region_id"]) if row["region_id"] else None,
+            )
+        )
+    out.sort(key=lambda log: log.done_at, reverse=True)
+    return out
+
+
+class LogArchiver(BackgroundWorker):
+    """Periodically moves logs past the retention window to cold storage."""
+
+    name = "log-archiver"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.LOG_ARCHIVE_INTERVAL
+
+    async def run_once(self) -> None:
+        async with AsyncSessionFactory() as db:
+            await archive_logs(db, archive_cutoff())
@@ -0,0 +1,163 @@
+import json
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Hashable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, event, exists, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import config
+from app.models import Log
+
+
+def coalesce_key(row: Dict[str, Any]) -> Hashable:
+    return (
+        row["user_device_id"],
+        row.get("user_app_id"),
+        row["action_id"],
+        json.dumps(row.get("details"), sort_keys=True, default=str),
+    )
+
+
+def run_length(rows: List[Dict[str, Any]], window: timedelta) -> List[Dict[str, Any]]:
+    """Merge consecutive identical rows of each device into counted runs.
+
+    The first row of a run keeps its id and ``done_at``; ``last_at`` and
+    ``count`` are extended by every merged row.
+    """
+    out: List[Dict[str, Any]] = []
+    current: Dict[Hashable, Dict[str, Any]] = {}
+    for row in sorted(rows, key=lambda r: (str(r["user_device_id"]), r["done_at"])):
+        key = coalesce_key(row)
+        prev = current.get(row["user_device_id"])
+        if (
+            prev is not None
+            and window > timedelta(0)
+            and coalesce_key(prev) == key
+            and row["done_at"] - prev["last_at"] <= window
+        ):
+            prev["last_at"] = row["done_at"]
+            prev["count"] += row.get("count", 1)
+            continue
+        run = {
+            **row,
+            "first_at": row["done_at"],
+            "last_at": row.get("last_at") or row["done_at"],
+            "count": row.get("count", 1),
+        }
+        current[row["user_device_id"]] = run
+        out.append(run)
+    return out
+
+
+# event ids remembered per run, enough to recognize a retried upload
+RUN_EVENTS = 64
+# session.info key for run updates waiting for the commit
+_PENDING = "pending_log_runs"
+
+
+@dataclass
+class _Run:
+    key: Hashable
+    log_id: UUID
+    done_at: datetime
+    last_at: datetime
+    # the latest events folded into the run, its own id included
+    events: Deque[UUID] = field(default_factory=lambda: deque(maxlen=RUN_EVENTS))
+
+
+class LogCoalescer:
+    """Remembers the latest stored row per device to fold repeats into it.
+
+    What is remembered only changes once the transaction storing the row
+    commits, so a rolled-back insert or merge is never folded into.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window = timedelta(seconds=window_seconds)
+        self._last: Dict[UUID, _Run] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > timedelta(0)
+
+    def seen(self, row: Dict[str, Any]) -> Optional[UUID]:
+        """The log a retried event was already stored or folded into."""
+        run = self._last.get(row["user_device_id"])
+        if run is not None and row["id"] in run.events:
+            return run.log_id
+        return None
+
+    def match(self, row: Dict[str, Any]) -> Optional[_Run]:
+        run = self._last.get(row["user_device_id"])
+        if run is None or run.key != coalesce_key(row):
+            return None
+        if not timedelta(0) <= row["done_at"] - run.last_at <= self.window:
+            return None
+        return run
+
+    def _pending(self, db: AsyncSession) -> Dict[UUID, _Run]:
+        return db.sync_session.info.setdefault(_PENDING, {}).setdefault(self, {})
+
+    def remember(self, db: AsyncSession, log_id: UUID, row: Dict[str, Any]) -> None:
+        """Starts a run at the stored ``row`` once the transaction commits."""
+        run = _Run(coalesce_key(row), log_id, row["done_at"], row["done_at"])
+        run.events.append(row["id"])
+        self._pending(db)[row["user_device_id"]] = run
+
+    def forget(self, user_device_id: UUID) -> None:
+        self._last.pop(user_device_id, None)
+
+    async def merge(self, db: AsyncSession, row: Dict[str, Any]) -> Optional[UUID]:
+        """Fold ``row`` into the device's previous run if nothing came between.
+
+        The guard against an intervening event is evaluated inside the same
+        UPDATE, so another worker storing a different event for the device
+        breaks the run instead of being hidden by it.
+        """
+        run = self.match(row)
+        if run is None:
+            return None
+        later = aliased(Log)
+        merged = await db.scalar(
+            update(Log)
+            .where(
+                Log.id == run.log_id,
+                ~exists().where(
+                    and_(
+                        later.user_device_id == row["user_device_id"],
+                        later.done_at > run.done_at,
+                        later.id != run.log_id,
+                    )
+                ),
+            )
+            .values(
+                count=Log.count + 1,
+                last_at=func.greatest(Log.last_at, row["done_at"]),
+            )
+            .returning(Log.id)
+        )
+        if merged is None:
+            self.forget(row["user_device_id"])
+            return None
+        extended = replace(run, last_at=row["done_at"], events=deque(run.events))
+        extended.events.append(row["id"])
+        self._pending(db)[row["user_device_id"]] = extended
+        return merged
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for coalescer, runs in session.info.pop(_PENDING, {}).items():
+        coalescer._last.update(runs)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+log_coalescer = LogCoalescer(config.LOG_COALESCE_WINDOW_SECONDS)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.models import Log, LogPayload
+
+
+def payload_hash(details: Dict[str, Any]) -> bytes:
+    """sha256 of the canonical JSON, so equal payloads share one row."""
+    encoded = json.dumps(
+        details, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(encoded.encode()).digest()
+
+
+# session.info key for payloads inserted by a not yet committed transaction
+_PENDING = "pending_log_payloads"
+
+
+class PayloadInterner:
+    """Moves ``details`` into ``log_payloads`` and references them by hash.
+
+    Hashes known to be committed are kept in a bounded LRU per worker
+    process, so the common case of a repeated payload costs no extra
+    statement. Hashes this session inserted itself only enter the cache once
+    the session commits; after a rollback they would dangle.
+    """
+
+    def __init__(self, enabled: bool, cache_size: int):
+        self.enabled = enabled
+        self.cache_size = cache_size
+        self._known: "OrderedDict[bytes, None]" = OrderedDict()
+
+    def remember(self, hashes: Iterable[bytes]) -> None:
+        for digest in hashes:
+            self._known[digest] = None
+            self._known.move_to_end(digest)
+        while len(self._known) > self.cache_size:
+            self._known.popitem(last=False)
+
+    async def intern(
+        self, db: AsyncSession, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Return copies of ``rows`` ready for insert into ``logs``."""
+        if not self.enabled:
+            return rows
+
+        pending = db.sync_session.info.setdefault(_PENDING, {}).setdefault(self, set())
+        out, missing = [], {}
+        for row in rows:
+            details = row.get("details")
+            if details is None:
+                out.append({**row, "payload_hash": None})
+                continue
+            digest = payload_hash(details)
+            if digest in self._known:
+                self._known.move_to_end(digest)
+            elif digest not in pending:
+                missing[digest] = details
+            out.append({**row, "details": None, "payload_hash": digest})
+
+        if missing:
+            inserted = set(
+                (
+                    await db.execute(
+                        insert(LogPayload)
+                        .values([{"hash": h, "details": d} for h, d in missing.items()])
+                        .on_conflict_do_nothing(index_elements=[LogPayload.hash])
+                        .returning(LogPayload.hash)
+                    )
+                ).scalars()
+            )
+            # a conflict waits for the other transaction, so those are committed
+            self.remember(h for h in missing if h not in inserted)
+            pending.update(inserted)
+        return out
+
+
+payload_interner = PayloadInterner(
+    config.LOG_DETAILS_STORAGE == "interned", config.LOG_PAYLOAD_CACHE_SIZE
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_pending(session: Session) -> None:
+    for interner, hashes in session.info.pop(_PENDING, {}).items():
+        interner.remember(hashes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+async def load_payloads(
+    db: AsyncSession, hashes: Iterable[Optional[bytes]]
+) -> Dict[bytes, Dict[str, Any]]:
+    wanted = {h for h in hashes if h is not None}
+    if not wanted:
+        return {}
+    return dict(
+        (
+            await db.execute(
+                select(LogPayload.hash, LogPayload.details).where(
+                    LogPayload.hash.in_(wanted)
+                )
+            )
+        ).all()
+    )
+
+
+def log_details(
+    log: Log, payloads: Dict[bytes, Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """``details`` of a log regardless of how they were stored."""
+    if log.details is not None:
+        return log.details
+    return payloads.get(log.payload_hash)
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.spool import Spool
+from app.core.timestamps import naive_utc
+from app.core.workers import BackgroundWorker
+from app.enums.enums import ActionDegrees
+from app.models import Action, Log, UserApp, UserDevice
+from app.services.anomalies import anomaly_detector
+from app.services.app_sketches import app_sketches
+from app.services.classifier import max_degree
+from app.services.device_sync import advance_many, forget_spooled
+from app.services.districts import district_locator
+from app.services.log_coalescer import run_length
+from app.services.log_payloads import payload_interner
+from app.services.notifications import TERRIBLE_ACTION, ParentEvent, alert_fanout
+from app.services.usage_sessions import track_usage
+
+logger = logging.getLogger(__name__)
+
+_spool: Spool | None = None
+_quarantine: Spool | None = None
+_degraded_until = 0.0
+
+
+def get_log_spool() -> Spool:
+    global _spool
+    if _spool is None:
+        _spool = Spool(
+            config.LOG_SPOOL_DIR,
+            segment_bytes=config.LOG_SPOOL_SEGMENT_BYTES,
+            fsync=config.LOG_SPOOL_FSYNC,
+        )
+    return _spool
+
+
+def get_log_quarantine() -> Spool:
+    """Spooled records the database rejected, kept for inspection."""
+    global _quarantine
+    if _quarantine is None:
+        _quarantine = Spool(
+            config.LOG_SPOOL_QUARANTINE_DIR,
+            segment_bytes=config.LOG_SPOOL_SEGMENT_BYTES,
+            fsync=config.LOG_SPOOL_FSYNC,
+        )
+    return _quarantine
+
+
+def is_outage(exc: BaseException) -> bool:
+    """Whether ``exc`` means the database is unreachable or too slow, as
+    opposed to rejecting the data itself."""
+    if isinstance(exc, (asyncio.TimeoutError, OSError)):
+        return True
+    if isinstance(exc, (InterfaceError, OperationalError)):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+
+def mark_degraded() -> None:
+    """Route new events straight to the spool for a while."""
+    global _degraded_until
+    _degraded_until = time.monotonic() + config.LOG_SPOOL_DEGRADED_SECONDS
+
+
+def mark_healthy() -> None:
+    global _degraded_until
+    _degraded_until = 0.0
+
+
+def is_degraded() -> bool:
+    return time.monotonic() < _degraded_until
+
+
+def spool_log(user_id: UUID, row: Dict[str, Any], seq: Optional[int] = None) -> None:
+    get_log_spool().append({"user_id": str(user_id), "seq": seq, **row})
+
+
+def _log_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": UUID(record["id"]),
+        "user_device_id": UUID(record["user_device_id"]),
+        "user_app_id": (
+            UUID(record["user_app_id"]) if record.get("user_app_id") else None
+        ),
+        "action_id": UUID(record["action_id"]),
+        # records spooled before done_at was normalized may carry an offset
+        "done_at": naive_utc(datetime.fromisoformat(record["done_at"])),
+        "location": record.get("location"),
+        "details": record.get("details"),
+        "degree": ActionDegrees(record["degree"]) if record.get("degree") else None,
+    }
+
+
+async def replay_records(db: AsyncSession, records: List[Dict[str, Any]]) -> int:
+    """Bulk-insert spooled records, skipping ones that are already stored.
+
+    Ownership and foreign keys are validated in bulk, since nothing was
+    checked against the database when the records were spooled.
+    """
+    if not records:
+        return 0
+
+    device_ids = {UUID(r["user_device_id"]) for r in records}
+    owners = dict(
+        (
+            await db.execute(
+                select(UserDevice.id, UserDevice.user_id).where(
+                    UserDevice.id.in_(device_ids)
+                )
+            )
+        ).all()
+    )
+    actions = {
+        a.id: a
+        for a in await db.execute(
+            select(Action.id, Action.name, Action.degree).where(
+                Action.id.in_({UUID(r["action_id"]) for r in records})
+            )
+        )
+    }
+    user_app_ids = {UUID(r["user_app_id"]) for r in records if r.get("user_app_id")}
+    app_ids = {}
+    if user_app_ids:
+        app_ids = dict(
+            (
+                await db.execute(
+                    select(UserApp.id, UserApp.app_id).where(
+                        UserApp.id.in_(user_app_ids)
+                    )
+                )
+            ).all()
+        )
+
+    rows = []
+    marks = []
+    for record in records:
+        row = _log_row(record)
+        if str(owners.get(row["user_device_id"])) != record["user_id"]:
+            continue
+        if row["action_id"] not in actions:
+            continue
+        if row["user_app_id"] is not None and row["user_app_id"] not in app_ids:
+            continue
+        rows.append(row)
+        if record.get("seq"):
+            marks.append((row["user_device_id"], record["seq"]))
+
+    # replayed or dropped, these are no longer waiting in the spool
+    forget_spooled(device_ids)
+    dropped = len(records) - len(rows)
+    if dropped:
+        logger.warning("Dropped %d invalid spooled log records", dropped)
+    if not rows:
+        return 0
+
+    await district_locator.tag_rows(db, rows)
+    window = timedelta(seconds=max(config.LOG_COALESCE_WINDOW_SECONDS, 0))
+    runs = await payload_interner.intern(db, run_length(rows, window))
+    inserted = set(
+        (
+            await db.execute(
+                insert(Log)
+                .values(runs)
+                .on_conflict_do_nothing(index_elements=[Log.id])
+                .returning(Log.id)
+            )
+        ).scalars()
+    )
+    # a client retry may have stored and counted some of these directly
+    fresh = [run for run in runs if run["id"] in inserted]
+    await track_usage(db, fresh)
+    await app_sketches.observe(
+        db,
+        [
+            (
+                run["user_device_id"],
+                app_ids[run["user_app_id"]],
+                run["done_at"],
+                run["count"],
+            )
+            for run in fresh
+            if run["user_app_id"] is not None
+        ],
+    )
+    for run in fresh:
+        action = actions[run["action_id"]]
+        degree = max_degree(run.get("degree"), action.degree)
+        anomaly_detector.observe_on_commit(
+            db, run["user_device_id"], degree, run["last_at"], run["count"]
+        )
+        if degree == ActionDegrees.TERRIBLE:
+            alert_fanout.publish_on_commit(
+                db,
+                ParentEvent(
+                    TERRIBLE_ACTION,
+                    owners[run["user_device_id"]],
+                    {
+                        "action": action.name,
+                        "user_device_id": str(run["user_device_id"]),
+                        "log_id": str(run["id"]),
+                    },
+                ),
+            )
+    await advance_many(db, marks)
+    return len(inserted)
+
+
+class LogSpoolReplayer(BackgroundWorker):
+    """Drains sealed spool segments into ``logs`` in bulk."""
+
+    name = "log-spool-replayer"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.LOG_SPOOL_REPLAY_INTERVAL
+        self.batch_size = config.LOG_SPOOL_REPLAY_BATCH
+
+    async def _replay(self, batch: List[Dict[str, Any]]) -> int:
+        """Replays a batch in one transaction; when the database rejects it,
+        replays record by record and quarantines the ones it rejects, so one
+        bad record cannot hold up the spool."""
+        try:
+            async with AsyncSessionFactory() as db:
+                inserted = await replay_records(db, batch)
+                await db.commit()
+                return inserted
+        except Exception as e:
+            if is_outage(e):
+                raise
+            logger.warning("Spooled batch rejected, replaying records one by one")
+        inserted = 0
+        for record in batch:
+            try:
+                async with AsyncSessionFactory() as db:
+                    inserted += await replay_records(db, [record])
+                    await db.commit()
+            except Exception as e:
+                if is_outage(e):
+                    raise
+                logger.error("Quarantining spooled log %s: %s", record.get("id"), e)
+                get_log_quarantine().append({**record, "error": str(e)})
+        return inserted
+
+    async def run_once(self) -> None:
+        spool = get_log_spool()
+        spool.seal()
+        for segment in spool.sealed_segments():
+            batch: List[Dict[str, Any]] = []
+            inserted = 0
+            try:
+                for record in spool.read_segment(segment):
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        inserted += await self._replay(batch)
+                        batch = []
+                inserted += await self._replay(batch)
+            except Exception:
+                mark_degraded()
+                raise
+            spool.remove(segment)
+            mark_healthy()
+            logger.info("Replayed %d spooled logs from %s", inserted, segment.name)
+
+    async def on_stop(self) -> None:
+        get_log_spool().close()
+        if _quarantine is not None:
+            _quarantine.close()
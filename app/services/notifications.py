@@ -0,0 +1,571 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from time import monotonic, time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import httpx
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, insert, inspect, select, true, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.otp_send import send_sms
+from app.core.workers import BackgroundWorker
+from app.enums.enums import Languages, UserRole
+from app.models import (
+    AppRequest,
+    Notification,
+    SmsOutbox,
+    StudentInfo,
+    User,
+    UserPreference,
+)
+from app.schemas._notifications import NotificationLatency, NotificationResponse
+
+logger = logging.getLogger(__name__)
+
+TERRIBLE_ACTION = "terrible_action"
+APP_REQUEST = "app_request"
+
+# session.info key for events published once the transaction commits
+_OUTBOX = "parent_events"
+
+TEMPLATES = {
+    Languages.UZB_LAT: {
+        TERRIBLE_ACTION: "{student}: xavfli harakat aniqlandi - {action}",
+        APP_REQUEST: "{student}: ilova so'rovi holati - {status}",
+        "more": "{student}: yana {count} ta ogohlantirish",
+    },
+    Languages.UZB_CYR: {
+        TERRIBLE_ACTION: "{student}: хавфли ҳаракат аниқланди - {action}",
+        APP_REQUEST: "{student}: илова сўрови ҳолати - {status}",
+        "more": "{student}: яна {count} та огоҳлантириш",
+    },
+    Languages.RUSSIAN: {
+        TERRIBLE_ACTION: "{student}: обнаружено опасное действие - {action}",
+        APP_REQUEST: "{student}: статус запроса приложения - {status}",
+        "more": "{student}: ещё {count} предупреждений",
+    },
+    Languages.ENGLISH: {
+        TERRIBLE_ACTION: "{student}: dangerous activity detected - {action}",
+        APP_REQUEST: "{student}: app request is now {status}",
+        "more": "{student}: {count} more alerts",
+    },
+}
+
+
+class ParentEvent:
+    """Something that happened to a student and their parents should hear about."""
+
+    __slots__ = ("kind", "student_id", "data", "occurred_at")
+
+    def __init__(
+        self,
+        kind: str,
+        student_id: UUID,
+        data: Dict[str, Any],
+        occurred_at: Optional[float] = None,
+    ):
+        self.kind = kind
+        self.student_id = student_id
+        self.data = data
+        self.occurred_at = time() if occurred_at is None else occurred_at
+
+
+class Recipient:
+    __slots__ = ("user_id", "phone_number", "language", "student_name")
+
+    def __init__(
+        self,
+        user_id: UUID,
+        phone_number: Optional[str],
+        language: Optional[Languages],
+        student_name: Optional[str],
+    ):
+        self.user_id = user_id
+        self.phone_number = phone_number
+        self.language = language
+        self.student_name = student_name
+
+
+class Message:
+    """One notification to one recipient."""
+
+    __slots__ = ("recipient", "kind", "body", "data", "events", "coalesced")
+
+    def __init__(
+        self,
+        recipient: Recipient,
+        kind: str,
+        body: str,
+        data: Optional[Dict[str, Any]],
+        events: List[ParentEvent] = (),
+        coalesced: bool = False,
+    ):
+        self.recipient = recipient
+        self.kind = kind
+        self.body = body
+        self.data = data
+        self.events = events
+        self.coalesced = coalesced
+
+    @classmethod
+    def for_events(
+        cls, recipient: Recipient, events: List[ParentEvent], coalesced: bool
+    ) -> "Message":
+        last = events[-1]
+        if len(events) == 1:
+            data = last.data
+        else:
+            data = {"count": len(events), "events": [e.data for e in events[-20:]]}
+        return cls(
+            recipient, last.kind, render(recipient, events), data, events, coalesced
+        )
+
+
+def render(recipient: Recipient, events: List[ParentEvent]) -> str:
+    templates = TEMPLATES.get(recipient.language, TEMPLATES[Languages.UZB_LAT])
+    student = recipient.student_name or ""
+    if len(events) > 1:
+        return templates["more"].format(student=student, count=len(events))
+    data = events[0].data
+    action = data.get("action", "")
+    if data.get("app"):
+        action = f"{action} ({data['app']})"
+    return templates[events[0].kind].format(
+        student=student, action=action, status=data.get("status", "")
+    )
+
+
+class Channel:
+    """A way of delivering messages.
+
+    Channels that use the database write in the dispatch transaction; the
+    others run after it commits and their failures are only logged.
+    """
+
+    name: str = "channel"
+    uses_db: bool = True
+
+    async def deliver(self, db: AsyncSession, messages: List[Message]) -> None:
+        raise NotImplementedError
+
+
+class FeedChannel(Channel):
+    name = "feed"
+
+    async def deliver(self, db: AsyncSession, messages: List[Message]) -> None:
+        await db.execute(
+            insert(Notification).values(
+                [
+                    {
+                        "user_id": m.recipient.user_id,
+                        "kind": m.kind,
+                        "body": m.body,
+                        "data": m.data,
+                    }
+                    for m in messages
+                ]
+            )
+        )
+
+
+class SmsChannel(Channel):
+    """Queues texts in ``sms_outbox`` for ``SmsOutboxSender``."""
+
+    name = "sms"
+
+    async def deliver(self, db: AsyncSession, messages: List[Message]) -> None:
+        rows = [
+            {"phone_number": m.recipient.phone_number, "body": m.body}
+            for m in messages
+            if m.recipient.phone_number
+        ]
+        if rows:
+            await db.execute(insert(SmsOutbox).values(rows))
+
+
+class WebhookChannel(Channel):
+    """POSTs each batch as a JSON list; runs after the dispatch commit."""
+
+    name = "webhook"
+    uses_db = False
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def deliver(self, db: AsyncSession, messages: List[Message]) -> None:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(
+                self.url,
+                json=[
+                    {
+                        "user_id": str(m.recipient.user_id),
+                        "kind": m.kind,
+                        "body": m.body,
+                        "data": m.data,
+                    }
+                    for m in messages
+                ],
+            )
+            response.raise_for_status()
+
+
+CHANNELS: Dict[str, Callable[[], Channel]] = {
+    "feed": FeedChannel,
+    "sms": SmsChannel,
+    "webhook": lambda: WebhookChannel(config.NOTIFY_WEBHOOK_URL),
+}
+
+
+def build_channels(names: Iterable[str]) -> List[Channel]:
+    return [CHANNELS[name]() for name in names]
+
+
+async def resolve_recipients(
+    db: AsyncSession, student_ids: Iterable[UUID]
+) -> Dict[UUID, List[Recipient]]:
+    """Parents of the students who have notifications enabled, in one query."""
+    ids = list(student_ids)
+    parents = union_all(
+        *(
+            select(
+                StudentInfo.user_id.label("student_id"),
+                StudentInfo.first_name.label("student_name"),
+                parent.label("parent_id"),
+            ).where(StudentInfo.user_id.in_(ids), parent.isnot(None))
+            for parent in (StudentInfo.father_id, StudentInfo.mother_id)
+        )
+    ).subquery()
+    rows = await db.execute(
+        select(
+            parents.c.student_id,
+            parents.c.student_name,
+            User.id,
+            User.phone_number,
+            UserPreference.language,
+        )
+        .join(User, User.id == parents.c.parent_id)
+        .outerjoin(UserPreference, UserPreference.user_id == User.id)
+        .where(func.coalesce(UserPreference.notifications_enabled, true()))
+    )
+    out: Dict[UUID, List[Recipient]] = {}
+    seen = set()
+    for student_id, student_name, user_id, phone_number, language in rows:
+        if (student_id, user_id) in seen:
+            continue
+        seen.add((student_id, user_id))
+        out.setdefault(student_id, []).append(
+            Recipient(user_id, phone_number, language, student_name)
+        )
+    return out
+
+
+class LatencyStats:
+    """Event-to-delivery latencies of the most recent messages, in seconds."""
+
+    def __init__(self, size: int = 1000):
+        self.samples: deque = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": self.count, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+        def pct(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "count": self.count,
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "max": samples[-1],
+        }
+
+
+Resolver = Callable[
+    [AsyncSession, Iterable[UUID]], Awaitable[Dict[UUID, List[Recipient]]]
+]
+
+
+class AlertFanout:
+    """Queues parent events and delivers them with per-recipient coalescing.
+
+    A recipient's first event goes out as soon as the dispatcher picks it
+    up. Further events for them within ``coalesce_seconds`` are held and
+    sent as one message when the window ends. Latency is recorded from the
+    event to the commit of its delivery, for messages that were not held.
+    """
+
+    def __init__(
+        self,
+        channels: List[Channel],
+        resolver: Resolver = resolve_recipients,
+        coalesce_seconds: float = 60.0,
+        queue_size: int = 10_000,
+        batch_size: int = 500,
+    ):
+        self.channels = channels
+        self.resolver = resolver
+        self.coalesce_seconds = coalesce_seconds
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.latency = LatencyStats()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_sent: Dict[UUID, float] = {}
+        self._held: Dict[UUID, List[Tuple[Recipient, ParentEvent]]] = {}
+
+    def _put(self, event: ParentEvent) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Notification queue full, dropping %s event", event.kind)
+
+    def publish(self, event: ParentEvent) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        # sync sessions commit in a worker thread
+        if self._loop is not None and running is not self._loop:
+            self._loop.call_soon_threadsafe(self._put, event)
+        else:
+            self._put(event)
+
+    def publish_on_commit(self, db: AsyncSession, event: ParentEvent) -> None:
+        session = getattr(db, "sync_session", db)
+        session.info.setdefault(_OUTBOX, []).append(event)
+
+    async def next_batch(self, timeout: float) -> List[ParentEvent]:
+        try:
+            batch = [await asyncio.wait_for(self.queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    def plan(
+        self,
+        events: List[ParentEvent],
+        recipients: Dict[UUID, List[Recipient]],
+        now: float,
+        flush_all: bool = False,
+    ) -> List[Message]:
+        """Messages to send now; events for recently notified recipients are held."""
+        messages = []
+        for ev in events:
+            for recipient in recipients.get(ev.student_id, ()):
+                user_id = recipient.user_id
+                last = self._last_sent.get(user_id)
+                if user_id in self._held or (
+                    last is not None and now - last < self.coalesce_seconds
+                ):
+                    self._held.setdefault(user_id, []).append((recipient, ev))
+                else:
+                    self._last_sent[user_id] = now
+                    messages.append(
+                        Message.for_events(recipient, [ev], coalesced=False)
+                    )
+
+        for user_id, held in list(self._held.items()):
+            if flush_all or now - self._last_sent[user_id] >= self.coalesce_seconds:
+                del self._held[user_id]
+                self._last_sent[user_id] = now
+                messages.append(
+                    Message.for_events(held[-1][0], [e for _, e in held], True)
+                )
+        for user_id, last in list(self._last_sent.items()):
+            if now - last >= self.coalesce_seconds and user_id not in self._held:
+                del self._last_sent[user_id]
+        return messages
+
+    async def pump(self, timeout: float = 1.0, flush_all: bool = False) -> int:
+        """Take queued events and deliver whatever is due; returns messages sent."""
+        self._loop = asyncio.get_running_loop()
+        events = await self.next_batch(timeout) if not flush_all else []
+        async with AsyncSessionFactory() as db:
+            recipients = {}
+            if events:
+                recipients = await self.resolver(db, {e.student_id for e in events})
+            messages = self.plan(events, recipients, monotonic(), flush_all)
+            if not messages:
+                return 0
+            for channel in self.channels:
+                if channel.uses_db:
+                    await channel.deliver(db, messages)
+            await db.commit()
+        delivered = time()
+        for message in messages:
+            if not message.coalesced:
+                for ev in message.events:
+                    self.latency.add(delivered - ev.occurred_at)
+        for channel in self.channels:
+            if not channel.uses_db:
+                try:
+                    await channel.deliver(None, messages)
+                except Exception:
+                    logger.error("Channel %s failed", channel.name, exc_info=True)
+        return len(messages)
+
+
+alert_fanout = AlertFanout(
+    build_channels(config.NOTIFY_CHANNELS),
+    coalesce_seconds=config.NOTIFY_COALESCE_SECONDS,
+    queue_size=config.NOTIFY_QUEUE_SIZE,
+    batch_size=config.NOTIFY_BATCH_SIZE,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _queue_app_request_changes(session, flush_context):
+    for obj in session.dirty:
+        if not isinstance(obj, AppRequest):
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.deleted or not history.added:
+            continue
+        value = history.added[0]
+        alert_fanout.publish_on_commit(
+            session,
+            ParentEvent(
+                APP_REQUEST,
+                obj.from_user_id,
+                {
+                    "app_request_id": str(obj.id),
+                    "app_id": str(obj.app_id),
+                    "status": getattr(value, "value", value),
+                },
+            ),
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    for ev in session.info.pop(_OUTBOX, ()):
+        alert_fanout.publish(ev)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session):
+    session.info.pop(_OUTBOX, None)
+
+
+async def get_notifications(
+    db: AsyncSession, current_user: User, unread_only: bool, limit: int
+) -> List[NotificationResponse]:
+    stmt = select(Notification).where(Notification.user_id == current_user.id)
+    if unread_only:
+        stmt = stmt.where(Notification.read_at.is_(None))
+    rows = (
+        (await db.execute(stmt.order_by(Notification.created_at.desc()).limit(limit)))
+        .scalars()
+        .all()
+    )
+    return [NotificationResponse.model_validate(r) for r in rows]
+
+
+async def mark_read(
+    db: AsyncSession, current_user: User, ids: Optional[List[UUID]]
+) -> int:
+    stmt = update(Notification).where(
+        Notification.user_id == current_user.id, Notification.read_at.is_(None)
+    )
+    if ids:
+        stmt = stmt.where(Notification.id.in_(ids))
+    result = await db.execute(stmt.values(read_at=datetime.utcnow()))
+    return result.rowcount
+
+
+async def get_latency(current_user: User) -> NotificationLatency:
+    if current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, "Only admins can view notification stats"
+        )
+    return NotificationLatency(
+        **alert_fanout.latency.summary(), queued=alert_fanout.queue.qsize()
+    )
+
+
+class NotificationDispatcher(BackgroundWorker):
+    """Delivers parent events as they are published; blocks on the queue."""
+
+    name = "notification-dispatcher"
+    interval = 0
+
+    async def run_once(self) -> None:
+        await alert_fanout.pump()
+
+    async def on_stop(self) -> None:
+        await alert_fanout.pump(flush_all=True)
+
+
+class SmsOutboxSender(BackgroundWorker):
+    """Hands queued texts to the SMS gateway with bounded concurrency."""
+
+    name = "sms-outbox-sender"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.SMS_OUTBOX_INTERVAL
+
+    async def run_once(self) -> None:
+        # full batches mean a backlog, e.g. after a digest run; keep draining
+        while (
+            await self.send_batch() == config.SMS_OUTBOX_BATCH
+            and not self._stopping.is_set()
+        ):
+            pass
+
+    async def send_batch(self) -> int:
+        async with AsyncSessionFactory() as db:
+            rows = (
+                (
+                    await db.execute(
+                        select(SmsOutbox)
+                        .where(
+                            SmsOutbox.sent_at.is_(None),
+                            SmsOutbox.attempts < config.SMS_MAX_ATTEMPTS,
+                        )
+                        .order_by(SmsOutbox.created_at)
+                        .limit(config.SMS_OUTBOX_BATCH)
+                        # several processes can drain the outbox side by side
+                        .with_for_update(skip_locked=True)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            if not rows:
+                return 0
+            limit = asyncio.Semaphore(config.SMS_SEND_CONCURRENCY)
+
+            async def send(row: SmsOutbox) -> None:
+                async with limit:
+                    ok, result = await send_sms(
+                        row.phone_number, row.body, sms_id=row.id.hex
+                    )
+                row.attempts += 1
+                if ok:
+                    row.sent_at = datetime.utcnow()
+                else:
+                    row.last_error = str(result)[:500]
+
+            await asyncio.gather(*(send(row) for row in rows))
+            await db.commit()
+        return len(rows)
@@ -0,0 +1,225 @@
+from typing import Optional, Set, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, inspect, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.models import (
+    District,
+    Policy,
+    PolicyAssignment,
+    Region,
+    School,
+    StudentInfo,
+    User,
+)
+from app.schemas._policy_assignments import (
+    EffectivePolicyResponse,
+    PolicyAssignmentResponse,
+    PolicyAssignmentUpdate,
+)
+from app.services.blocking_engine import mark_stale
+from app.services.scopes import (
+    COUNTRY,
+    COUNTRY_ID,
+    DISTRICT,
+    REGION,
+    SCHOOL,
+    STUDENT,
+    resolve_scope,
+)
+
+# nearest first; the school's own policy_id comes before all of them
+INHERITED = (DISTRICT, REGION, COUNTRY)
+
+
+def _inherited_policy(scope: str, scope_id):
+    assignment = aliased(PolicyAssignment)
+    return (
+        select(assignment.policy_id)
+        .where(assignment.scope == scope, assignment.scope_id == scope_id)
+        .scalar_subquery()
+    )
+
+
+def effective_policy():
+    """SQL for a school's policy: its own, else the nearest ancestor's."""
+    return func.coalesce(
+        School.policy_id,
+        _inherited_policy(DISTRICT, School.district_id),
+        _inherited_policy(REGION, School.region_id),
+        _inherited_policy(COUNTRY, COUNTRY_ID),
+    )
+
+
+def schools_under(scope: str, scope_id: UUID):
+    return {
+        SCHOOL: lambda: School.id == scope_id,
+        DISTRICT: lambda: School.district_id == scope_id,
+        REGION: lambda: School.region_id == scope_id,
+        COUNTRY: true,
+    }[scope]()
+
+
+def refresh_statement(scope: str, scope_id: UUID):
+    """Recompute the effective policy of the schools under one scope only."""
+    effective = effective_policy()
+    return (
+        update(School)
+        .where(
+            schools_under(scope, scope_id),
+            School.effective_policy_id.is_distinct_from(effective),
+        )
+        .values(effective_policy_id=effective)
+        .returning(School.id)
+    )
+
+
+# session.info key for scopes whose schools need recomputing; a school is
+# kept as the object, since a new one has no id before it is inserted
+_DIRTY = "policy_scopes"
+
+
+@event.listens_for(Session, "before_flush")
+def _note_policy_scopes(session, flush_context, instances):
+    scopes: Set[Tuple[str, object]] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, PolicyAssignment) and obj.scope != STUDENT:
+            scopes.add((obj.scope, obj.scope_id))
+        elif isinstance(obj, Policy) and obj in session.deleted:
+            # its schools fall back to whatever they inherit
+            scopes.add((COUNTRY, COUNTRY_ID))
+        elif isinstance(obj, School) and obj not in session.deleted:
+            state = inspect(obj)
+            if obj in session.new or any(
+                state.attrs[key].history.has_changes()
+                for key in ("policy_id", "district_id", "region_id")
+            ):
+                scopes.add((SCHOOL, obj))
+    if scopes:
+        session.info.setdefault(_DIRTY, set()).update(scopes)
+
+
+# after the flush has settled object states, so the expiry below sticks
+@event.listens_for(Session, "after_flush_postexec")
+def _refresh_effective_policies(session, flush_context):
+    scopes = session.info.pop(_DIRTY, None)
+    if not scopes:
+        return
+    connection = session.connection()
+    changed: Set[UUID] = set()
+    for scope, scope_id in scopes:
+        if isinstance(scope_id, School):
+            scope_id = scope_id.id
+        changed.update(connection.execute(refresh_statement(scope, scope_id)).scalars())
+    if changed:
+        mark_stale(session, school_ids=changed)
+        # loaded schools still hold the value from before the update
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, School) and obj.id in changed:
+                session.expire(obj, ["effective_policy_id"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_policy_scopes(session):
+    session.info.pop(_DIRTY, None)
+
+
+async def _authorize(
+    db: AsyncSession, current_user: User, scope: str, scope_id: UUID
+) -> Optional[StudentInfo]:
+    """The caller must answer for the scope; a student counts as their school."""
+    if scope == STUDENT:
+        student = (
+            await db.execute(select(StudentInfo).where(StudentInfo.user_id == scope_id))
+        ).scalar_one_or_none()
+        if student is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Student not found")
+        await resolve_scope(db, current_user, SCHOOL, student.school_id)
+        return student
+    if scope == COUNTRY:
+        scope_id = COUNTRY_ID
+    await resolve_scope(db, current_user, scope, scope_id)
+    model = {REGION: Region, DISTRICT: District}.get(scope)
+    if model is not None and await db.get(model, scope_id) is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, f"{scope.capitalize()} not found"
+        )
+    return None
+
+
+async def set_policy_assignment(
+    db: AsyncSession,
+    current_user: User,
+    scope: str,
+    scope_id: UUID,
+    data: PolicyAssignmentUpdate,
+) -> PolicyAssignmentResponse:
+    if scope == COUNTRY:
+        scope_id = COUNTRY_ID
+    await _authorize(db, current_user, scope, scope_id)
+    if data.policy_id is not None and await db.get(Policy, data.policy_id) is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Policy not found")
+
+    if scope == SCHOOL:
+        school = await db.get(School, scope_id)
+        if school is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "School not found")
+        school.policy_id = data.policy_id
+    else:
+        assignment = await db.get(PolicyAssignment, (scope, scope_id))
+        if data.policy_id is None:
+            if assignment is not None:
+                await db.delete(assignment)
+        elif assignment is None:
+            db.add(
+                PolicyAssignment(
+                    scope=scope, scope_id=scope_id, policy_id=data.policy_id
+                )
+            )
+        else:
+            assignment.policy_id = data.policy_id
+    await db.commit()
+    return PolicyAssignmentResponse(
+        scope=scope, scope_id=scope_id, policy_id=data.policy_id
+    )
+
+
+async def get_effective_policy(
+    db: AsyncSession, current_user: User, school_id: UUID
+) -> EffectivePolicyResponse:
+    """The school's effective policy and every level that assigns one."""
+    await resolve_scope(db, current_user, SCHOOL, school_id)
+    school = await db.get(School, school_id)
+    if school is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "School not found")
+    ancestors = {
+        DISTRICT: school.district_id,
+        REGION: school.region_id,
+        COUNTRY: COUNTRY_ID,
+    }
+    rows = await db.execute(
+        select(
+            PolicyAssignment.scope,
+            PolicyAssignment.scope_id,
+            PolicyAssignment.policy_id,
+        )
+        .where(PolicyAssignment.scope.in_(INHERITED))
+        .where(PolicyAssignment.scope_id.in_(ancestors.values()))
+    )
+    found = {
+        scope: policy_id
+        for scope, scope_id, policy_id in rows
+        if ancestors[scope] == scope_id
+    }
+    if school.policy_id is not None:
+        found[SCHOOL] = school.policy_id
+    assigned = {s: found[s] for s in (SCHOOL, *INHERITED) if s in found}
+    return EffectivePolicyResponse(
+        school_id=school.id,
+        policy_id=school.effective_policy_id,
+        source=next(iter(assigned), None),
+        assigned=assigned,
+    )
@@ -0,0 +1,285 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.domains import SuffixMatcher, normalize_domain
+from app.models import (
+    App,
+    Policy,
+    PolicyApp,
+    PolicyAssignment,
+    PolicyChange,
+    PolicyWeb,
+    School,
+    SchoolSchedule,
+    StudentInfo,
+    Website,
+)
+from app.services.scopes import STUDENT
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PolicySet:
+    """A policy's app packages and website domains, frozen at one version.
+
+    A whitelist policy blocks everything not listed, a blacklist policy
+    blocks exactly what is listed.
+    """
+
+    policy_id: UUID
+    version: int
+    whitelist_apps: bool
+    packages: FrozenSet[str]
+    whitelist_web: bool
+    domains: FrozenSet[str]
+
+    def blocks_package(self, package: str) -> bool:
+        return (package in self.packages) != self.whitelist_apps
+
+    def blocked_packages(self, installed: Iterable[str]) -> Set[str]:
+        installed = set(installed)
+        if self.whitelist_apps:
+            return installed - self.packages
+        return installed & self.packages
+
+    @cached_property
+    def web_matcher(self) -> SuffixMatcher:
+        return SuffixMatcher(self.domains)
+
+    def blocks_domain(self, host: str) -> bool:
+        """Listing a domain covers all of its subdomains too."""
+        return (host in self.web_matcher) != self.whitelist_web
+
+    def blocked_domains(self, hosts: Iterable[str]) -> List[bool]:
+        matcher, whitelist = self.web_matcher, self.whitelist_web
+        return [(host in matcher) != whitelist for host in hosts]
+
+    @cached_property
+    def snapshot(self) -> bytes:
+        """Canonical JSON of the rules alone, without the policy's identity,
+        so identical policies serialize to the same bytes."""
+        return json.dumps(
+            {
+                "is_whitelist_app": self.whitelist_apps,
+                "is_whitelist_web": self.whitelist_web,
+                "packages": sorted(self.packages),
+                "domains": sorted(self.domains),
+            },
+            separators=(",", ":"),
+        ).encode()
+
+    @cached_property
+    def snapshot_hash(self) -> str:
+        return hashlib.sha256(self.snapshot).hexdigest()
+
+
+async def compile_policy(db: AsyncSession, policy_id: UUID) -> Optional[PolicySet]:
+    policy = (
+        await db.execute(
+            select(
+                Policy.version, Policy.is_whitelist_app, Policy.is_whitelist_web
+            ).where(Policy.id == policy_id)
+        )
+    ).first()
+    if policy is None:
+        return None
+    packages = (
+        await db.execute(
+            select(App.package)
+            .join(PolicyApp, PolicyApp.app_id == App.id)
+            .where(PolicyApp.policy_id == policy_id, App.package.isnot(None))
+        )
+    ).scalars()
+    domains = (
+        await db.execute(
+            select(Website.domain)
+            .join(PolicyWeb, PolicyWeb.website_id == Website.id)
+            .where(PolicyWeb.policy_id == policy_id)
+        )
+    ).scalars()
+    return PolicySet(
+        policy_id=policy_id,
+        version=policy.version,
+        # an unset flag means a whitelist, as the column default does
+        whitelist_apps=policy.is_whitelist_app is not False,
+        packages=frozenset(packages),
+        whitelist_web=policy.is_whitelist_web is not False,
+        domains=frozenset(normalize_domain(d) for d in domains),
+    )
+
+
+class PolicySets:
+    """Compiled policies by id, recompiled when the policy's version moves.
+
+    Checking the version is one primary-key read; the sets themselves are
+    only reloaded after an edit.
+    """
+
+    def __init__(self):
+        self._sets: Dict[UUID, PolicySet] = {}
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    async def get(self, db: AsyncSession, policy_id: UUID) -> Optional[PolicySet]:
+        version = await db.scalar(select(Policy.version).where(Policy.id == policy_id))
+        if version is None:
+            self._sets.pop(policy_id, None)
+            return None
+        cached = self._sets.get(policy_id)
+        if cached is not None and cached.version == version:
+            return cached
+        compiled = await compile_policy(db, policy_id)
+        if compiled is not None:
+            self._sets[policy_id] = compiled
+            logger.debug("Compiled policy %s at version %d", policy_id, version)
+        return compiled
+
+
+policy_sets = PolicySets()
+
+
+# session.info key for change log entries waiting for their version
+_CHANGES = "policy_changes"
+# (policy_id, kind, value, added); a None kind only moves the version
+Change = Tuple[UUID, Optional[str], Optional[str], bool]
+
+
+def _changed(obj, *keys: str) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[key].history.has_changes() for key in keys)
+
+
+def _entry_changes(session, obj, added: bool) -> List[Change]:
+    if isinstance(obj, PolicyApp):
+        app = session.get(App, obj.app_id)
+        value = app.package if app is not None else None
+        return [(obj.policy_id, "app" if value else None, value, added)]
+    website = session.get(Website, obj.website_id)
+    value = normalize_domain(website.domain) if website is not None else None
+    return [(obj.policy_id, "web" if value else None, value, added)]
+
+
+def _schedule_changes(session, schedule: SchoolSchedule) -> List[Change]:
+    school = session.get(School, schedule.school_id)
+    if school is None:
+        return []
+    # students of the school with their own policy follow its schedule too
+    policies = set(
+        session.scalars(
+            select(PolicyAssignment.policy_id)
+            .join(StudentInfo, StudentInfo.user_id == PolicyAssignment.scope_id)
+            .where(
+                PolicyAssignment.scope == STUDENT,
+                StudentInfo.school_id == school.id,
+            )
+        )
+    )
+    if school.effective_policy_id is not None:
+        policies.add(school.effective_policy_id)
+    return [(policy_id, "schedule", str(school.id), True) for policy_id in policies]
+
+
+def _shift_changes(session, student: StudentInfo) -> List[Change]:
+    # the schedule sent to a student's devices depends on their shift
+    policy_id = session.scalar(
+        select(PolicyAssignment.policy_id).where(
+            PolicyAssignment.scope == STUDENT,
+            PolicyAssignment.scope_id == student.user_id,
+        )
+    )
+    if policy_id is None:
+        school = session.get(School, student.school_id)
+        policy_id = school.effective_policy_id if school is not None else None
+    if policy_id is None:
+        return []
+    return [(policy_id, "schedule", str(student.user_id), True)]
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_policy_versions(session, flush_context, instances):
+    """Any edit of a policy, its app and website lists, the schedules of its
+    schools or the shift of its students moves its version and is noted for
+    the change log."""
+    changes: List[Change] = []
+    for added, objects in ((True, session.new), (False, session.deleted)):
+        for obj in objects:
+            if isinstance(obj, (PolicyApp, PolicyWeb)):
+                changes.extend(_entry_changes(session, obj, added))
+            elif isinstance(obj, SchoolSchedule):
+                changes.extend(_schedule_changes(session, obj))
+    for obj in session.dirty:
+        if isinstance(obj, (PolicyApp, PolicyWeb)):
+            key = "app_id" if isinstance(obj, PolicyApp) else "website_id"
+            if _changed(obj, "policy_id", key):
+                # moved entries are rare; both policies resend everything
+                previous = inspect(obj).attrs.policy_id.history.deleted or []
+                for policy_id in {obj.policy_id, *previous}:
+                    changes.append((policy_id, "reset", None, True))
+        elif isinstance(obj, SchoolSchedule):
+            if session.is_modified(obj, include_collections=False):
+                changes.extend(_schedule_changes(session, obj))
+        elif isinstance(obj, StudentInfo) and _changed(obj, "shift"):
+            changes.extend(_shift_changes(session, obj))
+        elif isinstance(obj, Policy) and session.is_modified(
+            obj, include_collections=False
+        ):
+            flipped = _changed(obj, "is_whitelist_app", "is_whitelist_web")
+            changes.append((obj.id, "reset" if flipped else None, None, True))
+
+    bumped = set()
+    for policy_id in {change[0] for change in changes}:
+        policy = session.get(Policy, policy_id)
+        # a policy created in this flush starts at its first version
+        if policy is None or policy in session.new or policy in session.deleted:
+            continue
+        # computed in SQL, so concurrent edits cannot share a version
+        policy.version = Policy.version + 1
+        bumped.add(policy_id)
+    pending = [c for c in changes if c[1] is not None and c[0] in bumped]
+    if pending:
+        session.info.setdefault(_CHANGES, []).extend(pending)
+
+
+@event.listens_for(Session, "after_flush")
+def _log_policy_changes(session, flush_context):
+    """Writes the noted changes under the versions the flush just set."""
+    pending = session.info.pop(_CHANGES, None)
+    if not pending:
+        return
+    connection = session.connection()
+    versions = dict(
+        connection.execute(
+            select(Policy.id, Policy.version).where(
+                Policy.id.in_({change[0] for change in pending})
+            )
+        ).all()
+    )
+    rows = [
+        {
+            "policy_id": policy_id,
+            "version": versions[policy_id],
+            "kind": kind,
+            "value": value,
+            "added": added,
+        }
+        for policy_id, kind, value, added in pending
+        if policy_id in versions
+    ]
+    if rows:
+        connection.execute(insert(PolicyChange), rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_policy_changes(session):
+    session.info.pop(_CHANGES, None)
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.models import PolicySnapshot
+from app.services.policy_sets import PolicySet
+
+
+class PolicySnapshots:
+    """Published snapshot blobs by content hash, most recently used kept.
+
+    Schools running the same rules share one entry whatever policy they are
+    attached to, so the cache grows with distinct rule sets only.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def _remember(self, digest: str, content: bytes) -> None:
+        self._blobs[digest] = content
+        self._blobs.move_to_end(digest)
+        while len(self._blobs) > self.max_entries:
+            self._blobs.popitem(last=False)
+
+    def cached(self, digest: str) -> Optional[bytes]:
+        content = self._blobs.get(digest)
+        if content is not None:
+            self._blobs.move_to_end(digest)
+        return content
+
+    async def publish(self, db: AsyncSession, policy: PolicySet) -> str:
+        """Store the policy's snapshot if no one has yet; returns its hash."""
+        digest = policy.snapshot_hash
+        if self.cached(digest) is None:
+            await db.execute(
+                insert(PolicySnapshot)
+                .values(hash=digest, content=policy.snapshot)
+                .on_conflict_do_nothing(index_elements=[PolicySnapshot.hash])
+            )
+            await db.commit()
+            self._remember(digest, policy.snapshot)
+        return digest
+
+    async def fetch(self, db: AsyncSession, digest: str) -> Optional[bytes]:
+        content = self.cached(digest)
+        if content is None:
+            content = await db.scalar(
+                select(PolicySnapshot.content).where(PolicySnapshot.hash == digest)
+            )
+            if content is not None:
+                self._remember(digest, content)
+        return content
+
+
+policy_snapshots = PolicySnapshots(config.POLICY_SNAPSHOT_CACHE_SIZE)
+
+
+async def get_policy_snapshot(db: AsyncSession, digest: str) -> bytes:
+    content = await policy_snapshots.fetch(db, digest)
+    if content is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Snapshot not found")
+    return content
@@ -0,0 +1,162 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import PolicyChange, User, UserDevice
+from app.schemas.devices import (
+    DevicePolicyResponse,
+    DomainCheckRequest,
+    DomainCheckResponse,
+)
+from app.services.blocking_engine import (
+    BlockingEvaluator,
+    blocking_engine,
+    hhmm,
+    school_windows,
+)
+from app.services.policy_sets import PolicySet, policy_sets
+from app.services.policy_snapshots import policy_snapshots
+
+# value -> True when it ends up in the policy, False when taken out
+Delta = Dict[str, bool]
+
+
+def fold_changes(
+    changes: Iterable[Tuple[str, Optional[str], bool]],
+    school_id: UUID,
+    user_id: Optional[UUID] = None,
+) -> Optional[Tuple[Delta, Delta, bool]]:
+    """Net app and website deltas of ordered log entries, and whether the
+    schedule changed for the school or the student's shift. ``None`` when
+    only a full resend will do."""
+    schedules = {str(school_id), str(user_id)}
+    apps: Delta = {}
+    webs: Delta = {}
+    schedule = False
+    for kind, value, added in changes:
+        if kind == "reset":
+            return None
+        if kind == "app":
+            apps[value] = added
+        elif kind == "web":
+            webs[value] = added
+        elif kind == "schedule" and value in schedules:
+            schedule = True
+    return apps, webs, schedule
+
+
+async def _policy_delta(
+    db: AsyncSession, policy: PolicySet, since: int, school_id: UUID, user_id: UUID
+) -> Optional[Tuple[Delta, Delta, bool]]:
+    first = await db.scalar(
+        select(func.min(PolicyChange.version)).where(
+            PolicyChange.policy_id == policy.policy_id
+        )
+    )
+    # versions before the first entry were never logged
+    if first is None or since < first - 1:
+        return None
+    changes = await db.execute(
+        select(PolicyChange.kind, PolicyChange.value, PolicyChange.added)
+        .where(
+            PolicyChange.policy_id == policy.policy_id,
+            PolicyChange.version > since,
+            PolicyChange.version <= policy.version,
+        )
+        .order_by(PolicyChange.id)
+    )
+    return fold_changes(changes.all(), school_id, user_id)
+
+
+def _schedule(windows) -> List[List[str]]:
+    return [[f"{hhmm(start)}-{hhmm(end)}" for start, end in day] for day in windows]
+
+
+async def _device_policy(
+    db: AsyncSession, current_user: User, device_id: UUID
+) -> Tuple[BlockingEvaluator, PolicySet]:
+    owned = await db.scalar(
+        select(UserDevice.id).where(
+            UserDevice.device_id == device_id,
+            UserDevice.user_id == current_user.id,
+        )
+    )
+    if not owned:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Device not found")
+    evaluator = await blocking_engine.evaluator(db, current_user.id)
+    if evaluator is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Student profile not found")
+    policy = (
+        await policy_sets.get(db, evaluator.policy_id)
+        if evaluator.policy_id is not None
+        else None
+    )
+    if policy is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "No blocking policy for this school"
+        )
+    return evaluator, policy
+
+
+async def sync_device_policy(
+    db: AsyncSession,
+    current_user: User,
+    device_id: UUID,
+    since: Optional[int] = None,
+    policy_id: Optional[UUID] = None,
+) -> Optional[DevicePolicyResponse]:
+    """The device's policy as a delta past ``since``, or ``None`` if unchanged.
+
+    ``policy_id`` is the policy the device synced last and is required with
+    ``since``: versions count per policy, so those of another policy say
+    nothing about this one and a moved school gets a full resend.
+    """
+    if since is not None and policy_id is None:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "policy_id is required with since"
+        )
+    evaluator, policy = await _device_policy(db, current_user, device_id)
+    same_policy = policy_id == policy.policy_id
+    if since is not None and same_policy and since == policy.version:
+        return None
+    delta = None
+    if since is not None and same_policy and since < policy.version:
+        delta = await _policy_delta(
+            db, policy, since, evaluator.school_id, current_user.id
+        )
+
+    response = DevicePolicyResponse(
+        policy_id=policy.policy_id,
+        version=policy.version,
+        snapshot=await policy_snapshots.publish(db, policy),
+        full=delta is None,
+        is_whitelist_app=policy.whitelist_apps,
+        is_whitelist_web=policy.whitelist_web,
+    )
+    # a full sync carries no lists: the device fetches the snapshot by hash,
+    # which schools sharing the rules also share in HTTP caches
+    if delta is not None:
+        apps, webs, schedule_changed = delta
+        response.packages_added = sorted(p for p, added in apps.items() if added)
+        response.packages_removed = sorted(p for p, added in apps.items() if not added)
+        response.domains_added = sorted(d for d, added in webs.items() if added)
+        response.domains_removed = sorted(d for d, added in webs.items() if not added)
+    if delta is None or delta[2]:
+        response.schedule = _schedule(
+            await school_windows(db, evaluator.school_id, evaluator.shift)
+        )
+    return response
+
+
+async def check_device_domains(
+    db: AsyncSession, current_user: User, device_id: UUID, data: DomainCheckRequest
+) -> DomainCheckResponse:
+    _, policy = await _device_policy(db, current_user, device_id)
+    return DomainCheckResponse(
+        policy_id=policy.policy_id,
+        version=policy.version,
+        blocked=policy.blocked_domains(data.hosts),
+    )
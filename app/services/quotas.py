@@ -0,0 +1,357 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.models import (
+    PolicyApp,
+    PolicyAssignment,
+    PolicyWeb,
+    QuotaUsage,
+    School,
+    StudentInfo,
+    UserApp,
+    UserDevice,
+    Website,
+)
+from app.schemas._policies import QuotaItem, QuotaStatus
+from app.services.scopes import STUDENT
+
+logger = logging.getLogger(__name__)
+
+APP = "app"
+WEB = "web"
+
+# (kind, target): target is a user_app id for apps and a domain for sites
+QuotaKey = Tuple[str, str]
+
+_PENDING = "pending_quota_usage"
+
+
+class DeviceQuota:
+    """Daily limits of one device and its used seconds as last read from the DB."""
+
+    def __init__(
+        self,
+        owner_id: UUID,
+        day: date,
+        limits: Dict[QuotaKey, int],
+        base: Dict[QuotaKey, float],
+    ):
+        self.owner_id = owner_id
+        self.day = day
+        self.limits = limits
+        self.base = base
+        self.loaded_at = monotonic()
+        self.polled_at = self.loaded_at
+
+
+class QuotaTracker:
+    """In-memory per-device, per-day usage counters with batched flushes.
+
+    Reads are served from memory. Deltas recorded by this process are kept
+    in ``_pending`` until the flusher upserts them, and ``base`` is re-read
+    periodically, so usage counted by other processes shows up within
+    ``QUOTA_REFRESH_SECONDS``. Days are local to ``QUOTA_TIMEZONE``.
+    """
+
+    def __init__(self):
+        self.tz = ZoneInfo(config.QUOTA_TIMEZONE)
+        self._devices: Dict[UUID, DeviceQuota] = {}
+        self._pending: Dict[Tuple[UUID, date, str, str], float] = defaultdict(float)
+        self._flushing: Dict[Tuple[UUID, date, str, str], float] = {}
+
+    def today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    def record(
+        self, user_device_id: UUID, key: QuotaKey, start: datetime, end: datetime
+    ) -> None:
+        """Count naive UTC ``[start, end)`` against ``key``, split at local midnight."""
+        start, end = start.replace(tzinfo=timezone.utc), end.replace(
+            tzinfo=timezone.utc
+        )
+        while start < end:
+            day = start.astimezone(self.tz).date()
+            midnight = datetime.combine(day + timedelta(days=1), time.min, self.tz)
+            stop = min(end, midnight)
+            self._pending[(user_device_id, day, *key)] += (stop - start).total_seconds()
+            start = stop
+
+    def record_on_commit(
+        self,
+        db: AsyncSession,
+        user_device_id: UUID,
+        key: QuotaKey,
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        """Like ``record``, once the transaction commits; a rollback drops it."""
+        session = getattr(db, "sync_session", db)
+        session.info.setdefault(_PENDING, {}).setdefault(self, []).append(
+            (user_device_id, key, start, end)
+        )
+
+    def add_seconds(self, user_device_id: UUID, key: QuotaKey, seconds: float) -> None:
+        self._pending[(user_device_id, self.today(), *key)] += seconds
+
+    def used(self, user_device_id: UUID, day: date, key: QuotaKey) -> float:
+        entry = self._devices.get(user_device_id)
+        base = entry.base.get(key, 0.0) if entry and entry.day == day else 0.0
+        counter = (user_device_id, day, *key)
+        return base + self._pending.get(counter, 0.0) + self._flushing.get(counter, 0.0)
+
+    def cached(self, user_device_id: UUID) -> Optional[DeviceQuota]:
+        entry = self._devices.get(user_device_id)
+        if entry is None or entry.day != self.today():
+            return None
+        entry.polled_at = monotonic()
+        return entry
+
+    async def load(self, db: AsyncSession, user_device_ids: Iterable[UUID]) -> None:
+        """(Re)load limits and today's usage for devices, in bulk."""
+        ids = list(user_device_ids)
+        if not ids:
+            return
+        today = self.today()
+        owners = dict(
+            (
+                await db.execute(
+                    select(UserDevice.id, UserDevice.user_id).where(
+                        UserDevice.id.in_(ids)
+                    )
+                )
+            ).all()
+        )
+        effective = func.coalesce(
+            PolicyAssignment.policy_id, School.effective_policy_id
+        )
+        policy = (
+            select(UserDevice.id.label("user_device_id"), effective.label("policy_id"))
+            .join(StudentInfo, StudentInfo.user_id == UserDevice.user_id)
+            .join(School, School.id == StudentInfo.school_id)
+            .outerjoin(
+                PolicyAssignment,
+                (PolicyAssignment.scope == STUDENT)
+                & (PolicyAssignment.scope_id == UserDevice.user_id),
+            )
+            .where(UserDevice.id.in_(ids), effective.isnot(None))
+            .subquery()
+        )
+        limits: Dict[UUID, Dict[QuotaKey, int]] = defaultdict(dict)
+        # durations are minutes per day
+        app_rows = await db.execute(
+            select(UserApp.user_device_id, UserApp.id, func.min(PolicyApp.duration))
+            .join(policy, policy.c.user_device_id == UserApp.user_device_id)
+            .join(
+                PolicyApp,
+                (PolicyApp.policy_id == policy.c.policy_id)
+                & (PolicyApp.app_id == UserApp.app_id),
+            )
+            .where(PolicyApp.duration.isnot(None))
+            .group_by(UserApp.user_device_id, UserApp.id)
+        )
+        for user_device_id, user_app_id, minutes in app_rows:
+            limits[user_device_id][(APP, str(user_app_id))] = minutes * 60
+        web_rows = await db.execute(
+            select(policy.c.user_device_id, Website.domain, PolicyWeb.duration)
+            .join(PolicyWeb, PolicyWeb.policy_id == policy.c.policy_id)
+            .join(Website, Website.id == PolicyWeb.website_id)
+            .where(PolicyWeb.duration.isnot(None))
+        )
+        for user_device_id, domain, minutes in web_rows:
+            limits[user_device_id][(WEB, domain.lower())] = minutes * 60
+
+        base: Dict[UUID, Dict[QuotaKey, float]] = defaultdict(dict)
+        usage_rows = await db.execute(
+            select(
+                QuotaUsage.user_device_id,
+                QuotaUsage.kind,
+                QuotaUsage.target,
+                QuotaUsage.used_seconds,
+            ).where(QuotaUsage.user_device_id.in_(ids), QuotaUsage.day == today)
+        )
+        for user_device_id, kind, target, seconds in usage_rows:
+            base[user_device_id][(kind, target)] = seconds
+
+        for user_device_id in ids:
+            if user_device_id not in owners:
+                self._devices.pop(user_device_id, None)
+                continue
+            previous = self._devices.get(user_device_id)
+            entry = DeviceQuota(
+                owners[user_device_id],
+                today,
+                limits.get(user_device_id, {}),
+                base.get(user_device_id, {}),
+            )
+            if previous is not None:
+                entry.polled_at = previous.polled_at
+            self._devices[user_device_id] = entry
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Upsert pending deltas in one statement; they are kept on failure."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, defaultdict(float)
+        self._flushing = pending
+        try:
+            # counters of devices deleted meanwhile would fail the whole batch
+            existing = set(
+                (
+                    await db.execute(
+                        select(UserDevice.id).where(
+                            UserDevice.id.in_({key[0] for key in pending})
+                        )
+                    )
+                ).scalars()
+            )
+            rows = [
+                {
+                    "user_device_id": user_device_id,
+                    "day": day,
+                    "kind": kind,
+                    "target": target,
+                    "used_seconds": seconds,
+                }
+                for (user_device_id, day, kind, target), seconds in pending.items()
+                if user_device_id in existing
+            ]
+            if rows:
+                stmt = insert(QuotaUsage).values(rows)
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[
+                            QuotaUsage.user_device_id,
+                            QuotaUsage.day,
+                            QuotaUsage.kind,
+                            QuotaUsage.target,
+                        ],
+                        set_={
+                            "used_seconds": QuotaUsage.used_seconds
+                            + stmt.excluded.used_seconds,
+                            "modified_at": func.now(),
+                        },
+                    )
+                )
+                await db.commit()
+        except Exception:
+            for key, seconds in pending.items():
+                self._pending[key] += seconds
+            raise
+        finally:
+            self._flushing = {}
+        for (user_device_id, day, kind, target), seconds in pending.items():
+            entry = self._devices.get(user_device_id)
+            if entry is not None and entry.day == day:
+                entry.base[(kind, target)] = entry.base.get((kind, target), 0) + seconds
+        return len(pending)
+
+    def stale(self) -> List[UUID]:
+        """Devices to reload; ones nobody polled for a while are dropped."""
+        now = monotonic()
+        today = self.today()
+        out = []
+        for user_device_id, entry in list(self._devices.items()):
+            if now - entry.polled_at > config.QUOTA_EVICT_SECONDS:
+                del self._devices[user_device_id]
+            elif (
+                entry.day != today
+                or now - entry.loaded_at > config.QUOTA_REFRESH_SECONDS
+            ):
+                out.append(user_device_id)
+        return out
+
+    def status(self, user_device_id: UUID, entry: DeviceQuota) -> QuotaStatus:
+        items = []
+        for (kind, target), limit in sorted(entry.limits.items()):
+            used = self.used(user_device_id, entry.day, (kind, target))
+            items.append(
+                QuotaItem(
+                    kind=kind,
+                    user_app_id=UUID(target) if kind == APP else None,
+                    domain=target if kind == WEB else None,
+                    limit_seconds=limit,
+                    used_seconds=int(used),
+                    remaining_seconds=max(0, int(limit - used)),
+                )
+            )
+        return QuotaStatus(user_device_id=user_device_id, day=entry.day, items=items)
+
+
+quota_tracker = QuotaTracker()
+
+
+@event.listens_for(Session, "after_commit")
+def _record_committed(session: Session) -> None:
+    for tracker, intervals in session.info.pop(_PENDING, {}).items():
+        for interval in intervals:
+            tracker.record(*interval)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+async def _device_quota(
+    db: AsyncSession, user_id: UUID, user_device_id: UUID
+) -> DeviceQuota:
+    entry = quota_tracker.cached(user_device_id)
+    if entry is None:
+        # cold start for this device; later polls are served from memory
+        await quota_tracker.load(db, [user_device_id])
+        entry = quota_tracker.cached(user_device_id)
+    if entry is None or entry.owner_id != user_id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Device not found")
+    return entry
+
+
+async def get_quota(
+    db: AsyncSession, user_id: UUID, user_device_id: UUID
+) -> QuotaStatus:
+    entry = await _device_quota(db, user_id, user_device_id)
+    return quota_tracker.status(user_device_id, entry)
+
+
+async def report_web_usage(
+    db: AsyncSession, user_id: UUID, user_device_id: UUID, domain: str, seconds: float
+) -> QuotaStatus:
+    entry = await _device_quota(db, user_id, user_device_id)
+    quota_tracker.add_seconds(user_device_id, (WEB, domain.lower()), seconds)
+    return quota_tracker.status(user_device_id, entry)
+
+
+class QuotaFlusher(BackgroundWorker):
+    """Writes counted seconds in batches and refreshes cached limits."""
+
+    name = "quota-flusher"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.QUOTA_FLUSH_INTERVAL
+
+    async def run_once(self) -> None:
+        async with AsyncSessionFactory() as db:
+            flushed = await quota_tracker.flush(db)
+            if flushed:
+                logger.debug("Flushed %d quota counters", flushed)
+            stale = quota_tracker.stale()
+            if stale:
+                await quota_tracker.load(db, stale)
+
+    async def on_stop(self) -> None:
+        async with AsyncSessionFactory() as db:
+            await quota_tracker.flush(db)
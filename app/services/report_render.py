@@ -0,0 +1,23 @@
+"""Report rendering run in the report process pool.
+
+Kept free of database and app imports so pool processes start quickly.
+"""
+
+import csv
+import io
+from typing import List, Sequence
+
+from app.core.pdf import render_table
+
+
+def render_report(
+    fmt: str, title: str, header: Sequence[str], rows: List[Sequence[str]]
+) -> bytes:
+    if fmt == "pdf":
+        return render_table(title, header, rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    writer.writerows(rows)
+    # the BOM makes Excel read the file as UTF-8
+    return buffer.getvalue().encode("utf-8-sig")
@@ -0,0 +1,376 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException, status
+from sqlalchemy import distinct, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.enums.enums import ActionDegrees, Shifts
+from app.models import LogRollup, ReportJob, School, StudentInfo, User, UserDevice
+from app.schemas._reports import ReportCreate, ReportJobResponse
+from app.services.report_render import render_report
+from app.services.scopes import SCHOOL, resolve_scope
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHOOL_WEEKLY = "school_weekly"
+MEDIA_TYPES = {"csv": "text/csv", "pdf": "application/pdf"}
+HEADER = [
+    "Student",
+    "Shift",
+    "Devices",
+    "Active days",
+    "Regular",
+    "Suspicious",
+    "Dangerous",
+]
+
+
+def report_params(data: ReportCreate) -> Dict[str, Any]:
+    return {
+        "kind": SCHOOL_WEEKLY,
+        "school_id": str(data.school_id),
+        "week_start": data.week_start.isoformat(),
+        "shift": data.shift.value if data.shift else None,
+        "format": data.format,
+    }
+
+
+def params_hash(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def report_path(file_hash: str, fmt: str) -> Path:
+    return Path(config.REPORT_DIR) / file_hash[:2] / f"{file_hash}.{fmt}"
+
+
+def store_report(content: bytes, fmt: str) -> str:
+    """Write ``content`` under its own hash; identical reports share one file."""
+    file_hash = hashlib.sha256(content).hexdigest()
+    path = report_path(file_hash, fmt)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{uuid4().hex}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+    return file_hash
+
+
+def week_bounds(week_start: date, tz: ZoneInfo) -> Tuple[datetime, datetime]:
+    """Local midnight to midnight of the week, as naive UTC like the rollups."""
+
+    def utc(day: date) -> datetime:
+        local = datetime.combine(day, time(), tz)
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return utc(week_start), utc(week_start + timedelta(days=7))
+
+
+async def request_report(
+    db: AsyncSession, current_user: User, data: ReportCreate
+) -> ReportJobResponse:
+    if data.week_start.weekday() != 0:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "week_start must be a Monday")
+    today = datetime.now(ZoneInfo(config.REPORT_TIMEZONE)).date()
+    # reports of finished weeks do not change, which makes sharing them safe
+    if data.week_start + timedelta(days=7) > today:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "The week is not over yet")
+    await resolve_scope(db, current_user, SCHOOL, data.school_id)
+    if await db.get(School, data.school_id) is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "School not found")
+
+    params = report_params(data)
+    digest = params_hash(params)
+    await db.execute(
+        insert(ReportJob)
+        .values(
+            id=uuid4(), params_hash=digest, params=params, requested_by=current_user.id
+        )
+        .on_conflict_do_nothing(index_elements=[ReportJob.params_hash])
+    )
+    job = (
+        (
+            await db.execute(
+                select(ReportJob)
+                .where(ReportJob.params_hash == digest)
+                .with_for_update()
+            )
+        )
+        .scalars()
+        .one()
+    )
+    lost = (
+        job.status == DONE and not report_path(job.file_hash, params["format"]).exists()
+    )
+    if job.status == FAILED or lost:
+        job.status = QUEUED
+        job.progress = 0.0
+        job.attempts = 0
+        job.error = None
+        job.finished_at = None
+    await db.commit()
+    await db.refresh(job)
+    return ReportJobResponse.model_validate(job)
+
+
+async def _authorized_job(
+    db: AsyncSession, current_user: User, job_id: UUID
+) -> ReportJob:
+    job = await db.get(ReportJob, job_id)
+    if job is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Report not found")
+    await resolve_scope(db, current_user, SCHOOL, UUID(job.params["school_id"]))
+    return job
+
+
+async def get_report_job(
+    db: AsyncSession, current_user: User, job_id: UUID
+) -> ReportJobResponse:
+    return ReportJobResponse.model_validate(
+        await _authorized_job(db, current_user, job_id)
+    )
+
+
+async def get_report_file(
+    db: AsyncSession, current_user: User, job_id: UUID
+) -> Tuple[Path, str, str]:
+    """Path, media type and download name of a finished report."""
+    job = await _authorized_job(db, current_user, job_id)
+    if job.status != DONE:
+        raise HTTPException(status.HTTP_409_CONFLICT, "Report is not ready")
+    fmt = job.params["format"]
+    path = report_path(job.file_hash, fmt)
+    if not path.exists():
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, "Report file is gone, request it again"
+        )
+    return path, MEDIA_TYPES[fmt], f"report-{job.params['week_start']}.{fmt}"
+
+
+async def report_rows(
+    db: AsyncSession, params: Dict[str, Any]
+) -> Tuple[str, List[str], List[List[str]]]:
+    """Title, header and rows of a weekly school report from the rollups."""
+    school = await db.get(School, UUID(params["school_id"]))
+    if school is None:
+        raise ValueError("School no longer exists")
+    week_start = date.fromisoformat(params["week_start"])
+    start, end = week_bounds(week_start, ZoneInfo(config.REPORT_TIMEZONE))
+
+    students_stmt = select(
+        StudentInfo.user_id,
+        StudentInfo.first_name,
+        StudentInfo.last_name,
+        StudentInfo.shift,
+    ).where(StudentInfo.school_id == school.id)
+    if params["shift"]:
+        students_stmt = students_stmt.where(
+            StudentInfo.shift == Shifts(params["shift"])
+        )
+    students = (
+        await db.execute(
+            students_stmt.order_by(StudentInfo.last_name, StudentInfo.first_name)
+        )
+    ).all()
+    ids = [s.user_id for s in students]
+
+    devices: Dict[UUID, int] = {}
+    days: Dict[UUID, int] = {}
+    events: Dict[UUID, Dict[ActionDegrees, int]] = defaultdict(dict)
+    if ids:
+        devices = dict(
+            (
+                await db.execute(
+                    select(UserDevice.user_id, func.count())
+                    .where(UserDevice.user_id.in_(ids), UserDevice.is_active)
+                    .group_by(UserDevice.user_id)
+                )
+            ).all()
+        )
+        in_week = (
+            select(
+                UserDevice.user_id, LogRollup.degree, LogRollup.hour, LogRollup.events
+            )
+            .join(UserDevice, UserDevice.id == LogRollup.user_device_id)
+            .where(
+                UserDevice.user_id.in_(ids),
+                LogRollup.hour >= start,
+                LogRollup.hour < end,
+            )
+            .subquery()
+        )
+        days = dict(
+            (
+                await db.execute(
+                    select(
+                        in_week.c.user_id,
+                        func.count(distinct(func.date_trunc("day", in_week.c.hour))),
+                    ).group_by(in_week.c.user_id)
+                )
+            ).all()
+        )
+        for user_id, degree, total in await db.execute(
+            select(
+                in_week.c.user_id, in_week.c.degree, func.sum(in_week.c.events)
+            ).group_by(in_week.c.user_id, in_week.c.degree)
+        ):
+            events[user_id][degree] = int(total)
+
+    rows = []
+    totals = [0] * 5
+    for s in students:
+        counts = events.get(s.user_id, {})
+        numbers = [
+            devices.get(s.user_id, 0),
+            days.get(s.user_id, 0),
+            counts.get(ActionDegrees.NEUTRAL, 0),
+            counts.get(ActionDegrees.SUSPICIOUS, 0),
+            counts.get(ActionDegrees.TERRIBLE, 0),
+        ]
+        totals = [a + b for a, b in zip(totals, numbers)]
+        name = " ".join(n for n in (s.last_name, s.first_name) if n)
+        rows.append([name, s.shift.value if s.shift else "", *map(str, numbers)])
+    rows.append(["Total", "", *map(str, totals)])
+
+    week_end = week_start + timedelta(days=6)
+    title = f"{school.name}: {week_start.isoformat()} - {week_end.isoformat()}"
+    if params["shift"]:
+        title += f", {params['shift']} shift"
+    return title, HEADER, rows
+
+
+async def _update_job(db: AsyncSession, job_id: UUID, **values) -> None:
+    """Updates the job and extends its lease, unless ``locked_until`` is given."""
+    values.setdefault(
+        "locked_until",
+        func.localtimestamp() + timedelta(seconds=config.REPORT_LEASE_SECONDS),
+    )
+    await db.execute(update(ReportJob).where(ReportJob.id == job_id).values(**values))
+    await db.commit()
+
+
+async def claim_job(db: AsyncSession) -> Optional[ReportJob]:
+    """Take the oldest queued job, or a running one whose worker went away.
+
+    A job whose workers kept going away is given up once it has used up
+    its attempts, like one that kept failing.
+    """
+    expired = (ReportJob.status == RUNNING) & (
+        ReportJob.locked_until < func.localtimestamp()
+    )
+    await db.execute(
+        update(ReportJob)
+        .where(expired, ReportJob.attempts >= config.REPORT_MAX_ATTEMPTS)
+        .values(
+            status=FAILED,
+            error="Worker lost too many times",
+            locked_until=None,
+            finished_at=func.localtimestamp(),
+        )
+    )
+    job = (
+        (
+            await db.execute(
+                select(ReportJob)
+                .where(or_(ReportJob.status == QUEUED, expired))
+                .order_by(ReportJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+        )
+        .scalars()
+        .first()
+    )
+    if job is not None:
+        await _update_job(
+            db, job.id, status=RUNNING, progress=0.05, attempts=job.attempts + 1
+        )
+        await db.refresh(job)
+    return job
+
+
+async def build_report(
+    db: AsyncSession, job: ReportJob, pool: ProcessPoolExecutor
+) -> None:
+    # a rollback expires the job, so nothing is read from it afterwards
+    job_id, attempts, params = job.id, job.attempts, job.params
+    fmt = params["format"]
+    try:
+        title, header, rows = await report_rows(db, params)
+        await _update_job(db, job_id, progress=0.4)
+        content = await asyncio.get_running_loop().run_in_executor(
+            pool, render_report, fmt, title, header, rows
+        )
+        await _update_job(db, job_id, progress=0.8)
+        file_hash = await asyncio.to_thread(store_report, content, fmt)
+    except Exception as e:
+        await db.rollback()
+        logger.error("Report %s failed", job_id, exc_info=True)
+        retry = attempts < config.REPORT_MAX_ATTEMPTS
+        await _update_job(
+            db,
+            job_id,
+            status=QUEUED if retry else FAILED,
+            error=str(e) or type(e).__name__,
+            locked_until=None,
+        )
+        return
+    await db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == job_id)
+        .values(
+            status=DONE,
+            progress=1.0,
+            file_hash=file_hash,
+            error=None,
+            locked_until=None,
+            finished_at=func.localtimestamp(),
+        )
+    )
+    await db.commit()
+    logger.info("Built %s report %s (%d bytes)", fmt, job_id, len(content))
+
+
+class ReportWorker(BackgroundWorker):
+    """Builds queued reports, rendering them in a pool of processes."""
+
+    name = "report-worker"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.REPORT_INTERVAL
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def _drain(self) -> None:
+        async with AsyncSessionFactory() as db:
+            while (job := await claim_job(db)) is not None:
+                await build_report(db, job, self._pool)
+
+    async def run_once(self) -> None:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=config.REPORT_PROCESSES)
+        # one job per pool process at a time
+        await asyncio.gather(*(self._drain() for _ in range(config.REPORT_PROCESSES)))
+
+    async def on_stop(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
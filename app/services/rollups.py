@@ -0,0 +1,95 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import config
+from app.core.database import AsyncSessionFactory
+from app.core.workers import BackgroundWorker
+from app.enums.enums import ActionDegrees
+from app.models import Action, Log, LogRollup
+from app.services._logs import effective_degree
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_rollups(db: AsyncSession, since: datetime) -> int:
+    """Recount every (device, hour) with logs inserted or extended since ``since``.
+
+    The touched hours are recounted in full and upserted, so running it
+    again over the same range is harmless. A coalesced run is counted in the
+    hour of its first event.
+    """
+    hour = func.date_trunc("hour", Log.done_at)
+    touched = (
+        select(Log.user_device_id, hour.label("hour"))
+        .where(Log.modified_at >= since)
+        .distinct()
+        .cte("touched")
+    )
+    degree = func.coalesce(
+        effective_degree, literal(ActionDegrees.NEUTRAL, LogRollup.degree.type)
+    )
+    counts = (
+        select(
+            Log.user_device_id,
+            hour,
+            Log.action_id,
+            degree,
+            func.sum(Log.count),
+        )
+        .join(Action, Action.id == Log.action_id)
+        .join(
+            touched,
+            (touched.c.user_device_id == Log.user_device_id)
+            & (Log.done_at >= touched.c.hour)
+            & (Log.done_at < touched.c.hour + timedelta(hours=1)),
+        )
+        .group_by(Log.user_device_id, hour, Log.action_id, degree)
+    )
+    stmt = insert(LogRollup).from_select(
+        ["user_device_id", "hour", "action_id", "degree", "events"], counts
+    )
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[
+                LogRollup.user_device_id,
+                LogRollup.hour,
+                LogRollup.action_id,
+                LogRollup.degree,
+            ],
+            set_={"events": stmt.excluded.events, "modified_at": func.now()},
+        )
+    )
+    return result.rowcount
+
+
+class LogRollupBuilder(BackgroundWorker):
+    """Keeps ``log_rollups`` current from the logs modified since its last run.
+
+    The watermark is the database time at the start of the previous run,
+    moved back by ``ROLLUP_OVERLAP_SECONDS`` so rows of transactions that
+    were still open then are picked up too. After a restart the last
+    ``ROLLUP_LOOKBACK_HOURS`` are recounted.
+    """
+
+    name = "log-rollup-builder"
+
+    def __init__(self):
+        super().__init__()
+        self.interval = config.ROLLUP_INTERVAL
+        self.since: Optional[datetime] = None
+
+    async def run_once(self) -> None:
+        async with AsyncSessionFactory() as db:
+            started = await db.scalar(select(func.localtimestamp()))
+            since = self.since or started - timedelta(
+                hours=config.ROLLUP_LOOKBACK_HOURS
+            )
+            updated = await refresh_rollups(db, since)
+            await db.commit()
+        self.since = started - timedelta(seconds=config.ROLLUP_OVERLAP_SECONDS)
+        logger.debug("Refreshed %d log rollup rows", updated)
@@ -0,0 +1,141 @@
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.enums.enums import UserRole
+from app.models import District, School, StaffScope, User
+from app.schemas._staff import StaffScopeResponse, StaffScopeUpdate
+
+SCHOOL = "school"
+DISTRICT = "district"
+REGION = "region"
+COUNTRY = "country"
+SCOPES = (SCHOOL, DISTRICT, REGION, COUNTRY)
+# below a school, only policies are assigned per student
+STUDENT = "student"
+# the whole country is a single scope
+COUNTRY_ID = UUID(int=0)
+
+ROLE_SCOPES = {
+    UserRole.TEACHER.value: SCHOOL,
+    UserRole.DEPUTY_PRINCIPAL.value: SCHOOL,
+    UserRole.PRINCIPAL.value: SCHOOL,
+    UserRole.DISTRICT_PRINCIPAL.value: DISTRICT,
+    UserRole.REGIONAL_PRINCIPAL.value: REGION,
+}
+
+
+async def caller_scope(db: AsyncSession, current_user: User) -> Tuple[str, UUID]:
+    """The school, district or region the user answers for; ministry sees all."""
+    if current_user.user_role_name == UserRole.MINISTRY.value:
+        return COUNTRY, COUNTRY_ID
+    kind = ROLE_SCOPES.get(current_user.user_role_name)
+    if kind is None:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Only staff can view analytics")
+    assignment = await db.get(StaffScope, current_user.id)
+    scope_id = getattr(assignment, f"{kind}_id") if assignment else None
+    if scope_id is None:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, f"No {kind} is assigned to this user"
+        )
+    return kind, scope_id
+
+
+async def _contains(
+    db: AsyncSession, outer: str, outer_id: UUID, kind: str, scope_id: UUID
+) -> bool:
+    if outer == kind:
+        return outer_id == scope_id
+    if outer == COUNTRY:
+        return True
+    if kind == SCHOOL:
+        school = await db.get(School, scope_id)
+        if school is None:
+            return False
+        return {DISTRICT: school.district_id, REGION: school.region_id}[
+            outer
+        ] == outer_id
+    if kind == DISTRICT and outer == REGION:
+        district = await db.get(District, scope_id)
+        return district is not None and district.parent_region == outer_id
+    return False
+
+
+async def resolve_scope(
+    db: AsyncSession,
+    current_user: User,
+    kind: Optional[str],
+    scope_id: Optional[UUID],
+) -> Tuple[str, UUID]:
+    """The requested scope if it lies within the caller's, else 403.
+
+    Without a requested scope the caller's own one is used.
+    """
+    own, own_id = await caller_scope(db, current_user)
+    if kind is None:
+        return own, own_id
+    if kind == COUNTRY:
+        scope_id = COUNTRY_ID
+    elif scope_id is None:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "scope_id is required")
+    if not await _contains(db, own, own_id, kind, scope_id):
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, f"This {kind} is outside of your scope"
+        )
+    return kind, scope_id
+
+
+async def get_staff_scope(
+    db: AsyncSession, current_user: User, user_id: UUID
+) -> StaffScopeResponse:
+    if current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Only admins can view scopes")
+    assignment = await db.get(StaffScope, user_id)
+    if assignment is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "No scope assigned")
+    return StaffScopeResponse.model_validate(assignment)
+
+
+async def set_staff_scope(
+    db: AsyncSession, current_user: User, user_id: UUID, data: StaffScopeUpdate
+) -> StaffScopeResponse:
+    if current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Only admins can assign scopes")
+    user = await db.get(User, user_id)
+    if user is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
+    kind = ROLE_SCOPES.get(user.user_role_name)
+    if kind is None:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "Only school, district and regional staff"
+        )
+
+    values = data.model_dump()
+    # the rest of the hierarchy follows from the school or district
+    if values["school_id"] is not None:
+        school = await db.get(School, values["school_id"])
+        if school is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "School not found")
+        values["district_id"] = school.district_id
+        values["region_id"] = school.region_id
+    elif values["district_id"] is not None:
+        district = await db.get(District, values["district_id"])
+        if district is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "District not found")
+        values["region_id"] = district.parent_region
+    if values[f"{kind}_id"] is None:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, f"A {kind} is required for this role"
+        )
+
+    assignment = await db.get(StaffScope, user_id)
+    if assignment is None:
+        assignment = StaffScope(user_id=user_id)
+        db.add(assignment)
+    for key, value in values.items():
+        setattr(assignment, key, value)
+    await db.commit()
+    await db.refresh(assignment)
+    return StaffScopeResponse.model_validate(assignment)
@@ -0,0 +1,385 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from time import monotonic
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import delete, distinct, event, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.enums.enums import UserRole
+from app.models import Action
+from app.models import App as AppModel
+from app.models import Log, UsageSession, User, UserApp, UserDevice
+from app.schemas._logs import AppInfo, AppUsage
+from app.services.quotas import APP, quota_tracker
+
+logger = logging.getLogger(__name__)
+
+_close_action_ids: Optional[Set[UUID]] = None
+_close_actions_loaded = 0.0
+
+# session.info key set when a flush touched actions
+_ACTIONS_CHANGED = "close_actions_stale"
+
+
+async def close_action_ids(db: AsyncSession) -> Set[UUID]:
+    """Ids of the actions that end a session (``USAGE_CLOSE_ACTIONS``).
+
+    Cached for ``USAGE_CLOSE_ACTIONS_REFRESH_SECONDS``, so actions created
+    by other processes are picked up; commits in this process that touch
+    actions drop the cache right away.
+    """
+    global _close_action_ids, _close_actions_loaded
+    now = monotonic()
+    if (
+        _close_action_ids is None
+        or now - _close_actions_loaded > config.USAGE_CLOSE_ACTIONS_REFRESH_SECONDS
+    ):
+        _close_action_ids = set(
+            (
+                await db.execute(
+                    select(Action.id).where(Action.name.in_(config.USAGE_CLOSE_ACTIONS))
+                )
+            ).scalars()
+        )
+        _close_actions_loaded = now
+    return _close_action_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _note_action_changes(session, flush_context):
+    if any(
+        isinstance(obj, Action)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info[_ACTIONS_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_close_actions(session):
+    global _close_action_ids
+    if session.info.pop(_ACTIONS_CHANGED, False):
+        _close_action_ids = None
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_close_actions(session):
+    session.info.pop(_ACTIONS_CHANGED, None)
+
+
+def _idle() -> timedelta:
+    return timedelta(seconds=config.USAGE_SESSION_IDLE_SECONDS)
+
+
+def sessionize(
+    device: np.ndarray,
+    app: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    close: np.ndarray,
+    idle: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Split events into usage sessions with vectorized diffs.
+
+    Events must be sorted by device, then ``start``. ``device`` and ``app``
+    are integer codes (``app`` is -1 for app-less close events), ``start``
+    and ``end`` are int64 microseconds, since a coalesced log spans several
+    events, and ``idle`` is in microseconds too.
+
+    A session is a run of events of one app on one device with gaps of at
+    most ``idle`` that stops after a close event. When another event follows
+    within ``idle`` the session ends where that event starts. Returns the index
+    of each session's first event, its start, its end and whether it is
+    closed; only the last session of a device can be left open.
+    """
+    n = len(device)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, np.empty(0, dtype=bool)
+
+    new = np.ones(n, dtype=bool)
+    new[1:] = (
+        (device[1:] != device[:-1])
+        | (app[1:] != app[:-1])
+        | (start[1:] - end[:-1] > idle)
+        | close[:-1]
+    )
+    first = np.flatnonzero(new)
+    last = np.append(first[1:] - 1, n - 1)
+    run_end = np.maximum.reduceat(end, first)
+
+    nxt = np.minimum(last + 1, n - 1)
+    followed = (last + 1 < n) & (device[nxt] == device[last])
+    switch = followed & ~close[last] & (start[nxt] - run_end <= idle)
+    ended = np.where(switch, np.maximum(start[nxt], run_end), run_end)
+    closed = close[last] | followed
+
+    # a lone close event (or an app-less one like screen off) opens nothing
+    keep = (app[first] >= 0) & ~(close[first] & (first == last))
+    return first[keep], start[first][keep], ended[keep], closed[keep]
+
+
+def _sessions_from_rows(rows: List[Any]) -> List[Dict[str, Any]]:
+    """Rows of (user_device_id, user_app_id, done_at, last_at, is_close)."""
+    n = len(rows)
+    if not n:
+        return []
+    devices: Dict[UUID, int] = {}
+    apps: Dict[Optional[UUID], int] = {None: -1}
+    device = np.fromiter(
+        (devices.setdefault(r[0], len(devices)) for r in rows), np.int64, n
+    )
+    app = np.fromiter((apps.setdefault(r[1], len(apps)) for r in rows), np.int64, n)
+    start = np.array([r[2] for r in rows], dtype="datetime64[us]").astype(np.int64)
+    end = np.array([r[3] or r[2] for r in rows], dtype="datetime64[us]")
+    close = np.fromiter((bool(r[4]) for r in rows), bool, n)
+
+    idle = int(_idle() / timedelta(microseconds=1))
+    first, started, ended, closed = sessionize(
+        device, app, start, end.astype(np.int64), close, idle
+    )
+    started = started.astype("datetime64[us]").tolist()
+    ended = ended.astype("datetime64[us]").tolist()
+    return [
+        {
+            "user_device_id": rows[i][0],
+            "user_app_id": rows[i][1],
+            "started_at": s,
+            "ended_at": e,
+            "is_closed": bool(c),
+        }
+        for i, s, e, c in zip(first.tolist(), started, ended, closed)
+    ]
+
+
+def _extend(db: AsyncSession, session: UsageSession, until: datetime) -> None:
+    if until > session.ended_at:
+        quota_tracker.record_on_commit(
+            db,
+            session.user_device_id,
+            (APP, str(session.user_app_id)),
+            session.ended_at,
+            until,
+        )
+        session.ended_at = until
+
+
+def _advance(
+    db: AsyncSession,
+    user_device_id: UUID,
+    current: Optional[UsageSession],
+    event: Tuple[datetime, datetime, Optional[UUID], bool],
+) -> Optional[UsageSession]:
+    """Apply one event to the device's latest session, as ``sessionize`` would."""
+    start, end, user_app_id, is_close = event
+    if current is not None and not current.is_closed:
+        gap = start - current.ended_at
+        if current.user_app_id == user_app_id and gap <= _idle():
+            _extend(db, current, end)
+            current.is_closed = is_close
+            return current
+        if gap <= _idle():
+            _extend(db, current, start)
+        current.is_closed = True
+    if user_app_id is None or is_close:
+        return current
+    quota_tracker.record_on_commit(
+        db, user_device_id, (APP, str(user_app_id)), start, end
+    )
+    session = UsageSession(
+        user_device_id=user_device_id,
+        user_app_id=user_app_id,
+        started_at=start,
+        ended_at=end,
+        is_closed=is_close,
+    )
+    db.add(session)
+    return session
+
+
+async def track_usage(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Extend or open usage sessions for freshly stored log rows.
+
+    The latest session of each device is locked, so concurrent ingest for a
+    device is serialized. Events older than that session are left to the
+    backfill.
+    """
+    close_ids = await close_action_ids(db)
+    events = defaultdict(list)
+    for row in rows:
+        is_close = row["action_id"] in close_ids
+        if row.get("user_app_id") is None and not is_close:
+            continue
+        events[row["user_device_id"]].append(
+            (
+                row["done_at"],
+                row.get("last_at") or row["done_at"],
+                row.get("user_app_id"),
+                is_close,
+            )
+        )
+    if not events:
+        return
+
+    latest_ids = (
+        select(UsageSession.id)
+        .distinct(UsageSession.user_device_id)
+        .where(UsageSession.user_device_id.in_(list(events)))
+        .order_by(UsageSession.user_device_id, UsageSession.started_at.desc())
+    )
+    latest = {
+        s.user_device_id: s
+        for s in (
+            await db.execute(
+                select(UsageSession)
+                .where(UsageSession.id.in_(latest_ids))
+                .with_for_update()
+            )
+        ).scalars()
+    }
+    for user_device_id, device_events in events.items():
+        current = latest.get(user_device_id)
+        for ev in sorted(device_events, key=lambda e: e[0]):
+            if current is not None and ev[0] < current.started_at:
+                continue
+            current = _advance(db, user_device_id, current, ev)
+    await db.flush()
+
+
+async def backfill_usage_sessions(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    device_batch: Optional[int] = None,
+) -> int:
+    """Rebuild the sessions starting in [start, end) from logs.
+
+    Devices are processed in batches, each reading its logs in ``done_at``
+    order and committing on its own. Run it over whole days: a session that
+    crosses ``start`` is split there.
+    """
+    device_batch = device_batch or config.USAGE_BACKFILL_DEVICE_BATCH
+    close_ids = list(await close_action_ids(db))
+    in_window = (Log.done_at >= start, Log.done_at < end)
+    device_ids = (
+        (await db.execute(select(distinct(Log.user_device_id)).where(*in_window)))
+        .scalars()
+        .all()
+    )
+
+    created = 0
+    for i in range(0, len(device_ids), device_batch):
+        chunk = device_ids[i : i + device_batch]
+        rows = (
+            await db.execute(
+                select(
+                    Log.user_device_id,
+                    Log.user_app_id,
+                    Log.done_at,
+                    Log.last_at,
+                    Log.action_id.in_(close_ids),
+                )
+                .where(
+                    Log.user_device_id.in_(chunk),
+                    *in_window,
+                    or_(Log.user_app_id.isnot(None), Log.action_id.in_(close_ids)),
+                )
+                .order_by(Log.user_device_id, Log.done_at)
+            )
+        ).all()
+        await db.execute(
+            delete(UsageSession).where(
+                UsageSession.user_device_id.in_(chunk),
+                UsageSession.started_at >= start,
+                UsageSession.started_at < end,
+            )
+        )
+        sessions = _sessions_from_rows(rows)
+        if sessions:
+            await db.execute(insert(UsageSession).values(sessions))
+        await db.commit()
+        created += len(sessions)
+        logger.info(
+            "Rebuilt %d usage sessions for %d devices", len(sessions), len(chunk)
+        )
+    return created
+
+
+async def get_app_usage(
+    db: AsyncSession,
+    current_user: User,
+    day: Optional[date],
+    user_device_id: Optional[UUID],
+) -> List[AppUsage]:
+    if current_user.user_role_name not in (
+        UserRole.STUDENT.value,
+        UserRole.PARENT.value,
+        UserRole.MINISTRY.value,
+    ):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Access denied")
+
+    day_start = datetime.combine(day or date.today(), time.min)
+    day_end = day_start + timedelta(days=1)
+    seconds = func.sum(
+        func.extract(
+            "epoch",
+            func.least(UsageSession.ended_at, day_end)
+            - func.greatest(UsageSession.started_at, day_start),
+        )
+    )
+    stmt = (
+        select(
+            UserApp.id,
+            AppModel,
+            seconds.label("seconds"),
+            func.count(UsageSession.id),
+        )
+        .join(UserApp, UserApp.id == UsageSession.user_app_id)
+        .join(AppModel, AppModel.id == UserApp.app_id)
+        .join(UserDevice, UserDevice.id == UsageSession.user_device_id)
+        .where(
+            UserDevice.user_id == current_user.id,
+            # lets the started_at index bound the scan; sessions are short
+            UsageSession.started_at >= day_start - timedelta(days=1),
+            UsageSession.started_at < day_end,
+            UsageSession.ended_at > day_start,
+        )
+        .group_by(UserApp.id, AppModel.id)
+        .order_by(seconds.desc())
+    )
+    if user_device_id:
+        stmt = stmt.where(UsageSession.user_device_id == user_device_id)
+
+    return [
+        AppUsage(
+            user_app_id=user_app_id,
+            app=AppInfo(id=app.id, name=app.name, package_name=app.package),
+            seconds=float(total or 0),
+            sessions=count,
+        )
+        for user_app_id, app, total, count in (await db.execute(stmt)).all()
+    ]
+
+
+async def rebuild_usage(
+    db: AsyncSession, current_user: User, start_date: date, end_date: date
+) -> int:
+    if current_user.user_role_name != UserRole.MINISTRY.value:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, "Only admins can rebuild usage sessions"
+        )
+    if end_date < start_date:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "end_date must not be before start_date"
+        )
+    return await backfill_usage_sessions(
+        db,
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min),
+    )
@@ -0,0 +1,88 @@
+"""End-to-end latency of the parent alert fan-out.
+
+Publishes events at a fixed rate and measures the time from publishing to
+delivery through the queue, recipient resolution, coalescing and the
+channels. Recipients come from a stub resolver with a configurable delay
+standing in for the database round trip, and messages go to an in-memory
+channel, so no database is needed.
+
+    python -m benchmarks.alert_fanout --events 20000 --rate 2000 --students 5000
+"""
+
+import argparse
+import asyncio
+import random
+from uuid import uuid4
+
+from app.services.notifications import (
+    TERRIBLE_ACTION,
+    AlertFanout,
+    Channel,
+    ParentEvent,
+    Recipient,
+)
+
+
+class NullChannel(Channel):
+    name = "null"
+    uses_db = False
+
+    def __init__(self):
+        self.messages = 0
+
+    async def deliver(self, db, messages) -> None:
+        self.messages += len(messages)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=2_000, help="events per second")
+    parser.add_argument("--students", type=int, default=5_000)
+    parser.add_argument("--resolve-ms", type=float, default=2.0)
+    parser.add_argument("--coalesce", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    families = {
+        uuid4(): [Recipient(uuid4(), "+998900000000", None, "Student")] * 2
+        for _ in range(args.students)
+    }
+    students = list(families)
+
+    async def resolver(db, student_ids):
+        await asyncio.sleep(args.resolve_ms / 1000)
+        return {s: families[s] for s in student_ids}
+
+    channel = NullChannel()
+    fanout = AlertFanout([channel], resolver=resolver, coalesce_seconds=args.coalesce)
+
+    async def produce():
+        for _ in range(args.events):
+            fanout.publish(
+                ParentEvent(TERRIBLE_ACTION, rng.choice(students), {"action": "x"})
+            )
+            await asyncio.sleep(1 / args.rate)
+
+    async def consume():
+        while not producer.done() or not fanout.queue.empty():
+            await fanout.pump(timeout=0.05)
+
+    producer = asyncio.create_task(produce())
+    await consume()
+    held = sum(len(h) for h in fanout._held.values())
+
+    summary = fanout.latency.summary()
+    print(
+        f"{args.events} events -> {channel.messages} messages, "
+        f"{held} held for coalescing"
+    )
+    print(
+        "latency ms: "
+        + " ".join(f"{k}={summary[k] * 1000:.2f}" for k in ("p50", "p95", "p99", "max"))
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
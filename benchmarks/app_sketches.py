@@ -0,0 +1,56 @@
+"""Time to answer a top-apps query from stored daily sketches.
+
+Builds one sketch per day with a skewed app distribution, serializes them
+the way they are stored, then times deserializing and merging them into a
+top-k answer, which is all the endpoint does besides one SELECT.
+
+    python -m benchmarks.app_sketches --days 31 --apps 5000 --devices 20000
+"""
+
+import argparse
+import random
+import time
+from uuid import uuid4
+
+from app.core.sketches import hash64
+from app.services.app_sketches import AppSketch, _merge_payloads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--apps", type=int, default=5_000)
+    parser.add_argument("--devices", type=int, default=20_000)
+    parser.add_argument("--events", type=int, default=50_000, help="per day")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    apps = [uuid4() for _ in range(args.apps)]
+    payloads = []
+    for _ in range(args.days):
+        counts = {}
+        for _ in range(args.events):
+            app_id = apps[min(int(rng.paretovariate(1.1)) - 1, args.apps - 1)]
+            entry = counts.setdefault(app_id, [0, set()])
+            entry[0] += 1
+            entry[1].add(hash64(rng.randrange(args.devices).to_bytes(8, "little")))
+        sketch = AppSketch.empty()
+        for app_id, (events, devices) in counts.items():
+            sketch.add(app_id, events, devices)
+        payloads.append(sketch.to_bytes())
+
+    size = sum(len(p) for p in payloads) / len(payloads)
+    runs = []
+    for _ in range(5):
+        started = time.perf_counter()
+        top = _merge_payloads(payloads).top_k(args.k)
+        runs.append(time.perf_counter() - started)
+    print(f"{args.days} sketches of {size / 1024:.1f} KiB on average")
+    print(f"merge + top-{args.k}: {min(runs) * 1000:.1f} ms (best of 5)")
+    for app_id, events, devices in top[:3]:
+        print(f"  {app_id}: ~{events} events on ~{devices} devices")
+
+
+if __name__ == "__main__":
+    main()
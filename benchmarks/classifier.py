@@ -0,0 +1,86 @@
+"""Classification throughput in events per second on one core.
+
+Builds a synthetic rule set of keywords, domains, packages and regexes and
+classifies generated log details with it. No database is needed.
+
+    python -m benchmarks.classifier --rules 5000 --events 100000
+"""
+
+import argparse
+import random
+import string
+import time
+from uuid import uuid4
+
+from app.enums.enums import ActionDegrees, RuleKinds
+from app.services.classifier import RuleSet
+
+WORDS = [
+    "".join(random.Random(i).choices(string.ascii_lowercase, k=6 + i % 5))
+    for i in range(20_000)
+]
+DEGREES = [ActionDegrees.SUSPICIOUS, ActionDegrees.TERRIBLE]
+
+
+def make_rules(count: int, regexes: int, rng: random.Random):
+    rules = []
+    for i in range(count):
+        kind = (RuleKinds.KEYWORD, RuleKinds.DOMAIN, RuleKinds.PACKAGE)[i % 3]
+        word = rng.choice(WORDS)
+        pattern = {
+            RuleKinds.KEYWORD: word,
+            RuleKinds.DOMAIN: f"{word}.com",
+            RuleKinds.PACKAGE: f"com.{word}",
+        }[kind]
+        rules.append((uuid4(), kind, pattern, rng.choice(DEGREES)))
+    for i in range(regexes):
+        rules.append(
+            (uuid4(), RuleKinds.REGEX, rf"{rng.choice(WORDS)}\d+", rng.choice(DEGREES))
+        )
+    return rules
+
+
+def make_events(count: int, rng: random.Random):
+    return [
+        {
+            "query": " ".join(rng.choices(WORDS, k=rng.randint(2, 8))),
+            "url": f"https://www.{rng.choice(WORDS)}.com/{rng.choice(WORDS)}",
+            "package": f"com.{rng.choice(WORDS)}.app",
+        }
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", type=int, default=5_000)
+    parser.add_argument("--regexes", type=int, default=50)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    rules = RuleSet(make_rules(args.rules, args.regexes, rng))
+    compiled = time.perf_counter() - started
+    events = make_events(args.events, rng)
+
+    matched = 0
+    started = time.perf_counter()
+    for details in events:
+        if rules.classify(details).degree is not None:
+            matched += 1
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{rules.size} rules ({rules.keywords.size} automaton states) "
+        f"compiled in {compiled * 1000:.0f} ms"
+    )
+    print(
+        f"{args.events / elapsed:,.0f} events/s/core, "
+        f"{elapsed / args.events * 1e6:.1f} us/event, {matched} matched"
+    )
+
+
+if __name__ == "__main__":
+    main()
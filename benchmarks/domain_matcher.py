@@ -0,0 +1,73 @@
+"""Host lookups per second against a policy's website list.
+
+Builds a blocklist of random registrable domains and times the batch check
+the devices endpoint runs, 1000 hosts a call, for two workloads: every host distinct (the cold path, one set probe per
+label) and hosts drawn from a skewed distribution, the way devices revisit
+the same sites (mostly answered from the memo).
+
+    python -m benchmarks.domain_matcher --domains 100000 --hosts 1000000
+"""
+
+import argparse
+import random
+import string
+import time
+from uuid import uuid4
+
+from app.services.policy_sets import PolicySet
+
+TLDS = ["uz", "com", "ru", "net", "org", "info"]
+
+
+def _label(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+
+def _time(policy: PolicySet, hosts) -> float:
+    started = time.perf_counter()
+    for i in range(0, len(hosts), 1000):
+        policy.blocked_domains(hosts[i : i + 1000])
+    return len(hosts) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--domains", type=int, default=100_000)
+    parser.add_argument("--hosts", type=int, default=1_000_000)
+    parser.add_argument("--blocked-share", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    domains = [f"{_label(rng)}.{rng.choice(TLDS)}" for _ in range(args.domains)]
+    distinct = [
+        (
+            f"www.{rng.choice(domains)}"
+            if rng.random() < args.blocked_share
+            else f"{_label(rng)}.{_label(rng)}.{rng.choice(TLDS)}"
+        )
+        for _ in range(args.hosts)
+    ]
+    skewed = [
+        distinct[min(int(rng.paretovariate(1.0)), args.hosts) - 1]
+        for _ in range(args.hosts)
+    ]
+
+    def fresh() -> PolicySet:
+        return PolicySet(
+            policy_id=uuid4(),
+            version=1,
+            whitelist_apps=False,
+            packages=frozenset(),
+            whitelist_web=False,
+            domains=frozenset(domains),
+        )
+
+    cold = _time(fresh(), distinct)
+    warm = _time(fresh(), skewed)
+    print(f"{args.domains} listed domains, {args.hosts} lookups per workload")
+    print(f"distinct hosts: {cold / 1e6:.2f}M lookups/s")
+    print(f"skewed hosts:   {warm / 1e6:.2f}M lookups/s")
+
+
+if __name__ == "__main__":
+    main()
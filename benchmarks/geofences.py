@@ -0,0 +1,49 @@
+"""Single and batch lookups against a country's worth of school geofences.
+
+python -m benchmarks.geofences
+"""
+
+import random
+import time
+
+from app.core.geo import GeofenceIndex
+
+SCHOOLS = 10_000
+POINTS = 200_000
+
+
+def main() -> None:
+    rng = random.Random(1)
+    # roughly Uzbekistan's bounding box
+    fences = [
+        (i, rng.uniform(37.2, 45.6), rng.uniform(56.0, 73.1), rng.uniform(100, 600))
+        for i in range(SCHOOLS)
+    ]
+    index = GeofenceIndex(fences)
+    # half the pings land at a school, the rest anywhere
+    lats, lons = [], []
+    for _ in range(POINTS):
+        if rng.random() < 0.5:
+            _, lat, lon, _ = rng.choice(fences)
+            lat, lon = lat + rng.uniform(-0.003, 0.003), lon + rng.uniform(
+                -0.003, 0.003
+            )
+        else:
+            lat, lon = rng.uniform(37.2, 45.6), rng.uniform(56.0, 73.1)
+        lats.append(lat)
+        lons.append(lon)
+
+    started = time.perf_counter()
+    single = [index.locate(lat, lon) for lat, lon in zip(lats, lons)]
+    elapsed = time.perf_counter() - started
+    print(f"locate:      {elapsed / POINTS * 1e6:.2f} us/point")
+
+    started = time.perf_counter()
+    batch = index.locate_many(lats, lons)
+    elapsed = time.perf_counter() - started
+    print(f"locate_many: {elapsed / POINTS * 1e6:.2f} us/point")
+    assert batch == single
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Bytes per row and insert throughput of inline vs interned log details.
+
+Runs against a migrated database inside transactions that are rolled back.
+Rows go to temporary copies of ``logs`` and ``log_payloads``, which shadow
+the real tables for the benchmark connection.
+
+    python -m benchmarks.log_payloads --rows 50000 --distinct 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import config
+from app.models import Log
+from app.services.log_payloads import PayloadInterner
+
+PACKAGES = [f"com.vendor{i}.app{i % 37}" for i in range(400)]
+MESSAGES = [
+    "Opened application",
+    "Application moved to foreground",
+    "Blocked website visit",
+    "Screen time limit reached",
+    "Notification posted",
+    "Permission requested: android.permission.CAMERA",
+]
+
+
+def make_payloads(distinct: int, rng: random.Random):
+    return [
+        {
+            "message": rng.choice(MESSAGES),
+            "package": rng.choice(PACKAGES),
+            "version": f"{rng.randint(1, 9)}.{rng.randint(0, 20)}.{rng.randint(0, 99)}",
+            "extras": {"source": "accessibility", "foreground": rng.random() < 0.8},
+        }
+        for _ in range(distinct)
+    ]
+
+
+def make_rows(count: int, payloads, rng: random.Random):
+    devices = [uuid4() for _ in range(200)]
+    action_id = uuid4()
+    start = datetime(2025, 1, 1)
+    # skewed like real traffic: a few payloads account for most events
+    weights = [1 / (rank + 1) for rank in range(len(payloads))]
+    rows = []
+    for i, details in enumerate(rng.choices(payloads, weights, k=count)):
+        done_at = start + timedelta(seconds=i)
+        rows.append(
+            {
+                "id": uuid4(),
+                "user_device_id": rng.choice(devices),
+                "user_app_id": None,
+                "action_id": action_id,
+                "done_at": done_at,
+                "first_at": done_at,
+                "last_at": done_at,
+                "count": 1,
+                "location": None,
+                "details": details,
+            }
+        )
+    return rows
+
+
+async def run(engine, mode: str, rows, batch: int) -> None:
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        for table in ("log_payloads", "logs"):
+            await conn.execute(
+                text(f"CREATE TEMP TABLE {table} (LIKE public.{table} INCLUDING ALL)")
+            )
+        db = AsyncSession(bind=conn)
+        interner = PayloadInterner(mode == "interned", config.LOG_PAYLOAD_CACHE_SIZE)
+
+        started = time.perf_counter()
+        for i in range(0, len(rows), batch):
+            values = await interner.intern(db, rows[i : i + batch])
+            await db.execute(insert(Log).values(values))
+        elapsed = time.perf_counter() - started
+
+        size = await conn.scalar(
+            text(
+                "SELECT pg_total_relation_size('pg_temp.logs') "
+                "+ pg_total_relation_size('pg_temp.log_payloads')"
+            )
+        )
+        payloads = await conn.scalar(text("SELECT count(*) FROM pg_temp.log_payloads"))
+        await trans.rollback()
+
+    print(
+        f"{mode:>9}: {size / len(rows):8.1f} bytes/row "
+        f"{len(rows) / elapsed:10.0f} rows/s "
+        f"({payloads} payload rows)"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--dsn",
+        default=os.environ.get("BENCH_DATABASE__ASYNC_DSN", config.database.async_dsn),
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = make_rows(args.rows, make_payloads(args.distinct, rng), rng)
+    engine = create_async_engine(args.dsn)
+    try:
+        for mode in ("inline", "interned"):
+            await run(engine, mode, rows, args.batch)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
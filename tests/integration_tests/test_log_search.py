@@ -0,0 +1,87 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.models.base import SQLModel
+from app.services._logs import build_log_search
+
+TEST_DSN = os.environ.get("TEST_DATABASE__ASYNC_DSN")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DSN, reason="TEST_DATABASE__ASYNC_DSN (disposable Postgres) not set"
+)
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.statement, **kw)
+
+
+@pytest.fixture
+async def conn():
+    engine = create_async_engine(TEST_DSN)
+    async with engine.connect() as connection:
+        trans = await connection.begin()
+        await connection.run_sync(SQLModel.metadata.create_all)
+        # an empty table would otherwise always be scanned sequentially
+        await connection.execute(text("SET LOCAL enable_seqscan = off"))
+        yield connection
+        await trans.rollback()
+    await engine.dispose()
+
+
+async def _plan(conn, stmt) -> str:
+    rows = (await conn.execute(Explain(stmt))).scalars().all()
+    return "\n".join(rows)
+
+
+@pytest.mark.asyncio
+async def test_key_value_search_uses_details_gin(conn):
+    plan = await _plan(conn, build_log_search(key="package", value="com.game"))
+    assert "ix_logs_details" in plan
+    assert "Seq Scan" not in plan
+
+
+@pytest.mark.asyncio
+async def test_key_presence_search_uses_details_gin(conn):
+    plan = await _plan(conn, build_log_search(key="url"))
+    assert "ix_logs_details" in plan
+
+
+@pytest.mark.asyncio
+async def test_text_search_uses_tsvector_gin(conn):
+    stmt = build_log_search(
+        text="casino",
+        start=datetime(2025, 1, 1),
+        end=datetime(2025, 2, 1),
+    )
+    plan = await _plan(conn, stmt)
+    assert "ix_logs_details_tsv" in plan
+    assert "Seq Scan" not in plan
+
+
+@pytest.mark.asyncio
+async def test_text_search_of_interned_details_uses_payload_tsvector_gin(conn):
+    plan = await _plan(conn, build_log_search(text="casino"))
+    assert "ix_log_payloads_details_tsv" in plan
+    assert "Seq Scan" not in plan
+
+
+@pytest.mark.asyncio
+async def test_key_and_location_search_of_interned_logs_uses_gin(conn):
+    plan = await _plan(conn, build_log_search(key="url", text="tashkent"))
+    assert "ix_logs_details_tsv" in plan
+    assert "ix_log_payloads_details_tsv" in plan
+    assert "Seq Scan" not in plan
@@ -0,0 +1,111 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from app.enums.enums import ActionDegrees
+from app.services.anomalies import (
+    AnomalyDetector,
+    _drop_rolled_back,
+    _observe_committed,
+)
+
+BUCKET = 60
+
+
+def _detector(**kwargs):
+    params = dict(
+        bucket_seconds=BUCKET,
+        half_life_buckets=10,
+        threshold=4.0,
+        min_events=5,
+        warmup_buckets=3,
+        evict_buckets=100,
+        capacity=2,
+        now=0,
+    )
+    params.update(kwargs)
+    return AnomalyDetector(**params)
+
+
+def _bucket(detector, counts, minute):
+    for device, degree, count in counts:
+        detector.observe(device, degree, count=count)
+    return detector.close(now=(minute + 1) * BUCKET)
+
+
+def test_spike_above_baseline_is_flagged_after_warmup():
+    detector = _detector()
+    steady, spiky = uuid4(), uuid4()
+    for minute in range(10):
+        alerts = _bucket(
+            detector,
+            [
+                (steady, ActionDegrees.NEUTRAL, 20),
+                (spiky, ActionDegrees.TERRIBLE, 1 if minute < 2 else 0),
+            ],
+            minute,
+        )
+        assert alerts == []
+
+    alerts = _bucket(
+        detector,
+        [(steady, ActionDegrees.NEUTRAL, 21), (spiky, ActionDegrees.TERRIBLE, 12)],
+        10,
+    )
+    assert len(alerts) == 1
+    alert = alerts[0]
+    assert alert["user_device_id"] == spiky
+    assert alert["degree"] == ActionDegrees.TERRIBLE
+    assert alert["observed"] == 12
+    assert alert["expected"] < 1
+    assert alert["window_start"] == datetime(1970, 1, 1, 0, 10)
+
+
+def test_no_alerts_during_warmup_and_below_min_events():
+    detector = _detector(warmup_buckets=5)
+    device = uuid4()
+    assert _bucket(detector, [(device, ActionDegrees.SUSPICIOUS, 50)], 0) == []
+    for minute in range(1, 6):
+        _bucket(detector, [], minute)
+    assert _bucket(detector, [(device, ActionDegrees.SUSPICIOUS, 4)], 6) == []
+
+
+def test_stale_events_are_ignored_and_idle_devices_evicted():
+    detector = _detector(evict_buckets=2)
+    device = uuid4()
+    assert not detector.observe(device, None, at=datetime(1969, 12, 31))
+    assert len(detector) == 0
+    detector.observe(device, None)
+    detector.close(now=BUCKET)
+    assert len(detector) == 1
+    detector.close(now=10 * BUCKET)
+    assert len(detector) == 0
+    # the freed slot is reused, with a fresh baseline
+    other = uuid4()
+    detector.observe(other, ActionDegrees.TERRIBLE)
+    assert detector.age[0] == 0 and detector.mean[0].sum() == 0
+
+
+def test_arrays_grow_past_capacity():
+    detector = _detector(capacity=2)
+    devices = [uuid4() for _ in range(5)]
+    for device in devices:
+        detector.observe(device, ActionDegrees.NEUTRAL, count=3)
+    assert len(detector) == 5
+    assert detector.counts[:5, 0].tolist() == [3] * 5
+
+
+def test_events_are_counted_once_committed():
+    detector = _detector()
+    device, session = uuid4(), Session()
+    detector.observe_on_commit(session, device, ActionDegrees.SUSPICIOUS, count=4)
+    _drop_rolled_back(session)
+    _observe_committed(session)
+    assert len(detector) == 0
+
+    detector.observe_on_commit(session, device, ActionDegrees.SUSPICIOUS, count=4)
+    assert len(detector) == 0
+    _observe_committed(session)
+    slot = detector._slots[device]
+    assert detector.counts[slot].sum() == 4
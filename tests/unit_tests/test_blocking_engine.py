@@ -0,0 +1,135 @@
+from datetime import date, datetime, timedelta, timezone
+from types import MappingProxyType, SimpleNamespace
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.core.geo import GeofenceIndex
+from app.enums.enums import Shifts
+from app.services._blocking import BlockingServiceAsync
+from app.services.blocking_engine import (
+    SCHOOL_WEEK,
+    BlockingEngine,
+    BlockingEvaluator,
+    compile_windows,
+    parse_hours,
+)
+
+TZ = ZoneInfo("Asia/Tashkent")
+SCHOOL = (41.3111, 69.2797, 300.0)
+
+
+def _evaluator(**kwargs):
+    params = dict(
+        user_id=uuid4(),
+        school_id=uuid4(),
+        school_name="School 1",
+        shift=Shifts.MORNING,
+        policy_id=uuid4(),
+        tz=TZ,
+        windows=compile_windows([(SCHOOL_WEEK, parse_hours("08:00-14:00"))]),
+        holidays=MappingProxyType({date(2025, 3, 21): "Navruz"}),
+        geofence=SCHOOL,
+        exceptions=MappingProxyType({}),
+    )
+    params.update(kwargs)
+    return BlockingEvaluator(**params)
+
+
+def _at(day, hour, minute=0):
+    return datetime(2025, 3, day, hour, minute, tzinfo=TZ)
+
+
+def test_blocks_during_school_hours_only():
+    evaluator = _evaluator()
+
+    # Monday 10 March 2025
+    assert evaluator.decide(_at(10, 9)).blocking_active
+    assert evaluator.decide(_at(10, 9)).until == "14:00"
+    assert not evaluator.decide(_at(10, 14)).blocking_active
+    assert not evaluator.decide(_at(10, 7, 59)).blocking_active
+    # Sunday
+    assert not evaluator.decide(_at(16, 9)).blocking_active
+
+
+def test_holidays_and_missing_policy_lift_blocking():
+    decision = _evaluator().decide(_at(21, 9))
+    assert not decision.blocking_active
+    assert decision.is_holiday
+    assert decision.reason == "Holiday: Navruz"
+
+    assert not _evaluator(policy_id=None).decide(_at(10, 9)).blocking_active
+
+
+def test_geofence_is_checked_when_a_location_is_sent():
+    evaluator = _evaluator()
+
+    inside = evaluator.decide(_at(10, 9), (41.3120, 69.2800))
+    assert inside.blocking_active and inside.in_school
+    away = evaluator.decide(_at(10, 9), (41.3300, 69.2800))
+    assert not away.blocking_active and away.in_school is False
+    assert evaluator.decide(_at(10, 9)).in_school is None
+
+
+def test_overlapping_neighbour_does_not_take_the_student_out_of_school():
+    evaluator = _evaluator()
+    neighbour = uuid4()
+    index = GeofenceIndex(
+        [(evaluator.school_id, *SCHOOL), (neighbour, 41.3111, 69.2860, 300.0)]
+    )
+    # inside the own fence, yet closer to the neighbour's center
+    location = (41.3111, 69.2832)
+    assert index.locate(*location) == neighbour
+    decision = evaluator.decide(_at(10, 9), location)
+    assert decision.blocking_active and decision.in_school
+
+
+def test_exceptions_lapse_on_their_own():
+    app_id = uuid4()
+    now = datetime(2025, 3, 10, 5, tzinfo=timezone.utc)
+    evaluator = _evaluator(
+        exceptions=MappingProxyType(
+            {app_id: now.replace(tzinfo=None) + timedelta(minutes=30)}
+        )
+    )
+
+    assert evaluator.excepted(app_id, now)
+    assert not evaluator.excepted(app_id, now + timedelta(minutes=31))
+    assert not evaluator.excepted(uuid4(), now)
+
+
+def test_invalidation_by_user_and_school():
+    engine = BlockingEngine()
+    one, two, three = _evaluator(), _evaluator(), _evaluator()
+    for e in (one, two, three):
+        engine._evaluators[e.user_id] = e
+
+    engine.invalidate(user_ids=[one.user_id], school_ids=[two.school_id])
+    assert list(engine._evaluators) == [three.user_id]
+    engine.invalidate(everyone=True)
+    assert len(engine) == 0
+
+
+class _HolidaySession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return []
+
+
+@pytest.mark.asyncio
+async def test_schedule_of_the_last_representable_month(monkeypatch):
+    service = BlockingServiceAsync(_HolidaySession())
+    student = SimpleNamespace(school_id=uuid4(), shift=None)
+
+    async def ensure_student(user):
+        return student
+
+    monkeypatch.setattr(service, "_ensure_student", ensure_student)
+    schedule = await service.get_schedule(None, 12, 9999)
+    assert (schedule["month"], schedule["year"]) == (12, 9999)
+    (stmt,) = service.db.statements
+    assert date(9999, 12, 31) in stmt.compile().params.values()
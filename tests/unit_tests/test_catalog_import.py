@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from app.services.catalog_import import (
+    APPS,
+    WEBSITES,
+    ImportStats,
+    iter_lines,
+    normalize_rows,
+    parse_app,
+    parse_domain,
+)
+
+
+@pytest.mark.parametrize(
+    "line, domain",
+    [
+        ("games.uz", "games.uz"),
+        ("  Games.UZ.  # comment", "games.uz"),
+        ("0.0.0.0 ads.example.com", "ads.example.com"),
+        ("127.0.0.1\tads.example.com tracker", "ads.example.com"),
+        ("||casino.example^$third-party", "casino.example"),
+        ("https://m.games.uz/path?q=1", "m.games.uz"),
+        ("пример.рф", "xn--e1afmkfd.xn--p1ai"),
+        ("# only a comment", None),
+        ("! adblock comment", None),
+        ("[Adblock Plus 2.0]", None),
+        ("localhost", None),
+        ("not a -domain-.com", None),
+    ],
+)
+def test_parse_domain(line, domain):
+    assert parse_domain(line) == domain
+
+
+def test_parse_app():
+    assert parse_app(["com.game", " Game ", "games"]) == ("com.game", "Game", "GAMES")
+    assert parse_app(["com.game", "Game", "Unknown"]) == ("com.game", "Game", None)
+    assert parse_app(["com.game", "Game"]) == ("com.game", "Game", None)
+    assert parse_app(["game", "Game"]) is None
+    assert parse_app(["com.game", ""]) is None
+
+
+def test_rows_are_deduplicated_across_batches():
+    stats, seen = ImportStats(WEBSITES), set()
+    first = normalize_rows(WEBSITES, ["a.uz", "A.uz", "", "bad domain"], seen, stats)
+    second = normalize_rows(WEBSITES, ["0.0.0.0 a.uz", "b.uz"], seen, stats, "ads")
+    assert first == [("a.uz", None)]
+    assert second == [("b.uz", "ads")]
+    assert (stats.lines, stats.duplicates, stats.invalid) == (6, 2, 1)
+
+
+def test_app_header_is_skipped():
+    stats = ImportStats(APPS)
+    rows = normalize_rows(
+        APPS, ["package,name,type", 'com.a,"A, B",Tools', "com.a,A"], set(), stats
+    )
+    assert rows == [("com.a", "A, B", "TOOLS")]
+    assert stats.duplicates == 1
+
+
+@pytest.mark.asyncio
+async def test_lines_split_across_chunks():
+    data = "\ufeffa.uz\r\nпример.рф\nlast".encode()
+    stream = io.BytesIO(data)
+
+    async def read(size):
+        return stream.read(size)
+
+    lines = [line async for line in iter_lines(read, chunk_size=3)]
+    assert lines == ["a.uz", "пример.рф", "last"]
@@ -0,0 +1,83 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.aho_corasick import Automaton
+from app.enums.enums import ActionDegrees, RuleKinds
+from app.services._rules import _validate
+from app.services.classifier import RuleSet, required_literal
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = Automaton([("he", 1), ("she", 2), ("his", 3), ("hers", 4)])
+    assert automaton.search("ushers") == {1, 2, 4}
+    assert automaton.search("nothing here") == {1}
+    assert automaton.search("") == set()
+
+
+def _rules(*specs):
+    rules = [(uuid4(), kind, pattern, degree) for kind, pattern, degree in specs]
+    return rules, RuleSet(rules)
+
+
+def test_keyword_and_regex_rules_match_any_string_value():
+    (casino, card), rules = _rules(
+        (RuleKinds.KEYWORD, "Casino", ActionDegrees.SUSPICIOUS),
+        (
+            RuleKinds.REGEX,
+            r"\b\d{4}[- ]\d{4}[- ]\d{4}[- ]\d{4}\b",
+            ActionDegrees.TERRIBLE,
+        ),
+    )
+    result = rules.classify({"query": "best ONLINE casino", "nested": ["x"]})
+    assert result.degree == ActionDegrees.SUSPICIOUS
+    assert result.rule_ids == {casino[0]}
+
+    result = rules.classify({"message": "casino 4111 1111 1111 1111"})
+    assert result.degree == ActionDegrees.TERRIBLE
+    assert result.rule_ids == {casino[0], card[0]}
+
+    assert rules.classify({"query": "homework"}).degree is None
+
+
+def test_domain_rules_match_subdomains_only():
+    (rule,), rules = _rules((RuleKinds.DOMAIN, "bet.com", ActionDegrees.TERRIBLE))
+    assert rules.classify({"url": "https://m.bet.com/live?x=1"}).rule_ids == {rule[0]}
+    assert rules.classify({"domain": "BET.COM"}).rule_ids == {rule[0]}
+    assert rules.classify({"url": "https://notbet.com/"}).degree is None
+
+
+def test_package_rules_match_dotted_prefixes():
+    (rule,), rules = _rules(
+        (RuleKinds.PACKAGE, "com.games.*", ActionDegrees.SUSPICIOUS)
+    )
+    assert rules.classify(None, "com.games.racer").rule_ids == {rule[0]}
+    assert rules.classify({"package": "com.games"}).rule_ids == {rule[0]}
+    assert rules.classify(None, "com.gamesx.racer").degree is None
+
+
+def test_regex_with_required_literal_is_prefiltered():
+    (rule,), rules = _rules(
+        (RuleKinds.REGEX, r"promo-?\d{3}", ActionDegrees.SUSPICIOUS)
+    )
+    assert required_literal(r"\bpromo-?\d{3}") == "promo"
+    assert required_literal(r"(a|b)c") == "c"
+    assert rules.keywords.size > 1
+    assert rules.regex is None
+    assert rules.classify({"q": "use PROMO-123 now"}).rule_ids == {rule[0]}
+    assert rules.classify({"q": "promo code"}).degree is None
+
+
+def test_regex_with_inline_global_flags_is_rejected_and_skipped():
+    with pytest.raises(HTTPException) as exc:
+        _validate(RuleKinds.REGEX, r"(?i)[a-z]+\d")
+    assert exc.value.status_code == 400
+
+    # one stored before validation caught it does not take the others down
+    (_, card), rules = _rules(
+        (RuleKinds.REGEX, r"(?i)[a-z]+\d", ActionDegrees.SUSPICIOUS),
+        (RuleKinds.REGEX, r"\d{4}-\d{4}", ActionDegrees.TERRIBLE),
+    )
+    assert rules.size == 1
+    assert rules.classify({"q": "1234-5678"}).rule_ids == {card[0]}
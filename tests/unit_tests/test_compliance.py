@@ -0,0 +1,37 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.services.compliance import compliance_query
+from app.services.scopes import COUNTRY, COUNTRY_ID, DISTRICT, REGION, SCHOOL
+
+
+def _sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_totals_are_grouped_by_level_and_scoped():
+    region_id = uuid4()
+    sql = _sql(compliance_query(DISTRICT, REGION, region_id))
+
+    assert "JOIN districts ON districts.id = school_compliance.district_id" in sql
+    assert "GROUP BY school_compliance.district_id, districts.name" in sql
+    assert "WHERE school_compliance.region_id = " in sql
+
+
+def test_ministry_sees_every_region():
+    sql = _sql(compliance_query(REGION, COUNTRY, COUNTRY_ID))
+
+    assert "WHERE" not in sql
+    assert "sum(school_compliance.terrible_events)" in sql
+
+
+@pytest.mark.parametrize(
+    "level, own", [(DISTRICT, SCHOOL), (REGION, SCHOOL), (REGION, DISTRICT)]
+)
+def test_coarser_levels_than_own_scope_are_forbidden(level, own):
+    with pytest.raises(HTTPException) as err:
+        compliance_query(level, own, uuid4())
+    assert err.value.status_code == 403
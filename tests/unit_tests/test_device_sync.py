@@ -0,0 +1,141 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.services import device_sync
+from app.services.device_sync import (
+    _PENDING,
+    _cache_committed,
+    _drop_rolled_back,
+    accepts,
+    advance,
+    advance_many,
+    cached_high_water,
+    check_sequence,
+    contiguous,
+    get_high_water,
+    note_spooled,
+)
+
+
+class _Result:
+    def __init__(self, rowcount=0, rows=()):
+        self.rowcount = rowcount
+        self.rows = list(rows)
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, results=(), stored=0):
+        self.sync_session = Session()
+        self.results = list(results)
+        self.stored = stored
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return self.results.pop(0)
+
+    async def scalar(self, stmt):
+        return self.stored
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    monkeypatch.setattr(device_sync, "_high_water", device_sync.OrderedDict())
+    monkeypatch.setattr(device_sync, "_spooled", device_sync.OrderedDict())
+
+
+def test_check_sequence():
+    assert check_sequence(4, 5)
+    assert not check_sequence(4, 4)
+    assert not check_sequence(4, 1)
+    with pytest.raises(HTTPException) as exc:
+        check_sequence(4, 7)
+    assert exc.value.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_gap_against_a_stale_cache_is_confirmed_in_the_database():
+    device = uuid4()
+    device_sync._remember(device, 3)
+    # another worker has acknowledged up to 6 meanwhile
+    db = FakeSession(stored=6)
+    assert await accepts(db, device, 7)
+    assert cached_high_water(device) == 6
+    with pytest.raises(HTTPException):
+        await accepts(db, device, 9)
+
+
+@pytest.mark.asyncio
+async def test_advance_updates_the_cache_only_once_committed():
+    device = uuid4()
+    device_sync._remember(device, 4)
+    db = FakeSession([_Result(rowcount=1)])
+    assert await advance(db, device, 5)
+    assert cached_high_water(device) == 4
+    _drop_rolled_back(db.sync_session)
+    _cache_committed(db.sync_session)
+    assert cached_high_water(device) == 4
+
+    db = FakeSession([_Result(rowcount=1)])
+    assert await advance(db, device, 5)
+    _cache_committed(db.sync_session)
+    assert cached_high_water(device) == 5
+
+    db = FakeSession([_Result(rowcount=0)])
+    assert not await advance(db, device, 7)
+    assert _PENDING not in db.sync_session.info
+
+
+def test_contiguous_stops_at_the_first_gap():
+    assert contiguous(4, [6, 5, 5, 8]) == 6
+    assert contiguous(4, [3, 4]) == 4
+    assert contiguous(0, [2]) == 0
+
+
+@pytest.mark.asyncio
+async def test_advance_many_never_skips_a_gap():
+    a, b, c = uuid4(), uuid4(), uuid4()
+    db = FakeSession([_Result(rows=[(a, 4), (b, 9)]), _Result()])
+    await advance_many(db, [(a, 5), (a, 6), (a, 8), (b, 9), (c, 1), (c, 2)])
+    assert db.sync_session.info[_PENDING] == {a: 6, c: 2}
+    upsert = db.statements[1].compile().params
+    assert sorted(v for k, v in upsert.items() if k.startswith("last_seq")) == [2, 6]
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(config, "DEVICE_SYNC_CACHE_SIZE", 2)
+    a, b, c = uuid4(), uuid4(), uuid4()
+    for device in (a, b, c):
+        device_sync._remember(device, 1)
+    assert cached_high_water(a) is None
+    assert cached_high_water(c) == 1
+
+
+@pytest.mark.asyncio
+async def test_spooled_numbers_stay_out_of_the_committed_mark():
+    device = uuid4()
+    device_sync._remember(device, 4)
+    note_spooled(device, 5)
+    note_spooled(device, 6)
+    assert cached_high_water(device) == 6
+    assert device_sync._high_water[device] == 4
+
+    # replay dropped 5 and 6: the database still says 4
+    db = FakeSession(stored=4)
+    assert await accepts(db, device, 5)
+    assert cached_high_water(device) == 4
+
+
+@pytest.mark.asyncio
+async def test_refresh_lowers_a_mark_that_ran_ahead():
+    device = uuid4()
+    device_sync._remember(device, 9)
+    assert await get_high_water(FakeSession(stored=7), device, refresh=True) == 7
+    assert cached_high_water(device) == 7
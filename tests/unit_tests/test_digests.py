@@ -0,0 +1,38 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app.enums.enums import ActionDegrees, Languages
+from app.services.digests import digest_period, render_digest
+
+TASHKENT = ZoneInfo("Asia/Tashkent")
+
+
+def test_hourly_period_is_the_last_full_hour():
+    assert digest_period(datetime(2025, 8, 22, 10, 7), "hour", TASHKENT) == (
+        datetime(2025, 8, 22, 9),
+        datetime(2025, 8, 22, 10),
+    )
+
+
+def test_daily_period_follows_local_midnight():
+    # 21:30 UTC is already the next day in Tashkent (UTC+5)
+    assert digest_period(datetime(2025, 8, 22, 21, 30), "day", TASHKENT) == (
+        datetime(2025, 8, 21, 19),
+        datetime(2025, 8, 22, 19),
+    )
+    assert digest_period(datetime(2025, 8, 22, 18, 59), "day", TASHKENT) == (
+        datetime(2025, 8, 20, 19),
+        datetime(2025, 8, 21, 19),
+    )
+
+
+def test_render_digest_in_recipient_language():
+    children = [
+        ("Ali", {ActionDegrees.SUSPICIOUS: 3, ActionDegrees.NEUTRAL: 40}),
+        ("Vali", {ActionDegrees.TERRIBLE: 1}),
+    ]
+    assert render_digest(Languages.ENGLISH, "day", children) == (
+        "Last day. Ali: 3 suspicious, 0 dangerous, 40 regular actions; "
+        "Vali: 0 suspicious, 1 dangerous, 0 regular actions"
+    )
+    assert render_digest(None, "hour", children[:1]).startswith("So'nggi soat. Ali: 3")
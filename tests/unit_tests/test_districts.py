@@ -0,0 +1,46 @@
+from time import monotonic
+from uuid import uuid4
+
+import pytest
+
+from app.core.geo import NearestIndex
+from app.models import District
+from app.services.districts import DistrictLocator
+
+
+def test_coordinate_text_fills_numeric_columns():
+    district = District(name="Chilonzor", coordinate="41.2756, 69.2034")
+    assert (district.latitude, district.longitude) == (41.2756, 69.2034)
+    district.coordinate = "somewhere"
+    assert district.latitude is None and district.longitude is None
+
+
+@pytest.mark.asyncio
+async def test_rows_are_tagged_from_their_location():
+    district, region, lone_region = uuid4(), uuid4(), uuid4()
+    locator = DistrictLocator()
+    locator._index = NearestIndex(
+        [
+            ((district, region), 41.2756, 69.2034),
+            ((None, lone_region), 42.46, 59.61),
+        ],
+        150_000,
+    )
+    locator.stale, locator._checked = False, monotonic()
+
+    rows = [
+        {"location": "41.28, 69.21"},
+        {"location": "42.40 59.60"},
+        {"location": "55.75, 37.62"},
+        {"location": "school"},
+        {"location": None},
+    ]
+    # nothing is read from the database while the index is fresh
+    await locator.tag_rows(None, rows)
+    assert [(r["district_id"], r["region_id"]) for r in rows] == [
+        (district, region),
+        (None, lone_region),
+        (None, None),
+        (None, None),
+        (None, None),
+    ]
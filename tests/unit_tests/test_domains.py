@@ -0,0 +1,31 @@
+from app.core.domains import SuffixMatcher
+
+
+def test_host_matches_itself_and_parent_domains():
+    matcher = SuffixMatcher(["games.uz", "ads.example.com"])
+    assert "games.uz" in matcher
+    assert "www.games.uz" in matcher
+    assert "a.b.c.games.uz" in matcher
+    assert "x.ads.example.com" in matcher
+    assert "example.com" not in matcher
+    assert "notgames.uz" not in matcher
+    assert "uz" not in matcher
+
+
+def test_hosts_are_normalized():
+    matcher = SuffixMatcher(["games.uz"])
+    assert " WWW.Games.UZ. " in matcher
+
+
+def test_top_level_entry_covers_everything_below():
+    matcher = SuffixMatcher(["xxx"])
+    assert "a.b.xxx" in matcher
+    assert "a.b.xxy" not in matcher
+
+
+def test_empty_matcher_and_memo_limit():
+    assert "games.uz" not in SuffixMatcher([])
+    matcher = SuffixMatcher(["games.uz"], memo_size=2)
+    for host in ("a.uz", "b.uz", "c.games.uz", "d.uz"):
+        assert (host in matcher) == host.endswith("games.uz")
+    assert len(matcher._memo) <= 2
@@ -0,0 +1,113 @@
+import random
+
+from app.core.geo import (
+    GeofenceIndex,
+    NearestIndex,
+    haversine_m,
+    haversine_m_np,
+    parse_coordinate,
+)
+
+# two schools in Tashkent 700 m apart and one in Nukus
+FENCES = [
+    ("a", 41.3110, 69.2797, 300.0),
+    ("b", 41.3110, 69.2881, 500.0),
+    ("c", 42.4600, 59.6100, 200.0),
+]
+
+
+def _brute(lat, lon):
+    best = None
+    for key, flat, flon, radius in FENCES:
+        distance = haversine_m(flat, flon, lat, lon)
+        if distance <= radius and (best is None or distance < best[0]):
+            best = (distance, key)
+    return best[1] if best else None
+
+
+def test_locate_finds_containing_fence():
+    index = GeofenceIndex(FENCES)
+    assert index.locate(41.3110, 69.2797) == "a"
+    assert index.locate(42.4601, 59.6101) == "c"
+    assert index.locate(41.2000, 69.2797) is None
+    assert index.locate(-41.3110, -69.2797) is None
+
+
+def test_nearest_fence_wins_where_they_overlap():
+    index = GeofenceIndex(FENCES)
+    # inside both radii, closer to b
+    assert index.locate(41.3110, 69.2845) == "b"
+    assert index.locate(41.3110, 69.2825) == "a"
+
+
+def test_batch_agrees_with_single_lookups():
+    index = GeofenceIndex(FENCES)
+    rng = random.Random(7)
+    points = [
+        (41.3110 + rng.uniform(-0.01, 0.01), 69.2840 + rng.uniform(-0.015, 0.015))
+        for _ in range(2000)
+    ]
+    lats, lons = zip(*points)
+    expected = [_brute(lat, lon) for lat, lon in points]
+    assert [index.locate(lat, lon) for lat, lon in points] == expected
+    assert index.locate_many(lats, lons) == expected
+    assert any(expected) and None in expected
+
+
+def test_southern_and_western_hemispheres():
+    index = GeofenceIndex([("s", -34.6037, -58.3816, 400.0)])
+    assert index.locate(-34.6040, -58.3820) == "s"
+    assert index.locate_many([-34.6040, 34.6040], [-58.3820, 58.3820]) == ["s", None]
+
+
+def test_empty_index_and_zero_radius():
+    assert GeofenceIndex([]).locate(41.3, 69.3) is None
+    assert GeofenceIndex([]).locate_many([41.3], [69.3]) == [None]
+    index = GeofenceIndex([("z", 41.3, 69.3, 0.0)])
+    assert len(index) == 0
+    assert index.locate_many([], []) == []
+
+
+def test_vectorized_haversine_matches_scalar():
+    assert (
+        abs(
+            haversine_m_np(41.3110, 69.2797, [41.3110], [69.2881])[0]
+            - haversine_m(41.3110, 69.2797, 41.3110, 69.2881)
+        )
+        < 1e-6
+    )
+
+
+def test_coordinates_are_parsed_from_common_spellings():
+    assert parse_coordinate("41.3110, 69.2797") == (41.3110, 69.2797)
+    assert parse_coordinate(" 41.3110 69.2797 ") == (41.3110, 69.2797)
+    assert parse_coordinate("geo:41.3110,69.2797;u=35") == (41.3110, 69.2797)
+    assert parse_coordinate("POINT(69.2797 41.3110)") == (41.3110, 69.2797)
+    assert parse_coordinate("-34.6, -58.4") == (-34.6, -58.4)
+    for text in (None, "", "Tashkent", "41.3", "1, 2, 3", "95, 69"):
+        assert parse_coordinate(text) is None
+
+
+def test_nearest_centroid_within_reach():
+    centroids = [("tashkent", 41.30, 69.27), ("samarkand", 39.65, 66.96)]
+    index = NearestIndex(centroids, max_distance_m=150_000)
+    assert index.nearest(41.0, 69.5) == "tashkent"
+    assert index.nearest(39.9, 67.2) == "samarkand"
+    # Moscow is nowhere near either
+    assert index.nearest(55.75, 37.62) is None
+    lats, lons = [41.0, 39.9, 55.75], [69.5, 67.2, 37.62]
+    assert index.nearest_many(lats, lons) == ["tashkent", "samarkand", None]
+    assert NearestIndex([]).nearest(41.0, 69.5) is None
+
+
+def test_nearest_agrees_with_haversine():
+    rng = random.Random(3)
+    centroids = [(i, rng.uniform(37, 46), rng.uniform(56, 73)) for i in range(150)]
+    index = NearestIndex(centroids)
+    points = [(rng.uniform(37, 46), rng.uniform(56, 73)) for _ in range(500)]
+    expected = [
+        min(centroids, key=lambda c: haversine_m(c[1], c[2], lat, lon))[0]
+        for lat, lon in points
+    ]
+    assert index.nearest_many(*zip(*points)) == expected
+    assert [index.nearest(lat, lon) for lat, lon in points] == expected
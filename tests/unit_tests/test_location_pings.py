@@ -0,0 +1,130 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.enums.enums import UserRole
+from app.models import StudentInfo
+from app.schemas._location_pings import LocationPingResponse
+from app.services import location_pings
+from app.services.location_pings import (
+    LastLocations,
+    _check_student_access,
+    partition_day,
+    partition_name,
+)
+
+
+def _ping(device, minute, lat=41.3):
+    return LocationPingResponse(
+        user_device_id=device,
+        recorded_at=datetime(2025, 9, 9, 8, minute),
+        latitude=lat,
+        longitude=69.28,
+    )
+
+
+def test_partition_names_round_trip():
+    day = date(2025, 9, 9)
+    assert partition_name(day) == "location_pings_20250909"
+    assert partition_day(partition_name(day)) == day
+    assert partition_day("location_pings_default") is None
+    assert partition_day("logs_20250909") is None
+
+
+def test_newer_ping_replaces_older_only():
+    cache = LastLocations(max_entries=10, ttl=60)
+    device = uuid4()
+    cache.observe(_ping(device, 5, lat=41.1))
+    cache.observe(_ping(device, 3, lat=41.2))
+    hit, ping = cache.cached(device)
+    assert hit and ping.latitude == 41.1
+    cache.observe(_ping(device, 9, lat=41.3))
+    assert cache.cached(device)[1].latitude == 41.3
+
+
+def test_entries_expire_and_are_bounded():
+    cache = LastLocations(max_entries=2, ttl=-1)
+    device = uuid4()
+    cache.observe(_ping(device, 1))
+    assert cache.cached(device) == (False, None)
+
+    cache = LastLocations(max_entries=2, ttl=60)
+    devices = [uuid4() for _ in range(3)]
+    for device in devices:
+        cache.observe(_ping(device, 1))
+    assert len(cache) == 2
+    assert not cache.cached(devices[0])[0]
+    assert cache.cached(devices[2])[0]
+
+
+class _NoDatabase:
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("the database was queried")
+
+
+@pytest.mark.asyncio
+async def test_cached_devices_skip_the_database():
+    cache = LastLocations(max_entries=10, ttl=60)
+    seen, unseen = uuid4(), uuid4()
+    cache.observe(_ping(seen, 1))
+    # devices without pings are remembered as such
+    cache._remember(unseen, None)
+
+    found = await cache.get_many(_NoDatabase(), [seen, unseen])
+    assert found[seen].recorded_at == datetime(2025, 9, 9, 8, 1)
+    assert found[unseen] is None
+
+
+class _StudentLookup:
+    """Answers the student query only when it is by user id."""
+
+    def __init__(self, student):
+        self.student = student
+
+    async def execute(self, stmt):
+        params = stmt.compile().params
+        found = self.student if self.student.user_id in params.values() else None
+        return SimpleNamespace(scalar_one_or_none=lambda: found)
+
+
+def _student():
+    return StudentInfo(
+        id=uuid4(), user_id=uuid4(), school_id=uuid4(), father_id=uuid4()
+    )
+
+
+def _user(role, user_id=None):
+    return SimpleNamespace(id=user_id or uuid4(), user_role_name=role.value)
+
+
+@pytest.mark.asyncio
+async def test_parents_see_their_children_by_user_id():
+    student = _student()
+    db = _StudentLookup(student)
+    father = _user(UserRole.PARENT, student.father_id)
+    await _check_student_access(db, father, student.user_id)
+
+    with pytest.raises(HTTPException) as err:
+        await _check_student_access(db, _user(UserRole.PARENT), student.user_id)
+    assert err.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_staff_are_checked_against_the_students_school(monkeypatch):
+    student = _student()
+    checked = []
+
+    async def resolve_scope(db, current_user, kind, scope_id):
+        checked.append((kind, scope_id))
+
+    monkeypatch.setattr(location_pings, "resolve_scope", resolve_scope)
+    teacher = _user(UserRole.TEACHER)
+    await _check_student_access(_StudentLookup(student), teacher, student.user_id)
+    assert checked == [("school", student.school_id)]
+
+    with pytest.raises(HTTPException) as err:
+        await _check_student_access(_StudentLookup(student), teacher, uuid4())
+    assert err.value.status_code == 404
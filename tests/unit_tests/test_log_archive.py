@@ -0,0 +1,85 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.services._logs import reads_archive
+from app.services.log_archive import (
+    archive_cutoff,
+    months_between,
+    read_archived_logs,
+    write_partition,
+)
+
+
+def _row(device, done_at, **extra):
+    return {
+        "id": str(uuid4()),
+        "user_device_id": str(device),
+        "user_app_id": None,
+        "action_id": str(uuid4()),
+        "done_at": done_at,
+        "first_at": done_at,
+        "last_at": done_at,
+        "count": 1,
+        "location": None,
+        "details": None,
+        **extra,
+    }
+
+
+def test_archive_cutoff_wraps_year():
+    assert archive_cutoff(date(2025, 3, 15), months=6) == datetime(2024, 9, 1)
+    assert months_between(datetime(2024, 11, 5), datetime(2025, 1, 2)) == [
+        "2024-11",
+        "2024-12",
+        "2025-01",
+    ]
+
+
+def test_write_and_read_back_with_pruning(tmp_path):
+    device, other = uuid4(), uuid4()
+    write_partition(
+        tmp_path,
+        "2024-01",
+        "unknown",
+        [
+            _row(device, datetime(2024, 1, 10), details='{"url": "a"}'),
+            _row(other, datetime(2024, 1, 11)),
+        ],
+    )
+    write_partition(
+        tmp_path, "2024-02", "unknown", [_row(device, datetime(2024, 2, 3))]
+    )
+
+    logs = read_archived_logs([device], root=tmp_path)
+    assert [log.done_at for log in logs] == [
+        datetime(2024, 2, 3),
+        datetime(2024, 1, 10),
+    ]
+    assert logs[1].details == {"url": "a"}
+
+    logs = read_archived_logs(
+        [device], start=datetime(2024, 2, 1), end=datetime(2024, 2, 28), root=tmp_path
+    )
+    assert [log.done_at for log in logs] == [datetime(2024, 2, 3)]
+
+
+def test_rewriting_a_batch_does_not_duplicate(tmp_path):
+    device = uuid4()
+    rows = [_row(device, datetime(2024, 1, 10))]
+    first = write_partition(tmp_path, "2024-01", "unknown", rows)
+    second = write_partition(tmp_path, "2024-01", "unknown", rows)
+    assert first == second
+    assert len(read_archived_logs([device], root=tmp_path)) == 1
+
+
+def test_archive_is_read_only_when_it_can_fill_the_page():
+    cutoff = datetime(2024, 9, 1)
+    newer = [SimpleNamespace(done_at=datetime(2024, 10, d)) for d in (3, 2, 1)]
+    older = newer[:2] + [SimpleNamespace(done_at=datetime(2024, 8, 31))]
+
+    assert not reads_archive(newer, None, 3, cutoff)
+    assert not reads_archive(newer[:1], datetime(2024, 9, 1), 3, cutoff)
+    assert reads_archive(newer[:2], None, 3, cutoff)
+    assert reads_archive(older, None, 3, cutoff)
+    assert reads_archive([], datetime(2024, 1, 1), 3, cutoff)
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.services.log_coalescer import (
+    LogCoalescer,
+    _apply_pending,
+    _discard_pending,
+    run_length,
+)
+
+T0 = datetime(2025, 9, 9, 8)
+DEVICE = uuid4()
+ACTION = uuid4()
+
+
+def _row(seconds, details=None, device=DEVICE):
+    return {
+        "id": uuid4(),
+        "user_device_id": device,
+        "action_id": ACTION,
+        "done_at": T0 + timedelta(seconds=seconds),
+        "details": details,
+    }
+
+
+def test_runs_merge_identical_events_within_the_window():
+    other = uuid4()
+    rows = [
+        _row(0),
+        _row(30),
+        _row(50, device=other),
+        _row(60),
+        _row(200),
+        _row(210, {"url": "x"}),
+    ]
+    runs = run_length(rows, timedelta(seconds=60))
+
+    mine = [r for r in runs if r["user_device_id"] == DEVICE]
+    assert [(r["id"], r["count"]) for r in mine] == [
+        (rows[0]["id"], 3),
+        (rows[4]["id"], 1),
+        (rows[5]["id"], 1),
+    ]
+    assert mine[0]["first_at"] == T0
+    assert mine[0]["last_at"] == T0 + timedelta(seconds=60)
+    assert [r["count"] for r in runs if r["user_device_id"] == other] == [1]
+
+
+def test_zero_window_keeps_every_row():
+    assert len(run_length([_row(0), _row(1)], timedelta(0))) == 2
+
+
+class FakeSession:
+    """Answers the merge UPDATE as if it matched; counts the updates."""
+
+    def __init__(self):
+        self.sync_session = Session()
+        self.updates = 0
+
+    async def scalar(self, stmt):
+        self.updates += 1
+        return stmt.compile().params["id_1"]
+
+
+@pytest.mark.asyncio
+async def test_runs_are_remembered_only_after_commit():
+    coalescer = LogCoalescer(60)
+    db = FakeSession()
+    first = _row(0)
+    coalescer.remember(db, first["id"], first)
+    assert coalescer.match(_row(10)) is None
+
+    _discard_pending(db.sync_session)
+    _apply_pending(db.sync_session)
+    assert coalescer.match(_row(10)) is None
+
+    coalescer.remember(db, first["id"], first)
+    _apply_pending(db.sync_session)
+    assert coalescer.match(_row(10)).log_id == first["id"]
+
+
+@pytest.mark.asyncio
+async def test_retried_events_are_not_merged_twice():
+    coalescer = LogCoalescer(60)
+    db = FakeSession()
+    first, repeat = _row(0), _row(10)
+    coalescer.remember(db, first["id"], first)
+    _apply_pending(db.sync_session)
+
+    assert await coalescer.merge(db, repeat) == first["id"]
+    _apply_pending(db.sync_session)
+    assert db.updates == 1
+
+    # the retry and a retry of the first event map to the run, unchanged
+    assert coalescer.seen(repeat) == first["id"]
+    assert coalescer.seen(first) == first["id"]
+    assert coalescer.seen(_row(20)) is None
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_merge_does_not_extend_the_run():
+    coalescer = LogCoalescer(60)
+    db = FakeSession()
+    first, repeat = _row(0), _row(50)
+    coalescer.remember(db, first["id"], first)
+    _apply_pending(db.sync_session)
+
+    await coalescer.merge(db, repeat)
+    _discard_pending(db.sync_session)
+    assert coalescer.seen(repeat) is None
+    # the window still counts from the last committed event
+    assert coalescer.match(_row(90)) is None
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.schemas._logs import LogCreate
+from app.services._logs import build_log_search
+from app.services.log_payloads import (
+    PayloadInterner,
+    _discard_pending,
+    _promote_pending,
+    payload_hash,
+)
+
+
+class FakeSession:
+    """Records payload inserts; pretends every payload is new."""
+
+    def __init__(self):
+        self.sync_session = Session()
+        self.inserted = []
+
+    async def execute(self, stmt):
+        hashes = [
+            v for (col, v) in stmt.compile().params.items() if col.startswith("hash")
+        ]
+        self.inserted.append(hashes)
+        return SimpleNamespace(scalars=lambda: hashes)
+
+
+def _row(details):
+    return {"id": 1, "details": details}
+
+
+def test_hash_ignores_key_order():
+    assert payload_hash({"a": 1, "b": "x"}) == payload_hash({"b": "x", "a": 1})
+    assert payload_hash({"a": 1}) != payload_hash({"a": "1"})
+
+
+@pytest.mark.asyncio
+async def test_disabled_interner_keeps_rows():
+    db = FakeSession()
+    rows = [_row({"a": 1})]
+    assert await PayloadInterner(False, 10).intern(db, rows) is rows
+    assert db.inserted == []
+
+
+@pytest.mark.asyncio
+async def test_payloads_are_inserted_once_and_cached_after_commit():
+    interner = PayloadInterner(True, 10)
+    db = FakeSession()
+    out = await interner.intern(db, [_row({"a": 1}), _row({"a": 1}), _row(None)])
+    assert [r["details"] for r in out] == [None, None, None]
+    assert out[0]["payload_hash"] == out[1]["payload_hash"] == payload_hash({"a": 1})
+    assert out[2]["payload_hash"] is None
+    assert len(db.inserted) == 1
+
+    # same transaction: already pending, no second insert
+    await interner.intern(db, [_row({"a": 1})])
+    assert len(db.inserted) == 1
+
+    _promote_pending(db.sync_session)
+    other = FakeSession()
+    await interner.intern(other, [_row({"a": 1})])
+    assert other.inserted == []
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_payloads_are_not_cached():
+    interner = PayloadInterner(True, 10)
+    db = FakeSession()
+    await interner.intern(db, [_row({"a": 1})])
+    _discard_pending(db.sync_session)
+    _promote_pending(db.sync_session)
+
+    other = FakeSession()
+    await interner.intern(other, [_row({"a": 1})])
+    assert len(other.inserted) == 1
+
+
+@pytest.mark.parametrize(
+    "sent, stored",
+    [
+        ({"url": "a.com"}, {"url": "a.com"}),
+        ("opened settings", {"message": "opened settings"}),
+        ('{"url": "a.com"}', {"url": "a.com"}),
+        ("[1, 2]", {"message": [1, 2]}),
+        (None, None),
+    ],
+)
+def test_text_details_are_kept_under_message(sent, stored):
+    data = LogCreate(user_device_id=uuid4(), action_id=uuid4(), details=sent)
+    assert data.details == stored
+
+
+def test_search_matches_location_text_of_interned_logs():
+    sql = str(
+        build_log_search(key="url", text="tashkent").compile(
+            dialect=postgresql.dialect()
+        )
+    )
+    # the location of interned logs is matched by a branch of its own, so
+    # every branch filters on a single text index
+    assert sql.count("UNION") == 2
+    assert sql.count("logs.details_tsv @@") == 2
+    assert "log_payloads.details_tsv @@" in sql
+    assert " OR " not in sql
+
+    text_only = str(build_log_search(text="tashkent"))
+    assert text_only.count("UNION") == 1
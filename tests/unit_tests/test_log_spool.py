@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.schemas._logs import LogCreate
+from app.services import device_sync, log_spool
+from app.services.log_spool import LogSpoolReplayer, _log_row, is_outage
+
+
+def _record(**extra):
+    return {
+        "id": str(uuid4()),
+        "user_id": str(uuid4()),
+        "user_device_id": str(uuid4()),
+        "action_id": str(uuid4()),
+        "done_at": "2025-09-09 10:00:00+05:00",
+        **extra,
+    }
+
+
+def test_offsets_are_normalized_to_naive_utc():
+    data = LogCreate(
+        user_device_id=uuid4(),
+        action_id=uuid4(),
+        done_at="2025-09-09T10:00:00+05:00",
+    )
+    assert data.done_at == datetime(2025, 9, 9, 5)
+    assert _log_row(_record())["done_at"] == datetime(2025, 9, 9, 5)
+
+
+def test_only_connection_failures_count_as_outages():
+    assert is_outage(asyncio.TimeoutError())
+    assert is_outage(ConnectionRefusedError())
+    assert is_outage(OperationalError("select 1", {}, Exception("gone")))
+    assert not is_outage(IntegrityError("insert", {}, Exception("fk")))
+    assert not is_outage(ValueError())
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_rejected_records_are_quarantined(monkeypatch):
+    bad = _record(bad=True)
+    batch = [_record(), bad, _record()]
+    quarantined = []
+
+    async def replay_records(db, records):
+        if any(r.get("bad") for r in records):
+            raise IntegrityError("insert", {}, Exception("fk"))
+        return len(records)
+
+    monkeypatch.setattr(log_spool, "AsyncSessionFactory", _Session)
+    monkeypatch.setattr(log_spool, "replay_records", replay_records)
+    monkeypatch.setattr(
+        log_spool,
+        "get_log_quarantine",
+        lambda: SimpleNamespace(append=quarantined.append),
+    )
+    assert await LogSpoolReplayer()._replay(batch) == 2
+    assert [r["id"] for r in quarantined] == [bad["id"]]
+    assert "fk" in quarantined[0]["error"]
+
+
+@pytest.mark.asyncio
+async def test_outages_leave_the_batch_for_later(monkeypatch):
+    async def replay_records(db, records):
+        raise OperationalError("insert", {}, Exception("gone"))
+
+    monkeypatch.setattr(log_spool, "AsyncSessionFactory", _Session)
+    monkeypatch.setattr(log_spool, "replay_records", replay_records)
+    with pytest.raises(OperationalError):
+        await LogSpoolReplayer()._replay([_record()])
+
+
+class _Rows(list):
+    def all(self):
+        return self
+
+
+class _ReplaySession:
+    async def execute(self, stmt):
+        return _Rows()
+
+
+@pytest.mark.asyncio
+async def test_dropped_spooled_records_release_the_spooled_mark(monkeypatch):
+    monkeypatch.setattr(device_sync, "_high_water", device_sync.OrderedDict())
+    monkeypatch.setattr(device_sync, "_spooled", device_sync.OrderedDict())
+    device = uuid4()
+    device_sync._remember(device, 4)
+    device_sync.note_spooled(device, 5)
+
+    # the device was deleted meanwhile, so replay drops the record
+    record = _record(user_device_id=str(device), seq=5)
+    assert await log_spool.replay_records(_ReplaySession(), [record]) == 0
+    # a resend of 5 while the database is down again is not taken as a duplicate
+    assert device_sync.cached_high_water(device) == 4
@@ -0,0 +1,96 @@
+import asyncio
+from uuid import uuid4
+
+from app.enums.enums import Languages
+from app.services.notifications import (
+    APP_REQUEST,
+    TERRIBLE_ACTION,
+    AlertFanout,
+    Channel,
+    LatencyStats,
+    ParentEvent,
+    Recipient,
+)
+
+
+class MemoryChannel(Channel):
+    name = "memory"
+    uses_db = False
+
+    def __init__(self):
+        self.messages = []
+
+    async def deliver(self, db, messages):
+        self.messages.extend(messages)
+
+
+def _parent(language=Languages.ENGLISH):
+    return Recipient(uuid4(), "+998900000000", language, "Ali")
+
+
+def test_first_event_is_sent_and_later_ones_coalesced():
+    fanout = AlertFanout([], coalesce_seconds=60)
+    student = uuid4()
+    parent = _parent()
+    recipients = {student: [parent]}
+    event = ParentEvent(TERRIBLE_ACTION, student, {"action": "porn", "app": "Chrome"})
+
+    (message,) = fanout.plan([event], recipients, now=0)
+    assert not message.coalesced
+    assert message.body == "Ali: dangerous activity detected - porn (Chrome)"
+
+    more = [ParentEvent(TERRIBLE_ACTION, student, {"action": "x"}) for _ in range(3)]
+    assert fanout.plan(more, recipients, now=10) == []
+    assert fanout.plan([], recipients, now=30) == []
+
+    (digest,) = fanout.plan([], recipients, now=61)
+    assert digest.coalesced
+    assert digest.recipient is parent
+    assert digest.data["count"] == 3
+    assert digest.body == "Ali: 3 more alerts"
+
+    # the window restarted with the digest; once it passes, the next is immediate
+    (later,) = fanout.plan([event], recipients, now=200)
+    assert not later.coalesced
+
+
+def test_each_parent_gets_their_own_language():
+    fanout = AlertFanout([], coalesce_seconds=60)
+    student = uuid4()
+    father, mother = _parent(Languages.RUSSIAN), _parent(None)
+    event = ParentEvent(APP_REQUEST, student, {"status": "approved"})
+    messages = fanout.plan([event], {student: [father, mother]}, now=0)
+    assert [m.body for m in messages] == [
+        "Ali: статус запроса приложения - approved",
+        "Ali: ilova so'rovi holati - approved",
+    ]
+
+
+def test_pump_delivers_published_events_and_records_latency():
+    student = uuid4()
+    parent = _parent()
+    channel = MemoryChannel()
+
+    async def resolver(db, student_ids):
+        return {s: [parent] for s in student_ids}
+
+    async def run():
+        fanout = AlertFanout([channel], resolver=resolver)
+        fanout.publish(ParentEvent(TERRIBLE_ACTION, student, {"action": "x"}))
+        assert await fanout.pump(timeout=0.1) == 1
+        assert await fanout.pump(timeout=0.01) == 0
+        return fanout
+
+    fanout = asyncio.run(run())
+    assert len(channel.messages) == 1
+    assert fanout.latency.summary()["count"] == 1
+
+
+def test_latency_percentiles():
+    stats = LatencyStats(size=100)
+    for i in range(1, 101):
+        stats.add(i / 100)
+    summary = stats.summary()
+    assert summary["p50"] == 0.51
+    assert summary["p99"] == 1.0
+    assert summary["max"] == 1.0
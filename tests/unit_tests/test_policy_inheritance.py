@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.services.policy_inheritance  # noqa: F401 (registers the listeners)
+from app.models import District, Policy, PolicyAssignment, Region, School, UserRole
+from app.services.scopes import COUNTRY, COUNTRY_ID, DISTRICT, REGION
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Policy.metadata.create_all(
+        engine,
+        tables=[
+            UserRole.__table__,
+            Policy.__table__,
+            Region.__table__,
+            District.__table__,
+            School.__table__,
+            PolicyAssignment.__table__,
+        ],
+    )
+    return Session(engine, expire_on_commit=False)
+
+
+def test_schools_inherit_the_nearest_assignment():
+    with _session() as db:
+        policies = [Policy(name=f"P{i}", targeted_role_id=uuid4()) for i in range(4)]
+        region = Region(name="Tashkent")
+        db.add_all([*policies, region])
+        db.flush()
+        near = District(name="Chilonzor", parent_region=region.id)
+        far = District(name="Yunusobod", parent_region=region.id)
+        db.add_all([near, far])
+        db.flush()
+        plain = School(name="1", region_id=region.id, district_id=near.id)
+        own = School(
+            name="2",
+            region_id=region.id,
+            district_id=near.id,
+            policy_id=policies[3].id,
+        )
+        other = School(name="3", region_id=region.id, district_id=far.id)
+        db.add_all([plain, own, other])
+        db.commit()
+
+        def effective():
+            db.flush()
+            return [
+                (
+                    policies.index(
+                        next(p for p in policies if p.id == s.effective_policy_id)
+                    )
+                    if s.effective_policy_id
+                    else None
+                )
+                for s in (plain, own, other)
+            ]
+
+        assert effective() == [None, 3, None]
+        db.add(
+            PolicyAssignment(
+                scope=COUNTRY, scope_id=COUNTRY_ID, policy_id=policies[0].id
+            )
+        )
+        assert effective() == [0, 3, 0]
+        db.add(
+            PolicyAssignment(scope=REGION, scope_id=region.id, policy_id=policies[1].id)
+        )
+        assert effective() == [1, 3, 1]
+        district = PolicyAssignment(
+            scope=DISTRICT, scope_id=near.id, policy_id=policies[2].id
+        )
+        db.add(district)
+        assert effective() == [2, 3, 1]
+
+        db.delete(district)
+        own.policy_id = None
+        assert effective() == [1, 1, 1]
@@ -0,0 +1,110 @@
+from uuid import uuid4
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models import App, Policy, PolicyApp, PolicyChange, UserRole
+from app.services.policy_sets import PolicySet
+
+
+def _policy_set(whitelist_apps=False, whitelist_web=False):
+    return PolicySet(
+        policy_id=uuid4(),
+        version=1,
+        whitelist_apps=whitelist_apps,
+        packages=frozenset({"com.game", "com.chat"}),
+        whitelist_web=whitelist_web,
+        domains=frozenset({"games.uz"}),
+    )
+
+
+def test_blacklist_blocks_listed_installed_packages():
+    policy = _policy_set()
+    installed = ["com.game", "com.maps"]
+    assert policy.blocked_packages(installed) == {"com.game"}
+    assert policy.blocks_package("com.chat")
+    assert not policy.blocks_package("com.maps")
+
+
+def test_whitelist_blocks_everything_else():
+    policy = _policy_set(whitelist_apps=True)
+    installed = ["com.game", "com.maps"]
+    assert policy.blocked_packages(installed) == {"com.maps"}
+    assert not policy.blocks_package("com.chat")
+
+
+def test_domains_are_normalized():
+    assert _policy_set().blocks_domain(" Games.UZ. ")
+    assert not _policy_set().blocks_domain("kun.uz")
+    assert _policy_set(whitelist_web=True).blocks_domain("kun.uz")
+
+
+def test_listed_domains_cover_subdomains():
+    assert _policy_set().blocked_domains(["m.games.uz", "kun.uz"]) == [True, False]
+    whitelist = _policy_set(whitelist_web=True)
+    assert whitelist.blocked_domains(["m.games.uz", "kun.uz"]) == [False, True]
+
+
+def test_edits_bump_policy_version():
+    engine = create_engine("sqlite://")
+    Policy.metadata.create_all(
+        engine,
+        tables=[
+            UserRole.__table__,
+            Policy.__table__,
+            App.__table__,
+            PolicyApp.__table__,
+            PolicyChange.__table__,
+        ],
+    )
+    with Session(engine) as db:
+        policy = Policy(name="Default", targeted_role_id=uuid4())
+        app = App(name="Game", package="com.game")
+        db.add_all([policy, app])
+        db.commit()
+        assert policy.version == 1
+
+        db.add(PolicyApp(policy_id=policy.id, app_id=app.id))
+        db.commit()
+        assert policy.version == 2
+
+        policy.is_whitelist_app = False
+        db.commit()
+        assert policy.version == 3
+
+        db.delete(db.scalars(select(PolicyApp)).one())
+        db.commit()
+        assert policy.version == 4
+
+        db.add(App(name="Maps", package="com.maps"))
+        db.commit()
+        assert policy.version == 4
+
+        log = db.execute(
+            select(
+                PolicyChange.version,
+                PolicyChange.kind,
+                PolicyChange.value,
+                PolicyChange.added,
+            ).order_by(PolicyChange.id)
+        ).all()
+        assert log == [
+            (2, "app", "com.game", True),
+            (3, "reset", None, True),
+            (4, "app", "com.game", False),
+        ]
+
+
+def test_identical_rules_share_a_snapshot():
+    first = _policy_set()
+    second = PolicySet(
+        policy_id=uuid4(),
+        version=7,
+        whitelist_apps=False,
+        packages=frozenset({"com.chat", "com.game"}),
+        whitelist_web=False,
+        domains=frozenset({"games.uz"}),
+    )
+    assert first.snapshot == second.snapshot
+    assert first.snapshot_hash == second.snapshot_hash
+    assert _policy_set(whitelist_apps=True).snapshot_hash != first.snapshot_hash
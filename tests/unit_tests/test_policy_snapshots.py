@@ -0,0 +1,13 @@
+from app.services.policy_snapshots import PolicySnapshots
+
+
+def test_least_recently_used_snapshot_is_dropped():
+    snapshots = PolicySnapshots(max_entries=2)
+    snapshots._remember("a", b"1")
+    snapshots._remember("b", b"2")
+    assert snapshots.cached("a") == b"1"
+    snapshots._remember("c", b"3")
+    assert len(snapshots) == 2
+    assert snapshots.cached("b") is None
+    assert snapshots.cached("a") == b"1"
+    assert snapshots.cached("c") == b"3"
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import policy_sync
+from app.services.policy_sets import _shift_changes
+from app.services.policy_sync import fold_changes, sync_device_policy
+
+SCHOOL = uuid4()
+USER = SimpleNamespace(id=uuid4())
+
+
+def test_last_change_of_a_value_wins():
+    apps, webs, schedule = fold_changes(
+        [
+            ("app", "com.game", True),
+            ("web", "games.uz", True),
+            ("app", "com.game", False),
+            ("app", "com.chat", True),
+        ],
+        SCHOOL,
+    )
+    assert apps == {"com.game": False, "com.chat": True}
+    assert webs == {"games.uz": True}
+    assert not schedule
+
+
+def test_only_own_school_schedule_counts():
+    assert not fold_changes([("schedule", str(uuid4()), True)], SCHOOL)[2]
+    assert fold_changes([("schedule", str(SCHOOL), True)], SCHOOL)[2]
+
+
+def test_own_shift_change_resends_the_schedule():
+    student = uuid4()
+    changes = [("schedule", str(student), True)]
+    assert fold_changes(changes, SCHOOL, student)[2]
+    assert not fold_changes(changes, SCHOOL, uuid4())[2]
+
+
+class _ShiftSession:
+    def __init__(self, assigned, school):
+        self.assigned = assigned
+        self.school = school
+
+    def scalar(self, stmt):
+        return self.assigned
+
+    def get(self, model, ident):
+        return self.school
+
+
+def test_shift_change_is_logged_for_the_students_policy():
+    student = SimpleNamespace(user_id=uuid4(), school_id=SCHOOL)
+    school = SimpleNamespace(effective_policy_id=uuid4())
+    own = uuid4()
+    assert _shift_changes(_ShiftSession(None, school), student) == [
+        (school.effective_policy_id, "schedule", str(student.user_id), True)
+    ]
+    assert _shift_changes(_ShiftSession(own, school), student)[0][0] == own
+    assert _shift_changes(_ShiftSession(None, None), student) == []
+
+
+def test_reset_needs_full_resend():
+    assert (
+        fold_changes([("app", "com.game", True), ("reset", None, True)], SCHOOL) is None
+    )
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    policy = SimpleNamespace(
+        policy_id=uuid4(),
+        version=7,
+        whitelist_apps=False,
+        whitelist_web=False,
+        packages={"com.game"},
+        domains={"games.uz"},
+    )
+    evaluator = SimpleNamespace(school_id=SCHOOL, shift=1)
+
+    async def device_policy(db, current_user, device_id):
+        return evaluator, policy
+
+    async def publish(db, policy):
+        return "f" * 64
+
+    async def school_windows(db, school_id, shift):
+        return [[] for _ in range(7)]
+
+    async def policy_delta(db, policy, since, school_id, user_id):
+        return {"com.chat": True}, {}, False
+
+    monkeypatch.setattr(policy_sync, "_device_policy", device_policy)
+    monkeypatch.setattr(policy_sync.policy_snapshots, "publish", publish)
+    monkeypatch.setattr(policy_sync, "school_windows", school_windows)
+    monkeypatch.setattr(policy_sync, "_policy_delta", policy_delta)
+    return policy
+
+
+@pytest.mark.asyncio
+async def test_since_needs_the_policy_it_counts(policy):
+    with pytest.raises(HTTPException) as exc:
+        await sync_device_policy(None, USER, uuid4(), since=3)
+    assert exc.value.status_code == 400
+
+    assert await sync_device_policy(None, USER, uuid4(), 7, policy.policy_id) is None
+    moved = await sync_device_policy(None, USER, uuid4(), 7, uuid4())
+    assert moved.full
+    delta = await sync_device_policy(None, USER, uuid4(), 3, policy.policy_id)
+    assert not delta.full
+    assert delta.packages_added == ["com.chat"]
+
+
+@pytest.mark.asyncio
+async def test_full_sync_sends_only_the_snapshot_hash(policy):
+    full = await sync_device_policy(None, USER, uuid4())
+    assert full.full and full.snapshot == "f" * 64
+    assert full.packages_added == full.domains_added == []
+    assert len(full.schedule) == 7
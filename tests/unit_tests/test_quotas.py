@@ -0,0 +1,69 @@
+from datetime import date, datetime, time, timezone
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import Session
+
+from app.services.quotas import (
+    APP,
+    WEB,
+    DeviceQuota,
+    QuotaTracker,
+    _drop_rolled_back,
+    _record_committed,
+)
+
+
+class FakeSession:
+    def __init__(self):
+        self.sync_session = Session()
+
+
+def test_record_splits_at_local_midnight():
+    tracker = QuotaTracker()
+    tracker.tz = ZoneInfo("Asia/Tashkent")
+    device, key = uuid4(), (APP, str(uuid4()))
+    # 23:50-00:05 in Tashkent, UTC+5
+    tracker.record(
+        device, key, datetime(2025, 3, 1, 18, 50), datetime(2025, 3, 1, 19, 5)
+    )
+    assert tracker.used(device, date(2025, 3, 1), key) == 600
+    assert tracker.used(device, date(2025, 3, 2), key) == 300
+
+
+def test_usage_is_counted_only_once_committed():
+    tracker = QuotaTracker()
+    device, key = uuid4(), (APP, str(uuid4()))
+    start, end = datetime(2025, 3, 1, 9), datetime(2025, 3, 1, 9, 10)
+    day = start.replace(tzinfo=timezone.utc).astimezone(tracker.tz).date()
+
+    db = FakeSession()
+    tracker.record_on_commit(db, device, key, start, end)
+    _drop_rolled_back(db.sync_session)
+    _record_committed(db.sync_session)
+    assert tracker.used(device, day, key) == 0
+
+    tracker.record_on_commit(db, device, key, start, end)
+    assert tracker.used(device, day, key) == 0
+    _record_committed(db.sync_session)
+    assert tracker.used(device, day, key) == 600
+
+
+def test_status_combines_loaded_and_pending_usage():
+    tracker = QuotaTracker()
+    device, user_app_id = uuid4(), uuid4()
+    app_key, web_key = (APP, str(user_app_id)), (WEB, "example.com")
+    entry = DeviceQuota(
+        uuid4(), tracker.today(), {app_key: 3600, web_key: 600}, {app_key: 3000}
+    )
+    tracker._devices[device] = entry
+
+    noon = datetime.combine(tracker.today(), time(12), tracker.tz)
+    noon = noon.astimezone(timezone.utc).replace(tzinfo=None)
+    tracker.record(device, app_key, noon, noon.replace(minute=5))
+    tracker.add_seconds(device, web_key, 900)
+
+    app_item, web_item = tracker.status(device, entry).items
+    assert (app_item.user_app_id, app_item.used_seconds) == (user_app_id, 3300)
+    assert app_item.remaining_seconds == 300
+    assert (web_item.domain, web_item.remaining_seconds) == ("example.com", 0)
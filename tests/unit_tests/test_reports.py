@@ -0,0 +1,108 @@
+import re
+from datetime import date, datetime
+from types import SimpleNamespace
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.core.config import config
+from app.core.pdf import latin, render_table
+from app.enums.enums import Shifts
+from app.schemas._reports import ReportCreate
+from app.services import reports
+from app.services.report_render import render_report
+from app.services.reports import (
+    FAILED,
+    QUEUED,
+    build_report,
+    params_hash,
+    report_params,
+    report_path,
+    store_report,
+    week_bounds,
+)
+
+
+def test_identical_requests_share_a_hash():
+    school_id = uuid4()
+    one = ReportCreate(school_id=school_id, week_start=date(2025, 8, 18))
+    two = ReportCreate(school_id=school_id, week_start=date(2025, 8, 18), format="csv")
+    other = ReportCreate(
+        school_id=school_id, week_start=date(2025, 8, 18), shift=Shifts.MORNING
+    )
+
+    assert params_hash(report_params(one)) == params_hash(report_params(two))
+    assert params_hash(report_params(one)) != params_hash(report_params(other))
+
+
+def test_week_bounds_follow_local_midnight():
+    start, end = week_bounds(date(2025, 8, 18), ZoneInfo("Asia/Tashkent"))
+
+    assert start == datetime(2025, 8, 17, 19)
+    assert end == datetime(2025, 8, 24, 19)
+
+
+def test_files_are_stored_by_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "REPORT_DIR", str(tmp_path))
+    content = render_report("csv", "t", ["Student", "Regular"], [["Ali", "3"]])
+
+    first = store_report(content, "csv")
+    second = store_report(content, "csv")
+
+    assert first == second
+    assert report_path(first, "csv").read_bytes() == content
+    assert content.decode("utf-8-sig") == "Student,Regular\r\nAli,3\r\n"
+    assert len(list(tmp_path.rglob("*.csv"))) == 1
+
+
+def test_pdf_cross_reference_points_at_objects():
+    rows = [[f"Student {i}", "morning", "1", "2", "3", "0", "0"] for i in range(90)]
+    pdf = render_table("School", ["Student"] * 7, rows)
+
+    offsets = re.search(rb"xref\n0 (\d+)\n(.*?)trailer", pdf, re.S)
+    entries = offsets.group(2).splitlines()[1:]
+    assert len(entries) == int(offsets.group(1)) - 1
+    for number, entry in enumerate(entries, 1):
+        assert pdf[int(entry[:10]) :].startswith(b"%d 0 obj" % number)
+    start = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    assert pdf[start:].startswith(b"xref")
+    assert pdf.count(b"/Type /Page ") == 3
+
+
+def test_cyrillic_is_transliterated_for_pdf():
+    assert latin("Шоҳрух Ўринов") == "Shohrux O'rinov"
+
+
+class _JobSession:
+    """Collects the values of every job update."""
+
+    def __init__(self):
+        self.updates = []
+
+    async def execute(self, stmt):
+        self.updates.append({col.key: value for col, value in stmt._values.items()})
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+@pytest.mark.parametrize("attempts, status", [(1, QUEUED), (3, FAILED)])
+@pytest.mark.asyncio
+async def test_failed_builds_are_requeued_then_given_up(monkeypatch, attempts, status):
+    async def report_rows(db, params):
+        raise ValueError("School no longer exists")
+
+    monkeypatch.setattr(reports, "report_rows", report_rows)
+    monkeypatch.setattr(config, "REPORT_MAX_ATTEMPTS", 3)
+    db = _JobSession()
+    job = SimpleNamespace(id=uuid4(), attempts=attempts, params={"format": "csv"})
+    await build_report(db, job, pool=None)
+
+    (update,) = db.updates
+    assert update["status"].value == status
+    assert update["error"].value == "School no longer exists"
+    assert update["locked_until"].value is None
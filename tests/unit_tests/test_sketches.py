@@ -0,0 +1,112 @@
+import random
+from datetime import datetime
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.sketches import CountMinSketch, HyperLogLog, hash64
+from app.services.app_sketches import (
+    AppSketch,
+    AppSketchTracker,
+    _count_committed,
+    _drop_rolled_back,
+)
+
+
+def _h(i):
+    return hash64(i.to_bytes(8, "little"))
+
+
+def test_count_min_never_undercounts():
+    rng = random.Random(1)
+    cms = CountMinSketch(256, 4)
+    true = {}
+    for _ in range(20_000):
+        key = int(rng.paretovariate(1.2)) % 5000
+        true[key] = true.get(key, 0) + 1
+        cms.add(_h(key))
+    total = sum(true.values())
+    for key, count in true.items():
+        estimate = cms.estimate(_h(key))
+        assert estimate >= count
+        assert estimate - count <= total * 4 / 256
+
+
+def test_hyperloglog_estimate_and_union():
+    a, b = HyperLogLog(12), HyperLogLog(12)
+    for i in range(30_000):
+        a.add(_h(i))
+    for i in range(20_000, 50_000):
+        b.add(_h(i))
+    assert abs(a.count() - 30_000) / 30_000 < 0.05
+    a.merge(b)
+    assert abs(a.count() - 50_000) / 50_000 < 0.05
+
+    small = HyperLogLog(10)
+    for i in range(40):
+        small.add(_h(i))
+    assert abs(small.count() - 40) <= 2
+
+
+def _sketch():
+    return AppSketch(capacity=5, width=512, depth=4, precision=10)
+
+
+def test_app_sketch_top_k_and_merge():
+    apps = [uuid4() for _ in range(20)]
+    one, two = _sketch(), _sketch()
+    for rank, app_id in enumerate(apps):
+        # app i has 1000 - 40 i events on 50 - 2 i devices, split in two days
+        one.add(app_id, 500 - 20 * rank, (_h(d) for d in range(25 - rank)))
+        two.add(
+            app_id, 500 - 20 * rank, (_h(d) for d in range(25 - rank, 50 - 2 * rank))
+        )
+    one.prune()
+    two.prune()
+    top = one.merge(two).top_k(3)
+
+    assert [app_id for app_id, _, _ in top] == apps[:3]
+    for rank, (_, events, devices) in enumerate(top):
+        assert events >= 1000 - 40 * rank
+        assert abs(devices - (50 - 2 * rank)) <= 2
+
+
+def test_app_sketch_round_trip():
+    sketch = _sketch()
+    apps = [uuid4() for _ in range(8)]
+    for i, app_id in enumerate(apps):
+        sketch.add(app_id, 10 * (i + 1), [_h(i), _h(i + 100)])
+    restored = AppSketch.from_bytes(sketch.to_bytes())
+
+    assert restored.top_k(5) == sketch.top_k(5)
+    assert len(restored.top) == 5
+    assert all(isinstance(app_id, UUID) for app_id in restored.top)
+    restored.merge(sketch)
+    assert restored.top_k(1)[0][1] == 2 * 80
+
+
+class FakeSession:
+    def __init__(self):
+        self.sync_session = Session()
+
+
+@pytest.mark.asyncio
+async def test_tracker_counts_committed_events_only():
+    tracker = AppSketchTracker(10)
+    device, school, app_id = uuid4(), uuid4(), uuid4()
+    tracker._schools[device] = school
+    event = (device, app_id, datetime(2025, 3, 1, 9), 3)
+
+    db = FakeSession()
+    await tracker.observe(db, [event])
+    assert tracker._pending == {}
+    _drop_rolled_back(db.sync_session)
+    _count_committed(db.sync_session)
+    assert tracker._pending == {}
+
+    await tracker.observe(db, [event])
+    await tracker.observe(db, [event])
+    _count_committed(db.sync_session)
+    (apps,) = tracker._pending.values()
+    assert apps[app_id] == [6, {hash64(device.bytes)}]
@@ -0,0 +1,71 @@
+import os
+from uuid import uuid4
+
+from app.core.spool import RECORD_HEADER, Spool
+
+
+def _records(n):
+    return [{"id": str(uuid4()), "n": i} for i in range(n)]
+
+
+def test_append_seal_and_read_back(tmp_path):
+    spool = Spool(str(tmp_path))
+    records = _records(5)
+    spool.append_many(records)
+    assert spool.sealed_segments() == []
+
+    spool.seal()
+    (segment,) = spool.sealed_segments()
+    assert list(spool.read_segment(segment)) == records
+
+    spool.remove(segment)
+    assert spool.is_empty()
+    spool.close()
+
+
+def test_segments_roll_at_size_limit(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=200)
+    records = _records(20)
+    for r in records:
+        spool.append(r)
+    spool.seal()
+
+    read = [r for seg in spool.sealed_segments() for r in spool.read_segment(seg)]
+    assert len(spool.sealed_segments()) > 1
+    assert read == records
+    spool.close()
+
+
+def test_torn_tail_is_truncated_on_reopen(tmp_path):
+    spool = Spool(str(tmp_path))
+    records = _records(3)
+    spool.append_many(records)
+    spool.close()
+
+    (segment,) = list(tmp_path.iterdir())
+    with open(segment, "ab") as fh:
+        fh.write(RECORD_HEADER.pack(100, 0) + b"partial")
+
+    spool = Spool(str(tmp_path))
+    spool.seal()
+    (segment,) = spool.sealed_segments()
+    assert list(spool.read_segment(segment)) == records
+    spool.close()
+
+
+def test_corrupt_record_ends_segment(tmp_path):
+    spool = Spool(str(tmp_path))
+    records = _records(3)
+    spool.append_many(records)
+    spool.seal()
+    (segment,) = spool.sealed_segments()
+
+    first_len = len(Spool.encode(records[0]))
+    with open(segment, "r+b") as fh:
+        fh.seek(first_len + RECORD_HEADER.size + 2)
+        fh.write(b"X")
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    assert list(spool.read_segment(segment)) == records[:1]
+    spool.close()
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.config import config
+from app.services import usage_sessions
+from app.services.usage_sessions import (
+    _ACTIONS_CHANGED,
+    _advance,
+    _drop_close_actions,
+    _sessions_from_rows,
+    close_action_ids,
+)
+
+T0 = datetime(2025, 3, 1, 9, 0)
+IDLE = timedelta(seconds=config.USAGE_SESSION_IDLE_SECONDS)
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+        self.info = {}
+
+    def add(self, obj):
+        self.added.append(obj)
+
+
+def _at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+@pytest.fixture
+def ids():
+    return uuid4(), uuid4(), uuid4()
+
+
+def _events(device, game, chat):
+    # (user_device_id, user_app_id, done_at, last_at, is_close)
+    return [
+        (device, game, _at(0), None, False),
+        (device, game, _at(1), _at(3), False),  # coalesced run
+        (device, chat, _at(4), None, False),  # switch ends the game session
+        (device, chat, _at(6), None, True),  # explicit close
+        (device, chat, _at(7), None, True),  # lone close opens nothing
+        (device, game, _at(30), None, False),  # after an idle gap
+        (device, game, _at(31), None, False),
+        (device, None, _at(32), None, True),  # screen off
+    ]
+
+
+def test_batch_sessions(ids):
+    device, game, chat = ids
+    sessions = _sessions_from_rows(_events(device, game, chat))
+    assert [
+        (s["user_app_id"], s["started_at"], s["ended_at"], s["is_closed"])
+        for s in sessions
+    ] == [
+        (game, _at(0), _at(4), True),
+        (chat, _at(4), _at(6), True),
+        (game, _at(30), _at(32), True),
+    ]
+
+
+def test_idle_gap_splits_and_last_session_stays_open(ids):
+    device, game, _ = ids
+    rows = [
+        (device, game, T0, None, False),
+        (device, game, T0 + IDLE + timedelta(seconds=1), None, False),
+    ]
+    sessions = _sessions_from_rows(rows)
+    assert [(s["started_at"], s["ended_at"], s["is_closed"]) for s in sessions] == [
+        (T0, T0, True),
+        (T0 + IDLE + timedelta(seconds=1), T0 + IDLE + timedelta(seconds=1), False),
+    ]
+
+
+def test_incremental_matches_batch(ids):
+    device, game, chat = ids
+    rows = _events(device, game, chat)
+    db, current = FakeSession(), None
+    for _, app, done_at, last_at, is_close in rows:
+        current = _advance(
+            db, device, current, (done_at, last_at or done_at, app, is_close)
+        )
+
+    incremental = [
+        (s.user_app_id, s.started_at, s.ended_at, s.is_closed) for s in db.added
+    ]
+    batch = [
+        (s["user_app_id"], s["started_at"], s["ended_at"], s["is_closed"])
+        for s in _sessions_from_rows(rows)
+    ]
+    assert incremental == batch
+
+
+class _Ids:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def scalars(self):
+        return iter(self.ids)
+
+
+class ActionLookup:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = 0
+
+    async def execute(self, stmt):
+        self.queries += 1
+        return _Ids(self.results.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_close_action_ids_are_rechecked(monkeypatch):
+    monkeypatch.setattr(usage_sessions, "_close_action_ids", None)
+    close = uuid4()
+    db = ActionLookup([], [close], [])
+
+    # actions not seeded yet are not cached as empty for good
+    assert await close_action_ids(db) == set()
+    assert await close_action_ids(db) == set()
+    assert db.queries == 1
+    monkeypatch.setattr(config, "USAGE_CLOSE_ACTIONS_REFRESH_SECONDS", 0)
+    assert await close_action_ids(db) == {close}
+    assert db.queries == 2
+
+    monkeypatch.setattr(config, "USAGE_CLOSE_ACTIONS_REFRESH_SECONDS", 3600)
+    session = Session()
+    session.info[_ACTIONS_CHANGED] = True
+    _drop_close_actions(session)
+    assert await close_action_ids(db) == set()
+    assert db.queries == 3